@@ -1,6 +1,6 @@
 """Tests for CSCS-DWDI backend."""
 
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
 from typing import Any, Optional
 from unittest.mock import MagicMock, call, patch
 
@@ -11,7 +11,7 @@ from waldur_site_agent_cscs_dwdi.backend import (
     CSCSDWDIInferenceBackend,
     CSCSDWDIStorageBackend,
 )
-from waldur_site_agent_cscs_dwdi.client import CSCSDWDIClient
+from waldur_site_agent_cscs_dwdi.client import CSCSDWDIClient, get_shared_client
 
 
 class TestCSCSDWDIClient:
@@ -247,6 +247,136 @@ class TestCSCSDWDIClient:
         assert token1 == token2
 
 
+class TestConnectionPooling:
+    """Tests for the pooled HTTP connections and the shared clients."""
+
+    @staticmethod
+    def _token_response(token: str = "pooled_token") -> MagicMock:
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = {"access_token": token, "expires_in": 3600}
+        return response
+
+    def test_requests_share_one_http_client(self) -> None:
+        with patch("waldur_site_agent_cscs_dwdi.client.httpx.Client") as mock_client_class:
+            http = mock_client_class.return_value
+            http.post.return_value = self._token_response()
+            http.get.return_value.status_code = 200
+            http.get.return_value.json.return_value = {"compute": []}
+
+            client = CSCSDWDIClient(
+                api_url="https://api.example.com",
+                client_id="test_client",
+                client_secret="test_secret",
+                oidc_token_url="https://oidc.example.com/token",
+                socks_proxy="socks5://localhost:12345",
+            )
+            client.get_usage_for_month(["acc1"], date(2025, 1, 1), date(2025, 1, 31))
+            client.get_storage_usage_for_month(["/store/acc1"], "capstor", "store", "2025-01")
+            assert client.ping() is True
+
+        mock_client_class.assert_called_once()
+        assert mock_client_class.call_args.kwargs["proxy"] == "socks5://localhost:12345"
+        assert http.get.call_count == 3
+        # The token is acquired once and reused by all requests
+        http.post.assert_called_once()
+        assert http.get.call_args.kwargs["headers"] == {"Authorization": "Bearer pooled_token"}
+
+    def test_rejected_token_is_renewed(self) -> None:
+        with patch("waldur_site_agent_cscs_dwdi.client.httpx.Client") as mock_client_class:
+            http = mock_client_class.return_value
+            http.post.side_effect = [
+                self._token_response("revoked_token"),
+                self._token_response("new_token"),
+            ]
+            rejected = MagicMock(status_code=401)
+            accepted = MagicMock(status_code=200)
+            accepted.json.return_value = {"compute": []}
+            http.get.side_effect = [rejected, accepted]
+
+            client = CSCSDWDIClient(
+                api_url="https://api.example.com",
+                client_id="test_client",
+                client_secret="test_secret",
+                oidc_token_url="https://oidc.example.com/token",
+            )
+            result = client.get_usage_for_month(["acc1"], date(2025, 1, 1), date(2025, 1, 31))
+
+        assert result == {"compute": []}
+        assert http.post.call_count == 2
+        assert http.get.call_args.kwargs["headers"] == {"Authorization": "Bearer new_token"}
+
+    def test_close_releases_the_connections(self) -> None:
+        with patch("waldur_site_agent_cscs_dwdi.client.httpx.Client") as mock_client_class:
+            client = CSCSDWDIClient(
+                api_url="https://api.example.com",
+                client_id="test_client",
+                client_secret="test_secret",
+            )
+            client._get_http_client()
+            client.close()
+
+        mock_client_class.return_value.close.assert_called_once()
+        assert client._http is None
+
+    def test_backends_share_a_client(self) -> None:
+        backend_settings = {
+            "cscs_dwdi_api_url": "https://shared.example.com",
+            "cscs_dwdi_client_id": "test_client",
+            "cscs_dwdi_client_secret": "test_secret",
+            "cscs_dwdi_oidc_token_url": "https://oidc.example.com/token",
+        }
+
+        compute = CSCSDWDIComputeBackend(backend_settings, {})
+        storage = CSCSDWDIStorageBackend(
+            {
+                **backend_settings,
+                "storage_filesystem": "lustre",
+                "storage_data_type": "projects",
+            },
+            {},
+        )
+        other = CSCSDWDIComputeBackend(
+            {**backend_settings, "cscs_dwdi_client_id": "other_client"}, {}
+        )
+
+        assert compute.cscs_client is storage.cscs_client
+        assert other.cscs_client is not compute.cscs_client
+
+    def test_rotated_secret_closes_the_previous_client(self) -> None:
+        settings = {
+            "api_url": "https://rotated.example.com",
+            "client_id": "test_client",
+            "oidc_token_url": "https://oidc.example.com/token",
+        }
+        old_client = get_shared_client(client_secret="old_secret", **settings)
+        with patch.object(old_client, "close") as mock_close:
+            new_client = get_shared_client(client_secret="new_secret", **settings)
+
+        mock_close.assert_called_once()
+        assert new_client is not old_client
+        assert new_client.client_secret == "new_secret"
+        assert get_shared_client(client_secret="new_secret", **settings) is new_client
+
+    def test_token_is_acquired_without_holding_the_lock(self) -> None:
+        client = CSCSDWDIClient(
+            api_url="https://api.example.com",
+            client_id="test_client",
+            client_secret="test_secret",
+            oidc_token_url="https://oidc.example.com/token",
+        )
+
+        def acquire(oidc_token_url: str) -> tuple[str, datetime]:
+            assert not client._token_lock.locked()
+            return "fresh_token", datetime.now(tz=timezone.utc) + timedelta(minutes=5)
+
+        with patch.object(client, "_acquire_oidc_token", side_effect=acquire) as mock_acquire:
+            assert client._get_auth_token() == "fresh_token"
+            assert client._get_auth_token() == "fresh_token"
+
+        mock_acquire.assert_called_once_with("https://oidc.example.com/token")
+
+
 class TestCSCSDWDIComputeBackend:
     """Tests for CSCS-DWDI compute backend."""
 
@@ -863,6 +993,97 @@ class TestCSCSDWDIComputeBackend:
         assert result == {}
 
 
+class TestComputeBulkUsage:
+    """Tests for the usage of many accounts queried per cluster."""
+
+    @staticmethod
+    def _backend() -> CSCSDWDIComputeBackend:
+        return CSCSDWDIComputeBackend(
+            {
+                "cscs_dwdi_api_url": "https://api.example.com",
+                "cscs_dwdi_client_id": "test_client",
+                "cscs_dwdi_client_secret": "test_secret",
+                "cscs_dwdi_oidc_token_url": "https://oidc.example.com/token",
+            },
+            {"nodeHours": {"measured_unit": "node-hours", "unit_factor": 1}},
+        )
+
+    @staticmethod
+    def _resource(backend_id: str, offering_backend_id: Optional[str]) -> MagicMock:
+        resource = MagicMock()
+        resource.backend_id = backend_id
+        resource.offering_backend_id = offering_backend_id
+        return resource
+
+    @staticmethod
+    def _usage_response(accounts: list[str], **kwargs: Any) -> dict[str, Any]:
+        return {
+            "compute": [
+                {
+                    "account": account,
+                    "totalNodeHours": 10.0,
+                    "users": [{"username": "u1", "nodeHours": 10.0}],
+                }
+                for account in accounts
+            ]
+        }
+
+    def test_accounts_are_queried_once_per_cluster(self) -> None:
+        backend = self._backend()
+        resources = [
+            self._resource("acc1", "Alps"),
+            self._resource("acc2", "Alps"),
+            self._resource("acc3", "Eiger"),
+            self._resource("acc4", None),
+        ]
+
+        with patch.object(backend.cscs_client, "get_usage_for_month") as mock_get:
+            mock_get.side_effect = lambda accounts, **kwargs: self._usage_response(
+                [account for account in accounts if account != "acc2"]
+            )
+            report = backend.pull_resources_usage(resources)
+
+        queries = sorted(
+            (call_args.kwargs["clusters"], call_args.kwargs["accounts"])
+            for call_args in mock_get.call_args_list
+        )
+        assert queries == [(["alps"], ["acc1", "acc2"]), (["eiger"], ["acc3"])]
+        assert set(report) == {"acc1", "acc2", "acc3"}
+        assert report["acc1"].usage["TOTAL_ACCOUNT_USAGE"] == {"nodeHours": 10.0}
+        assert report["acc1"].users == ["u1"]
+        assert report["acc2"].usage == {"TOTAL_ACCOUNT_USAGE": {"nodeHours": 0.0}}
+
+    def test_batched_period_report_uses_the_clusters_of_the_accounts(self) -> None:
+        backend = self._backend()
+        with patch.object(backend.cscs_client, "get_usage_for_month") as mock_get:
+            mock_get.side_effect = lambda accounts, **kwargs: self._usage_response(accounts)
+            backend.pull_resources_usage(
+                [self._resource("acc1", "alps"), self._resource("acc2", "eiger")]
+            )
+            mock_get.reset_mock()
+
+            report = backend.get_usage_report_for_period(["acc1", "acc2", "acc3"], 2024, 1)
+
+        queries = sorted(
+            (call_args.kwargs["clusters"] or [], call_args.kwargs["accounts"])
+            for call_args in mock_get.call_args_list
+        )
+        assert queries == [([], ["acc3"]), (["alps"], ["acc1"]), (["eiger"], ["acc2"])]
+        assert set(report) == {"acc1", "acc2", "acc3"}
+
+    def test_cycle_reset_forgets_the_clusters_of_the_accounts(self) -> None:
+        backend = self._backend()
+        with patch.object(backend.cscs_client, "get_usage_for_month") as mock_get:
+            mock_get.side_effect = lambda accounts, **kwargs: self._usage_response(accounts)
+            backend.pull_resources_usage([self._resource("acc1", "alps")])
+            backend.reset_cycle_caches()
+            mock_get.reset_mock()
+
+            backend.get_usage_report_for_period(["acc1"], 2024, 1)
+
+        assert mock_get.call_args.kwargs["clusters"] is None
+
+
 class TestCSCSDWDIStorageBackend:
     """Tests for CSCS-DWDI storage backend historical usage."""
 
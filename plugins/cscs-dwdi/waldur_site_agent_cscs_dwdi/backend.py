@@ -2,6 +2,7 @@
 
 import calendar
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from typing import Any, Optional
 
@@ -14,15 +15,20 @@ from waldur_site_agent.backend import utils as backend_utils
 from waldur_site_agent.backend.backends import BaseBackend
 from waldur_site_agent.common.structures import BackendComponent
 
-from .client import CSCSDWDIClient
+from .client import get_shared_client
 
 logger = logging.getLogger(__name__)
 
+# Cluster queries of a usage report sent to the API at the same time
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+
 
 class CSCSDWDIComputeBackend(BaseBackend):
     """Backend for reporting compute usage from CSCS-DWDI API."""
 
     supports_decreasing_usage: bool = True
+    # The API reports many accounts per query, see pull_resources_usage
+    supports_bulk_usage_report: bool = True
 
     def __init__(
         self, backend_settings: dict[str, Any], backend_components: dict[str, Any]
@@ -64,6 +70,14 @@ class CSCSDWDIComputeBackend(BaseBackend):
         # Optional cluster filter for historical usage queries
         self.cluster = backend_settings.get("cscs_dwdi_cluster")
 
+        self.max_concurrent_requests = int(
+            backend_settings.get(
+                "cscs_dwdi_max_concurrent_requests", DEFAULT_MAX_CONCURRENT_REQUESTS
+            )
+        )
+        # Account -> clusters of its resource, for the batched historical queries
+        self._account_clusters: dict[str, tuple[str, ...]] = {}
+
         if not all([self.api_url, self.client_id, self.client_secret, self.oidc_token_url]):
             msg = (
                 "CSCS-DWDI backend requires cscs_dwdi_api_url, cscs_dwdi_client_id, "
@@ -71,7 +85,7 @@ class CSCSDWDIComputeBackend(BaseBackend):
             )
             raise ValueError(msg)
 
-        self.cscs_client = CSCSDWDIClient(
+        self.cscs_client = get_shared_client(
             api_url=self.api_url,
             client_id=self.client_id,
             client_secret=self.client_secret,
@@ -163,6 +177,78 @@ class CSCSDWDIComputeBackend(BaseBackend):
             logger.exception("Failed to get usage report from CSCS-DWDI")
             raise
 
+    def _get_compute_usage_by_cluster(
+        self,
+        accounts_by_clusters: dict[tuple[str, ...], list[str]],
+        from_date: date,
+        to_date: date,
+    ) -> dict[str, dict[str, dict[str, float]]]:
+        """Query the usage of groups of accounts, each filtered by its own clusters.
+
+        The groups are queried concurrently over the shared connection pool.
+        An empty clusters tuple queries the group without a cluster filter.
+        """
+        if not accounts_by_clusters:
+            return {}
+        workers = max(1, min(self.max_concurrent_requests, len(accounts_by_clusters)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    self._get_compute_usage_for_dates,
+                    accounts,
+                    from_date,
+                    to_date,
+                    clusters=list(clusters) or None,
+                )
+                for clusters, accounts in accounts_by_clusters.items()
+            ]
+            report: dict[str, dict[str, dict[str, float]]] = {}
+            for future in futures:
+                report.update(future.result())
+        return report
+
+    def pull_resources_usage(
+        self, waldur_resources: list[WaldurResource]
+    ) -> dict[str, structures.BackendResourceInfo]:
+        """Pull the current month's usage of many accounts with one query per cluster.
+
+        Like pull_resource, each account is filtered by the cluster of its
+        resource's offering_backend_id, and resources without one are skipped.
+        """
+        accounts_by_clusters: dict[tuple[str, ...], list[str]] = {}
+        for waldur_resource in waldur_resources:
+            account_name = waldur_resource.backend_id
+            if not account_name:
+                continue
+            cluster_name = self._get_offering_cluster(waldur_resource)
+            if cluster_name is None:
+                logger.error("Resource %s is missing offering_backend_id, skipping", account_name)
+                continue
+            clusters = (cluster_name,)
+            self._account_clusters[account_name] = clusters
+            accounts_by_clusters.setdefault(clusters, []).append(account_name)
+
+        today = backend_utils.get_current_time_in_timezone(self.timezone).date()
+        usage_report = self._get_compute_usage_by_cluster(
+            accounts_by_clusters, today.replace(day=1), today
+        )
+
+        report = {}
+        for accounts in accounts_by_clusters.values():
+            for account_name in accounts:
+                account_usage = usage_report.get(account_name)
+                if account_usage is None:
+                    empty_usage = dict.fromkeys(self.backend_components, 0.0)
+                    account_usage = {"TOTAL_ACCOUNT_USAGE": empty_usage}
+                report[account_name] = structures.BackendResourceInfo(
+                    backend_id=account_name,
+                    users=[
+                        username for username in account_usage if username != "TOTAL_ACCOUNT_USAGE"
+                    ],
+                    usage=account_usage,
+                )
+        return report
+
     def _get_usage_report(
         self, resource_backend_ids: list[str], clusters: Optional[list[str]] = None
     ) -> dict[str, dict[str, dict[str, float]]]:
@@ -185,6 +271,9 @@ class CSCSDWDIComputeBackend(BaseBackend):
     ) -> dict[str, dict[str, dict[str, float]]]:
         """Get usage report for a specific billing period.
 
+        Without a waldur_resource, the accounts are filtered by the clusters
+        seen for them in pull_resources_usage, one concurrent query per cluster.
+
         Args:
             resource_backend_ids: List of account identifiers
             year: Year to query
@@ -199,10 +288,30 @@ class CSCSDWDIComputeBackend(BaseBackend):
 
         from_date = date(year, month, 1)
         to_date = date(year, month, calendar.monthrange(year, month)[1])
-        clusters = self._resolve_clusters(waldur_resource)
-        return self._get_compute_usage_for_dates(
-            resource_backend_ids, from_date, to_date, clusters=clusters
-        )
+        if waldur_resource is not None:
+            clusters = self._resolve_clusters(waldur_resource)
+            return self._get_compute_usage_for_dates(
+                resource_backend_ids, from_date, to_date, clusters=clusters
+            )
+
+        default_clusters = tuple(self._resolve_clusters() or ())
+        accounts_by_clusters: dict[tuple[str, ...], list[str]] = {}
+        for account_name in resource_backend_ids:
+            account_clusters = self._account_clusters.get(account_name, default_clusters)
+            accounts_by_clusters.setdefault(account_clusters, []).append(account_name)
+        return self._get_compute_usage_by_cluster(accounts_by_clusters, from_date, to_date)
+
+    def reset_cycle_caches(self) -> None:
+        """Forget the clusters seen for the accounts in the previous cycle."""
+        self._account_clusters = {}
+
+    @staticmethod
+    def _get_offering_cluster(waldur_resource: WaldurResource) -> Optional[str]:
+        """Return the lowercase cluster of the resource's offering_backend_id, if set."""
+        offering_backend_id = getattr(waldur_resource, "offering_backend_id", None)
+        if not offering_backend_id or isinstance(offering_backend_id, Unset):
+            return None
+        return offering_backend_id.lower()
 
     def _resolve_clusters(
         self, waldur_resource: Optional[WaldurResource] = None,
@@ -212,13 +321,10 @@ class CSCSDWDIComputeBackend(BaseBackend):
         Uses offering_backend_id from the Waldur resource (same as pull_resource),
         falling back to self.cluster from backend_settings config.
         """
-        if (
-            waldur_resource is not None
-            and hasattr(waldur_resource, "offering_backend_id")
-            and waldur_resource.offering_backend_id
-            and not isinstance(waldur_resource.offering_backend_id, Unset)
-        ):
-            cluster_name = waldur_resource.offering_backend_id.lower()
+        cluster_name = (
+            self._get_offering_cluster(waldur_resource) if waldur_resource is not None else None
+        )
+        if cluster_name is not None:
             logger.info(
                 "Using cluster filter from offering_backend_id: %s",
                 cluster_name,
@@ -584,7 +690,7 @@ class CSCSDWDIStorageBackend(BaseBackend):
             )
             raise ValueError(msg)
 
-        self.cscs_client = CSCSDWDIClient(
+        self.cscs_client = get_shared_client(
             api_url=self.api_url,
             client_id=self.client_id,
             client_secret=self.client_secret,
@@ -916,7 +1022,7 @@ class CSCSDWDIInferenceBackend(BaseBackend):
             raise ValueError(msg)
 
 
-        self.cscs_client = CSCSDWDIClient(
+        self.cscs_client = get_shared_client(
             api_url=self.api_url,
             client_id=self.client_id,
             client_secret=self.client_secret,
@@ -1,6 +1,15 @@
-"""CSCS-DWDI API client implementation."""
+"""CSCS-DWDI API client implementation.
 
+Each client keeps one pooled ``httpx.Client`` for its lifetime, so repeated
+queries reuse the TCP, TLS and SOCKS proxy connections, and HTTP/2 is used when
+the ``h2`` package is installed. The compute, storage and inference backends of
+an agent obtain their client from ``get_shared_client`` and share the pool and
+the OIDC token when they talk to the same API with the same credentials.
+"""
+
+import importlib.util
 import logging
+import threading
 from datetime import date, datetime, timedelta, timezone
 from typing import Any, Optional
 
@@ -9,11 +18,18 @@ import httpx
 logger = logging.getLogger(__name__)
 
 HTTP_OK = 200
+HTTP_UNAUTHORIZED = 401
 
 # Refresh token 30 seconds before expiry
 REFRESH_MARGIN_SECONDS = 30
 TOKEN_EXPIRATION_SECONDS = 300
 
+REQUEST_TIMEOUT_SECONDS = 30.0
+PING_TIMEOUT_SECONDS = 10.0
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
 class CSCSDWDIClient:
     """Client for interacting with CSCS-DWDI API."""
 
@@ -44,23 +60,81 @@ class CSCSDWDIClient:
         self.socks_proxy = socks_proxy
         self._token: Optional[str] = None
         self._token_expires_at: Optional[datetime] = None
+        self._token_lock = threading.Lock()
+        self._http: Optional[httpx.Client] = None
+        self._http_lock = threading.Lock()
+
+    def _get_http_client(self) -> httpx.Client:
+        """Return the pooled HTTP client, creating it on first use."""
+        with self._http_lock:
+            if self._http is None:
+                client_args: dict[str, Any] = {
+                    "timeout": REQUEST_TIMEOUT_SECONDS,
+                    "http2": HTTP2_AVAILABLE,
+                }
+                if self.socks_proxy:
+                    client_args["proxy"] = self.socks_proxy
+                    logger.debug("Using SOCKS proxy for CSCS-DWDI API: %s", self.socks_proxy)
+                self._http = httpx.Client(**client_args)
+            return self._http
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        with self._http_lock:
+            if self._http is not None:
+                self._http.close()
+                self._http = None
+
+    def _get(
+        self,
+        path: str,
+        params: dict[str, Any],
+        timeout: float = REQUEST_TIMEOUT_SECONDS,
+    ) -> httpx.Response:
+        """Send an authenticated GET request over the pooled connections.
+
+        A request rejected with 401 is sent once more with a new token, as the
+        token may be revoked before its announced expiry.
+        """
+        url = f"{self.api_url}{path}"
+        http = self._get_http_client()
+        token = self._get_auth_token()
+        response = http.get(
+            url, params=params, headers={"Authorization": f"Bearer {token}"}, timeout=timeout
+        )
+        if response.status_code == HTTP_UNAUTHORIZED:
+            logger.info("CSCS-DWDI API rejected the token, acquiring a new one")
+            token = self._get_auth_token(expired_token=token)
+            response = http.get(
+                url, params=params, headers={"Authorization": f"Bearer {token}"}, timeout=timeout
+            )
+        return response
 
-    def _get_auth_token(self) -> str:
+    def _get_auth_token(self, expired_token: Optional[str] = None) -> str:
         """Get or refresh OIDC authentication token.
 
+        The token is shared by all threads using the client. The lock only
+        guards reading and replacing it, so a slow OIDC provider does not
+        block the threads that still hold a valid token.
+
+        Args:
+            expired_token: Token rejected by the API, renewed even if not expired yet
+
         Returns:
             Valid authentication token
 
         Raises:
             httpx.HTTPError: If token acquisition fails
         """
-        # Check if we have a valid cached token
-        if (
-            self._token
-            and self._token_expires_at
-            and datetime.now(tz=timezone.utc) < self._token_expires_at
-        ):
-            return self._token
+        with self._token_lock:
+            # Check if we have a valid cached token
+            if (
+                self._token
+                and self._token != expired_token
+                and self._token_expires_at
+                and datetime.now(tz=timezone.utc) < self._token_expires_at
+            ):
+                return self._token
 
         # Fail if OIDC endpoint not configured
         if not self.oidc_token_url:
@@ -72,18 +146,25 @@ class CSCSDWDIClient:
             raise ValueError(error_msg)
 
         # Request new token from OIDC provider
-        return self._acquire_oidc_token()
+        access_token, expires_at = self._acquire_oidc_token(self.oidc_token_url)
+        with self._token_lock:
+            self._token = access_token
+            self._token_expires_at = expires_at
+        return access_token
 
-    def _acquire_oidc_token(self) -> str:
+    def _acquire_oidc_token(self, oidc_token_url: str) -> tuple[str, datetime]:
         """Acquire a new OIDC token from the configured provider.
 
+        Args:
+            oidc_token_url: OIDC token endpoint URL
+
         Returns:
-            Valid authentication token
+            Authentication token and the time it should be renewed at
 
         Raises:
             httpx.HTTPError: If token acquisition fails
         """
-        logger.debug("Acquiring new OIDC token from %s", self.oidc_token_url)
+        logger.debug("Acquiring new OIDC token from %s", oidc_token_url)
 
         token_data = {
             "grant_type": "client_credentials",
@@ -97,35 +178,23 @@ class CSCSDWDIClient:
 
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-        # Configure httpx client with SOCKS proxy if specified
-        client_args: dict[str, Any] = {"timeout": 30.0}
-        if self.socks_proxy:
-            client_args["proxy"] = self.socks_proxy
-            logger.debug("Using SOCKS proxy for token acquisition: %s", self.socks_proxy)
-
-        with httpx.Client(**client_args) as client:
-            response = client.post(self.oidc_token_url, data=token_data, headers=headers)
-            response.raise_for_status()
-            token_response = response.json()
+        response = self._get_http_client().post(oidc_token_url, data=token_data, headers=headers)
+        response.raise_for_status()
+        token_response = response.json()
 
-            # Extract token and expiry information
-            access_token = token_response.get("access_token")
-            if not access_token:
-                msg = f"No access_token in OIDC response: {token_response}"
-                raise ValueError(msg)
+        # Extract token and expiry information
+        access_token = token_response.get("access_token")
+        if not access_token:
+            msg = f"No access_token in OIDC response: {token_response}"
+            raise ValueError(msg)
 
-            # Calculate token expiry time
-            expires_in = token_response.get("expires_in", TOKEN_EXPIRATION_SECONDS)
-            safe_expires_in = expires_in - REFRESH_MARGIN_SECONDS
+        # Calculate token expiry time
+        expires_in = token_response.get("expires_in", TOKEN_EXPIRATION_SECONDS)
+        safe_expires_in = expires_in - REFRESH_MARGIN_SECONDS
 
-            self._token = access_token
-            self._token_expires_at = datetime.now(tz=timezone.utc) + timedelta(
-                seconds=safe_expires_in
-            )
+        logger.info("Successfully acquired OIDC token, expires in %d seconds", safe_expires_in)
 
-            logger.info("Successfully acquired OIDC token, expires in %d seconds", safe_expires_in)
-
-            return self._token
+        return access_token, datetime.now(tz=timezone.utc) + timedelta(seconds=safe_expires_in)
 
     def get_usage_for_month(
         self,
@@ -148,8 +217,6 @@ class CSCSDWDIClient:
         Raises:
             httpx.HTTPError: If API request fails
         """
-        token = self._get_auth_token()
-
         # Format dates as YYYY-MM for month endpoints
         from_month = from_date.strftime("%Y-%m")
         to_month = to_date.strftime("%Y-%m")
@@ -167,10 +234,6 @@ class CSCSDWDIClient:
         if clusters:
             params["cluster"] = clusters
 
-        headers = {"Authorization": f"Bearer {token}"}
-
-        url = f"{self.api_url}/compute/usage-month/account"
-
         logger.debug(
             "Fetching usage for accounts %s from %s to %s",
             accounts,
@@ -178,16 +241,9 @@ class CSCSDWDIClient:
             to_month,
         )
 
-        # Configure httpx client with SOCKS proxy if specified
-        client_args: dict[str, Any] = {"timeout": 30.0}
-        if self.socks_proxy:
-            client_args["proxy"] = self.socks_proxy
-            logger.debug("Using SOCKS proxy for API request: %s", self.socks_proxy)
-
-        with httpx.Client(**client_args) as client:
-            response = client.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
+        response = self._get("/compute/usage-month/account", params)
+        response.raise_for_status()
+        return response.json()
 
     def get_usage_for_days(
         self,
@@ -210,8 +266,6 @@ class CSCSDWDIClient:
         Raises:
             httpx.HTTPError: If API request fails
         """
-        token = self._get_auth_token()
-
         # Format dates as YYYY-MM-DD for day endpoints
         from_day = from_date.strftime("%Y-%m-%d")
         to_day = to_date.strftime("%Y-%m-%d")
@@ -229,10 +283,6 @@ class CSCSDWDIClient:
         if clusters:
             params["cluster"] = clusters
 
-        headers = {"Authorization": f"Bearer {token}"}
-
-        url = f"{self.api_url}/compute/usage-day/account"
-
         logger.debug(
             "Fetching daily usage for accounts %s from %s to %s",
             accounts,
@@ -240,16 +290,9 @@ class CSCSDWDIClient:
             to_day,
         )
 
-        # Configure httpx client with SOCKS proxy if specified
-        client_args: dict[str, Any] = {"timeout": 30.0}
-        if self.socks_proxy:
-            client_args["proxy"] = self.socks_proxy
-            logger.debug("Using SOCKS proxy for API request: %s", self.socks_proxy)
-
-        with httpx.Client(**client_args) as client:
-            response = client.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
+        response = self._get("/compute/usage-day/account", params)
+        response.raise_for_status()
+        return response.json()
 
     def get_storage_usage_for_month(
         self,
@@ -272,8 +315,6 @@ class CSCSDWDIClient:
         Raises:
             httpx.HTTPError: If API request fails
         """
-        token = self._get_auth_token()
-
         params: dict[str, Any] = {
             "exact-month": exact_month,
         }
@@ -286,26 +327,15 @@ class CSCSDWDIClient:
         if data_type:
             params["data_type"] = data_type
 
-        headers = {"Authorization": f"Bearer {token}"}
-
-        url = f"{self.api_url}/storage/usage-month"
-
         logger.debug(
             "Fetching storage usage for paths %s for month %s",
             paths,
             exact_month,
         )
 
-        # Configure httpx client with SOCKS proxy if specified
-        client_args: dict[str, Any] = {"timeout": 30.0}
-        if self.socks_proxy:
-            client_args["proxy"] = self.socks_proxy
-            logger.debug("Using SOCKS proxy for API request: %s", self.socks_proxy)
-
-        with httpx.Client(**client_args) as client:
-            response = client.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
+        response = self._get("/storage/usage-month", params)
+        response.raise_for_status()
+        return response.json()
 
     def get_storage_usage_for_day(
         self,
@@ -328,8 +358,6 @@ class CSCSDWDIClient:
         Raises:
             httpx.HTTPError: If API request fails
         """
-        token = self._get_auth_token()
-
         params: dict[str, Any] = {
             "exact-date": exact_date.strftime("%Y-%m-%d"),
         }
@@ -342,26 +370,15 @@ class CSCSDWDIClient:
         if data_type:
             params["data_type"] = data_type
 
-        headers = {"Authorization": f"Bearer {token}"}
-
-        url = f"{self.api_url}/storage/usage-day"
-
         logger.debug(
             "Fetching storage usage for paths %s for date %s",
             paths,
             exact_date,
         )
 
-        # Configure httpx client with SOCKS proxy if specified
-        client_args: dict[str, Any] = {"timeout": 30.0}
-        if self.socks_proxy:
-            client_args["proxy"] = self.socks_proxy
-            logger.debug("Using SOCKS proxy for API request: %s", self.socks_proxy)
-
-        with httpx.Client(**client_args) as client:
-            response = client.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
+        response = self._get("/storage/usage-day", params)
+        response.raise_for_status()
+        return response.json()
 
     def ping(self) -> bool:
         """Check if CSCS-DWDI compute API is accessible.
@@ -370,9 +387,6 @@ class CSCSDWDIClient:
             True if API is accessible, False otherwise
         """
         try:
-            token = self._get_auth_token()
-            headers = {"Authorization": f"Bearer {token}"}
-
             # Use a simple query to test connectivity
             today = datetime.now(tz=timezone.utc).date()
             params = {
@@ -380,17 +394,8 @@ class CSCSDWDIClient:
                 "to": today.strftime("%Y-%m-%d"),
             }
 
-            url = f"{self.api_url}/compute/usage-day"
-
-            # Configure httpx client with SOCKS proxy if specified
-            client_args: dict[str, Any] = {"timeout": 10.0}
-            if self.socks_proxy:
-                client_args["proxy"] = self.socks_proxy
-                logger.debug("Using SOCKS proxy for ping: %s", self.socks_proxy)
-
-            with httpx.Client(**client_args) as client:
-                response = client.get(url, params=params, headers=headers)
-                return response.status_code == HTTP_OK
+            response = self._get("/compute/usage-day", params, timeout=PING_TIMEOUT_SECONDS)
+            return response.status_code == HTTP_OK
         except Exception:
             logger.exception("Compute ping failed")
             return False
@@ -402,9 +407,6 @@ class CSCSDWDIClient:
             True if API is accessible, False otherwise
         """
         try:
-            token = self._get_auth_token()
-            headers = {"Authorization": f"Bearer {token}"}
-
             # Use a simple query to test connectivity
             today = datetime.now(tz=timezone.utc).date()
             params = {
@@ -412,17 +414,8 @@ class CSCSDWDIClient:
             }
 
             # Use default values for ping test
-            url = f"{self.api_url}/storage/usage-day"
-
-            # Configure httpx client with SOCKS proxy if specified
-            client_args: dict[str, Any] = {"timeout": 10.0}
-            if self.socks_proxy:
-                client_args["proxy"] = self.socks_proxy
-                logger.debug("Using SOCKS proxy for storage ping: %s", self.socks_proxy)
-
-            with httpx.Client(**client_args) as client:
-                response = client.get(url, params=params, headers=headers)
-                return response.status_code == HTTP_OK
+            response = self._get("/storage/usage-day", params, timeout=PING_TIMEOUT_SECONDS)
+            return response.status_code == HTTP_OK
         except Exception:
             logger.exception("Storage ping failed")
             return False
@@ -447,8 +440,6 @@ class CSCSDWDIClient:
         Raises:
             httpx.HTTPError: If API request fails
         """
-        token = self._get_auth_token()
-
         params: dict[str, Any] = {
             "from": month_from,
             "to": month_to
@@ -458,27 +449,15 @@ class CSCSDWDIClient:
         if resource_uuid:
             params["resource_uuid"] = resource_uuid
 
-        headers = {"Authorization": f"Bearer {token}"}
-
-        url = f"{self.api_url}/inference/resource/cost"
-
         logger.debug(
             "Fetching inference cost for resources with resource_uuid %s for month %s",
             resource_uuid,
             month_to,
         )
 
-        # Configure httpx client with SOCKS proxy if specified
-        client_args: dict[str, Any] = {"timeout": 30.0}
-        if self.socks_proxy:
-            client_args["proxy"] = self.socks_proxy
-            logger.debug("Using SOCKS proxy for API request: %s", self.socks_proxy)
-
-        with httpx.Client(**client_args) as client:
-            response = client.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
-
+        response = self._get("/inference/resource/cost", params)
+        response.raise_for_status()
+        return response.json()
 
     def ping_inference(self) -> bool:
         """Check if CSCS-DWDI inference API is accessible.
@@ -487,9 +466,6 @@ class CSCSDWDIClient:
             True if API is accessible, False otherwise
         """
         try:
-            token = self._get_auth_token()
-            headers = {"Authorization": f"Bearer {token}"}
-
             # Use a simple query to test connectivity
             today = datetime.now(tz=timezone.utc).date()
             params = {
@@ -497,17 +473,48 @@ class CSCSDWDIClient:
             }
 
             # Use default values for ping test
-            url = f"{self.api_url}/inference/resource/cost"
-
-            # Configure httpx client with SOCKS proxy if specified
-            client_args: dict[str, Any] = {"timeout": 10.0}
-            if self.socks_proxy:
-                client_args["proxy"] = self.socks_proxy
-                logger.debug("Using SOCKS proxy for storage ping: %s", self.socks_proxy)
-
-            with httpx.Client(**client_args) as client:
-                response = client.get(url, params=params, headers=headers)
-                return response.status_code == HTTP_OK
+            response = self._get("/inference/resource/cost", params, timeout=PING_TIMEOUT_SECONDS)
+            return response.status_code == HTTP_OK
         except Exception:
             logger.exception("Inference ping failed")
             return False
+
+
+# Keyed by everything but the client secret, which is kept next to the client
+_shared_clients: dict[tuple[Optional[str], ...], tuple[str, CSCSDWDIClient]] = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_shared_client(
+    api_url: str,
+    client_id: str,
+    client_secret: str,
+    oidc_token_url: Optional[str] = None,
+    oidc_scope: Optional[str] = None,
+    socks_proxy: Optional[str] = None,
+) -> CSCSDWDIClient:
+    """Return the client of the process for the API, credentials and proxy.
+
+    Backends configured with the same settings get the same client, and so share
+    its connection pool and OIDC token. When the client secret is rotated, the
+    client created with the previous secret is replaced and its connections are
+    closed.
+    """
+    key = (api_url.rstrip("/"), client_id, oidc_token_url, oidc_scope, socks_proxy)
+    with _shared_clients_lock:
+        entry = _shared_clients.get(key)
+        if entry is not None and entry[0] == client_secret:
+            return entry[1]
+        client = CSCSDWDIClient(
+            api_url=api_url,
+            client_id=client_id,
+            client_secret=client_secret,
+            oidc_token_url=oidc_token_url,
+            oidc_scope=oidc_scope,
+            socks_proxy=socks_proxy,
+        )
+        _shared_clients[key] = (client_secret, client)
+    if entry is not None:
+        logger.info("CSCS-DWDI client secret changed, closing the previous client")
+        entry[1].close()
+    return client
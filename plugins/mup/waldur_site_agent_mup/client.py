@@ -42,6 +42,10 @@ class MUPClient(BaseClient):
             timeout=30.0,
         )
 
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self.session.close()
+
     def _make_request(
         self, method: str, endpoint: str, **kwargs: Any
     ) -> httpx.Response:  # noqa: ANN401
@@ -62,6 +62,10 @@ class NextcloudClient(BaseClient):
     # HTTP helper
     # ------------------------------------------------------------------
 
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self.session.close()
+
     def _make_request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
         """Execute an HTTP request with shared auth and headers.
 
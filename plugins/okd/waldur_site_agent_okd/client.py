@@ -54,6 +54,10 @@ class OkdClient(TokenRefreshMixin, BaseClient):
 
         logger.info(f"Initialized OKD client for {self.api_url}")
 
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self.session.close()
+
     def _make_request(self, method: str, endpoint: str, data: Optional[dict] = None) -> dict:
         """Make HTTP request to OKD API with automatic token refresh."""
         # Use authenticated request if token manager is available
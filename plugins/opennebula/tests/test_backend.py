@@ -1,10 +1,12 @@
 """Tests for OpenNebula VDC backend."""
 
 import logging
+import time
 from unittest.mock import MagicMock, patch
 
 import pyone
 import pytest
+from pyone import LCM_STATE, VM_STATE
 from waldur_api_client.models.resource import Resource as WaldurResource
 
 from waldur_site_agent.backend.exceptions import BackendError
@@ -1323,6 +1325,8 @@ class TestOpenNebulaBackendVMCreation:
             model_image=None,
             engine_image_id=None,
             vllm_context=None,
+            wait_until_running=True,
+            running_timeout=300,
         )
 
     def test_create_vm_stores_metadata(self, vm_backend):
@@ -1344,6 +1348,126 @@ class TestOpenNebulaBackendVMCreation:
         assert metadata["ip_address"] == "10.0.1.5"
 
 
+class TestAsyncVMCreation:
+    """Test VM creation that does not wait for the VM to start."""
+
+    @pytest.fixture()
+    def client(self):
+        with patch("waldur_site_agent_opennebula.client.pyone") as mock_pyone:
+            mock_pyone.OneServer.return_value = MagicMock()
+            c = OpenNebulaClient(
+                api_url="http://localhost:2633/RPC2",
+                credentials="oneadmin:testpass",
+            )
+        c.one = MagicMock()
+        return c
+
+    @pytest.fixture()
+    def vm_backend(self, vm_backend_settings, vm_backend_components):
+        vm_backend_settings["async_vm_creation"] = True
+        vm_backend_settings["vm_running_timeout"] = 600
+        with patch("waldur_site_agent_opennebula.client.pyone"):
+            backend = OpenNebulaBackend(vm_backend_settings, vm_backend_components)
+        backend.client = MagicMock(spec=OpenNebulaClient)
+        return backend
+
+    @staticmethod
+    def _vm(vm_id, state, lcm_state, age=0):
+        vm = MagicMock()
+        vm.ID = vm_id
+        vm.STATE = state
+        vm.LCM_STATE = lcm_state
+        vm.STIME = int(time.time()) - age
+        return vm
+
+    def test_create_vm_without_waiting(self, client):
+        client._get_vnet_by_name = MagicMock(return_value=MagicMock(ID=42))
+        client._get_secgroup_by_name = MagicMock(return_value=None)
+        client._get_group_by_name = MagicMock(return_value=MagicMock(ID=5))
+        client.one.template.instantiate.return_value = 100
+
+        vm_id = client.create_vm(
+            template_id=101,
+            vm_name="test_vm",
+            parent_vdc_name="test_vdc",
+            wait_until_running=False,
+        )
+
+        assert vm_id == 100
+        client.one.vm.info.assert_not_called()
+
+    def test_check_vm_running(self, client):
+        client.one.vm.info.return_value = self._vm(
+            100, VM_STATE.ACTIVE, LCM_STATE.RUNNING
+        )
+
+        assert client.check_vm_running(100) is True
+
+    def test_check_vm_running_times_out(self, client):
+        client.one.vm.info.return_value = self._vm(
+            100, VM_STATE.PENDING, LCM_STATE.LCM_INIT, age=400
+        )
+
+        with pytest.raises(BackendError, match="did not reach RUNNING"):
+            client.check_vm_running(100, timeout=300)
+
+    def test_check_vms_running_lists_the_pool_once(self, client):
+        client.one.vmpool.info.return_value.VM = [
+            self._vm(100, VM_STATE.ACTIVE, LCM_STATE.RUNNING),
+            self._vm(101, VM_STATE.ACTIVE, LCM_STATE.BOOT),
+            self._vm(102, VM_STATE.FAILED, LCM_STATE.LCM_INIT),
+            self._vm(103, VM_STATE.ACTIVE, LCM_STATE.RUNNING),
+        ]
+
+        statuses = client.check_vms_running([100, 101, 102, 104])
+
+        assert statuses == {100: True, 101: False}
+        client.one.vmpool.info.assert_called_once()
+        client.one.vm.info.assert_not_called()
+
+    def test_async_setting_enables_async_orders(self, vm_backend):
+        assert vm_backend.supports_async_orders is True
+        assert vm_backend.vm_running_timeout == 600
+
+    def test_async_setting_is_ignored_for_vdc(self, backend_settings, backend_components):
+        backend_settings["async_vm_creation"] = True
+        with patch("waldur_site_agent_opennebula.client.pyone"):
+            backend = OpenNebulaBackend(backend_settings, backend_components)
+
+        assert backend.supports_async_orders is False
+
+    def test_create_resource_returns_pending_order(self, vm_backend):
+        resource = MagicMock(spec=WaldurResource)
+        resource.attributes = {"template_id": "101", "parent_backend_id": "my_vdc"}
+        vm_backend.client.create_vm.return_value = 42
+        vm_backend.client.get_vm_ip_address.return_value = "10.0.1.5"
+
+        info = vm_backend.create_resource_with_id(
+            resource, "test_vm", {"plan_quotas": _DEFAULT_PLAN_QUOTAS, "ssh_keys": {}}
+        )
+
+        assert info.backend_id == "42"
+        assert info.pending_order_id == "42"
+        assert vm_backend.client.create_vm.call_args.kwargs["wait_until_running"] is False
+
+    def test_failed_vm_is_terminated(self, vm_backend):
+        vm_backend.client.check_vm_running.side_effect = BackendError("failed")
+
+        with pytest.raises(BackendError):
+            vm_backend.check_pending_order("42")
+
+        vm_backend.client.check_vm_running.assert_called_once_with(42, 600)
+        vm_backend.client.delete_vm.assert_called_once_with(42)
+
+    def test_pending_orders_are_checked_in_bulk(self, vm_backend):
+        vm_backend.client.check_vms_running.return_value = {42: True, 43: False}
+
+        statuses = vm_backend.check_pending_orders(["42", "43", "external"])
+
+        vm_backend.client.check_vms_running.assert_called_once_with([42, 43], 600)
+        assert statuses == {"42": True, "43": False}
+
+
 class TestOpenNebulaBackendVMDeletion:
     """Test VM deletion flow."""
 
@@ -3394,7 +3518,7 @@ class TestWaitForVMRunning:
         )
 
         assert vm_id == 100
-        client._wait_for_vm_running.assert_called_once_with(100)
+        client._wait_for_vm_running.assert_called_once_with(100, timeout=300)
 
     def test_create_vm_rollback_on_poll_failure(self, client):
         """Poll failure in create_vm terminates the VM."""
@@ -4122,3 +4246,138 @@ class TestOpenNebulaVmIpParsing:
         info.TEMPLATE = {"NIC": [{"NETWORK": "x"}, {"IP": "10.0.0.5"}]}
         client._get_vm_info = MagicMock(return_value=info)
         assert client.get_vm_ip_address(8) == "10.0.0.5"
+
+
+class TestPoolSnapshots:
+    """Lookups by name are served from one pool listing per cycle."""
+
+    @pytest.fixture()
+    def mock_one(self, mock_one_env):
+        return mock_one_env[0]
+
+    @pytest.fixture()
+    def client(self, one_client):
+        return one_client[0]
+
+    @staticmethod
+    def _named(name, object_id):
+        obj = MagicMock()
+        obj.NAME = name
+        obj.ID = object_id
+        return obj
+
+    @staticmethod
+    def _quotas(group_id, cpu_used, mem_used):
+        quotas = MagicMock()
+        quotas.ID = group_id
+        vm_entry = MagicMock()
+        vm_entry.CPU_USED = str(cpu_used)
+        vm_entry.MEMORY_USED = str(mem_used)
+        quotas.VM_QUOTA.VM = [vm_entry]
+        quotas.DATASTORE_QUOTA.DATASTORE = []
+        quotas.NETWORK_QUOTA.NETWORK = []
+        return quotas
+
+    def test_lookups_share_one_listing(self, client, mock_one):
+        mock_one.grouppool.info.return_value.GROUP = [
+            self._named("vdc_a", 100),
+            self._named("vdc_b", 101),
+        ]
+
+        assert client._get_group_by_name("vdc_a").ID == 100
+        assert client._get_group_by_name("vdc_b").ID == 101
+        assert client._get_group_by_name("missing") is None
+
+        mock_one.grouppool.info.assert_called_once()
+
+    def test_first_object_with_a_name_is_returned(self, client, mock_one):
+        mock_one.vnpool.info.return_value.VNET = [
+            self._named("net", 1),
+            self._named("net", 2),
+        ]
+
+        assert client._get_vnet_by_name("net").ID == 1
+        mock_one.vnpool.info.assert_called_once_with(-2, -1, -1, -1)
+
+    def test_writes_invalidate_the_pool(self, client, mock_one):
+        mock_one.secgrouppool.info.return_value.SECURITY_GROUP = []
+        mock_one.grouppool.info.return_value.GROUP = []
+        client._get_secgroup_by_name("sg")
+        client._get_group_by_name("vdc_a")
+
+        mock_one.secgroup.allocate.return_value = 5
+        client._create_security_group("sg", [])
+        mock_one.secgrouppool.info.return_value.SECURITY_GROUP = [self._named("sg", 5)]
+
+        assert client._get_secgroup_by_name("sg").ID == 5
+        assert client._get_group_by_name("vdc_a") is None
+        assert mock_one.secgrouppool.info.call_count == 2
+        mock_one.grouppool.info.assert_called_once()
+
+    def test_taken_name_is_looked_up_in_a_new_listing(
+        self, client, mock_one, mock_one_env
+    ):
+        _, pyone_mod = mock_one_env
+        mock_one.grouppool.info.return_value.GROUP = []
+        client._get_group_by_name("vdc_a")
+
+        mock_one.group.allocate.side_effect = pyone_mod.OneInternalException(
+            "NAME is already taken"
+        )
+        mock_one.grouppool.info.return_value.GROUP = [self._named("vdc_a", 100)]
+
+        assert client._create_group("vdc_a") == 100
+
+    def test_listing_error_raises_backend_error(self, client, mock_one):
+        mock_one.vrouterpool.info.side_effect = Exception("connection reset")
+
+        with pytest.raises(BackendError, match="Failed to list virtual routers"):
+            client._get_vrouter_by_name("router")
+
+    def test_usage_report_reads_quotas_from_one_listing(self, client, mock_one):
+        pool = mock_one.grouppool.info.return_value
+        pool.GROUP = [self._named("vdc_a", 100), self._named("vdc_b", 101)]
+        pool.QUOTAS = [self._quotas(100, 2, 1024), self._quotas(101, 4, 2048)]
+
+        report = client.get_usage_report(["vdc_a", "vdc_b", "missing"])
+
+        assert report == [
+            {"resource_id": "vdc_a", "usage": {"cpu": 2, "ram": 1024}},
+            {"resource_id": "vdc_b", "usage": {"cpu": 4, "ram": 2048}},
+        ]
+        mock_one.grouppool.info.assert_called_once()
+        mock_one.group.info.assert_not_called()
+
+    def test_groups_without_listed_quotas_are_read_one_by_one(self, client, mock_one):
+        pool = mock_one.grouppool.info.return_value
+        pool.GROUP = [self._named("vdc_a", 100)]
+        pool.QUOTAS = []
+        mock_one.group.info.return_value = self._quotas(100, 1, 512)
+
+        report = client.get_usage_report(["vdc_a"])
+
+        assert report == [{"resource_id": "vdc_a", "usage": {"cpu": 1, "ram": 512}}]
+        mock_one.group.info.assert_called_once_with(100)
+
+    def test_quota_changes_refresh_the_group_listing(self, client, mock_one):
+        pool = mock_one.grouppool.info.return_value
+        pool.GROUP = [self._named("vdc_a", 100)]
+        pool.QUOTAS = [self._quotas(100, 1, 512)]
+        client.get_resource_limits("vdc_a")
+
+        client.set_resource_limits("vdc_a", {"cpu": 4})
+        client.get_resource_limits("vdc_a")
+
+        assert mock_one.grouppool.info.call_count == 2
+
+    def test_backend_drops_the_snapshots_each_cycle(
+        self, mock_one, backend_settings, backend_components
+    ):
+        backend = OpenNebulaBackend(backend_settings, backend_components)
+        mock_one.vdcpool.info.return_value.VDC = [self._named("vdc_a", 10)]
+        backend.client._get_vdc_by_name("vdc_a")
+
+        backend.reset_cycle_caches()
+        backend.client._get_vdc_by_name("vdc_a")
+
+        assert mock_one.vdcpool.info.call_count == 2
@@ -80,6 +80,9 @@ class OpenNebulaBackend(BaseBackend):
             zone_id: OpenNebula zone ID (default 0).
             cluster_ids: List of cluster IDs.
             resource_type: "vdc" (default) or "vm".
+            async_vm_creation: In VM mode, complete create orders on a later
+                cycle once the VM is running instead of waiting for it (default False).
+            vm_running_timeout: Seconds a new VM may take to reach RUNNING (default 300).
 
         backend_components may be empty — they will be populated by
         extend_backend_components() from Waldur offering before any
@@ -88,6 +91,12 @@ class OpenNebulaBackend(BaseBackend):
         super().__init__(backend_settings, backend_components)
         self.backend_type = "opennebula"
         self.resource_type = backend_settings.get("resource_type", "vdc")
+        self.vm_running_timeout = int(backend_settings.get("vm_running_timeout", 300))
+        # VM create orders stay EXECUTING with the VM ID as order backend_id
+        # until check_pending_order(s) sees the VM running
+        self.supports_async_orders = self.resource_type == "vm" and bool(
+            backend_settings.get("async_vm_creation", False)
+        )
 
         required_keys = ["api_url", "credentials"]
         for key in required_keys:
@@ -150,6 +159,10 @@ class OpenNebulaBackend(BaseBackend):
 
         return True
 
+    def reset_cycle_caches(self) -> None:
+        """List the OpenNebula pools again on the next lookups."""
+        self.client.invalidate_pool_snapshots()
+
     def diagnostics(self) -> bool:
         """Log diagnostic information and check connectivity."""
         logger.info(
@@ -614,6 +627,8 @@ class OpenNebulaBackend(BaseBackend):
             model_image=self._pending_vm_config.get("model_image"),
             engine_image_id=self._pending_vm_config.get("engine_image_id"),
             vllm_context=self._pending_vm_config.get("vllm_context"),
+            wait_until_running=not self.supports_async_orders,
+            running_timeout=self.vm_running_timeout,
         )
 
         # Store VM metadata keyed by numeric ID
@@ -691,6 +706,7 @@ class OpenNebulaBackend(BaseBackend):
 
         backend_resource_info = BackendResourceInfo(
             backend_id=vm_backend_id,
+            pending_order_id=vm_backend_id if self.supports_async_orders else "",
             limits={},
         )
 
@@ -699,6 +715,45 @@ class OpenNebulaBackend(BaseBackend):
         )
         return backend_resource_info
 
+    def check_pending_order(self, order_backend_id: str) -> bool:
+        """Check whether the VM of an async create order reached RUNNING.
+
+        Args:
+            order_backend_id: Numeric ID of the VM created for the order.
+
+        Returns:
+            True if the VM is running, False if it is still starting.
+
+        Raises:
+            BackendError: If the VM failed or timed out; the VM is terminated.
+        """
+        vm_id = int(order_backend_id)
+        try:
+            return self.client.check_vm_running(vm_id, self.vm_running_timeout)
+        except BackendError:
+            logger.warning(
+                "VM %d failed to reach RUNNING state, attempting cleanup", vm_id
+            )
+            try:
+                self.client.delete_vm(vm_id)
+            except BackendError:
+                logger.warning("Failed to terminate VM %d during rollback", vm_id)
+            raise
+
+    def check_pending_orders(self, order_backend_ids: list[str]) -> dict[str, bool]:
+        """Check the VMs of all async create orders with one VM pool listing.
+
+        Failed and timed out VMs are left out, so check_pending_order()
+        terminates them and fails their orders.
+        """
+        vm_ids = [
+            int(order_backend_id)
+            for order_backend_id in order_backend_ids
+            if order_backend_id.isdigit()
+        ]
+        statuses = self.client.check_vms_running(vm_ids, self.vm_running_timeout)
+        return {str(vm_id): running for vm_id, running in statuses.items()}
+
     @staticmethod
     def _generate_opennebula_username(vdc_name: str) -> str:
         """Derive a deterministic OpenNebula username from a VDC name."""
@@ -15,7 +15,7 @@ import pyone
 from pyone import LCM_STATE, VM_STATE
 
 from waldur_site_agent.backend.clients import BaseClient
-from waldur_site_agent.backend.exceptions import BackendError
+from waldur_site_agent.backend.exceptions import BackendError, BackendNotReadyError
 from waldur_site_agent.backend.structures import Association, ClientResource
 
 logger = logging.getLogger(__name__)
@@ -28,6 +28,16 @@ QUOTA_COMPONENT_MAP = {
     "floating_ip": ("NETWORK", "LEASES"),
 }
 
+# Pool snapshot name -> (pool attribute, element, info() filter arguments, label)
+POOL_LOOKUPS: dict[str, tuple[str, str, tuple[int, ...], str]] = {
+    "vdc": ("vdcpool", "VDC", (), "VDCs"),
+    "group": ("grouppool", "GROUP", (), "groups"),
+    "vnet": ("vnpool", "VNET", (-2, -1, -1, -1), "VNets"),
+    "vrouter": ("vrouterpool", "VROUTER", (-2, -1, -1), "virtual routers"),
+    "secgroup": ("secgrouppool", "SECURITY_GROUP", (-2, -1, -1), "security groups"),
+    "vm": ("vmpool", "VM", (-2, -1, -1, -1), "VMs"),
+}
+
 
 class OpenNebulaClient(BaseClient):
     """Client for communicating with OpenNebula via XML-RPC API."""
@@ -54,6 +64,65 @@ class OpenNebulaClient(BaseClient):
         self.zone_id = zone_id
         self.cluster_ids = cluster_ids or []
         self.one = pyone.OneServer(api_url, session=credentials)
+        # Pool name -> {object name: pyone object}, fetched once per cycle
+        self._pool_snapshots: dict[str, dict[str, object]] = {}
+        # Group ID -> quotas, read from the same listing as the group snapshot
+        self._group_quotas: dict[int, object] = {}
+
+    # ── Pool snapshots ───────────────────────────────────────────────
+
+    def invalidate_pool_snapshots(self, *pools: str) -> None:
+        """Drop the pool snapshots, so the next lookups list the pools again.
+
+        Args:
+            pools: Names of the snapshots to drop (see POOL_LOOKUPS).
+                All snapshots are dropped if none are given.
+        """
+        for pool in pools or tuple(self._pool_snapshots):
+            self._pool_snapshots.pop(pool, None)
+            if pool == "group":
+                self._group_quotas = {}
+
+    def _get_pool_snapshot(self, pool: str) -> dict[str, object]:
+        """Return the name -> object index of a pool, listing it on first use.
+
+        Lookups by name are served from the index until the pool is written
+        to or the snapshots are invalidated for the next cycle. If several
+        objects share a name, the first one listed is returned, as before.
+        """
+        snapshot = self._pool_snapshots.get(pool)
+        if snapshot is not None:
+            return snapshot
+
+        pool_attr, element, filters, label = POOL_LOOKUPS[pool]
+        snapshot = {}
+        try:
+            listing = getattr(self.one, pool_attr).info(*filters)
+        except pyone.OneNoExistsException:
+            listing = None
+        except pyone.OneException as e:
+            raise BackendError(f"Failed to list {label}: {e}") from e
+
+        if listing is not None:
+            for obj in getattr(listing, element):
+                snapshot.setdefault(obj.NAME, obj)
+            if pool == "group":
+                self._group_quotas = {
+                    quotas.ID: quotas for quotas in listing.QUOTAS or []
+                }
+        self._pool_snapshots[pool] = snapshot
+        return snapshot
+
+    def _get_group_quotas(self, group: object) -> object:
+        """Return the quotas of a group from the group snapshot.
+
+        Falls back to a ``group.info`` call for groups missing in the
+        listing's QUOTAS section.
+        """
+        quotas = self._group_quotas.get(group.ID)
+        if quotas is None:
+            return self._get_group_info(group.ID)
+        return quotas
 
     # ── VDC helpers ──────────────────────────────────────────────────
 
@@ -62,22 +131,14 @@ class OpenNebulaClient(BaseClient):
 
         Returns the pyone VDC object or None if not found.
         """
-        try:
-            pool = self.one.vdcpool.info()
-            for vdc in pool.VDC:
-                if vdc.NAME == name:
-                    return vdc
-        except pyone.OneNoExistsException:
-            return None
-        except pyone.OneException as e:
-            raise BackendError(f"Failed to list VDCs: {e}") from e
-        return None
+        return self._get_pool_snapshot("vdc").get(name)
 
     def _create_vdc(self, name: str) -> int:
         """Create a new VDC, or return existing one if name is taken.
 
         Returns the numeric VDC ID.
         """
+        self.invalidate_pool_snapshots("vdc")
         try:
             return self.one.vdc.allocate(f'NAME="{name}"')
         except pyone.OneInternalException as e:
@@ -94,6 +155,7 @@ class OpenNebulaClient(BaseClient):
 
     def _delete_vdc(self, vdc_id: int) -> None:
         """Delete a VDC by numeric ID."""
+        self.invalidate_pool_snapshots("vdc")
         try:
             self.one.vdc.delete(vdc_id)
         except pyone.OneException as e:
@@ -169,16 +231,7 @@ class OpenNebulaClient(BaseClient):
 
         Returns the pyone group object or None if not found.
         """
-        try:
-            pool = self.one.grouppool.info()
-            for group in pool.GROUP:
-                if group.NAME == name:
-                    return group
-        except pyone.OneNoExistsException:
-            return None
-        except pyone.OneException as e:
-            raise BackendError(f"Failed to list groups: {e}") from e
-        return None
+        return self._get_pool_snapshot("group").get(name)
 
     def _create_group(self, name: str) -> int:
         """Create a new group, or return existing one if name is taken.
@@ -187,6 +240,7 @@ class OpenNebulaClient(BaseClient):
         was already created (e.g. due to a retried request after a
         connection reset).
         """
+        self.invalidate_pool_snapshots("group")
         try:
             return self.one.group.allocate(name)
         except pyone.OneInternalException as e:
@@ -203,6 +257,7 @@ class OpenNebulaClient(BaseClient):
 
     def _delete_group(self, group_id: int) -> None:
         """Delete a group by numeric ID."""
+        self.invalidate_pool_snapshots("group")
         try:
             self.one.group.delete(group_id)
         except pyone.OneException as e:
@@ -210,6 +265,7 @@ class OpenNebulaClient(BaseClient):
 
     def _set_group_quota(self, group_id: int, quota_xml: str) -> None:
         """Set quota on a group."""
+        self.invalidate_pool_snapshots("group")
         try:
             self.one.group.quota(group_id, quota_xml)
         except pyone.OneException as e:
@@ -231,6 +287,7 @@ class OpenNebulaClient(BaseClient):
             group_id: Numeric group ID.
             template_str: Template string to merge (e.g. SAML_GROUP, FIREEDGE attrs).
         """
+        self.invalidate_pool_snapshots("group")
         try:
             self.one.group.update(group_id, template_str, 1)
         except pyone.OneException as e:
@@ -245,6 +302,7 @@ class OpenNebulaClient(BaseClient):
             group_id: Numeric group ID.
             user_id: Numeric user ID to grant admin role.
         """
+        self.invalidate_pool_snapshots("group")
         try:
             self.one.group.addadmin(group_id, user_id)
         except pyone.OneException as e:
@@ -417,16 +475,7 @@ class OpenNebulaClient(BaseClient):
         Returns the pyone VNet object or None if not found.
         Uses filter flag -2 (all) to list all VNets.
         """
-        try:
-            pool = self.one.vnpool.info(-2, -1, -1, -1)
-            for vnet in pool.VNET:
-                if vnet.NAME == name:
-                    return vnet
-        except pyone.OneNoExistsException:
-            return None
-        except pyone.OneException as e:
-            raise BackendError(f"Failed to list VNets: {e}") from e
-        return None
+        return self._get_pool_snapshot("vnet").get(name)
 
     def _allocate_next_subnet(self, base: str, prefix: int, subnet_len: int) -> str:
         """Allocate the next available subnet from the pool.
@@ -534,6 +583,7 @@ class OpenNebulaClient(BaseClient):
         ])
         template = "\n".join(lines)
 
+        self.invalidate_pool_snapshots("vnet")
         try:
             return self.one.vn.allocate(template, cluster_id)
         except pyone.OneInternalException as e:
@@ -550,6 +600,7 @@ class OpenNebulaClient(BaseClient):
 
     def _delete_vnet(self, vnet_id: int) -> None:
         """Delete a virtual network by ID."""
+        self.invalidate_pool_snapshots("vnet")
         try:
             self.one.vn.delete(vnet_id)
         except pyone.OneException as e:
@@ -572,16 +623,7 @@ class OpenNebulaClient(BaseClient):
         Returns the pyone VRouter object or None if not found.
         Uses filter flag -2 (all).
         """
-        try:
-            pool = self.one.vrouterpool.info(-2, -1, -1)
-            for vr in pool.VROUTER:
-                if vr.NAME == name:
-                    return vr
-        except pyone.OneNoExistsException:
-            return None
-        except pyone.OneException as e:
-            raise BackendError(f"Failed to list virtual routers: {e}") from e
-        return None
+        return self._get_pool_snapshot("vrouter").get(name)
 
     def _create_virtual_router(self, name: str) -> int:
         """Create a virtual router object.
@@ -589,6 +631,7 @@ class OpenNebulaClient(BaseClient):
         Returns the numeric VRouter ID.
         """
         template = f'NAME="{name}"'
+        self.invalidate_pool_snapshots("vrouter")
         try:
             return self.one.vrouter.allocate(template)
         except pyone.OneInternalException as e:
@@ -623,6 +666,7 @@ class OpenNebulaClient(BaseClient):
         Returns:
             VM ID of the instantiated VR.
         """
+        self.invalidate_pool_snapshots("vrouter", "vm")
         try:
             # API: one.vrouter.instantiate(vr_id, n_vms, template_id, name, hold, extra_template)
             self.one.vrouter.instantiate(
@@ -647,6 +691,7 @@ class OpenNebulaClient(BaseClient):
 
     def _delete_virtual_router(self, vr_id: int) -> None:
         """Delete a virtual router and its associated VMs."""
+        self.invalidate_pool_snapshots("vrouter", "vm")
         try:
             self.one.vrouter.delete(vr_id)
         except pyone.OneException as e:
@@ -660,16 +705,7 @@ class OpenNebulaClient(BaseClient):
         Returns the pyone SecGroup object or None if not found.
         Uses filter flag -2 (all).
         """
-        try:
-            pool = self.one.secgrouppool.info(-2, -1, -1)
-            for sg in pool.SECURITY_GROUP:
-                if sg.NAME == name:
-                    return sg
-        except pyone.OneNoExistsException:
-            return None
-        except pyone.OneException as e:
-            raise BackendError(f"Failed to list security groups: {e}") from e
-        return None
+        return self._get_pool_snapshot("secgroup").get(name)
 
     def _create_security_group(self, name: str, rules: list[dict[str, str]]) -> int:
         """Create a security group with the given rules.
@@ -697,6 +733,7 @@ class OpenNebulaClient(BaseClient):
 
         template = f'NAME="{name}"\n' + "\n".join(rule_parts)
 
+        self.invalidate_pool_snapshots("secgroup")
         try:
             return self.one.secgroup.allocate(template)
         except pyone.OneInternalException as e:
@@ -713,6 +750,7 @@ class OpenNebulaClient(BaseClient):
 
     def _delete_security_group(self, sg_id: int) -> None:
         """Delete a security group by ID."""
+        self.invalidate_pool_snapshots("secgroup")
         try:
             self.one.secgroup.delete(sg_id)
         except pyone.OneException as e:
@@ -954,6 +992,92 @@ class OpenNebulaClient(BaseClient):
         }
     )
 
+    def _is_vm_running(self, vm_id: int, state: int, lcm_state: int) -> bool:
+        """Return True for ACTIVE/RUNNING, False while the VM is still starting.
+
+        Raises:
+            BackendError: If the VM is in a failure state.
+        """
+        if state == VM_STATE.ACTIVE and lcm_state == LCM_STATE.RUNNING:
+            return True
+        if state in self.FAILURE_VM_STATES:
+            raise BackendError(f"VM {vm_id} entered failure state: STATE={state}")
+        if lcm_state in self.FAILURE_LCM_STATES:
+            raise BackendError(
+                f"VM {vm_id} entered failure LCM state: "
+                f"STATE={state} LCM_STATE={lcm_state}"
+            )
+        return False
+
+    def _check_vm_started(self, vm: object, timeout: int) -> bool:
+        """Check a starting VM once, without waiting for it.
+
+        Args:
+            vm: pyone VM object from ``vm.info`` or the VM pool.
+            timeout: Seconds since the VM start time after which a VM that is
+                not running yet is considered failed.
+
+        Returns:
+            True if the VM is ACTIVE/RUNNING, False if it is still starting.
+
+        Raises:
+            BackendError: If the VM is in a failure state or timed out.
+        """
+        vm_id = int(vm.ID)
+        state = int(vm.STATE)
+        lcm_state = int(vm.LCM_STATE)
+        if self._is_vm_running(vm_id, state, lcm_state):
+            return True
+        started_seconds_ago = time.time() - float(vm.STIME)
+        if started_seconds_ago >= timeout:
+            raise BackendError(
+                f"VM {vm_id} did not reach RUNNING within {timeout}s "
+                f"(last STATE={state} LCM_STATE={lcm_state})"
+            )
+        logger.info("VM %d state: STATE=%d LCM_STATE=%d", vm_id, state, lcm_state)
+        return False
+
+    def check_vm_running(self, vm_id: int, timeout: int = 300) -> bool:
+        """Check once whether a VM created without waiting reached RUNNING.
+
+        Raises:
+            BackendNotReadyError: If OpenNebula could not be queried.
+            BackendError: If the VM is in a failure state or timed out.
+        """
+        try:
+            vm_info = self.one.vm.info(vm_id)
+        except pyone.OneNoExistsException as e:
+            raise BackendError(f"VM {vm_id} not found: {e}") from e
+        except pyone.OneException as e:
+            raise BackendNotReadyError(f"Failed to get VM info {vm_id}: {e}") from e
+        return self._check_vm_started(vm_info, timeout)
+
+    def check_vms_running(
+        self, vm_ids: list[int], timeout: int = 300
+    ) -> dict[int, bool]:
+        """Check many VMs created without waiting with one VM pool listing.
+
+        Returns:
+            Mapping of VM ID to True if running and False if still starting.
+            VMs missing from the pool, failed or timed out are left out, so
+            that check_vm_running() reports them.
+        """
+        wanted = set(vm_ids)
+        try:
+            pool = self.one.vmpool.info(-2, -1, -1, -1)
+        except pyone.OneException as e:
+            raise BackendError(f"Failed to list VMs: {e}") from e
+        statuses = {}
+        for vm in pool.VM:
+            vm_id = int(vm.ID)
+            if vm_id not in wanted:
+                continue
+            try:
+                statuses[vm_id] = self._check_vm_started(vm, timeout)
+            except BackendError:
+                continue
+        return statuses
+
     def _wait_for_vm_running(
         self, vm_id: int, timeout: int = 300, poll_interval: int = 5
     ) -> None:
@@ -981,22 +1105,10 @@ class OpenNebulaClient(BaseClient):
                 )
                 prev_state = (state, lcm_state)
 
-            # Success
-            if state == VM_STATE.ACTIVE and lcm_state == LCM_STATE.RUNNING:
+            if self._is_vm_running(vm_id, state, lcm_state):
                 logger.info("VM %d is now ACTIVE/RUNNING", vm_id)
                 return
 
-            # Failure states
-            if state in self.FAILURE_VM_STATES:
-                raise BackendError(
-                    f"VM {vm_id} entered failure state: STATE={state}"
-                )
-            if lcm_state in self.FAILURE_LCM_STATES:
-                raise BackendError(
-                    f"VM {vm_id} entered failure LCM state: "
-                    f"STATE={state} LCM_STATE={lcm_state}"
-                )
-
             # Timeout
             if time.monotonic() >= deadline:
                 raise BackendError(
@@ -1012,16 +1124,7 @@ class OpenNebulaClient(BaseClient):
         Returns the pyone VM object or None if not found.
         Uses filter flag -2 (all), no range limits.
         """
-        try:
-            pool = self.one.vmpool.info(-2, -1, -1, -1)
-            for vm in pool.VM:
-                if vm.NAME == vm_name:
-                    return vm
-        except pyone.OneNoExistsException:
-            return None
-        except pyone.OneException as e:
-            raise BackendError(f"Failed to list VMs: {e}") from e
-        return None
+        return self._get_pool_snapshot("vm").get(vm_name)
 
     def _get_vm_info(self, vm_id: int) -> object:
         """Get detailed VM info by numeric ID."""
@@ -1151,6 +1254,8 @@ class OpenNebulaClient(BaseClient):
         model_image: Optional[object] = None,
         engine_image_id: Optional[int] = None,
         vllm_context: Optional[dict[str, str]] = None,
+        wait_until_running: bool = True,
+        running_timeout: int = 300,
     ) -> int:
         """Instantiate a VM from a template within a VDC.
 
@@ -1177,6 +1282,9 @@ class OpenNebulaClient(BaseClient):
                 disk(s) are read and preserved.
             vllm_context: Optional ``ONEAPP_VLLM_*`` serving parameters to inject
                 into the VM CONTEXT.
+            wait_until_running: Block until the VM is RUNNING. When False, the
+                caller tracks the VM with check_vm_running()/check_vms_running().
+            running_timeout: Seconds the VM may take to reach RUNNING.
 
         Returns:
             Numeric VM ID.
@@ -1241,6 +1349,8 @@ class OpenNebulaClient(BaseClient):
 
         extra_template = "\n".join(extra_parts)
 
+        # The new VM also counts against the quotas in the group listing
+        self.invalidate_pool_snapshots("vm", "group")
         try:
             vm_id = self.one.template.instantiate(
                 template_id, vm_name, False, extra_template
@@ -1265,9 +1375,18 @@ class OpenNebulaClient(BaseClient):
                 logger.warning("Failed to terminate VM %d during rollback", vm_id)
             raise
 
+        if not wait_until_running:
+            logger.info(
+                "Instantiated VM '%s' (ID %d) in VDC '%s', not waiting for it to start",
+                vm_name,
+                vm_id,
+                parent_vdc_name,
+            )
+            return vm_id
+
         # Wait for VM to reach RUNNING state
         try:
-            self._wait_for_vm_running(vm_id)
+            self._wait_for_vm_running(vm_id, timeout=running_timeout)
         except BackendError:
             logger.warning(
                 "VM %d failed to reach RUNNING state, attempting cleanup",
@@ -1292,6 +1411,7 @@ class OpenNebulaClient(BaseClient):
 
         Uses ``terminate-hard`` to immediately destroy the VM.
         """
+        self.invalidate_pool_snapshots("vm", "group")
         try:
             self.one.vm.action("terminate-hard", vm_id)
             logger.info("Terminated VM ID %d", vm_id)
@@ -1526,6 +1646,7 @@ class OpenNebulaClient(BaseClient):
         if group is None:
             raise BackendError(f"Group '{group_name}' not found for VM chown")
 
+        self.invalidate_pool_snapshots("vm")
         try:
             # one.vm.chown(vm_id, user_id, group_id) — use -1 to keep user
             self.one.vm.chown(vm_id, -1, group.ID)
@@ -1854,8 +1975,7 @@ class OpenNebulaClient(BaseClient):
         if group is None:
             return {}
 
-        group_info = self._get_group_info(group.ID)
-        return self._parse_group_quota_limits(group_info)
+        return self._parse_group_quota_limits(self._get_group_quotas(group))
 
     def get_resource_user_limits(self, resource_id: str) -> dict[str, dict[str, int]]:
         """Not supported — Waldur shields users."""
@@ -1889,7 +2009,9 @@ class OpenNebulaClient(BaseClient):
     def get_usage_report(self, resource_ids: list[str], timezone: Optional[str] = None) -> list[dict]:
         """Get quota usage for VDC-associated groups.
 
-        Returns a list of dicts with group quota usage keyed by resource name.
+        The groups and their quotas are read from one group pool listing
+        shared by all resources. Returns a list of dicts with group quota
+        usage keyed by resource name.
         """
         del timezone  # Not used for OpenNebula
         results = []
@@ -1899,8 +2021,7 @@ class OpenNebulaClient(BaseClient):
                 logger.warning("Group '%s' not found for usage report", resource_name)
                 continue
 
-            group_info = self._get_group_info(group.ID)
-            usage = self._parse_group_quota_usage(group_info)
+            usage = self._parse_group_quota_usage(self._get_group_quotas(group))
             results.append({"resource_id": resource_name, "usage": usage})
 
         return results
@@ -59,6 +59,10 @@ class RancherClient(BaseClient):
 
         logger.info(f"Initialized Rancher client for {self.api_url}")
 
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self.session.close()
+
     def login(self, access_key: str, secret_key: str) -> None:
         """Login to Rancher server using access_key and secret_key.
 
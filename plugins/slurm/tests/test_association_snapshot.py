@@ -0,0 +1,185 @@
+"""Tests for the cluster-wide association snapshot of the SLURM clients.
+
+With a positive ``association_snapshot_ttl`` the per-account association
+lookups are answered from a single dump, which is dropped as soon as the
+agent itself changes associations.
+"""
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+from waldur_site_agent.backend.exceptions import BackendError
+
+from waldur_site_agent_slurm.associations import (
+    AssociationRecord,
+    AssociationSnapshot,
+    AssociationSnapshotCache,
+)
+from waldur_site_agent_slurm.client import SlurmClient
+from waldur_site_agent_slurm.rest_client import SlurmRestClient
+
+SLURM_TRES = {"cpu": {}, "mem": {}}
+
+ASSOCIATION_DUMP = "\n".join(
+    [
+        "root||||",
+        "proj_a||root|cpu=600,mem=2048M|",
+        "proj_a|user1|||cpu=100",
+        "proj_a|user2|||",
+        "proj_b||root||",
+    ]
+)
+
+
+class TestAssociationSnapshot:
+    def test_lookups_are_case_insensitive(self):
+        snapshot = AssociationSnapshot(
+            [AssociationRecord(account="proj_a"), AssociationRecord(account="proj_a", user="u1")]
+        )
+        assert snapshot.has_account("Proj_A")
+        assert snapshot.account_association("PROJ_A").account == "proj_a"
+        assert [record.user for record in snapshot.user_associations("Proj_A")] == ["u1"]
+
+    def test_first_association_of_a_user_is_kept(self):
+        snapshot = AssociationSnapshot(
+            [
+                AssociationRecord(account="proj_a", user="u1", max_tres_mins={"cpu": 1}),
+                AssociationRecord(account="proj_a", user="u1", max_tres_mins={"cpu": 2}),
+            ]
+        )
+        assert snapshot.user_association("proj_a", "u1").max_tres_mins == {"cpu": 1}
+
+
+class TestAssociationSnapshotCache:
+    def test_snapshot_is_loaded_once_within_ttl(self):
+        loads = []
+        cache = AssociationSnapshotCache(lambda: loads.append(1) or AssociationSnapshot([]), ttl=60)
+        cache.get()
+        cache.get()
+        assert len(loads) == 1
+
+    def test_invalidate_forces_reload(self):
+        loads = []
+        cache = AssociationSnapshotCache(lambda: loads.append(1) or AssociationSnapshot([]), ttl=60)
+        cache.get()
+        cache.invalidate()
+        cache.get()
+        assert len(loads) == 2
+
+    def test_load_racing_an_invalidation_is_not_stored(self):
+        cache = AssociationSnapshotCache(lambda: None, ttl=60)
+
+        def loader():
+            # An agent-side write lands while the dump is in flight.
+            cache.invalidate()
+            return AssociationSnapshot([])
+
+        cache._loader = loader
+        cache.get()
+        assert cache._snapshot is None
+
+    def test_zero_ttl_disables_cache(self):
+        assert not AssociationSnapshotCache(lambda: AssociationSnapshot([])).enabled
+
+
+class TestCliClientSnapshot:
+    @pytest.fixture
+    def client(self):
+        client = SlurmClient(SLURM_TRES, slurm_bin_path="", association_snapshot_ttl=60)
+        with patch.object(client, "execute_command", return_value=ASSOCIATION_DUMP):
+            yield client
+
+    def test_lookups_share_a_single_dump(self, client):
+        assert client.get_resource("proj_a").name == "proj_a"
+        assert client.get_resource("missing") is None
+        assert client.list_resource_users("proj_a") == ["user1", "user2"]
+        assert client.get_resource_limits("proj_a") == {"cpu": 600, "mem": 2048}
+        assert client.get_resource_user_limits("proj_a") == {"user1": {"cpu": 100}}
+        assert client.get_association("user1", "proj_a").user == "user1"
+        assert client.get_association("user3", "proj_a") is None
+        assert client.get_account_parent("Proj_A") == "root"
+        assert client.account_has_users("proj_a")
+        assert not client.account_has_users("proj_b")
+
+        assert client.executed_commands == [
+            "sacctmgr --parsable2 --noheader list associations "
+            "format=Account,User,ParentName,GrpTRESMins,MaxTRESMins"
+        ]
+
+    def test_user_limits_match_the_per_account_query(self):
+        client = SlurmClient(SLURM_TRES, slurm_bin_path="", association_snapshot_ttl=0)
+        output = "proj_a|cpu=100|user1\nproj_a||user2\nproj_a||\n"
+        with patch.object(client, "execute_command", return_value=output):
+            assert list(client.get_resource_user_limits("proj_a")) == ["user1"]
+
+    def test_association_change_invalidates_snapshot(self, client):
+        client.list_resource_users("proj_a")
+        client.create_association("user3", "proj_a")
+        client.list_resource_users("proj_a")
+
+        dumps = [command for command in client.executed_commands if "list associations" in command]
+        assert len(dumps) == 2
+
+    def test_failed_change_invalidates_snapshot(self, client):
+        client.list_resource_users("proj_a")
+        with (
+            patch.object(client, "execute_command", side_effect=BackendError("failed")),
+            pytest.raises(BackendError),
+        ):
+            client.delete_association("user1", "proj_a")
+        assert client.association_snapshot._snapshot is None
+
+    def test_snapshot_disabled_by_default(self):
+        client = SlurmClient(SLURM_TRES, slurm_bin_path="")
+        with patch.object(client, "execute_command", return_value=""):
+            client.list_resource_users("proj_a")
+        assert (
+            "list associations format=account,user where account=proj_a"
+            in client.executed_commands[0]
+        )
+
+
+class TestRestClientSnapshot:
+    @pytest.fixture
+    def requests(self):
+        return []
+
+    @pytest.fixture
+    def client(self, requests, monkeypatch):
+        associations = [
+            {"account": "proj_a", "user": "", "parent_account": "root"},
+            {
+                "account": "proj_a",
+                "user": "user1",
+                "max": {"tres": {"minutes": {"per": {"job": [{"type": "cpu", "count": 5}]}}}},
+            },
+        ]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(f"{request.method} {request.url.path}")
+            return httpx.Response(
+                200, json={"errors": [], "warnings": [], "associations": associations}
+            )
+
+        monkeypatch.setenv("SLURM_JWT", "test-token")
+        return SlurmRestClient(
+            slurm_tres=SLURM_TRES,
+            rest_settings={"url": "http://localhost:6820", "token_env": "SLURM_JWT"},
+            cluster_name="testcluster",
+            transport=httpx.MockTransport(handler),
+            association_snapshot_ttl=60,
+        )
+
+    def test_lookups_share_a_single_request(self, client, requests):
+        assert client.get_resource("proj_a").name == "proj_a"
+        assert client.list_resource_users("proj_a") == ["user1"]
+        assert client.get_resource_user_limits("proj_a") == {"user1": {"cpu": 5}}
+        assert client.get_account_parent("proj_a") == "root"
+        assert len(requests) == 1
+
+    def test_write_invalidates_snapshot(self, client, requests):
+        client.list_resource_users("proj_a")
+        client.delete_association("user1", "proj_a")
+        client.list_resource_users("proj_a")
+        assert [request.split()[0] for request in requests] == ["GET", "DELETE", "GET"]
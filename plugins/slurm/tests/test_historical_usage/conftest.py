@@ -233,9 +233,16 @@ def patched_slurm_client(sacct_emulator, sacctmgr_emulator):
             return "slurm-emulator 0.1.0"
         return f"Unknown command: {command_name}"
 
+    def mock_stream_command(args, command_name="sacct", parsable=True):
+        output = mock_execute_command(args, command_name, immediate=False, parsable=parsable)
+        return iter(output.splitlines(keepends=True))
+
     with patch(
         "waldur_site_agent_slurm.client.SlurmClient._execute_command",
         side_effect=mock_execute_command,
+    ), patch(
+        "waldur_site_agent_slurm.client.SlurmClient._stream_command",
+        side_effect=mock_stream_command,
     ):
         yield
 
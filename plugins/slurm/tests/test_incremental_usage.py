@@ -0,0 +1,214 @@
+"""Tests for the incremental collection of the current month's SLURM usage."""
+
+import datetime
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from waldur_site_agent_slurm.backend import SlurmBackend
+from waldur_site_agent_slurm.client import SlurmClient
+from waldur_site_agent_slurm.parser import SlurmJobLine
+from waldur_site_agent_slurm.usage_accumulator import UsageAccumulator
+
+SLURM_TRES = {
+    "cpu": {
+        "limit": 10,
+        "measured_unit": "k-Hours",
+        "unit_factor": 1,
+        "accounting_type": "usage",
+        "label": "CPU",
+    },
+}
+PERIOD_START = "2024-06-01T00:00:00"
+PERIOD_START_DT = datetime.datetime(2024, 6, 1)
+
+
+def _job(
+    account,
+    user,
+    job_id,
+    cpus=1,
+    elapsed="01:00:00",
+    start="2024-06-10T10:00:00",
+    cluster="cluster1",
+):
+    line = f"{account}|cpu={cpus}|{elapsed}|{user}|{job_id}|{start}|{cluster}"
+    return SlurmJobLine(line, SLURM_TRES, PERIOD_START_DT)
+
+
+class TestSlurmJobLine:
+    def test_usage_of_job_started_in_period(self):
+        assert _job("acc", "u1", "1", cpus=2).tres_usage == {"cpu": 120.0}
+
+    def test_usage_before_period_start_is_cut(self):
+        job = _job("acc", "u1", "1", elapsed="02:00:00", start="2024-05-31T23:00:00")
+        assert job.duration == 60.0
+
+    def test_job_which_never_started(self):
+        job = _job("acc", "u1", "1", elapsed="00:00:00", start="None")
+        assert job.start is None
+        assert job.duration == 0.0
+
+
+class TestUsageAccumulator:
+    def test_jobs_are_counted_once(self, tmp_path):
+        accumulator = UsageAccumulator(str(tmp_path / "state" / "usage.sqlite3"))
+        jobs = [_job("acc", "u1", "1"), _job("acc", "u2", "2")]
+
+        accumulator.add_finished_jobs(PERIOD_START, ["acc"], "2024-06-10T12:00:00", jobs)
+        accumulator.add_finished_jobs(
+            PERIOD_START, ["acc"], "2024-06-10T13:00:00", [*jobs, _job("acc", "u1", "3")]
+        )
+
+        assert accumulator.usage(PERIOD_START, ["acc", "other"]) == {
+            "acc": {"u1": {"cpu": 120.0}, "u2": {"cpu": 60.0}}
+        }
+        assert accumulator.high_water_marks(PERIOD_START, ["acc", "other"]) == {
+            "acc": "2024-06-10T13:00:00",
+            "other": None,
+        }
+
+    def test_jobs_are_told_apart_by_cluster_and_run(self, tmp_path):
+        accumulator = UsageAccumulator(str(tmp_path / "usage.sqlite3"))
+        jobs = [
+            _job("acc", "u1", "1"),
+            _job("acc", "u1", "1", cluster="cluster2"),
+            # The next run of a requeued job keeps its ID
+            _job("acc", "u1", "1", start="2024-06-10T11:00:00"),
+        ]
+
+        accumulator.add_finished_jobs(PERIOD_START, ["acc"], "2024-06-10T12:00:00", jobs)
+        accumulator.add_finished_jobs(PERIOD_START, ["acc"], "2024-06-10T13:00:00", jobs)
+
+        assert accumulator.usage(PERIOD_START, ["acc"]) == {"acc": {"u1": {"cpu": 180.0}}}
+
+    def test_state_counting_jobs_by_id_is_collected_again(self, tmp_path):
+        path = tmp_path / "usage.sqlite3"
+        connection = sqlite3.connect(path)
+        connection.executescript(
+            "CREATE TABLE high_water_marks (period TEXT, account TEXT, mark TEXT);"
+            "CREATE TABLE counted_jobs (period TEXT, job_id TEXT);"
+            "CREATE TABLE user_usage (period TEXT, account TEXT, user TEXT, tres TEXT, usage REAL);"
+            f"INSERT INTO high_water_marks VALUES ('{PERIOD_START}', 'acc', '{PERIOD_START}');"
+        )
+        connection.close()
+
+        accumulator = UsageAccumulator(str(path))
+
+        assert accumulator.high_water_marks(PERIOD_START, ["acc"]) == {"acc": None}
+        accumulator.add_finished_jobs(PERIOD_START, ["acc"], PERIOD_START, [_job("acc", "u1", "1")])
+        assert accumulator.usage(PERIOD_START, ["acc"]) == {"acc": {"u1": {"cpu": 60.0}}}
+
+    def test_state_survives_reopening_and_old_periods_are_pruned(self, tmp_path):
+        path = str(tmp_path / "usage.sqlite3")
+        accumulator = UsageAccumulator(path)
+        accumulator.add_finished_jobs(PERIOD_START, ["acc"], PERIOD_START, [_job("acc", "u1", "1")])
+        accumulator.close()
+
+        accumulator = UsageAccumulator(path)
+        assert accumulator.usage(PERIOD_START, ["acc"]) == {"acc": {"u1": {"cpu": 60.0}}}
+
+        accumulator.prune("2024-07-01T00:00:00")
+        assert accumulator.usage(PERIOD_START, ["acc"]) == {}
+
+
+class TestIncrementalUsageReport:
+    @pytest.fixture
+    def backend(self, tmp_path):
+        settings = {
+            "customer_prefix": "hpc_",
+            "project_prefix": "hpc_",
+            "allocation_prefix": "hpc_",
+            "enable_user_homedir_account_creation": False,
+            "incremental_usage_state_file": str(tmp_path / "usage.sqlite3"),
+        }
+        backend = SlurmBackend(settings, SLURM_TRES)
+        backend.client = MagicMock()
+        backend.client.get_running_jobs_report.return_value = []
+        return backend
+
+    @patch("waldur_site_agent_slurm.backend.backend_utils.get_current_time_in_timezone")
+    def test_only_jobs_ended_since_the_mark_are_queried(self, mock_now, backend):
+        mock_now.return_value = datetime.datetime(2024, 6, 10, 12, 0, 0)
+        backend.client.get_finished_jobs_report.return_value = [_job("acc1", "u1", "1")]
+        backend.client.get_running_jobs_report.return_value = [_job("acc1", "u2", "2")]
+
+        report = backend._get_usage_report(["acc1"])
+
+        backend.client.get_finished_jobs_report.assert_called_once_with(
+            ["acc1"], PERIOD_START, "2024-06-10T12:00:00", PERIOD_START
+        )
+        backend.client.get_usage_report.assert_not_called()
+        assert report["acc1"]["TOTAL_ACCOUNT_USAGE"] == {"cpu": 120}
+
+        # The next cycle starts from the mark, a job seen again is not re-counted
+        mock_now.return_value = datetime.datetime(2024, 6, 10, 12, 30, 0)
+        backend.client.get_finished_jobs_report.return_value = [
+            _job("acc1", "u1", "1"),
+            _job("acc1", "u2", "2"),
+        ]
+        backend.client.get_running_jobs_report.return_value = []
+
+        report = backend._get_usage_report(["acc1"])
+
+        assert backend.client.get_finished_jobs_report.call_args.args[1] == "2024-06-10T11:45:00"
+        assert report["acc1"]["TOTAL_ACCOUNT_USAGE"] == {"cpu": 120}
+        assert report["acc1"]["u2"] == {"cpu": 60}
+
+    @patch("waldur_site_agent_slurm.backend.backend_utils.get_current_time_in_timezone")
+    def test_new_account_is_collected_from_month_start(self, mock_now, backend):
+        mock_now.return_value = datetime.datetime(2024, 6, 10, 12, 0, 0)
+        backend.client.get_finished_jobs_report.return_value = []
+        backend._get_usage_report(["acc1"])
+
+        mock_now.return_value = datetime.datetime(2024, 6, 10, 12, 30, 0)
+        backend._get_usage_report(["acc1", "acc2"])
+
+        calls = backend.client.get_finished_jobs_report.call_args_list[1:]
+        assert sorted((call.args[0], call.args[1]) for call in calls) == [
+            (["acc1"], "2024-06-10T11:45:00"),
+            (["acc2"], PERIOD_START),
+        ]
+
+    def test_full_month_query_without_state_file(self, tmp_path):
+        settings = {
+            "customer_prefix": "hpc_",
+            "project_prefix": "hpc_",
+            "allocation_prefix": "hpc_",
+            "enable_user_homedir_account_creation": False,
+        }
+        backend = SlurmBackend(settings, SLURM_TRES)
+        backend.client = MagicMock()
+        backend.client.get_usage_totals.return_value = {}
+
+        backend._get_usage_report(["acc1"])
+
+        backend.client.get_usage_totals.assert_called_once()
+        backend.client.get_finished_jobs_report.assert_not_called()
+
+
+class TestJobReportCommands:
+    @patch.object(SlurmClient, "_execute_command", return_value="acc|cpu=1|01:00:00|u1|7|None|c1\n")
+    def test_finished_jobs_command(self, mock_execute):
+        client = SlurmClient(SLURM_TRES)
+
+        lines = client.get_finished_jobs_report(
+            ["acc"], "2024-06-10T11:45:00", "2024-06-10T12:30:00", PERIOD_START
+        )
+
+        args = mock_execute.call_args.args[0]
+        assert "--state=CA,CD,DL,F,NF,OOM,PR,RQ,TO" in args
+        assert "--duplicates" in args
+        assert "--starttime=2024-06-10T11:45:00" in args
+        assert "--endtime=2024-06-10T12:30:00" in args
+        assert "--truncate" not in args
+        assert [(line.cluster, line.job_id) for line in lines] == [("c1", "7")]
+
+    @patch.object(SlurmClient, "_execute_command", return_value="")
+    def test_running_jobs_command(self, mock_execute):
+        SlurmClient(SLURM_TRES).get_running_jobs_report(["acc"], PERIOD_START)
+
+        args = mock_execute.call_args.args[0]
+        assert "--state=R,S,CG" in args
+        assert not any(arg.startswith("--starttime") for arg in args)
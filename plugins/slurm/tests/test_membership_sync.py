@@ -264,6 +264,9 @@ class MembershipSyncTest(unittest.TestCase):
         self.mock_pull_backend_resource = mock.patch.object(
             backend.SlurmBackend, "_pull_backend_resource", return_value=backend_resource
         ).start()
+        self.mock_pull_backend_resource_users = mock.patch.object(
+            backend.SlurmBackend, "_pull_backend_resource_users", return_value=backend_resource
+        ).start()
         self.mock_restore_resource = mock.patch.object(
             backend.SlurmBackend, "restore_resource", return_value=None
         ).start()
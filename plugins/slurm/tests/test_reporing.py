@@ -188,11 +188,13 @@ class ReportingTest(unittest.TestCase):
             json=[
                 {
                     "uuid": "23565BD44E5D433F88C1028A2E7AB5F6",
+                    "resource_uuid": self.waldur_resource["uuid"],
                     "type": "cpu",
                     "usage": "15.0",
                 },
                 {
                     "uuid": "ABFCD77BDE254F7485F839397968A12D",
+                    "resource_uuid": self.waldur_resource["uuid"],
                     "type": "mem",
                     "usage": "20.0",
                 },
@@ -736,6 +736,8 @@ class TestCliDelegation:
         client._cli = mock.Mock(spec=SlurmClient)
         client.get_usage_report(["acc1"], "UTC")
         client._cli.get_usage_report.assert_called_once_with(["acc1"], "UTC")
+        client.get_usage_totals(["acc1"], "UTC")
+        client._cli.get_usage_totals.assert_called_once_with(["acc1"], "UTC")
         client.get_historical_usage_report(["acc1"], 2026, 5)
         client._cli.get_historical_usage_report.assert_called_once_with(["acc1"], 2026, 5)
         client.reset_raw_usage("acc1")
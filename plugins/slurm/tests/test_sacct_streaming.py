@@ -0,0 +1,207 @@
+"""Tests for the streaming aggregation of the sacct usage reports."""
+
+import os
+import random
+import time
+import tracemalloc
+from unittest.mock import MagicMock, patch
+
+import pytest
+from waldur_site_agent_slurm.backend import SlurmBackend
+from waldur_site_agent_slurm.client import SlurmClient
+from waldur_site_agent_slurm.parser import (
+    SacctUsageAggregator,
+    SlurmReportLine,
+    parse_duration,
+    parse_elapsed,
+)
+
+SLURM_TRES = {
+    "cpu": {"measured_unit": "Hours", "unit_factor": 1},
+    "mem": {"measured_unit": "MB", "unit_factor": 1},
+    "gres/gpu": {"measured_unit": "Hours", "unit_factor": 1},
+}
+MAPPED_TRES = {
+    "node_hours": {
+        "measured_unit": "Hours",
+        "unit_factor": 1,
+        "target_components": {"cpu": {"factor": 64.0}, "gpu": {"factor": 8.0}},
+    },
+}
+REQ_TRES_SHAPES = [
+    "billing=4,cpu=4,mem=16G,node=1",
+    "cpu=128,gres/gpu=4,mem=512000M,node=2",
+    "cpu=1,mem=1000",
+    "cpu=2,cpu=3,gpu=1",
+    "billing=1",
+    "",
+]
+ELAPSED_VALUES = ["00:00:00", "00:01:03", "23:59:59", "850:00:00", "1-02:03:04", "00:00:03.500"]
+
+# Lines generated by the opt-in benchmark, e.g. WALDUR_SACCT_BENCHMARK_LINES=1000000
+BENCHMARK_LINES = int(os.environ.get("WALDUR_SACCT_BENCHMARK_LINES", "0"))
+
+
+def _synthetic_lines(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        account = f"acc{rng.randrange(50)}"
+        user = f"user{rng.randrange(500)}"
+        req_tres = rng.choice(REQ_TRES_SHAPES)
+        elapsed = f"{rng.randrange(48):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}"
+        yield f"{account}|{req_tres}|{elapsed}|{user}\n"
+
+
+def _report_from_lines(lines, slurm_tres):
+    """Per-account, per-user usage the way the backend folded SlurmReportLine objects."""
+    report = {}
+    SlurmBackend._add_report_lines(
+        report,
+        [SlurmReportLine(line, slurm_tres) for line in lines.splitlines() if "|" in line],
+    )
+    return report
+
+
+class TestParseElapsed:
+    @pytest.mark.parametrize("value", [*ELAPSED_VALUES, "12:30", "INVALID"])
+    def test_matches_parse_duration(self, value):
+        assert parse_elapsed(value) == parse_duration(value)
+
+
+class TestSacctUsageAggregator:
+    @pytest.mark.parametrize("slurm_tres", [SLURM_TRES, MAPPED_TRES])
+    def test_matches_summed_report_lines(self, slurm_tres):
+        rng = random.Random(1)
+        lines = [
+            f"acc{rng.randrange(3)} |{rng.choice(REQ_TRES_SHAPES)}|"
+            f"{rng.choice(ELAPSED_VALUES)}|user{rng.randrange(4)}"
+            for _ in range(500)
+        ]
+        output = "\n".join(["not a report line", *lines, ""])
+
+        aggregator = SacctUsageAggregator(slurm_tres)
+        aggregator.add_lines(output.splitlines(keepends=True))
+
+        assert aggregator.report() == _report_from_lines(output, slurm_tres)
+
+    def test_users_without_requested_tres_are_reported_empty(self):
+        aggregator = SacctUsageAggregator(SLURM_TRES)
+        aggregator.add_lines(["acc|billing=1|01:00:00|user1\n", "acc|cpu=2|00:30:00|user2\n"])
+
+        assert aggregator.report() == {"acc": {"user1": {}, "user2": {"cpu": 60.0}}}
+
+
+class TestUsageTotals:
+    def test_client_streams_the_sacct_report(self):
+        client = SlurmClient(SLURM_TRES, slurm_bin_path="", cluster_name="cluster1")
+        output = ["acc1|cpu=2,mem=2048M|01:00:00|user1\n", "acc1|cpu=1|00:30:00|user2\n"]
+
+        with patch.object(client, "stream_command", return_value=iter(output)) as stream:
+            totals = client.get_usage_totals(["acc1"])
+
+        command = stream.call_args.args[0]
+        assert command[:3] == ["sacct", "--parsable2", "--noheader"]
+        assert "--cluster=cluster1" in command
+        assert "--format=Account,ReqTRES,Elapsed,User" in command
+        assert totals == {
+            "acc1": {"user1": {"cpu": 120.0, "mem": 122880.0}, "user2": {"cpu": 30.0}}
+        }
+
+    def test_client_streams_the_historical_report(self):
+        client = SlurmClient(SLURM_TRES, slurm_bin_path="")
+        output = ["acc1|cpu=2|01:00:00|user1\n", "acc2|cpu=1|00:30:00|user2\n"]
+
+        with patch.object(client, "stream_command", return_value=iter(output)) as stream:
+            totals = client.get_historical_usage_totals(["acc1", "acc2"], 2024, 2)
+
+        command = stream.call_args.args[0]
+        assert "--accounts=acc1,acc2" in command
+        assert "--starttime=2024-02-01T00:00:00" in command
+        assert totals == {"acc1": {"user1": {"cpu": 120.0}}, "acc2": {"user2": {"cpu": 30.0}}}
+
+    def test_backend_adds_account_totals(self):
+        backend = SlurmBackend(
+            {
+                "customer_prefix": "hpc_",
+                "project_prefix": "hpc_",
+                "allocation_prefix": "hpc_",
+                "enable_user_homedir_account_creation": False,
+            },
+            {"cpu": {"limit": 10, "measured_unit": "Hours", "unit_factor": 60}},
+        )
+        backend.client = MagicMock()
+        backend.client.get_usage_totals.return_value = {
+            "acc1": {"user1": {"cpu": 120.0}, "user2": {"cpu": 60.0}}
+        }
+
+        report = backend._get_usage_report(["acc1"])
+
+        backend.client.get_usage_report.assert_not_called()
+        assert report["acc1"]["TOTAL_ACCOUNT_USAGE"] == {"cpu": 3}
+
+    def test_backend_period_report_uses_historical_totals(self):
+        backend = SlurmBackend(
+            {
+                "customer_prefix": "hpc_",
+                "project_prefix": "hpc_",
+                "allocation_prefix": "hpc_",
+                "enable_user_homedir_account_creation": False,
+            },
+            {"cpu": {"limit": 10, "measured_unit": "Hours", "unit_factor": 60}},
+        )
+        backend.client = MagicMock()
+        backend.client.get_historical_usage_totals.return_value = {
+            "acc1": {"user1": {"cpu": 120.0}},
+            "acc2": {"user2": {"cpu": 60.0}},
+        }
+
+        report = backend.get_usage_report_for_period(["acc1", "acc2"], 2024, 2)
+
+        backend.client.get_historical_usage_totals.assert_called_once_with(
+            ["acc1", "acc2"], 2024, 2
+        )
+        backend.client.get_historical_usage_report.assert_not_called()
+        assert report["acc1"]["TOTAL_ACCOUNT_USAGE"] == {"cpu": 2}
+        assert report["acc2"]["TOTAL_ACCOUNT_USAGE"] == {"cpu": 1}
+
+
+@pytest.mark.skipif(not BENCHMARK_LINES, reason="WALDUR_SACCT_BENCHMARK_LINES not set")
+class TestStreamingBenchmark:
+    """Compares the streaming aggregation with building and folding SlurmReportLine objects."""
+
+    @staticmethod
+    def _buffered():
+        # The whole check_output string, a SlurmReportLine per line, folded with sum_dicts
+        return _report_from_lines("".join(_synthetic_lines(BENCHMARK_LINES)), SLURM_TRES)
+
+    @staticmethod
+    def _streamed():
+        aggregator = SacctUsageAggregator(SLURM_TRES)
+        aggregator.add_lines(_synthetic_lines(BENCHMARK_LINES))
+        return aggregator.report()
+
+    @staticmethod
+    def _measure(function):
+        started_at = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started_at
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return result, elapsed, peak
+
+    def test_streaming_uses_less_memory_and_time(self):
+        buffered, buffered_seconds, buffered_peak = self._measure(self._buffered)
+        streamed, streamed_seconds, streamed_peak = self._measure(self._streamed)
+
+        print(  # noqa: T201
+            f"\n{BENCHMARK_LINES} lines: buffered {buffered_seconds:.2f}s, "
+            f"peak {buffered_peak / 2**20:.1f} MiB; streamed {streamed_seconds:.2f}s, "
+            f"peak {streamed_peak / 2**20:.1f} MiB"
+        )
+        assert streamed.keys() == buffered.keys()
+        assert streamed_seconds < buffered_seconds
+        assert streamed_peak * 4 < buffered_peak
@@ -0,0 +1,107 @@
+"""Cluster-wide snapshot of SLURM associations.
+
+A single association dump answers the per-account lookups of a sync cycle
+(existence, users, limits, parent) instead of a separate ``sacctmgr`` call
+or REST request per account.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class AssociationRecord:
+    """A single association; account-level when ``user`` is empty."""
+
+    account: str
+    user: str = ""
+    parent: str = ""
+    grp_tres_mins: dict[str, int] = field(default_factory=dict)
+    max_tres_mins: dict[str, int] = field(default_factory=dict)
+
+
+class AssociationSnapshot:
+    """Associations of the cluster indexed by account and user.
+
+    Account names are case-insensitive in SLURM and stored lower-cased, so
+    account lookups are case-insensitive as well. When an account or user has
+    several associations (e.g. one per partition), the first one is kept,
+    matching the single-account ``sacctmgr`` queries this replaces.
+    """
+
+    def __init__(self, records: Iterable[AssociationRecord]) -> None:
+        """Index the records by account and user."""
+        self._accounts: dict[str, dict[str, AssociationRecord]] = {}
+        for record in records:
+            account_records = self._accounts.setdefault(record.account.lower(), {})
+            account_records.setdefault(record.user, record)
+
+    def __len__(self) -> int:
+        """Number of accounts in the snapshot."""
+        return len(self._accounts)
+
+    def has_account(self, account: str) -> bool:
+        """Check if the account has any association."""
+        return account.lower() in self._accounts
+
+    def account_association(self, account: str) -> Optional[AssociationRecord]:
+        """Return the account-level association of the account."""
+        return self._accounts.get(account.lower(), {}).get("")
+
+    def user_association(self, account: str, user: str) -> Optional[AssociationRecord]:
+        """Return the association between the user and the account."""
+        if not user:
+            return None
+        return self._accounts.get(account.lower(), {}).get(user)
+
+    def user_associations(self, account: str) -> list[AssociationRecord]:
+        """Return the user-level associations of the account."""
+        return [record for user, record in self._accounts.get(account.lower(), {}).items() if user]
+
+
+class AssociationSnapshotCache:
+    """Lazily loaded association snapshot, reloaded once it is ``ttl`` seconds old.
+
+    A non-positive ``ttl`` disables the cache; callers then query the cluster
+    directly. ``invalidate`` must be called after every association change made
+    by the agent, so the next lookup sees it. A dump that was already in flight
+    when the cache got invalidated is returned to its caller but not stored.
+    """
+
+    def __init__(self, loader: Callable[[], AssociationSnapshot], ttl: float = 0) -> None:
+        """Init the cache with the function dumping the associations."""
+        self._loader = loader
+        self.ttl = ttl
+        self._snapshot: Optional[AssociationSnapshot] = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether lookups should be served from the snapshot."""
+        return self.ttl > 0
+
+    def get(self) -> AssociationSnapshot:
+        """Return the current snapshot, dumping the associations if needed."""
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._snapshot
+            generation = self._generation
+        snapshot = self._loader()
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._loaded_at = time.monotonic()
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Drop the snapshot after the associations were changed."""
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
@@ -23,7 +23,9 @@ from waldur_site_agent.common.component_mapping import ComponentMapper
 from waldur_site_agent_slurm import utils
 from waldur_site_agent_slurm.client import SlurmClient
 from waldur_site_agent_slurm.interface import SlurmClientInterface
+from waldur_site_agent_slurm.parser import SACCT_TIME_FORMAT
 from waldur_site_agent_slurm.schemas import ExecutionMode
+from waldur_site_agent_slurm.usage_accumulator import UsageAccumulator
 
 # Accepted values for the ``default_account_policy`` backend setting. An
 # unrecognized value (e.g. a typo) must fail loudly at construction rather than
@@ -31,6 +33,15 @@ from waldur_site_agent_slurm.schemas import ExecutionMode
 # account.
 _VALID_DEFAULT_ACCOUNT_POLICIES = frozenset({"common", "individual", "none"})
 
+# Default for the ``association_snapshot_ttl`` backend setting: how long (in
+# seconds) association lookups are answered from a single cluster-wide dump.
+_DEFAULT_ASSOCIATION_SNAPSHOT_TTL = 60
+
+# Overlap between consecutive windows of the incremental usage collection. A job
+# can reach its final state (e.g. COMPLETING -> COMPLETED) a while after its end
+# time; its ID keeps it from being counted twice.
+_INCREMENTAL_USAGE_OVERLAP = datetime.timedelta(minutes=15)
+
 
 def _get_ldap_client(ldap_settings: dict):  # type: ignore[no-untyped-def]  # noqa: ANN202
     """Lazily import and instantiate the LDAP client if configured.
@@ -64,6 +75,13 @@ class SlurmBackend(backends.BaseBackend):
     # implements apply_periodic_settings below.
     supports_user_homedirs = True
     supports_periodic_settings = True
+    # sacct accepts a list of accounts, so one run covers a whole report batch.
+    supports_bulk_usage_report = True
+    # Membership sync reads associations only; skip the sacct usage query.
+    supports_membership_only_pull = True
+    # Every sacctmgr change is serialised by slurmdbd, more parallel writers
+    # only queue up there.
+    max_membership_sync_workers = 4
 
     def __init__(self, slurm_settings: dict, slurm_tres: dict[str, dict]) -> None:
         """Init backend data and creates a corresponding client."""
@@ -79,13 +97,27 @@ class SlurmBackend(backends.BaseBackend):
             # would mask a misconfigured deployment.
             msg = f"Unknown SLURM execution_mode {raw_execution_mode!r} — expected 'cli' or 'rest'"
             raise BackendError(msg) from e
+        # Agent-side writes invalidate the snapshot; the TTL bounds how long
+        # changes made outside the agent (e.g. by an admin) can go unnoticed.
+        self._association_snapshot_ttl = float(
+            self.backend_settings.get("association_snapshot_ttl", _DEFAULT_ASSOCIATION_SNAPSHOT_TTL)
+        )
         if self.execution_mode is ExecutionMode.REST:
             self.client: SlurmClientInterface = self._create_rest_client(slurm_tres, slurm_bin_path)
         else:
             self.client = SlurmClient(
-                slurm_tres, slurm_bin_path=slurm_bin_path, cluster_name=self.cluster_name
+                slurm_tres,
+                slurm_bin_path=slurm_bin_path,
+                cluster_name=self.cluster_name,
+                association_snapshot_ttl=self._association_snapshot_ttl,
             )
 
+        # Optional incremental usage collection, see _get_incremental_usage_report
+        self._usage_accumulator: Optional[UsageAccumulator] = None
+        usage_state_file = self.backend_settings.get("incremental_usage_state_file")
+        if usage_state_file:
+            self._usage_accumulator = UsageAccumulator(usage_state_file)
+
         # Optional LDAP integration for project groups
         self._ldap_client = None
         ldap_settings = self.backend_settings.get("ldap")
@@ -182,6 +214,7 @@ class SlurmBackend(backends.BaseBackend):
             rest_settings=rest_settings,
             cluster_name=self.cluster_name,
             slurm_bin_path=slurm_bin_path,
+            association_snapshot_ttl=self._association_snapshot_ttl,
         )
 
     def _pre_create_resource(
@@ -1136,15 +1169,11 @@ class SlurmBackend(backends.BaseBackend):
             }
         }
         """
-        report: dict[str, dict[str, dict[str, int]]] = {}
-        lines = self.client.get_usage_report(resource_backend_ids, timezone=self.timezone)
-
-        for line in lines:
-            report.setdefault(line.account, {}).setdefault(line.user, {})
-            tres_usage = line.tres_usage
-            user_usage_existing = report[line.account][line.user]
-            user_usage_new = backend_utils.sum_dicts([user_usage_existing, tres_usage])
-            report[line.account][line.user] = user_usage_new
+        report: dict[str, dict[str, dict]]
+        if self._usage_accumulator is not None:
+            report = self._get_incremental_usage_report(resource_backend_ids)
+        else:
+            report = self.client.get_usage_totals(resource_backend_ids, timezone=self.timezone)
 
         for account_usage in report.values():
             usages_per_user = list(account_usage.values())
@@ -1153,6 +1182,54 @@ class SlurmBackend(backends.BaseBackend):
 
         return self._convert_usage_report(report)
 
+    def _get_incremental_usage_report(
+        self, resource_backend_ids: list[str]
+    ) -> dict[str, dict[str, dict[str, int]]]:
+        """Collect the current month's per-user usage of the accounts incrementally.
+
+        Only the jobs ended since each account's high-water mark are read from
+        sacct and added to the persisted accumulator; the running jobs are read
+        on every call. Accounts without a mark are collected from the month start.
+        """
+        accumulator = self._usage_accumulator
+        if accumulator is None:
+            return {}
+        period_start, _ = backend_utils.format_current_month(self.timezone or "")
+        now = backend_utils.get_current_time_in_timezone(self.timezone or "").replace(tzinfo=None)
+        until = now.strftime(SACCT_TIME_FORMAT)
+        next_mark = max(
+            (now - _INCREMENTAL_USAGE_OVERLAP).strftime(SACCT_TIME_FORMAT), period_start
+        )
+        accumulator.prune(period_start)
+
+        accounts_by_mark: dict[str, list[str]] = {}
+        for account, mark in accumulator.high_water_marks(
+            period_start, resource_backend_ids
+        ).items():
+            accounts_by_mark.setdefault(mark or period_start, []).append(account)
+
+        for since, accounts in accounts_by_mark.items():
+            logger.info(
+                "Collecting usage of jobs ended since %s for %s accounts", since, len(accounts)
+            )
+            lines = self.client.get_finished_jobs_report(accounts, since, until, period_start)
+            accumulator.add_finished_jobs(period_start, accounts, next_mark, lines)
+
+        report = accumulator.usage(period_start, resource_backend_ids)
+        running_lines = self.client.get_running_jobs_report(resource_backend_ids, period_start)
+        self._add_report_lines(report, running_lines)
+        return report
+
+    @staticmethod
+    def _add_report_lines(report: dict[str, dict[str, dict]], lines: list) -> None:
+        """Add the TRES usage of the sacct lines to the per-account, per-user report."""
+        for line in lines:
+            report.setdefault(line.account, {}).setdefault(line.user, {})
+            tres_usage = line.tres_usage
+            user_usage_existing = report[line.account][line.user]
+            user_usage_new = backend_utils.sum_dicts([user_usage_existing, tres_usage])
+            report[line.account][line.user] = user_usage_new
+
     def get_usage_report_for_period(
         self,
         resource_backend_ids: list[str],
@@ -1170,16 +1247,13 @@ class SlurmBackend(backends.BaseBackend):
 
         Returns:
             Dictionary with same structure as _get_usage_report() but for historical data
-        """
-        report: dict[str, dict[str, dict[str, int]]] = {}
-        lines = self.client.get_historical_usage_report(resource_backend_ids, year, month)
 
-        for line in lines:
-            report.setdefault(line.account, {}).setdefault(line.user, {})
-            tres_usage = line.tres_usage
-            user_usage_existing = report[line.account][line.user]
-            user_usage_new = backend_utils.sum_dicts([user_usage_existing, tres_usage])
-            report[line.account][line.user] = user_usage_new
+        The report processor queries all accounts of a batch at once, so the sacct
+        output is aggregated while it is streamed, as for the current month.
+        """
+        report: dict[str, dict[str, dict]] = self.client.get_historical_usage_totals(
+            resource_backend_ids, year, month
+        )
 
         for account_usage in report.values():
             usages_per_user = list(account_usage.values())
@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
+import datetime
 import re
-from collections.abc import Sequence
+from collections.abc import Iterator, Sequence
 from pathlib import Path
 from typing import Optional
 
@@ -12,8 +13,20 @@ from waldur_site_agent.backend.exceptions import (
     BackendError,
 )
 from waldur_site_agent.backend.structures import Association, ClientResource
+from waldur_site_agent_slurm.associations import (
+    AssociationRecord,
+    AssociationSnapshot,
+    AssociationSnapshotCache,
+)
 from waldur_site_agent_slurm.interface import SlurmClientInterface
-from waldur_site_agent_slurm.parser import SlurmAssociationLine, SlurmReportLine
+from waldur_site_agent_slurm.parser import (
+    SACCT_TIME_FORMAT,
+    SacctUsageAggregator,
+    SlurmAssociationLine,
+    SlurmJobLine,
+    SlurmReportLine,
+    parse_tres_limits,
+)
 
 _PARTITION_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
 # QoS names share the partition character set; guards against sacctmgr injection.
@@ -32,21 +45,33 @@ class SlurmClient(SlurmClientInterface):
     _COMMAND_SUPPORTS_PARSABLE = frozenset({"sacctmgr", "sacct"})
     # SLURM commands whose path should be resolved via slurm_bin_path
     SLURM_COMMANDS = frozenset({"sacctmgr", "sacct", "scancel", "sinfo"})
+    # Terminal job states; with a time window sacct selects jobs which ended in it.
+    # A requeued run (RQ) ended too, the job's next run keeps its JobIDRaw.
+    _FINISHED_JOB_STATES = "CA,CD,DL,F,NF,OOM,PR,RQ,TO"
+    # States of jobs which started and have not ended yet.
+    _ACTIVE_JOB_STATES = "R,S,CG"
+    _JOB_REPORT_FORMAT = "Account,ReqTRES,Elapsed,User,JobIDRaw,Start,Cluster"
 
     # sacctmgr entity types that are cluster-independent (global).
     _CLUSTER_INDEPENDENT_ENTITIES = frozenset({"qos", "tres", "cluster"})
+    # sacctmgr actions changing the association data cached in the snapshot.
+    _MUTATING_ACTIONS = frozenset({"add", "create", "modify", "update", "remove", "delete"})
 
     def __init__(
         self,
         slurm_tres: dict,
         slurm_bin_path: str = "/usr/bin",
         cluster_name: Optional[str] = None,
+        association_snapshot_ttl: float = 0,
     ) -> None:
         """Inits SLURM-related data."""
         self.slurm_tres = slurm_tres
         self.slurm_bin_path = slurm_bin_path
         self.cluster_name = cluster_name
         self.executed_commands: list[str] = []
+        self.association_snapshot = AssociationSnapshotCache(
+            self.list_all_associations, ttl=association_snapshot_ttl
+        )
 
     def get_version(self) -> str:
         """Return the SLURM version string as reported by ``sinfo -V``."""
@@ -100,7 +125,15 @@ class SlurmClient(SlurmClientInterface):
         return [line.split("|")[0].strip() for line in output.splitlines() if line.strip()]
 
     def get_resource(self, resource_id: str) -> ClientResource | None:
-        """Returns Account object from cluster based on the account name."""
+        """Returns Account object from cluster based on the account name.
+
+        With the association snapshot, an account only counts as existing if it
+        has an account-level association on the cluster; one known to the SLURM
+        database without it is reported as missing.
+        """
+        if self.association_snapshot.enabled:
+            record = self.association_snapshot.get().account_association(resource_id)
+            return None if record is None else ClientResource(name=record.account)
         output = self._execute_command(["show", "account", resource_id])
         lines = [line for line in output.splitlines() if "|" in line]
         if len(lines) == 0:
@@ -154,6 +187,9 @@ class SlurmClient(SlurmClientInterface):
         never matched here — the caller then treats it as unparented and issues a
         redundant reparent that Slurm rejects.
         """
+        if self.association_snapshot.enabled:
+            record = self.association_snapshot.get().account_association(account)
+            return (record.parent or None) if record is not None else None
         output = self._execute_command(
             ["show", "assoc", f"account={account}", "format=Account,ParentName,User", "-n", "-P"]
         )
@@ -180,6 +216,8 @@ class SlurmClient(SlurmClientInterface):
 
     def account_has_users(self, account: str) -> bool:
         """Checks if the account with the specified name have related users."""
+        if self.association_snapshot.enabled:
+            return bool(self.association_snapshot.get().user_associations(account))
         output = self._execute_command(["show", "association", "where", f"account={account}"])
         items = [self._parse_association(line) for line in output.splitlines() if "|" in line]
         return any(item.user != "" for item in items)
@@ -210,6 +248,15 @@ class SlurmClient(SlurmClientInterface):
 
     def get_association(self, user: str, resource_id: str) -> Association | None:
         """Returns associations between the user and the account if exists."""
+        if self.association_snapshot.enabled:
+            record = self.association_snapshot.get().user_association(resource_id, user)
+            if record is None:
+                return None
+            return Association(
+                account=record.account,
+                user=record.user,
+                value=record.grp_tres_mins.get("cpu", 0),
+            )
         output = self._execute_command(
             [
                 "show",
@@ -247,27 +294,45 @@ class SlurmClient(SlurmClientInterface):
             ]
         )
 
-    def get_usage_report(
-        self, resource_ids: list[str], timezone: Optional[str] = None
-    ) -> list[SlurmReportLine]:
-        """Generates per-user usage report for the accounts."""
-        month_start, month_end = backend_utils.format_current_month(timezone or "")
-
-        args = [
+    @staticmethod
+    def _usage_report_args(resource_ids: list[str], start: str, end: str) -> list[str]:
+        return [
             "--noconvert",
             "--truncate",
             "--allocations",
             "--allusers",
-            f"--starttime={month_start}",
-            f"--endtime={month_end}",
+            f"--starttime={start}",
+            f"--endtime={end}",
             f"--accounts={','.join(resource_ids)}",
             "--format=Account,ReqTRES,Elapsed,User",
         ]
+
+    def get_usage_report(
+        self, resource_ids: list[str], timezone: Optional[str] = None
+    ) -> list[SlurmReportLine]:
+        """Generates per-user usage report for the accounts."""
+        month_start, month_end = backend_utils.format_current_month(timezone or "")
+        args = self._usage_report_args(resource_ids, month_start, month_end)
         output = self._execute_command(args, "sacct", immediate=False)
         return [
             SlurmReportLine(line, self.slurm_tres) for line in output.splitlines() if "|" in line
         ]
 
+    def get_usage_totals(
+        self, resource_ids: list[str], timezone: Optional[str] = None
+    ) -> dict[str, dict[str, dict[str, float]]]:
+        """Sums the current month's TRES usage of the accounts per account and user.
+
+        The sacct output is aggregated while it is read from the pipe, so neither
+        the whole output nor an object per job is held in memory.
+        """
+        month_start, month_end = backend_utils.format_current_month(timezone or "")
+        aggregator = SacctUsageAggregator(self.slurm_tres)
+        aggregator.add_lines(
+            self._stream_command(self._usage_report_args(resource_ids, month_start, month_end))
+        )
+        return aggregator.report()
+
     def get_historical_usage_report(
         self, resource_ids: list[str], year: int, month: int
     ) -> list[SlurmReportLine]:
@@ -282,24 +347,94 @@ class SlurmClient(SlurmClientInterface):
             List of SlurmReportLine objects containing usage data for the specified month
         """
         month_start, month_end = backend_utils.format_month_period(year, month)
+        args = self._usage_report_args(resource_ids, month_start, month_end)
+        output = self._execute_command(args, "sacct", immediate=False)
+        return [
+            SlurmReportLine(line, self.slurm_tres) for line in output.splitlines() if "|" in line
+        ]
+
+    def get_historical_usage_totals(
+        self, resource_ids: list[str], year: int, month: int
+    ) -> dict[str, dict[str, dict[str, float]]]:
+        """Sums the TRES usage of the accounts for a specific month per account and user.
 
+        Like get_usage_totals, the sacct output is aggregated while it is read,
+        so one query can cover all accounts of an offering.
+        """
+        month_start, month_end = backend_utils.format_month_period(year, month)
+        aggregator = SacctUsageAggregator(self.slurm_tres)
+        aggregator.add_lines(
+            self._stream_command(self._usage_report_args(resource_ids, month_start, month_end))
+        )
+        return aggregator.report()
+
+    def get_finished_jobs_report(
+        self, resource_ids: list[str], since: str, until: str, period_start: str
+    ) -> list[SlurmJobLine]:
+        """Generates per-job usage report for the jobs of the accounts ended in the window.
+
+        Args:
+            resource_ids: List of SLURM account names to query
+            since: Start of the window, in sacct time format
+            until: End of the window, in sacct time format
+            period_start: Start of the billing period; usage before it is not counted
+
+        Returns:
+            List of SlurmJobLine objects, one per job allocation
+        """
         args = [
             "--noconvert",
-            "--truncate",
             "--allocations",
             "--allusers",
-            f"--starttime={month_start}",
-            f"--endtime={month_end}",
+            # Every run of a requeued job, not only the last one
+            "--duplicates",
+            f"--state={self._FINISHED_JOB_STATES}",
+            f"--starttime={since}",
+            f"--endtime={until}",
             f"--accounts={','.join(resource_ids)}",
-            "--format=Account,ReqTRES,Elapsed,User",
+            f"--format={self._JOB_REPORT_FORMAT}",
+        ]
+        return self._get_jobs_report(args, period_start)
+
+    def get_running_jobs_report(
+        self, resource_ids: list[str], period_start: str
+    ) -> list[SlurmJobLine]:
+        """Generates per-job usage report for the currently active jobs of the accounts.
+
+        Running, suspended and completing jobs have not ended yet, so their
+        usage is read again on every call.
+
+        Args:
+            resource_ids: List of SLURM account names to query
+            period_start: Start of the billing period; usage before it is not counted
+
+        Returns:
+            List of SlurmJobLine objects, one per job allocation
+        """
+        args = [
+            "--noconvert",
+            "--allocations",
+            "--allusers",
+            f"--state={self._ACTIVE_JOB_STATES}",
+            f"--accounts={','.join(resource_ids)}",
+            f"--format={self._JOB_REPORT_FORMAT}",
         ]
+        return self._get_jobs_report(args, period_start)
+
+    def _get_jobs_report(self, args: list[str], period_start: str) -> list[SlurmJobLine]:
         output = self._execute_command(args, "sacct", immediate=False)
+        start = datetime.datetime.strptime(period_start, SACCT_TIME_FORMAT)
         return [
-            SlurmReportLine(line, self.slurm_tres) for line in output.splitlines() if "|" in line
+            SlurmJobLine(line, self.slurm_tres, start)
+            for line in output.splitlines()
+            if "|" in line
         ]
 
     def get_resource_limits(self, resource_id: str) -> dict[str, int]:
         """Returns limits for the account."""
+        if self.association_snapshot.enabled:
+            record = self.association_snapshot.get().account_association(resource_id)
+            return {} if record is None else record.grp_tres_mins
         args = [
             "show",
             "association",
@@ -321,7 +456,13 @@ class SlurmClient(SlurmClientInterface):
         return correct_lines[0]
 
     def get_resource_user_limits(self, resource_id: str) -> dict[str, dict[str, int]]:
-        """Get per-user limits for the account."""
+        """Get per-user limits for the account, only for the users with MaxTRESMins set."""
+        if self.association_snapshot.enabled:
+            return {
+                record.user: record.max_tres_mins
+                for record in self.association_snapshot.get().user_associations(resource_id)
+                if record.max_tres_mins
+            }
         args = [
             "show",
             "association",
@@ -338,11 +479,16 @@ class SlurmClient(SlurmClientInterface):
         return {
             association.user: association.tres_limits
             for association in lines
-            if association.user != ""
+            if association.user != "" and association.tres_limits
         }
 
     def list_resource_users(self, resource_id: str) -> list[str]:
         """Returns list of users linked to the account."""
+        if self.association_snapshot.enabled:
+            return [
+                record.user
+                for record in self.association_snapshot.get().user_associations(resource_id)
+            ]
         args = [
             "list",
             "associations",
@@ -367,6 +513,32 @@ class SlurmClient(SlurmClientInterface):
             users.append(username)
         return users
 
+    def list_all_associations(self) -> AssociationSnapshot:
+        """Dumps all the associations of the cluster with a single sacctmgr call."""
+        args = ["list", "associations", "format=Account,User,ParentName,GrpTRESMins,MaxTRESMins"]
+        output = self._execute_command(args, immediate=False)
+        records = []
+        for line in output.splitlines():
+            if "|" not in line:
+                continue
+            account, user, parent, grp_tres_mins, max_tres_mins, *_ = (
+                *line.split("|"),
+                "",
+                "",
+                "",
+                "",
+            )
+            records.append(
+                AssociationRecord(
+                    account=account.strip(),
+                    user=user.strip(),
+                    parent=parent.strip(),
+                    grp_tres_mins=parse_tres_limits(grp_tres_mins, self.slurm_tres),
+                    max_tres_mins=parse_tres_limits(max_tres_mins, self.slurm_tres),
+                )
+            )
+        return AssociationSnapshot(records)
+
     def get_current_account_qos(self, account: str) -> str:
         """Returns a name of the current QoS of the account."""
         args = [
@@ -488,6 +660,34 @@ class SlurmClient(SlurmClientInterface):
         silent: bool = False,
     ) -> str:
         """Constructs and executes a command with the given parameters."""
+        account_command = self._build_command(command, command_name, immediate, parsable)
+        try:
+            return self.execute_command(account_command, silent=silent)
+        except BackendError as e:
+            if command and command[0] == "modify" and "Nothing modified" in str(e):
+                # Real sacctmgr prints "Nothing modified" on stdout but exits 1
+                # for a no-op modify (account_functions.c:726-729 returns
+                # SLURM_ERROR; sacctmgr.c:982-984 maps that to exit_code=1).
+                # The desired state is already reached, so treat it as success.
+                return ""
+            raise
+        finally:
+            # Also after a failure: the command may have been applied partially.
+            if command_name == "sacctmgr" and command and command[0] in self._MUTATING_ACTIONS:
+                self.association_snapshot.invalidate()
+
+    def _stream_command(
+        self, command: list[str], command_name: str = "sacct", parsable: bool = True
+    ) -> Iterator[str]:
+        """Constructs a read-only command and yields its output lines while it runs."""
+        return self.stream_command(
+            self._build_command(command, command_name, immediate=False, parsable=parsable)
+        )
+
+    def _build_command(
+        self, command: list[str], command_name: str, immediate: bool, parsable: bool
+    ) -> list[str]:
+        """Constructs the full command line and records it in executed_commands."""
         if immediate and command_name not in self._COMMAND_SUPPORTS_IMMEDIATE:
             raise ValueError(
                 f"--immediate is not supported by {command_name}. "
@@ -512,16 +712,7 @@ class SlurmClient(SlurmClientInterface):
             account_command.append("--immediate")
         account_command.extend(command)
         self.executed_commands.append(" ".join(account_command))
-        try:
-            return self.execute_command(account_command, silent=silent)
-        except BackendError as e:
-            if command and command[0] == "modify" and "Nothing modified" in str(e):
-                # Real sacctmgr prints "Nothing modified" on stdout but exits 1
-                # for a no-op modify (account_functions.c:726-729 returns
-                # SLURM_ERROR; sacctmgr.c:982-984 maps that to exit_code=1).
-                # The desired state is already reached, so treat it as success.
-                return ""
-            raise
+        return account_command
 
     # ===== QOS MANAGEMENT EXTENSION =====
 
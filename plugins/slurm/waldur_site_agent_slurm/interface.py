@@ -14,19 +14,23 @@ from collections.abc import Sequence
 from typing import Optional
 
 from waldur_site_agent.backend import clients
+from waldur_site_agent_slurm.associations import AssociationSnapshot, AssociationSnapshotCache
 
 
 class SlurmClientInterface(clients.BaseClient, abc.ABC):
     """Contract for SLURM client implementations.
 
     Implementations must also provide the attributes ``slurm_tres``,
-    ``cluster_name``, ``slurm_bin_path`` and ``executed_commands`` (a
-    human-readable log of executed commands/requests for diagnostics).
+    ``cluster_name``, ``slurm_bin_path``, ``executed_commands`` (a
+    human-readable log of executed commands/requests for diagnostics) and
+    ``association_snapshot`` (the cache answering association lookups from
+    ``list_all_associations``, invalidated on every write).
     """
 
     slurm_tres: dict
     cluster_name: Optional[str]
     executed_commands: list[str]
+    association_snapshot: AssociationSnapshotCache
 
     def clear_executed_commands(self) -> None:
         """Clear the list of tracked executed commands."""
@@ -64,12 +68,38 @@ class SlurmClientInterface(clients.BaseClient, abc.ABC):
     def account_has_users(self, account: str) -> bool:
         """Check if the account has associated users."""
 
+    @abc.abstractmethod
+    def list_all_associations(self) -> AssociationSnapshot:
+        """Return all the associations of the cluster, indexed by account and user."""
+
+    @abc.abstractmethod
+    def get_usage_totals(
+        self, resource_ids: list[str], timezone: Optional[str] = None
+    ) -> dict[str, dict[str, dict[str, float]]]:
+        """Return the current month's TRES usage of the accounts summed per account and user."""
+
     @abc.abstractmethod
     def get_historical_usage_report(
         self, resource_ids: list[str], year: int, month: int
     ) -> list:
         """Return per-user usage records for the accounts for a specific month."""
 
+    @abc.abstractmethod
+    def get_historical_usage_totals(
+        self, resource_ids: list[str], year: int, month: int
+    ) -> dict[str, dict[str, dict[str, float]]]:
+        """Return the TRES usage of the accounts for a specific month per account and user."""
+
+    @abc.abstractmethod
+    def get_finished_jobs_report(
+        self, resource_ids: list[str], since: str, until: str, period_start: str
+    ) -> list:
+        """Return per-job usage records for the jobs of the accounts ended in the window."""
+
+    @abc.abstractmethod
+    def get_running_jobs_report(self, resource_ids: list[str], period_start: str) -> list:
+        """Return per-job usage records for the currently running jobs of the accounts."""
+
     # ===== QOS MANAGEMENT =====
 
     @abc.abstractmethod
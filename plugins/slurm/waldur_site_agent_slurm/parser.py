@@ -2,7 +2,9 @@
 
 import datetime
 import re
-from functools import cached_property
+from collections.abc import Iterable
+from functools import cached_property, lru_cache
+from typing import Optional
 
 UNIT_PATTERN = re.compile(r"(\d+)([KMGTP]?)")
 
@@ -15,6 +17,12 @@ UNITS: dict[str, int] = {
 
 # Constants for time parsing
 MIN_TIME_COMPONENTS = 3
+# Timestamp format of sacct input and output (e.g. Start, --starttime)
+SACCT_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+# Account, ReqTRES, Elapsed and User
+REPORT_LINE_FIELDS = 4
+# Distinct ReqTRES values whose parsed form is kept; jobs mostly share a few shapes
+REQ_TRES_CACHE_SIZE = 4096
 
 
 def parse_int(value: str) -> int:
@@ -101,6 +109,45 @@ def parse_duration(value: str) -> float:
     return int(delta.total_seconds()) / 60
 
 
+def parse_elapsed(value: str) -> float:
+    """Returns the minutes of a ``[D-]HH:MM:SS[.ffffff]`` duration.
+
+    Same result as ``parse_duration`` without going through ``strptime`` for
+    the formats sacct prints; other values are passed to ``parse_duration``.
+    """
+    days, separator, clock = value.partition("-")
+    if not separator:
+        days, clock = "0", value
+    hours, _, rest = clock.partition(":")
+    minutes, _, seconds = rest.partition(":")
+    try:
+        total = (
+            int(days) * 86400
+            + int(hours) * 3600
+            + int(minutes) * 60
+            + int(seconds.partition(".")[0])
+        )
+    except ValueError:
+        return parse_duration(value)
+    return total / 60
+
+
+def allowed_tres_names(slurm_tres: dict) -> set[str]:
+    """Build set of TRES names to accept from SLURM output.
+
+    In passthrough mode these are the source component names.
+    When target_components mapping is configured, the SLURM output
+    contains the *target* names (e.g. cpu, gpu) rather than the
+    source names (e.g. node_hours), so we must include those too.
+    """
+    names = set(slurm_tres.keys())
+    for comp_config in slurm_tres.values():
+        target_components = comp_config.get("target_components", {})
+        if target_components:
+            names.update(target_components.keys())
+    return names
+
+
 class SlurmReportLine:
     """Class for SLURM report line parsing."""
 
@@ -143,19 +190,8 @@ class SlurmReportLine:
 
     @cached_property
     def _allowed_tres_names(self) -> set:
-        """Build set of TRES names to accept from SLURM output.
-
-        In passthrough mode these are the source component names.
-        When target_components mapping is configured, the SLURM output
-        contains the *target* names (e.g. cpu, gpu) rather than the
-        source names (e.g. node_hours), so we must include those too.
-        """
-        names = set(self.slurm_tres.keys())
-        for comp_config in self.slurm_tres.values():
-            target_components = comp_config.get("target_components", {})
-            if target_components:
-                names.update(target_components.keys())
-        return names
+        """Names of the TRES to accept from SLURM output."""
+        return allowed_tres_names(self.slurm_tres)
 
     @cached_property
     def tres_usage(self) -> dict:
@@ -171,6 +207,111 @@ class SlurmReportLine:
         return usage
 
 
+class SacctUsageAggregator:
+    """Sums the TRES usage of ``Account|ReqTRES|Elapsed|User`` sacct lines per account and user.
+
+    Gives the same totals as summing ``SlurmReportLine.tres_usage`` per account
+    and user, but keeps one list of numbers per account and user instead of
+    an object and several dictionaries per line, so that the lines can be
+    consumed straight from the sacct output.
+    """
+
+    def __init__(self, slurm_tres: dict) -> None:
+        """Inits the accumulators for the TRES accepted from the SLURM output."""
+        self.tres_names = sorted(allowed_tres_names(slurm_tres))
+        self._tres_indexes = {name: index for index, name in enumerate(self.tres_names)}
+        self._mem_index = self._tres_indexes.get("mem")
+        # Account -> user -> usage per TRES of tres_names, None for TRES never requested
+        self._usage: dict[str, dict[str, list[Optional[float]]]] = {}
+        self._parse_req_tres = lru_cache(maxsize=REQ_TRES_CACHE_SIZE)(self._parse_req_tres_value)
+
+    def _parse_req_tres_value(self, value: str) -> tuple[tuple[int, int], ...]:
+        resources = {}
+        for pair in value.split(","):
+            key, separator, amount = pair.partition("=")
+            if separator and key in self._tres_indexes:
+                resources[self._tres_indexes[key]] = parse_int(amount)
+        return tuple(resources.items())
+
+    def add_line(self, line: str) -> None:
+        """Adds the usage of a sacct line, ignoring lines which are not a report line."""
+        parts = line.rstrip("\n").split("|", 4)
+        if len(parts) < REPORT_LINE_FIELDS:
+            return
+        account_usage = self._usage.setdefault(parts[0].strip(), {})
+        usage = account_usage.get(parts[3])
+        if usage is None:
+            usage = account_usage[parts[3]] = [None] * len(self.tres_names)
+        requested = self._parse_req_tres(parts[1])
+        if not requested:
+            return
+        duration = parse_elapsed(parts[2])
+        for index, amount in requested:
+            value = amount * duration
+            if index == self._mem_index:
+                value //= 2**20  # Convert from Bytes to MB
+            current = usage[index]
+            usage[index] = value if current is None else current + value
+
+    def add_lines(self, lines: Iterable[str]) -> None:
+        """Adds the usage of the sacct lines."""
+        for line in lines:
+            self.add_line(line)
+
+    def report(self) -> dict[str, dict[str, dict[str, float]]]:
+        """Returns the summed usage per account, user and TRES."""
+        return {
+            account: {
+                user: {
+                    name: value for name, value in zip(self.tres_names, usage) if value is not None
+                }
+                for user, usage in account_usage.items()
+            }
+            for account, account_usage in self._usage.items()
+        }
+
+
+class SlurmJobLine(SlurmReportLine):
+    """Class for parsing a SLURM job line with the job ID, start time and cluster.
+
+    Expects ``Account,ReqTRES,Elapsed,User,JobIDRaw,Start,Cluster`` lines of
+    sacct run without ``--truncate``. The usage only covers the part of the job
+    after ``period_start``, the way ``--truncate`` cuts it for a whole month.
+    """
+
+    def __init__(self, line: str, slurm_tres: dict, period_start: datetime.datetime) -> None:
+        """Inits parts field from the specified line."""
+        super().__init__(line, slurm_tres)
+        self.period_start = period_start
+
+    @cached_property
+    def job_id(self) -> str:
+        """Returns the raw job ID from the report line."""
+        return self._parts[4]
+
+    @cached_property
+    def cluster(self) -> str:
+        """Returns the cluster of the job, empty for lines without one."""
+        cluster_job_line_len = 7
+        return self._parts[6] if len(self._parts) >= cluster_job_line_len else ""
+
+    @cached_property
+    def start(self) -> Optional[datetime.datetime]:
+        """Returns the job start time, None for jobs which never started."""
+        try:
+            return datetime.datetime.strptime(self._parts[5], SACCT_TIME_FORMAT)
+        except ValueError:
+            return None
+
+    @cached_property
+    def duration(self) -> float:
+        """Elapsed minutes of the job since the start of the period."""
+        elapsed = parse_duration(self._parts[2])
+        if self.start is not None and self.start < self.period_start:
+            elapsed -= (self.period_start - self.start).total_seconds() / 60
+        return max(elapsed, 0.0)
+
+
 class SlurmAssociationLine(SlurmReportLine):
     """Class for SLURM association line parsing."""
 
@@ -201,16 +342,23 @@ class SlurmAssociationLine(SlurmReportLine):
     @cached_property
     def tres_limits(self) -> dict:
         """TRES limits in the line."""
-        resources = self._resources
-        limits = {}
-        slurm_tres_set = set(self.slurm_tres.keys())
+        return parse_tres_limits(self._parts[1], self.slurm_tres)
 
-        for tres, limit in resources.items():
-            if tres not in slurm_tres_set:
-                continue
-            if tres == "mem":
-                limits[tres] = parse_int(limit) // 2**20  # Convert from Bytes to MB
-            else:
-                limits[tres] = parse_int(limit)
 
-        return limits
+def parse_tres_limits(value: str, slurm_tres: dict) -> dict[str, int]:
+    """Parses a TRES limits string, keeping only the configured TRES.
+
+    Example: ``cpu=100,mem=2G`` to ``{"cpu": 100, "mem": 2048}``.
+    """
+    limits = {}
+    for pair in value.split(","):
+        if "=" not in pair:
+            continue
+        tres, limit = pair.split("=", 1)  # Split only on first =
+        if tres not in slurm_tres:
+            continue
+        if tres == "mem":
+            limits[tres] = parse_int(limit) // 2**20  # Convert from Bytes to MB
+        else:
+            limits[tres] = parse_int(limit)
+    return limits
@@ -30,6 +30,11 @@ import httpx
 from waldur_site_agent.backend import logger
 from waldur_site_agent.backend.exceptions import BackendError
 from waldur_site_agent.backend.structures import Association, ClientResource
+from waldur_site_agent_slurm.associations import (
+    AssociationRecord,
+    AssociationSnapshot,
+    AssociationSnapshotCache,
+)
 from waldur_site_agent_slurm.client import (
     _PARTITION_NAME_RE,
     _QOS_NAME_RE,
@@ -115,6 +120,8 @@ class SlurmRestClient(SlurmClientInterface):
         cluster_name: str,
         slurm_bin_path: str = "/usr/bin",
         transport: Optional[httpx.BaseTransport] = None,
+        *,
+        association_snapshot_ttl: float = 0,
     ) -> None:
         """Init REST transport, auth settings and the internal CLI client.
 
@@ -125,6 +132,8 @@ class SlurmRestClient(SlurmClientInterface):
                 payloads always carry an explicit cluster, so this is required.
             slurm_bin_path: path to SLURM binaries for delegated CLI calls.
             transport: optional httpx transport override (used by tests).
+            association_snapshot_ttl: seconds to answer association lookups
+                from a single cluster-wide dump; 0 disables the snapshot.
         """
         if not cluster_name:
             msg = "cluster_name is required when SLURM execution_mode is 'rest'"
@@ -159,6 +168,13 @@ class SlurmRestClient(SlurmClientInterface):
         self._cli = SlurmClient(
             slurm_tres, slurm_bin_path=slurm_bin_path, cluster_name=cluster_name
         )
+        self.association_snapshot = AssociationSnapshotCache(
+            self.list_all_associations, ttl=association_snapshot_ttl
+        )
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self._http.close()
 
     @property
     def slurm_bin_path(self) -> str:
@@ -233,6 +249,25 @@ class SlurmRestClient(SlurmClientInterface):
         request_repr = f"{method} {path}" + (f"?{urlencode(query)}" if query else "")
         self._executed_commands.append(request_repr)
         logger.debug("slurmrestd request: %s", request_repr)
+        try:
+            return self._send(
+                method, path, request_repr, query=query, body=body, allow_errors=allow_errors
+            )
+        finally:
+            # Any write may touch associations, even a failed one.
+            if method != "GET":
+                self.association_snapshot.invalidate()
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        request_repr: str,
+        *,
+        query: Optional[dict[str, str]],
+        body: Optional[dict],
+        allow_errors: bool,
+    ) -> dict:
         try:
             response = self._http.request(
                 method, path, params=query, json=body, headers=self._headers()
@@ -363,6 +398,23 @@ class SlurmRestClient(SlurmClientInterface):
         payload = self._request("GET", self._db("associations/"), query=query)
         return payload.get("associations") or []
 
+    def list_all_associations(self) -> AssociationSnapshot:
+        """Return all the associations of the cluster from a single request."""
+        return AssociationSnapshot(
+            AssociationRecord(
+                account=assoc.get("account", ""),
+                user=assoc.get("user") or "",
+                parent=assoc.get("parent_account") or "",
+                grp_tres_mins=self._tres_list_to_dict(
+                    self._dig(assoc, "max", "tres", "group", "minutes")
+                ),
+                max_tres_mins=self._tres_list_to_dict(
+                    self._dig(assoc, "max", "tres", "minutes", "per", "job")
+                ),
+            )
+            for assoc in self._list_associations()
+        )
+
     def _get_account_association(self, account: str) -> Optional[dict]:
         """Return the account-level association (the one with no user)."""
         for assoc in self._list_associations(account=account):
@@ -463,7 +515,14 @@ class SlurmRestClient(SlurmClientInterface):
         return [self._parse_account(account) for account in payload.get("accounts") or []]
 
     def get_resource(self, resource_id: str) -> Optional[ClientResource]:
-        """Return the account with the given name, or None when absent."""
+        """Return the account with the given name, or None when absent.
+
+        With the association snapshot, an account only counts as existing if it
+        has an account-level association on the cluster, as in the CLI client.
+        """
+        if self.association_snapshot.enabled:
+            record = self.association_snapshot.get().account_association(resource_id)
+            return None if record is None else ClientResource(name=record.account)
         payload = self._request(
             "GET", self._db(f"account/{quote(resource_id)}"), allow_errors=True
         )
@@ -514,6 +573,9 @@ class SlurmRestClient(SlurmClientInterface):
 
     def get_account_parent(self, account: str) -> Optional[str]:
         """Return the parent account name read from the account-level association."""
+        if self.association_snapshot.enabled:
+            record = self.association_snapshot.get().account_association(account)
+            return (record.parent or None) if record is not None else None
         assoc = self._get_account_association(account)
         if assoc is None:
             return None
@@ -525,6 +587,8 @@ class SlurmRestClient(SlurmClientInterface):
 
     def account_has_users(self, account: str) -> bool:
         """Check if the account has user associations."""
+        if self.association_snapshot.enabled:
+            return bool(self.association_snapshot.get().user_associations(account))
         return any(assoc.get("user") for assoc in self._list_associations(account=account))
 
     def delete_all_users_from_account(self, name: str) -> str:
@@ -549,13 +613,22 @@ class SlurmRestClient(SlurmClientInterface):
 
     def get_resource_limits(self, resource_id: str) -> dict[str, int]:
         """Return GrpTRESMins limits of the account association."""
+        if self.association_snapshot.enabled:
+            record = self.association_snapshot.get().account_association(resource_id)
+            return {} if record is None else record.grp_tres_mins
         assoc = self._get_account_association(resource_id)
         if assoc is None:
             return {}
         return self._tres_list_to_dict(self._dig(assoc, "max", "tres", "group", "minutes"))
 
     def get_resource_user_limits(self, resource_id: str) -> dict[str, dict[str, int]]:
-        """Return per-user MaxTRESMins limits for the account."""
+        """Return per-user MaxTRESMins limits for the account, only for the users with some set."""
+        if self.association_snapshot.enabled:
+            return {
+                record.user: record.max_tres_mins
+                for record in self.association_snapshot.get().user_associations(resource_id)
+                if record.max_tres_mins
+            }
         result = {}
         for assoc in self._list_associations(account=resource_id):
             user = assoc.get("user")
@@ -643,6 +716,15 @@ class SlurmRestClient(SlurmClientInterface):
 
     def get_association(self, user: str, resource_id: str) -> Optional[Association]:
         """Return the association between the user and the account, if it exists."""
+        if self.association_snapshot.enabled:
+            record = self.association_snapshot.get().user_association(resource_id, user)
+            if record is None:
+                return None
+            return Association(
+                account=record.account,
+                user=record.user,
+                value=record.grp_tres_mins.get("cpu", 0),
+            )
         associations = self._list_associations(account=resource_id, user=user)
         if not associations:
             return None
@@ -796,6 +878,11 @@ class SlurmRestClient(SlurmClientInterface):
 
     def list_resource_users(self, resource_id: str) -> list[str]:
         """Return the list of users associated with the account."""
+        if self.association_snapshot.enabled:
+            return [
+                record.user
+                for record in self.association_snapshot.get().user_associations(resource_id)
+            ]
         return [
             assoc["user"] for assoc in self._list_associations(account=resource_id)
             if assoc.get("user")
@@ -1025,12 +1112,34 @@ class SlurmRestClient(SlurmClientInterface):
         """Per-user usage report — delegated to sacct (no sreport REST equivalent)."""
         return self._cli.get_usage_report(resource_ids, timezone)
 
+    def get_usage_totals(
+        self, resource_ids: list[str], timezone: Optional[str] = None
+    ) -> dict[str, dict[str, dict[str, float]]]:
+        """Per-user usage totals — delegated to sacct (no sreport REST equivalent)."""
+        return self._cli.get_usage_totals(resource_ids, timezone)
+
     def get_historical_usage_report(
         self, resource_ids: list[str], year: int, month: int
     ) -> list:
         """Historical usage report — delegated to sacct (no sreport REST equivalent)."""
         return self._cli.get_historical_usage_report(resource_ids, year, month)
 
+    def get_historical_usage_totals(
+        self, resource_ids: list[str], year: int, month: int
+    ) -> dict[str, dict[str, dict[str, float]]]:
+        """Historical usage totals — delegated to sacct (no sreport REST equivalent)."""
+        return self._cli.get_historical_usage_totals(resource_ids, year, month)
+
+    def get_finished_jobs_report(
+        self, resource_ids: list[str], since: str, until: str, period_start: str
+    ) -> list:
+        """Finished jobs report — delegated to sacct (no sreport REST equivalent)."""
+        return self._cli.get_finished_jobs_report(resource_ids, since, until, period_start)
+
+    def get_running_jobs_report(self, resource_ids: list[str], period_start: str) -> list:
+        """Running jobs report — delegated to sacct (no sreport REST equivalent)."""
+        return self._cli.get_running_jobs_report(resource_ids, period_start)
+
     def reset_raw_usage(self, account: str) -> bool:
         """Reset raw usage — delegated to sacctmgr (no REST equivalent)."""
         return self._cli.reset_raw_usage(account)
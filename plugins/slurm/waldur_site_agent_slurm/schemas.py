@@ -264,6 +264,28 @@ class SlurmBackendSettingsSchema(HomedirSettingsSchema):
         description="slurmrestd connection settings, required when execution_mode is 'rest'",
     )
 
+    # Association lookups (existence, users, limits) served from one dump per TTL
+    association_snapshot_ttl: float = Field(
+        default=60,
+        ge=0,
+        description=(
+            "Seconds to answer per-account association lookups from a single "
+            "cluster-wide association dump. Writes by the agent refresh it "
+            "immediately; the TTL bounds how long external changes go unseen. "
+            "0 queries SLURM for every lookup."
+        ),
+    )
+
+    # Usage reporting: accumulate ended jobs instead of re-reading the whole month
+    incremental_usage_state_file: Optional[str] = Field(
+        default=None,
+        description=(
+            "SQLite file keeping the usage of the jobs ended in the current month. "
+            "When set, each report cycle only queries sacct for the jobs ended since "
+            "the previous cycle and the running jobs."
+        ),
+    )
+
     # Optional: default partition for user associations
     default_partition: Optional[str] = Field(
         default=None,
@@ -0,0 +1,133 @@
+"""Persisted monthly usage of finished SLURM jobs, for incremental sacct collection.
+
+The usage of a job never changes once it has ended. The accumulator keeps the
+summed usage of the jobs already ended in the month per account and user, and
+per account the high-water mark up to which ended jobs are collected. A report
+cycle then only asks sacct for the jobs ended since the mark, plus the running
+ones, instead of re-reading the whole month.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Optional
+
+from waldur_site_agent_slurm.parser import SlurmJobLine
+
+_TABLES = ("high_water_marks", "counted_jobs", "user_usage")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS high_water_marks (
+    period TEXT NOT NULL,
+    account TEXT NOT NULL,
+    mark TEXT NOT NULL,
+    PRIMARY KEY (period, account)
+);
+CREATE TABLE IF NOT EXISTS counted_jobs (
+    period TEXT NOT NULL,
+    cluster TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    start TEXT NOT NULL,
+    PRIMARY KEY (period, cluster, job_id, start)
+);
+CREATE TABLE IF NOT EXISTS user_usage (
+    period TEXT NOT NULL,
+    account TEXT NOT NULL,
+    user TEXT NOT NULL,
+    tres TEXT NOT NULL,
+    usage REAL NOT NULL,
+    PRIMARY KEY (period, account, user, tres)
+);
+"""
+
+
+class UsageAccumulator:
+    """SQLite-backed per-account, per-user TRES usage of the jobs ended in a month.
+
+    Periods are identified by their start in sacct time format. Job runs are
+    counted once per period by their cluster, raw job ID and start time, so
+    the windows of consecutive collections may overlap. The start time tells
+    apart the runs of a requeued job, which share the job ID.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open or create the accumulator database at the path."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            columns = {
+                row[1] for row in self._connection.execute("PRAGMA table_info(counted_jobs)")
+            }
+            if columns and "cluster" not in columns:
+                # Jobs were counted by ID alone, the month is collected again
+                for table in _TABLES:
+                    self._connection.execute(f"DROP TABLE IF EXISTS {table}")
+            self._connection.executescript(_SCHEMA)
+
+    def high_water_marks(self, period: str, accounts: Iterable[str]) -> dict[str, Optional[str]]:
+        """Return the high-water marks of the accounts, None for accounts not collected yet."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT account, mark FROM high_water_marks WHERE period = ?", (period,)
+            ).fetchall()
+        marks = dict(rows)
+        return {account: marks.get(account) for account in accounts}
+
+    def add_finished_jobs(
+        self, period: str, accounts: Iterable[str], mark: str, lines: Iterable[SlurmJobLine]
+    ) -> None:
+        """Add the usage of jobs not counted yet and move the accounts' marks to ``mark``."""
+        with self._lock, self._connection:
+            for line in lines:
+                start = line.start.isoformat() if line.start is not None else ""
+                inserted = self._connection.execute(
+                    "INSERT OR IGNORE INTO counted_jobs VALUES (?, ?, ?, ?)",
+                    (period, line.cluster, line.job_id, start),
+                ).rowcount
+                if not inserted:
+                    continue
+                self._connection.executemany(
+                    "INSERT INTO user_usage VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (period, account, user, tres) "
+                    "DO UPDATE SET usage = usage + excluded.usage",
+                    [
+                        (period, line.account, line.user, tres, float(usage))
+                        for tres, usage in line.tres_usage.items()
+                    ],
+                )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO high_water_marks VALUES (?, ?, ?)",
+                [(period, account, mark) for account in accounts],
+            )
+
+    def usage(self, period: str, accounts: Iterable[str]) -> dict[str, dict[str, dict[str, float]]]:
+        """Return the accumulated usage of the accounts, by account, user and TRES."""
+        wanted = set(accounts)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT account, user, tres, usage FROM user_usage WHERE period = ?", (period,)
+            ).fetchall()
+        report: dict[str, dict[str, dict[str, float]]] = {}
+        for account, user, tres, usage in rows:
+            if account not in wanted:
+                continue
+            report.setdefault(account, {}).setdefault(user, {})[tres] = usage
+        return report
+
+    def prune(self, period: str) -> None:
+        """Drop the data of every period except ``period``."""
+        with self._lock, self._connection:
+            for table in _TABLES:
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE period != ?",  # noqa: S608
+                    (period,),
+                )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
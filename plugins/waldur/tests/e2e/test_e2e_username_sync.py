@@ -456,7 +456,7 @@ class TestPositiveUsernameSync:
 
         user_b_uuid = self.__class__._state["user_b_uuid"]
         backend._user_uuid_cache.clear()
-        backend._user_uuid_cache[a_user_username] = UUID(user_b_uuid)
+        backend._user_uuid_cache.set(a_user_username, UUID(user_b_uuid))
         report.text(
             f"Pre-cached resolution: `{a_user_username}` -> `{user_b_uuid}`"
         )
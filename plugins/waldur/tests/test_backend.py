@@ -328,6 +328,26 @@ class TestCheckPendingOrder:
             backend.check_pending_order(str(ORDER_UUID))
 
 
+class TestCheckPendingOrders:
+    def test_in_flight_orders_are_pending(self, backend, mock_client):
+        """Orders still in flight on Waldur B are reported from one listing."""
+        in_flight = MagicMock()
+        in_flight.uuid = ORDER_UUID
+        mock_client.list_offering_in_flight_orders.return_value = [in_flight]
+        finished_uuid = "12345678-1234-1234-1234-123456789abd"
+
+        result = backend.check_pending_orders([str(ORDER_UUID), finished_uuid])
+
+        assert result == {str(ORDER_UUID): False}
+        mock_client.list_offering_in_flight_orders.assert_called_once()
+        mock_client.get_order.assert_not_called()
+
+    def test_invalid_order_ids_are_left_out(self, backend, mock_client):
+        mock_client.list_offering_in_flight_orders.return_value = []
+
+        assert backend.check_pending_orders(["not-a-uuid"]) == {}
+
+
 class TestResourceDeletion:
     @staticmethod
     def _b_resource(state: ResourceState) -> MagicMock:
@@ -705,6 +725,95 @@ class TestUsageReporting:
         assert report[str(RESOURCE_UUID)]["user1"]["node_hours"] == 0.35
 
 
+OTHER_RESOURCE_UUID = UUID("abcdef02-1234-1234-1234-123456789abc")
+
+
+def _component_usage(resource_uuid, type_, usage):
+    mock_usage = MagicMock()
+    mock_usage.resource_uuid = resource_uuid
+    mock_usage.type_ = type_
+    mock_usage.usage = usage
+    return mock_usage
+
+
+def _user_usage(resource_uuid, username, component_type, usage):
+    mock_user_usage = MagicMock()
+    mock_user_usage.resource_uuid = resource_uuid
+    mock_user_usage.username = username
+    mock_user_usage.component_type = component_type
+    mock_user_usage.usage = usage
+    return mock_user_usage
+
+
+class TestBulkUsageReporting:
+    def test_resources_are_grouped_from_offering_usages(
+        self, backend_with_conversion, mock_client
+    ):
+        mock_client.list_offering_component_usages.return_value = [
+            _component_usage(RESOURCE_UUID, "gpu_hours", 500),
+            _component_usage(OTHER_RESOURCE_UUID, "gpu_hours", 50),
+            _component_usage(RESOURCE_UUID, "storage_gb_hours", 800),
+        ]
+        mock_client.list_offering_component_user_usages.return_value = [
+            _user_usage(RESOURCE_UUID, "user1", "gpu_hours", 500),
+        ]
+        resource_ids = [str(RESOURCE_UUID), str(OTHER_RESOURCE_UUID)]
+
+        with patch(
+            "waldur_site_agent_waldur.backend.backend_utils.get_current_time_in_timezone",
+            return_value=datetime.datetime(2026, 8, 6, 12, 0),
+        ):
+            report = backend_with_conversion._get_usage_report(resource_ids)
+
+        mock_client.list_offering_component_usages.assert_called_once_with(
+            datetime.date(2026, 8, 1)
+        )
+        mock_client.get_component_usages.assert_not_called()
+        mock_client.get_component_user_usages.assert_not_called()
+        # node_hours = 500/5 + 800/10 = 180
+        assert report[str(RESOURCE_UUID)]["TOTAL_ACCOUNT_USAGE"]["node_hours"] == 180.0
+        assert report[str(RESOURCE_UUID)]["user1"]["node_hours"] == 100.0
+        assert report[str(OTHER_RESOURCE_UUID)] == {"TOTAL_ACCOUNT_USAGE": {"node_hours": 10.0}}
+
+    def test_resource_without_usages_reports_zero(self, backend, mock_client):
+        mock_client.list_offering_component_usages.return_value = []
+        mock_client.list_offering_component_user_usages.return_value = []
+
+        report = backend.get_usage_report_for_period(
+            [str(RESOURCE_UUID), str(OTHER_RESOURCE_UUID)], 2026, 7
+        )
+
+        mock_client.list_offering_component_user_usages.assert_called_once_with(
+            datetime.date(2026, 7, 1)
+        )
+        assert report[str(OTHER_RESOURCE_UUID)]["TOTAL_ACCOUNT_USAGE"] == {
+            "cpu": 0.0,
+            "mem": 0.0,
+        }
+
+    def test_failed_listing_falls_back_to_per_resource_queries(self, backend, mock_client):
+        mock_client.list_offering_component_usages.side_effect = Exception("API error")
+        mock_client.get_component_usages.return_value = [
+            _component_usage(RESOURCE_UUID, "cpu", 100)
+        ]
+        mock_client.get_component_user_usages.return_value = []
+
+        report = backend.get_usage_report_for_period(
+            [str(RESOURCE_UUID), str(OTHER_RESOURCE_UUID)], 2026, 7
+        )
+
+        assert mock_client.get_component_usages.call_count == 2
+        assert report[str(RESOURCE_UUID)]["TOTAL_ACCOUNT_USAGE"]["cpu"] == 100.0
+
+    def test_single_resource_is_queried_directly(self, backend, mock_client):
+        mock_client.get_component_usages.return_value = []
+        mock_client.get_component_user_usages.return_value = []
+
+        backend._get_usage_report([str(RESOURCE_UUID)])
+
+        mock_client.list_offering_component_usages.assert_not_called()
+
+
 class TestUserSync:
     def test_add_users_to_resource(self, backend, mock_client):
         mock_resource = MagicMock()
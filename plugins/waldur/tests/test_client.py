@@ -4,6 +4,7 @@ from unittest.mock import MagicMock, patch
 from uuid import UUID
 
 import pytest
+from waldur_api_client.errors import UnexpectedStatus
 
 from waldur_site_agent.backend.exceptions import BackendError
 
@@ -369,13 +370,21 @@ class TestUserResolution:
     def test_resolve_user_by_cuid_not_found(self, client):
         with patch(
             "waldur_api_client.api.remote_eduteams.remote_eduteams.sync",
-            side_effect=Exception("Not found"),
+            side_effect=UnexpectedStatus(404, b"", "/api/remote-eduteams/"),
         ):
             result = client.resolve_user_by_cuid("nonexistent-cuid")
             assert result is None
 
+    def test_resolve_user_by_cuid_error_is_raised(self, client):
+        with patch(
+            "waldur_api_client.api.remote_eduteams.remote_eduteams.sync",
+            side_effect=UnexpectedStatus(502, b"", "/api/remote-eduteams/"),
+        ), pytest.raises(UnexpectedStatus):
+            client.resolve_user_by_cuid("user-cuid-123")
+
     def test_resolve_user_by_email(self, client):
         mock_user = MagicMock()
+        mock_user.email = "User@Example.com"
         mock_user.uuid = USER_UUID
 
         with patch(
@@ -385,6 +394,24 @@ class TestUserResolution:
             result = client.resolve_user_by_field("user@example.com", "email")
             assert result == USER_UUID
 
+    def test_resolve_user_by_username_requires_an_exact_match(self, client):
+        mock_user = MagicMock()
+        mock_user.username = "user10"
+        mock_user.uuid = USER_UUID
+
+        with patch(
+            "waldur_api_client.api.users.users_list.sync",
+            return_value=[mock_user],
+        ):
+            assert client.resolve_user_by_field("user1", "username") is None
+
+    def test_resolve_user_by_field_error_is_raised(self, client):
+        with patch(
+            "waldur_api_client.api.users.users_list.sync",
+            side_effect=UnexpectedStatus(500, b"", "/api/users/"),
+        ), pytest.raises(UnexpectedStatus):
+            client.resolve_user_by_field("user1", "username")
+
     def test_resolve_user_via_identity_bridge(self, client):
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -623,3 +650,79 @@ class TestSetResourceEndDate:
             client.set_resource_end_date(RESOURCE_UUID, None)
             mock_set.assert_called_once()
             assert mock_set.call_args.kwargs["body"].end_date is None
+
+
+class TestOfferingUsages:
+    def test_component_usages_are_listed_for_the_offering(self, client):
+        import datetime
+
+        with patch(
+            "waldur_api_client.api.marketplace_component_usages."
+            "marketplace_component_usages_list.sync_all",
+            return_value=[],
+        ) as mock_list:
+            client.list_offering_component_usages(datetime.date(2025, 6, 1))
+
+        call_kwargs = mock_list.call_args.kwargs
+        assert call_kwargs["offering_uuid"] == UUID(client.offering_uuid)
+        assert call_kwargs["billing_period"] == datetime.date(2025, 6, 1)
+        assert "resource_uuid" not in call_kwargs
+
+    def test_user_usages_are_listed_for_the_offering(self, client):
+        import datetime
+
+        with patch(
+            "waldur_api_client.api.marketplace_component_user_usages."
+            "marketplace_component_user_usages_list.sync_all",
+            return_value=[],
+        ) as mock_list:
+            client.list_offering_component_user_usages(datetime.date(2025, 6, 1))
+
+        call_kwargs = mock_list.call_args.kwargs
+        assert call_kwargs["offering_uuid"] == UUID(client.offering_uuid)
+        assert call_kwargs["component_usage_billing_period"] == datetime.date(2025, 6, 1)
+
+    def test_list_resources_follows_pagination(self, client):
+        with patch(
+            "waldur_site_agent_waldur.client.marketplace_resources_list.sync_all",
+            return_value=[],
+        ) as mock_list:
+            client.list_resources()
+
+        mock_list.assert_called_once()
+
+
+    def test_in_flight_orders_are_listed_for_the_offering(self, client):
+        from waldur_api_client.models.order_state import OrderState
+
+        with patch(
+            "waldur_site_agent_waldur.client.marketplace_orders_list.sync_all",
+            return_value=[],
+        ) as mock_list:
+            client.list_offering_in_flight_orders()
+
+        call_kwargs = mock_list.call_args.kwargs
+        assert call_kwargs["offering_uuid"] == UUID(client.offering_uuid)
+        assert OrderState.EXECUTING in call_kwargs["state"]
+        assert OrderState.DONE not in call_kwargs["state"]
+
+
+class TestResolveUsersByUsernames:
+    def test_usernames_are_listed_in_chunks(self, client):
+        def _users(client, username_list):
+            users = []
+            for username in username_list.split(","):
+                user = MagicMock()
+                user.username = username
+                user.uuid = USER_UUID
+                users.append(user)
+            return users
+
+        usernames = [f"user{index}" for index in range(60)]
+        with patch(
+            "waldur_api_client.api.users.users_list.sync_all", side_effect=_users
+        ) as mock_list:
+            resolved = client.resolve_users_by_usernames(usernames)
+
+        assert mock_list.call_count == 2
+        assert resolved.keys() == set(usernames)
@@ -0,0 +1,176 @@
+"""Tests for the identity cache of the users resolved on Waldur B."""
+
+from unittest.mock import MagicMock, patch
+from uuid import UUID
+
+import pytest
+
+from waldur_site_agent_waldur.backend import WaldurBackend
+from waldur_site_agent_waldur.identity_cache import IdentityCache
+
+USER_UUID = UUID("11223344-1234-1234-1234-123456789abc")
+OTHER_USER_UUID = UUID("11223344-1234-1234-1234-123456789abd")
+PROJECT_UUID = UUID("aabbccdd-1234-1234-1234-123456789abc")
+RESOURCE_UUID = UUID("abcdef01-1234-1234-1234-123456789abc")
+
+
+class TestIdentityCache:
+    def test_entries_expire(self):
+        cache = IdentityCache("scope", ttl=60, negative_ttl=10)
+        with patch("waldur_site_agent_waldur.identity_cache.time.time", return_value=1000.0):
+            cache.set("user1", USER_UUID)
+            cache.set("missing", None)
+
+        with patch("waldur_site_agent_waldur.identity_cache.time.time", return_value=1020.0):
+            assert cache.get("user1").user_uuid == USER_UUID
+            assert cache.get("missing") is None
+
+        with patch("waldur_site_agent_waldur.identity_cache.time.time", return_value=1060.0):
+            assert cache.get("user1") is None
+
+    def test_negative_entries_are_cached(self):
+        cache = IdentityCache("scope", ttl=60, negative_ttl=10)
+        cache.set("missing", None)
+
+        entry = cache.get("missing")
+
+        assert entry is not None
+        assert entry.user_uuid is None
+
+    def test_zero_ttl_disables_caching(self):
+        cache = IdentityCache("scope", ttl=0, negative_ttl=0)
+        cache.set("user1", USER_UUID)
+        cache.set("missing", None)
+
+        assert cache.get("user1") is None
+        assert cache.get("missing") is None
+
+    def test_entries_survive_a_restart(self, tmp_path):
+        path = str(tmp_path / "identities.sqlite3")
+        IdentityCache("scope", ttl=60, negative_ttl=60, path=path).set("user1", USER_UUID)
+
+        assert IdentityCache("scope", ttl=60, negative_ttl=60, path=path).get(
+            "user1"
+        ).user_uuid == USER_UUID
+        assert IdentityCache("other", ttl=60, negative_ttl=60, path=path).get("user1") is None
+
+    def test_clear_drops_persisted_entries(self, tmp_path):
+        path = str(tmp_path / "identities.sqlite3")
+        cache = IdentityCache("scope", ttl=60, negative_ttl=60, path=path)
+        cache.set("user1", USER_UUID)
+
+        cache.clear()
+
+        assert IdentityCache("scope", ttl=60, negative_ttl=60, path=path).get("user1") is None
+
+
+@pytest.fixture()
+def user_field_backend(backend_settings, backend_components_passthrough, mock_client):
+    backend_settings["user_resolve_method"] = "user_field"
+    backend_settings["user_match_field"] = "username"
+    backend = WaldurBackend(backend_settings, backend_components_passthrough)
+    backend.client = mock_client
+    mock_resource = MagicMock()
+    mock_resource.project_uuid = PROJECT_UUID
+    mock_client.get_marketplace_resource.return_value = mock_resource
+    return backend
+
+
+@pytest.fixture()
+def mock_client():
+    return MagicMock()
+
+
+def _waldur_resource():
+    waldur_resource = MagicMock()
+    waldur_resource.backend_id = str(RESOURCE_UUID)
+    return waldur_resource
+
+
+class TestIdentityResolution:
+    def test_users_are_pre_resolved_in_bulk(self, user_field_backend, mock_client):
+        mock_client.resolve_users_by_usernames.return_value = {
+            "user1": USER_UUID,
+            "user2": OTHER_USER_UUID,
+        }
+
+        added = user_field_backend.add_users_to_resource(
+            _waldur_resource(), {"user1", "user2", "user3"}
+        )
+
+        mock_client.resolve_users_by_usernames.assert_called_once_with(
+            ["user1", "user2", "user3"]
+        )
+        mock_client.resolve_user_by_field.assert_not_called()
+        assert added == {"user1", "user2"}
+
+    def test_failed_bulk_resolution_falls_back_to_single_lookups(
+        self, user_field_backend, mock_client
+    ):
+        mock_client.resolve_users_by_usernames.side_effect = Exception("API error")
+        mock_client.resolve_user_by_field.return_value = USER_UUID
+
+        added = user_field_backend.add_users_to_resource(
+            _waldur_resource(), {"user1", "user2"}
+        )
+
+        assert mock_client.resolve_user_by_field.call_count == 2
+        assert added == {"user1", "user2"}
+
+    def test_users_not_found_are_not_looked_up_again(self, user_field_backend, mock_client):
+        mock_client.resolve_user_by_field.return_value = None
+
+        assert user_field_backend._resolve_remote_user("missing") is None
+        assert user_field_backend._resolve_remote_user("missing") is None
+
+        mock_client.resolve_user_by_field.assert_called_once()
+
+    def test_failed_lookups_are_not_cached_as_not_found(self, user_field_backend, mock_client):
+        user_field_backend.user_not_found_action = "fail"
+        mock_client.resolve_user_by_field.side_effect = [Exception("API error"), USER_UUID]
+
+        with pytest.raises(Exception, match="API error"):
+            user_field_backend._resolve_remote_user("user1")
+
+        assert user_field_backend._resolve_remote_user("user1") == USER_UUID
+        assert mock_client.resolve_user_by_field.call_count == 2
+
+    def test_cached_users_are_not_pre_resolved(self, user_field_backend, mock_client):
+        user_field_backend._user_uuid_cache.set("user1", USER_UUID)
+
+        user_field_backend.remove_users_from_resource(
+            _waldur_resource(), {"user1"}, user_roles={"user1": "PROJECT.ADMIN"}
+        )
+
+        mock_client.resolve_users_by_usernames.assert_not_called()
+        mock_client.remove_user_from_project.assert_called_once()
+
+    def test_identity_bridge_is_not_pre_resolved(
+        self, backend_settings, backend_components_passthrough, mock_client
+    ):
+        backend = WaldurBackend(backend_settings, backend_components_passthrough)
+        backend.client = mock_client
+        mock_client.get_marketplace_resource.return_value = MagicMock(
+            project_uuid=PROJECT_UUID
+        )
+        mock_client.resolve_user_via_identity_bridge.return_value = USER_UUID
+
+        backend.add_users_to_resource(_waldur_resource(), {"user1", "user2"})
+
+        mock_client.resolve_users_by_usernames.assert_not_called()
+        assert mock_client.resolve_user_via_identity_bridge.call_count == 2
+
+    def test_resolved_users_are_shared_across_restarts(
+        self, backend_settings, backend_components_passthrough, mock_client, tmp_path
+    ):
+        backend_settings["identity_cache_file"] = str(tmp_path / "identities.sqlite3")
+        backend = WaldurBackend(backend_settings, backend_components_passthrough)
+        backend.client = mock_client
+        mock_client.resolve_user_via_identity_bridge.return_value = USER_UUID
+        backend._resolve_remote_user("user-cuid")
+
+        restarted = WaldurBackend(backend_settings, backend_components_passthrough)
+        restarted.client = mock_client
+
+        assert restarted._resolve_remote_user("user-cuid") == USER_UUID
+        mock_client.resolve_user_via_identity_bridge.assert_called_once()
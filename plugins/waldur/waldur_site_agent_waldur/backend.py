@@ -16,6 +16,8 @@ from waldur_api_client.api.marketplace_provider_resources import (
     marketplace_provider_resources_set_end_date,
 )
 from waldur_api_client.api.projects import projects_partial_update
+from waldur_api_client.models.component_usage import ComponentUsage
+from waldur_api_client.models.component_user_usage import ComponentUserUsage
 from waldur_api_client.models.patched_project_request import PatchedProjectRequest
 from waldur_api_client.models.project import Project
 from waldur_api_client.models.resource_effective_id_request import ResourceEffectiveIDRequest
@@ -39,6 +41,11 @@ from waldur_site_agent.backend.structures import BackendResourceInfo
 from waldur_site_agent_waldur.client import DEFAULT_PROJECT_ROLE_NAME, WaldurClient
 from waldur_site_agent_waldur.component_mapping import ComponentMapper
 from waldur_site_agent_waldur.enums import EndDateSyncDirection, LimitSyncDirection
+from waldur_site_agent_waldur.identity_cache import (
+    DEFAULT_NEGATIVE_TTL,
+    DEFAULT_TTL,
+    IdentityCache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +61,8 @@ class WaldurBackend(backends.BaseBackend):
 
     supports_async_orders = True
     supports_cycle_preflight = True
+    # _get_usage_report answers many resources from offering-wide usage listings
+    supports_bulk_usage_report = True
     requires_source_project = True
     # Every resource federated from a given source project maps onto the same Waldur B
     # project (backend_id = "{customer_uuid}_{project_uuid}"), so all resources share
@@ -100,8 +109,16 @@ class WaldurBackend(backends.BaseBackend):
 
         self.component_mapper = ComponentMapper(backend_components)
 
-        # Cache for resolved user UUIDs on Waldur B: local_identifier -> remote_uuid
-        self._user_uuid_cache: dict[str, Optional[UUID]] = {}
+        # Resolved user UUIDs on Waldur B: local identifier -> remote UUID, or None
+        # for identities not found
+        self._user_uuid_cache = IdentityCache(
+            scope=self._identity_cache_scope(),
+            ttl=float(backend_settings.get("identity_cache_ttl", DEFAULT_TTL)),
+            negative_ttl=float(
+                backend_settings.get("identity_cache_negative_ttl", DEFAULT_NEGATIVE_TTL)
+            ),
+            path=backend_settings.get("identity_cache_file"),
+        )
 
     # --- Abstract Method Implementations ---
 
@@ -435,6 +452,31 @@ class WaldurBackend(backends.BaseBackend):
         )
         return False
 
+    def check_pending_orders(self, order_backend_ids: list[str]) -> dict[str, bool]:
+        """Check target orders on Waldur B with one listing of the offering's orders.
+
+        Orders still in flight on Waldur B are reported as pending. The others
+        reached a terminal state and are left to check_pending_order(), which
+        tells the completed orders from the failed ones.
+        """
+        in_flight = {
+            order.uuid.hex for order in self.client.list_offering_in_flight_orders()
+        }
+        statuses = {}
+        for order_backend_id in order_backend_ids:
+            try:
+                order_uuid = UUID(order_backend_id)
+            except ValueError:
+                continue
+            if order_uuid.hex in in_flight:
+                statuses[order_backend_id] = False
+        logger.info(
+            "%d of %d target orders still in flight on Waldur B",
+            len(statuses),
+            len(order_backend_ids),
+        )
+        return statuses
+
     def delete_resource(
         self,
         waldur_resource: WaldurResource,
@@ -752,6 +794,29 @@ class WaldurBackend(backends.BaseBackend):
         """
         now = backend_utils.get_current_time_in_timezone(self.timezone)
         billing_period = datetime.date(now.year, now.month, 1)
+        return self._collect_usage_report(resource_backend_ids, billing_period)
+
+    def _collect_usage_report(
+        self, resource_backend_ids: list[str], billing_period: datetime.date
+    ) -> dict[str, dict[str, dict[str, float]]]:
+        """Pull the usage of the resources for a billing period from Waldur B.
+
+        Several resources are answered from one offering-wide listing of the
+        period's usages. A single resource, or a failed listing, falls back to
+        the queries of each resource.
+        """
+        if len(resource_backend_ids) > 1:
+            try:
+                return self._get_offering_usage_report(
+                    resource_backend_ids, billing_period
+                )
+            except Exception:
+                logger.exception(
+                    "Failed to list usage of offering %s for period %s, "
+                    "falling back to per-resource queries",
+                    self.target_offering_uuid,
+                    billing_period,
+                )
 
         report: dict[str, dict[str, dict[str, float]]] = {}
 
@@ -762,7 +827,11 @@ class WaldurBackend(backends.BaseBackend):
                 )
                 report[resource_id] = resource_report
             except Exception:
-                logger.exception("Failed to get usage for resource %s", resource_id)
+                logger.exception(
+                    "Failed to get usage for resource %s (period %s)",
+                    resource_id,
+                    billing_period,
+                )
                 # Return empty usage for this resource
                 empty_usage: dict[str, float] = {
                     comp: 0.0 for comp in self.backend_components
@@ -771,6 +840,30 @@ class WaldurBackend(backends.BaseBackend):
 
         return report
 
+    def _get_offering_usage_report(
+        self, resource_backend_ids: list[str], billing_period: datetime.date
+    ) -> dict[str, dict[str, dict[str, float]]]:
+        """Get the usage of the resources from the usages of the whole target offering."""
+        component_usages: dict[UUID, list[ComponentUsage]] = {}
+        for usage in self.client.list_offering_component_usages(billing_period):
+            if not isinstance(usage.resource_uuid, type(UNSET)):
+                component_usages.setdefault(usage.resource_uuid, []).append(usage)
+
+        user_usages: dict[UUID, list[ComponentUserUsage]] = {}
+        listed_user_usages = self.client.list_offering_component_user_usages(billing_period)
+        for user_usage in listed_user_usages:
+            if not isinstance(user_usage.resource_uuid, type(UNSET)):
+                user_usages.setdefault(user_usage.resource_uuid, []).append(user_usage)
+
+        report: dict[str, dict[str, dict[str, float]]] = {}
+        for resource_id in resource_backend_ids:
+            resource_uuid = UUID(resource_id)
+            report[resource_id] = self._build_resource_usage(
+                component_usages.get(resource_uuid, []),
+                user_usages.get(resource_uuid, []),
+            )
+        return report
+
     def _get_single_resource_usage(
         self,
         resource_id: str,
@@ -778,11 +871,20 @@ class WaldurBackend(backends.BaseBackend):
     ) -> dict[str, dict[str, float]]:
         """Get usage report for a single resource from Waldur B."""
         resource_uuid = UUID(resource_id)
-
-        # Fetch total component usages
         component_usages = self.client.get_component_usages(
             resource_uuid, billing_period=billing_period
         )
+        user_usages = self.client.get_component_user_usages(
+            resource_uuid, billing_period=billing_period
+        )
+        return self._build_resource_usage(component_usages, user_usages)
+
+    def _build_resource_usage(
+        self,
+        component_usages: list[ComponentUsage],
+        user_usages: list[ComponentUserUsage],
+    ) -> dict[str, dict[str, float]]:
+        """Sum and reverse-convert the Waldur B usages of one resource."""
         target_total_usage: dict[str, float] = {}
         for usage in component_usages:
             comp_type = usage.type_ if not isinstance(usage.type_, type(UNSET)) else None
@@ -805,11 +907,6 @@ class WaldurBackend(backends.BaseBackend):
             "TOTAL_ACCOUNT_USAGE": source_total_usage,
         }
 
-        # Fetch per-user usages
-        user_usages = self.client.get_component_user_usages(
-            resource_uuid, billing_period=billing_period
-        )
-
         # Group user usages by username and component
         per_user_target: dict[str, dict[str, float]] = {}
         for user_usage in user_usages:
@@ -854,26 +951,9 @@ class WaldurBackend(backends.BaseBackend):
         waldur_resource=None,
     ) -> dict[str, dict[str, dict[str, float]]]:
         """Pull usage from Waldur B for a specific billing period."""
-        billing_period = datetime.date(year, month, 1)
-        report: dict[str, dict[str, dict[str, float]]] = {}
-
-        for resource_id in resource_backend_ids:
-            try:
-                resource_report = self._get_single_resource_usage(
-                    resource_id, billing_period=billing_period
-                )
-                report[resource_id] = resource_report
-            except Exception:
-                logger.exception(
-                    "Failed to get usage for resource %s (period %s-%s)",
-                    resource_id, year, month,
-                )
-                empty_usage: dict[str, float] = {
-                    comp: 0.0 for comp in self.backend_components
-                }
-                report[resource_id] = {"TOTAL_ACCOUNT_USAGE": empty_usage}
-
-        return report
+        return self._collect_usage_report(
+            resource_backend_ids, datetime.date(year, month, 1)
+        )
 
     # --- User/Membership Sync ---
 
@@ -889,20 +969,37 @@ class WaldurBackend(backends.BaseBackend):
             return target_role
         return source_role
 
-    def _resolve_remote_user(
+    def _identity_cache_scope(self) -> str:
+        """Return the identity cache scope of the Waldur B instance and resolution method."""
+        if self.user_resolve_method == "identity_bridge":
+            method = f"identity_bridge:{self.identity_bridge_source}"
+        else:
+            method = f"{self.user_resolve_method}:{self.user_match_field}"
+        return f"{self.backend_settings['target_api_url']}|{method}"
+
+    def _user_search_field(self) -> Optional[str]:
+        """Return the field users are searched by on Waldur B, None if they are not searched."""
+        if self.user_resolve_method == "user_field":
+            return self.user_match_field if self.user_match_field in ("email", "username") else "username"
+        if self.user_resolve_method == "remote_eduteams" and self.user_match_field in (
+            "email",
+            "username",
+        ):
+            return self.user_match_field
+        return None
+
+    def _lookup_remote_user(
         self, local_username: str, attributes: Optional[dict] = None,
     ) -> Optional[UUID]:
-        """Resolve a local username to a user UUID on Waldur B.
+        """Resolve a local username on Waldur B through the identity cache.
 
-        Uses the configured user_match_field to look up the user.
-        Results are cached to minimize API calls.
-
-        Args:
-            local_username: Username or CUID to resolve.
-            attributes: Optional user profile attributes for identity bridge calls.
+        Unlike _resolve_remote_user, users not found are only recorded in the
+        cache, without applying user_not_found_action. Lookups that fail raise
+        and are not cached, so they are retried on the next call.
         """
-        if local_username in self._user_uuid_cache:
-            return self._user_uuid_cache[local_username]
+        cached = self._user_uuid_cache.get(local_username)
+        if cached is not None:
+            return cached.user_uuid
 
         remote_uuid: Optional[UUID] = None
 
@@ -912,13 +1009,16 @@ class WaldurBackend(backends.BaseBackend):
                     "identity_bridge_source is required when "
                     "user_resolve_method=identity_bridge"
                 )
-            else:
-                remote_uuid = self.client.resolve_user_via_identity_bridge(
-                    local_username, self.identity_bridge_source,
-                    attributes=attributes,
-                )
+                return None
+            remote_uuid = self.client.resolve_user_via_identity_bridge(
+                local_username, self.identity_bridge_source,
+                attributes=attributes,
+            )
+            # The identity bridge creates missing users, None is an error worth retrying
+            if remote_uuid is None:
+                return None
         elif self.user_resolve_method == "user_field":
-            field = self.user_match_field if self.user_match_field in ("email", "username") else "username"
+            field = self._user_search_field() or "username"
             remote_uuid = self.client.resolve_user_by_field(local_username, field)
         elif self.user_resolve_method == "remote_eduteams":
             if self.user_match_field == "cuid":
@@ -929,11 +1029,31 @@ class WaldurBackend(backends.BaseBackend):
                 )
             else:
                 logger.error("Unknown user_match_field: %s", self.user_match_field)
+                return None
         else:
             logger.error("Unknown user_resolve_method: %s", self.user_resolve_method)
+            return None
+
+        self._user_uuid_cache.set(local_username, remote_uuid)
+        return remote_uuid
+
+    def _resolve_remote_user(
+        self, local_username: str, attributes: Optional[dict] = None,
+    ) -> Optional[UUID]:
+        """Resolve a local username to a user UUID on Waldur B.
+
+        Uses the configured user_match_field to look up the user. Results are
+        cached to minimize API calls, as are users a lookup did not find.
+
+        Args:
+            local_username: Username or CUID to resolve.
+            attributes: Optional user profile attributes for identity bridge calls.
 
-        if remote_uuid is not None:
-            self._user_uuid_cache[local_username] = remote_uuid
+        Raises:
+            BackendError: If the user is not found and user_not_found_action is "fail".
+            Exception: If Waldur B cannot be queried for the user.
+        """
+        remote_uuid = self._lookup_remote_user(local_username, attributes=attributes)
 
         if remote_uuid is None:
             if self.user_not_found_action == "fail":
@@ -950,6 +1070,36 @@ class WaldurBackend(backends.BaseBackend):
 
         return remote_uuid
 
+    def _pre_resolve_remote_users(self, identities: list[str]) -> None:
+        """Resolve the identities missing in the identity cache with bulk user listings.
+
+        Only applies when users are searched by username, the one lookup Waldur B
+        answers for many users at once. Other identities are resolved one by one
+        when they are used.
+        """
+        if self._user_search_field() != "username":
+            return
+        pending = sorted(
+            {
+                identity
+                for identity in identities
+                if self._user_uuid_cache.get(identity) is None
+            }
+        )
+        if not pending:
+            return
+        try:
+            resolved = self.client.resolve_users_by_usernames(pending)
+        except Exception:
+            logger.exception(
+                "Failed to resolve %d users on Waldur B in bulk, resolving them one by one",
+                len(pending),
+            )
+            return
+        logger.info("Resolved %d of %d users on Waldur B in bulk", len(resolved), len(pending))
+        for identity in pending:
+            self._user_uuid_cache.set(identity, resolved.get(identity))
+
     def add_user(self, waldur_resource: WaldurResource, username: str, **kwargs: str) -> bool:
         """Add a single user to the resource's project on Waldur B."""
         resource_backend_id = waldur_resource.backend_id
@@ -1035,6 +1185,10 @@ class WaldurBackend(backends.BaseBackend):
         user_attributes: dict = kwargs.get("user_attributes", {})
         user_roles: dict = kwargs.get("user_roles", {})
 
+        self._pre_resolve_remote_users(
+            [user_cuids.get(username, username) for username in user_ids]
+        )
+
         added_users: set[str] = set()
         for username in user_ids:
             try:
@@ -1089,6 +1243,10 @@ class WaldurBackend(backends.BaseBackend):
 
         b_roles_by_uuid: dict[str, str] = self._fetch_b_side_roles(project_uuid)
 
+        self._pre_resolve_remote_users(
+            [user_cuids.get(username, username) for username in usernames]
+        )
+
         removed_users: list[str] = []
         for username in usernames:
             try:
@@ -1171,6 +1329,14 @@ class WaldurBackend(backends.BaseBackend):
 
         b_roles_by_uuid = self._fetch_b_side_roles(project_uuid)
 
+        self._pre_resolve_remote_users(
+            [
+                user_cuids.get(username, username)
+                for username in existing_users
+                if user_roles.get(username)
+            ]
+        )
+
         for username in existing_users:
             source_role = user_roles.get(username)
             if not source_role:
@@ -1178,7 +1344,11 @@ class WaldurBackend(backends.BaseBackend):
             expected_role = self._map_role(source_role)
 
             identity = user_cuids.get(username, username)
-            remote_user_uuid = self._resolve_remote_user(identity)
+            try:
+                remote_user_uuid = self._resolve_remote_user(identity)
+            except Exception:
+                logger.exception("Failed to resolve user %s on Waldur B", username)
+                continue
             if not remote_user_uuid:
                 continue
 
@@ -10,6 +10,7 @@ from __future__ import annotations
 import datetime
 import logging
 import time
+from http import HTTPStatus
 from typing import Any, Optional, Union
 from uuid import UUID
 
@@ -78,6 +79,9 @@ IN_FLIGHT_ORDER_STATES = [
 # Default role name for project members (used to look up role UUID)
 DEFAULT_PROJECT_ROLE_NAME = "PROJECT.ADMIN"
 
+# Usernames per user listing when resolving users in bulk, keeps the query string short
+USERNAME_LIST_CHUNK_SIZE = 50
+
 
 class WaldurClient(BaseClient):
     """Client for communicating with target Waldur B via waldur_api_client."""
@@ -104,6 +108,10 @@ class WaldurClient(BaseClient):
         # re-fetching the same project for resources that share it.
         self._project_cache: dict[str, Optional[Project]] = {}
 
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self._api_client.get_httpx_client().close()
+
     def _get_role_uuid(self, role_name: str = DEFAULT_PROJECT_ROLE_NAME) -> str:
         """Look up a role UUID by name on Waldur B, with caching."""
         if role_name in self._role_uuid_cache:
@@ -251,6 +259,14 @@ class WaldurClient(BaseClient):
             )
         return orders[0]
 
+    def list_offering_in_flight_orders(self) -> list[OrderDetails]:
+        """List the non-terminal orders of all resources of the target offering."""
+        return marketplace_orders_list.sync_all(
+            client=self._api_client,
+            offering_uuid=UUID(self.offering_uuid),
+            state=IN_FLIGHT_ORDER_STATES,
+        )
+
     def get_order(self, order_uuid: UUID) -> OrderDetails:
         """Retrieve order details from Waldur B."""
         from waldur_api_client.api.marketplace_orders import (  # noqa: PLC0415
@@ -349,12 +365,23 @@ class WaldurClient(BaseClient):
     def list_marketplace_resources(
         self,
         offering_uuid: Optional[UUID] = None,
+        all_pages: bool = False,
     ) -> list[Resource]:
-        """List marketplace resources, optionally filtered by offering."""
+        """List marketplace resources, optionally filtered by offering.
+
+        Args:
+            offering_uuid: Optional offering UUID to filter by.
+            all_pages: Follow the pagination instead of returning the first page.
+        """
         kwargs = {}
         if offering_uuid:
             kwargs["offering_uuid"] = [offering_uuid]
 
+        if all_pages:
+            return marketplace_resources_list.sync_all(
+                client=self._api_client,
+                **kwargs,
+            )
         return marketplace_resources_list.sync(
             client=self._api_client,
             **kwargs,
@@ -665,7 +692,11 @@ class WaldurClient(BaseClient):
         """Resolve a user on Waldur B by eduTeams CUID.
 
         Returns:
-            User UUID on Waldur B, or None if not found.
+            User UUID on Waldur B, or None if eduTEAMS does not know the CUID.
+
+        Raises:
+            Exception: When Waldur B cannot be queried, so a failed lookup is
+                not mistaken for a user that does not exist.
         """
         from waldur_api_client.api.remote_eduteams import remote_eduteams  # noqa: PLC0415
 
@@ -674,10 +705,11 @@ class WaldurClient(BaseClient):
                 client=self._api_client,
                 body=RemoteEduteamsRequestRequest(cuid=cuid),
             )
-            return result.uuid
-        except Exception:
-            logger.exception("Failed to resolve user by CUID: %s", cuid)
-            return None
+        except UnexpectedStatus as e:
+            if e.status_code == HTTPStatus.NOT_FOUND:
+                return None
+            raise
+        return result.uuid
 
     def resolve_user_via_identity_bridge(
         self, username: str, source: str, attributes: Optional[dict] = None,
@@ -729,28 +761,63 @@ class WaldurClient(BaseClient):
     ) -> Optional[UUID]:
         """Resolve a user on Waldur B by email or username.
 
+        Only an exact match counts, as in resolve_users_by_usernames: usernames
+        are compared as they are and emails case-insensitively.
+
         Args:
             value: The value to search for.
             field: Either "email" or "username".
 
         Returns:
-            User UUID on Waldur B, or None if not found.
+            User UUID on Waldur B, or None if no user matches.
+
+        Raises:
+            Exception: When the user listing fails, so a failed lookup is not
+                mistaken for a user that does not exist.
         """
         from waldur_api_client.api.users import users_list  # noqa: PLC0415
 
-        try:
-            kwargs = {field: value}
-            users = users_list.sync(
+        if field == "email":
+            users = users_list.sync(client=self._api_client, email=value)
+        else:
+            users = users_list.sync(client=self._api_client, username=value)
+        for user in users:
+            found = getattr(user, field)
+            if isinstance(found, Unset) or isinstance(user.uuid, Unset):
+                continue
+            if found == value or (field == "email" and found.lower() == value.lower()):
+                return user.uuid
+        return None
+
+    def resolve_users_by_usernames(self, usernames: list[str]) -> dict[str, UUID]:
+        """Resolve several users on Waldur B by username with paginated listings.
+
+        Args:
+            usernames: Usernames to search for.
+
+        Returns:
+            Mapping of the found usernames to user UUIDs on Waldur B.
+
+        Raises:
+            Exception: When a listing fails, so callers can fall back to
+                resolving the users one by one.
+        """
+        from waldur_api_client.api.users import users_list  # noqa: PLC0415
+
+        resolved: dict[str, UUID] = {}
+        for start in range(0, len(usernames), USERNAME_LIST_CHUNK_SIZE):
+            chunk = usernames[start : start + USERNAME_LIST_CHUNK_SIZE]
+            users = users_list.sync_all(
                 client=self._api_client,
-                **kwargs,
+                username_list=",".join(chunk),
             )
-            if users:
-                user = users[0]
-                uuid_val = user.uuid if not isinstance(user.uuid, type(UNSET)) else None
-                return uuid_val
-        except Exception:
-            logger.exception("Failed to resolve user by %s=%s", field, value)
-        return None
+            for user in users:
+                if isinstance(user.username, type(UNSET)) or isinstance(
+                    user.uuid, type(UNSET)
+                ):
+                    continue
+                resolved[user.username] = user.uuid
+        return resolved
 
     # --- Component Usage Operations ---
 
@@ -800,12 +867,48 @@ class WaldurClient(BaseClient):
 
         return marketplace_component_user_usages_list.sync_all(**kwargs)
 
+    def list_offering_component_usages(
+        self, billing_period: datetime.date
+    ) -> list[ComponentUsage]:
+        """Get the component usages of all resources of the target offering for a period.
+
+        Args:
+            billing_period: Billing period date to filter by.
+        """
+        from waldur_api_client.api.marketplace_component_usages import (  # noqa: PLC0415
+            marketplace_component_usages_list,
+        )
+
+        return marketplace_component_usages_list.sync_all(
+            client=self._api_client,
+            offering_uuid=UUID(self.offering_uuid),
+            billing_period=billing_period,
+        )
+
+    def list_offering_component_user_usages(
+        self, billing_period: datetime.date
+    ) -> list[ComponentUserUsage]:
+        """Get the per-user usages of all resources of the target offering for a period.
+
+        Args:
+            billing_period: Billing period date to filter by.
+        """
+        from waldur_api_client.api.marketplace_component_user_usages import (  # noqa: PLC0415
+            marketplace_component_user_usages_list,
+        )
+
+        return marketplace_component_user_usages_list.sync_all(
+            client=self._api_client,
+            offering_uuid=UUID(self.offering_uuid),
+            component_usage_billing_period=billing_period,
+        )
+
     # --- BaseClient Abstract Method Implementations ---
 
     def list_resources(self) -> list[ClientResource]:
-        """List resources on Waldur B for the configured offering."""
+        """List all resources on Waldur B for the configured offering."""
         resources = self.list_marketplace_resources(
-            offering_uuid=UUID(self.offering_uuid)
+            offering_uuid=UUID(self.offering_uuid), all_pages=True
         )
         return [
             ClientResource(
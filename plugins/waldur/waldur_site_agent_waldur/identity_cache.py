@@ -0,0 +1,123 @@
+"""Cache of the Waldur B users resolved for local identities.
+
+Resolving a user on Waldur B costs an API call (an identity bridge POST, a
+remote eduTEAMS lookup or a user search) per identity. The cache keeps the
+resolved user UUIDs for ``ttl`` seconds and the identities that could not be
+resolved for ``negative_ttl`` seconds, so membership syncs of large projects
+do not resolve the same users again every cycle. With a ``path``, the entries
+are kept in a SQLite file and survive agent restarts.
+
+Entries are scoped by the resolution method, so changing the method or the
+matched field does not reuse users resolved the other way.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+from uuid import UUID
+
+DEFAULT_TTL = 86400
+DEFAULT_NEGATIVE_TTL = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resolved_users (
+    scope TEXT NOT NULL,
+    identity TEXT NOT NULL,
+    user_uuid TEXT,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (scope, identity)
+);
+"""
+
+
+class ResolvedUser(NamedTuple):
+    """Cached resolution of an identity, ``user_uuid`` is None when it was not found."""
+
+    user_uuid: Optional[UUID]
+    expires_at: float
+
+
+class IdentityCache:
+    """Identity -> Waldur B user UUID cache with expiry and negative entries."""
+
+    def __init__(
+        self,
+        scope: str,
+        ttl: float,
+        negative_ttl: float,
+        path: Optional[str] = None,
+    ) -> None:
+        """Constructor.
+
+        Args:
+            scope: Resolution method the entries belong to
+            ttl: Seconds a resolved user UUID is reused, 0 disables the cache
+            negative_ttl: Seconds an identity that was not found is not resolved
+                again, 0 disables negative caching
+            path: Optional SQLite file keeping the entries across restarts
+        """
+        self.scope = scope
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: dict[str, ResolvedUser] = {}
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            with self._lock, self._connection:
+                self._connection.executescript(_SCHEMA)
+                self._connection.execute(
+                    "DELETE FROM resolved_users WHERE expires_at <= ?", (time.time(),)
+                )
+                rows = self._connection.execute(
+                    "SELECT identity, user_uuid, expires_at FROM resolved_users "
+                    "WHERE scope = ?",
+                    (scope,),
+                ).fetchall()
+            for identity, user_uuid, expires_at in rows:
+                self._entries[identity] = ResolvedUser(
+                    UUID(user_uuid) if user_uuid else None, expires_at
+                )
+
+    def get(self, identity: str) -> Optional[ResolvedUser]:
+        """Return the unexpired resolution of the identity, None on a cache miss."""
+        with self._lock:
+            entry = self._entries.get(identity)
+        if entry is None or entry.expires_at <= time.time():
+            return None
+        return entry
+
+    def set(self, identity: str, user_uuid: Optional[UUID]) -> None:
+        """Record the resolution of the identity, None when the user was not found."""
+        ttl = self.ttl if user_uuid is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        entry = ResolvedUser(user_uuid, time.time() + ttl)
+        with self._lock:
+            self._entries[identity] = entry
+            if self._connection is not None:
+                with self._connection:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO resolved_users VALUES (?, ?, ?, ?)",
+                        (
+                            self.scope,
+                            identity,
+                            str(user_uuid) if user_uuid is not None else None,
+                            entry.expires_at,
+                        ),
+                    )
+
+    def clear(self) -> None:
+        """Drop all entries of the scope."""
+        with self._lock:
+            self._entries.clear()
+            if self._connection is not None:
+                with self._connection:
+                    self._connection.execute(
+                        "DELETE FROM resolved_users WHERE scope = ?", (self.scope,)
+                    )
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Literal
+from typing import Literal, Optional
 
 from pydantic import Field
 
@@ -107,3 +107,20 @@ class WaldurBackendSettingsSchema(PluginBackendSettingsSchema):
         default=False,
         description="If True, only sync users who have given data-sharing consent on Waldur A.",
     )
+    identity_cache_ttl: int = Field(
+        default=86400,
+        ge=0,
+        description="Seconds a user resolved on Waldur B is reused before resolving it again. "
+        "0 disables the cache.",
+    )
+    identity_cache_negative_ttl: int = Field(
+        default=300,
+        ge=0,
+        description="Seconds a user not found on Waldur B is not looked up again. "
+        "0 disables negative caching.",
+    )
+    identity_cache_file: Optional[str] = Field(
+        default=None,
+        description="SQLite file keeping the resolved users across agent restarts. "
+        "Unset keeps them in memory only.",
+    )
@@ -0,0 +1,226 @@
+"""Tests for batched usage collection in the report processor."""
+
+import unittest
+import uuid
+from unittest import mock
+
+import respx
+from freezegun import freeze_time
+from waldur_api_client.client import AuthenticatedClient
+from waldur_api_client.models import ServiceProvider
+
+from tests.fixtures import OFFERING, user_me_api_response
+from waldur_site_agent.backend.backends import BaseBackend
+from waldur_site_agent.backend.structures import BackendResourceInfo, ClientResource
+from waldur_site_agent.common.processors import OfferingReportProcessor
+
+
+class TestPullResourcesUsage(unittest.TestCase):
+    """BaseBackend.pull_resources_usage with and without bulk support."""
+
+    def setUp(self):
+        self.backend = mock.Mock(spec=BaseBackend)
+        self.backend.client = mock.Mock()
+        self.backend.backend_components = {"cpu": {}, "mem": {}}
+        self.resources = []
+        for backend_id in ("alloc-1", "alloc-2", "alloc-3"):
+            resource = mock.Mock()
+            resource.backend_id = backend_id
+            self.resources.append(resource)
+
+    def _call(self):
+        return BaseBackend.pull_resources_usage(self.backend, self.resources)
+
+    def test_fallback_pulls_each_resource(self):
+        self.backend.supports_bulk_usage_report = False
+        self.backend.pull_resource.side_effect = [
+            BackendResourceInfo(usage={"TOTAL_ACCOUNT_USAGE": {"cpu": 1}}),
+            None,
+            BackendResourceInfo(usage={"TOTAL_ACCOUNT_USAGE": {"cpu": 3}}),
+        ]
+
+        report = self._call()
+
+        self.assertEqual(self.backend.pull_resource.call_count, 3)
+        self.assertEqual(set(report), {"alloc-1", "alloc-3"})
+        self.backend._get_usage_report.assert_not_called()
+
+    def test_bulk_uses_single_usage_query(self):
+        self.backend.supports_bulk_usage_report = True
+        self.backend.client.list_resources.return_value = [
+            ClientResource(name="alloc-1"),
+            ClientResource(name="alloc-2"),
+        ]
+        self.backend._get_usage_report.return_value = {
+            "alloc-1": {"TOTAL_ACCOUNT_USAGE": {"cpu": 5, "mem": 7}},
+        }
+
+        report = self._call()
+
+        self.backend._get_usage_report.assert_called_once_with(["alloc-1", "alloc-2"])
+        self.backend.pull_resource.assert_not_called()
+        self.assertEqual(set(report), {"alloc-1", "alloc-2"})
+        self.assertEqual(report["alloc-1"].usage["TOTAL_ACCOUNT_USAGE"], {"cpu": 5, "mem": 7})
+        # Resources without usage in the report get zeroed totals
+        self.assertEqual(report["alloc-2"].usage["TOTAL_ACCOUNT_USAGE"], {"cpu": 0, "mem": 0})
+
+    def test_bulk_without_existing_resources_skips_usage_query(self):
+        self.backend.supports_bulk_usage_report = True
+        self.backend.client.list_resources.return_value = []
+
+        self.assertEqual(self._call(), {})
+        self.backend._get_usage_report.assert_not_called()
+
+
+@freeze_time("2024-06-15")
+class TestBatchedReportProcessor(unittest.TestCase):
+    """OfferingReportProcessor collecting usage for resource batches."""
+
+    BASE_URL = "https://waldur.example.com"
+
+    def setUp(self) -> None:
+        respx.start()
+        self.waldur_resources = [
+            {
+                "uuid": uuid.uuid4().hex,
+                "name": f"alloc-{index}",
+                "backend_id": f"alloc-{index}",
+                "state": "OK",
+            }
+            for index in range(3)
+        ]
+        self.waldur_offering = {
+            "components": [{"type": "cpu"}],
+            "customer_uuid": uuid.uuid4().hex,
+        }
+        self.client = AuthenticatedClient(
+            base_url=self.BASE_URL, token=OFFERING.api_token, headers={}
+        )
+        self.backend = mock.MagicMock(spec=BaseBackend)
+        self.backend.backend_type = "slurm"
+        self.backend.supports_decreasing_usage = False
+        self.backend.supports_bulk_usage_report = True
+        self.backend.backend_components = {
+            "cpu": {"limit": 10, "measured_unit": "h", "unit_factor": 1,
+                    "accounting_type": "usage", "label": "CPU"},
+        }
+        self.backend.timezone = ""
+        self._stub_waldur()
+
+    def tearDown(self) -> None:
+        respx.stop()
+
+    def _stub_waldur(self) -> None:
+        respx.get(f"{self.BASE_URL}/api/users/me/").respond(
+            200, json=user_me_api_response(base_url=self.BASE_URL, username="test-user")
+        )
+        respx.get(
+            f"{self.BASE_URL}/api/marketplace-provider-offerings/{OFFERING.uuid}/"
+        ).respond(200, json=self.waldur_offering)
+        respx.get(f"{self.BASE_URL}/api/marketplace-provider-resources/").respond(
+            200, json=self.waldur_resources
+        )
+        for resource in self.waldur_resources:
+            respx.get(
+                f"{self.BASE_URL}/api/marketplace-provider-resources/{resource['uuid']}/"
+            ).respond(200, json=resource)
+        respx.get(f"{self.BASE_URL}/api/marketplace-service-providers/").respond(
+            200, json=[ServiceProvider(uuid=uuid.uuid4()).to_dict()]
+        )
+        respx.get(f"{self.BASE_URL}/api/marketplace-component-usages/").respond(200, json=[])
+        respx.get(f"{self.BASE_URL}/api/marketplace-component-user-usages/").respond(
+            200, json=[]
+        )
+        respx.get(f"{self.BASE_URL}/api/marketplace-offering-users/").respond(200, json=[])
+        self.set_usage = respx.post(
+            f"{self.BASE_URL}/api/marketplace-component-usages/set_usage/"
+        ).respond(201, json={})
+
+    def _processor(self, reporting_periods: int = 1) -> OfferingReportProcessor:
+        return OfferingReportProcessor(
+            OFFERING,
+            self.client,
+            resource_backend=self.backend,
+            resource_backend_version="test",
+            reporting_periods=reporting_periods,
+        )
+
+    @staticmethod
+    def _usage(batch) -> dict:
+        return {
+            resource.backend_id: BackendResourceInfo(
+                backend_id=resource.backend_id,
+                usage={"TOTAL_ACCOUNT_USAGE": {"cpu": 10}},
+            )
+            for resource in batch
+        }
+
+    def test_batches_respect_configured_size(self) -> None:
+        self.backend.pull_resources_usage.side_effect = self._usage
+        with mock.patch.dict(OFFERING.backend_settings, {"usage_report_batch_size": 2}):
+            self._processor().process_offering()
+
+        batch_sizes = [
+            len(call.args[0]) for call in self.backend.pull_resources_usage.call_args_list
+        ]
+        self.assertEqual(batch_sizes, [2, 1])
+        self.backend.pull_resource.assert_not_called()
+        self.assertEqual(self.set_usage.call_count, 3)
+
+    def test_resource_missing_in_batch_is_skipped(self) -> None:
+        self.backend.pull_resources_usage.side_effect = lambda batch: self._usage(batch[1:])
+
+        self._processor().process_offering()
+
+        self.backend.pull_resource.assert_not_called()
+        self.assertEqual(self.set_usage.call_count, 2)
+
+    def test_failed_batch_falls_back_to_per_resource_pulls(self) -> None:
+        self.backend.pull_resources_usage.side_effect = Exception("sacct failed")
+        self.backend.pull_resource.side_effect = lambda resource: BackendResourceInfo(
+            backend_id=resource.backend_id,
+            usage={"TOTAL_ACCOUNT_USAGE": {"cpu": 10}},
+        )
+
+        self._processor().process_offering()
+
+        self.assertEqual(self.backend.pull_resource.call_count, 3)
+        self.assertEqual(self.set_usage.call_count, 3)
+
+    @freeze_time("2024-03-15")
+    def test_past_period_is_queried_once_per_batch(self) -> None:
+        self.backend.pull_resources_usage.side_effect = self._usage
+        self.backend.get_usage_report_for_period.side_effect = (
+            lambda backend_ids, year, month: {
+                backend_id: {"TOTAL_ACCOUNT_USAGE": {"cpu": 5}} for backend_id in backend_ids
+            }
+        )
+
+        self._processor(reporting_periods=2).process_offering()
+
+        self.backend.get_usage_report_for_period.assert_called_once_with(
+            ["alloc-0", "alloc-1", "alloc-2"], 2024, 2
+        )
+        self.assertEqual(self.set_usage.call_count, 6)
+
+    @freeze_time("2024-03-15")
+    def test_failed_past_period_query_falls_back_to_per_resource_queries(self) -> None:
+        self.backend.pull_resources_usage.side_effect = self._usage
+        self.backend.get_usage_report_for_period.side_effect = [
+            Exception("sacct failed"),
+            *(
+                {f"alloc-{index}": {"TOTAL_ACCOUNT_USAGE": {"cpu": 5}}}
+                for index in range(3)
+            ),
+        ]
+
+        self._processor(reporting_periods=2).process_offering()
+
+        requested_ids = [
+            call.args[0] for call in self.backend.get_usage_report_for_period.call_args_list
+        ]
+        self.assertEqual(
+            requested_ids,
+            [["alloc-0", "alloc-1", "alloc-2"], ["alloc-0"], ["alloc-1"], ["alloc-2"]],
+        )
+        self.assertEqual(self.set_usage.call_count, 6)
@@ -0,0 +1,134 @@
+"""Tests for the offering-wide ComponentUsage index of the report processor."""
+
+import datetime
+import threading
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from waldur_api_client.models import ComponentUsage, ComponentUserUsage
+
+from waldur_site_agent.common.processors import OfferingReportProcessor
+
+PROCESSORS_MODULE = "waldur_site_agent.common.processors"
+BILLING_PERIOD = datetime.date(2024, 6, 1)
+REPORT_DATE = datetime.datetime(2024, 6, 15, tzinfo=datetime.timezone.utc)
+
+
+def _make_processor(supports_decreasing_usage=False):
+    processor = OfferingReportProcessor.__new__(OfferingReportProcessor)
+    processor.offering = mock.Mock(uuid=uuid.uuid4().hex)
+    processor.waldur_rest_client = mock.Mock()
+    processor.timezone = ""
+    processor.resource_backend = mock.Mock(supports_decreasing_usage=supports_decreasing_usage)
+    processor._component_usages_index = {}
+    processor._user_usage_parents_index = {}
+    processor._cache_lock = threading.RLock()
+    processor._stale_component_usages = set()
+    processor._past_period_reports = {}
+    processor.usage_ledger = None
+    return processor
+
+
+def _usage(resource_uuid, type_, usage):
+    return ComponentUsage(
+        uuid=uuid.uuid4(), resource_uuid=uuid.UUID(resource_uuid), type_=type_, usage=usage
+    )
+
+
+def _resource(resource_uuid):
+    return SimpleNamespace(uuid=uuid.UUID(resource_uuid), backend_id=f"alloc-{resource_uuid[:4]}")
+
+
+def _page(items):
+    return mock.Mock(parsed=items, headers={})
+
+
+@mock.patch(f"{PROCESSORS_MODULE}.marketplace_component_usages_set_usage")
+@mock.patch(f"{PROCESSORS_MODULE}.marketplace_component_user_usages_list")
+@mock.patch(f"{PROCESSORS_MODULE}.marketplace_component_usages_list")
+class TestComponentUsageIndex(unittest.TestCase):
+    def setUp(self):
+        self.first = uuid.uuid4().hex
+        self.second = uuid.uuid4().hex
+        self.components = [SimpleNamespace(type_="cpu")]
+
+    def _submit(self, processor, resource_uuid, amount):
+        processor._submit_total_usage_for_resource(
+            _resource(resource_uuid),
+            {"cpu": amount},
+            self.components,
+            report_date=REPORT_DATE,
+            billing_period_start=BILLING_PERIOD,
+        )
+
+    def test_offering_usages_are_listed_once(self, mock_list, mock_user_list, mock_set_usage):
+        mock_list.sync_detailed.return_value = _page(
+            [_usage(self.first, "cpu", "10.00"), _usage(self.second, "cpu", "20.00")]
+        )
+        processor = _make_processor()
+
+        self._submit(processor, self.first, 10.0)
+        self._submit(processor, self.second, 20.0)
+
+        mock_list.sync_detailed.assert_called_once()
+        kwargs = mock_list.sync_detailed.call_args.kwargs
+        assert kwargs["offering_uuid"] == processor.offering.uuid
+        assert kwargs["billing_period"] == BILLING_PERIOD
+        mock_list.sync_all.assert_not_called()
+        mock_set_usage.sync_detailed.assert_not_called()
+
+    def test_anomaly_check_uses_offering_user_usages(
+        self, mock_list, mock_user_list, mock_set_usage
+    ):
+        mock_list.sync_detailed.return_value = _page(
+            [_usage(self.first, "cpu", "10.00"), _usage(self.second, "cpu", "20.00")]
+        )
+        mock_user_list.sync_detailed.return_value = _page(
+            [ComponentUserUsage(component_usage="https://waldur.example.com/api/x/")]
+        )
+        processor = _make_processor()
+
+        self._submit(processor, self.first, 15.0)
+        self._submit(processor, self.second, 25.0)
+
+        mock_user_list.sync_detailed.assert_called_once()
+        assert mock_user_list.sync_detailed.call_args.kwargs["offering_uuid"] == (
+            processor.offering.uuid
+        )
+        mock_user_list.sync_all.assert_not_called()
+        assert mock_set_usage.sync_detailed.call_count == 2
+
+    def test_submitted_resource_is_read_again(self, mock_list, mock_user_list, mock_set_usage):
+        mock_list.sync_detailed.return_value = _page([_usage(self.first, "cpu", "10.00")])
+        mock_user_list.sync_detailed.return_value = _page([])
+        refreshed = [_usage(self.first, "cpu", "15.00")]
+        mock_list.sync_all.return_value = refreshed
+        processor = _make_processor()
+
+        self._submit(processor, self.first, 15.0)
+
+        assert processor._get_component_usages(self.first, BILLING_PERIOD) == refreshed
+        assert mock_list.sync_all.call_args.kwargs["resource_uuid"] == self.first
+        # The refreshed records are served from the index afterwards
+        assert processor._get_component_usages(self.first, BILLING_PERIOD) == refreshed
+        mock_list.sync_all.assert_called_once()
+        mock_list.sync_detailed.assert_called_once()
+
+    def test_reset_drops_the_index(self, mock_list, mock_user_list, mock_set_usage):
+        mock_list.sync_detailed.return_value = _page([])
+        processor = _make_processor()
+        processor._offering_users_cache = None
+        processor._service_accounts_cache = {}
+        processor._course_accounts_cache = {}
+
+        processor._get_component_usages(self.first, BILLING_PERIOD)
+        processor.reset_cycle_caches()
+        processor._get_component_usages(self.first, BILLING_PERIOD)
+
+        assert mock_list.sync_detailed.call_count == 2
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -131,10 +131,10 @@ class CourseAccountMessageTest(TestCase):
         assert args[1] == {self.course_account.username}
 
     @mock.patch(
-        "waldur_site_agent.event_processing.handlers.agent_identity_management.marketplace_site_agent_identities_register_service"
+        "waldur_site_agent.event_processing.offering_context.agent_identity_management.marketplace_site_agent_identities_register_service"
     )
     @mock.patch(
-        "waldur_site_agent.event_processing.handlers.agent_identity_management.marketplace_site_agent_identities_list"
+        "waldur_site_agent.event_processing.offering_context.agent_identity_management.marketplace_site_agent_identities_list"
     )
     @mock.patch(
         "waldur_site_agent.event_processing.handlers.common_processors.OfferingMembershipProcessor"
@@ -188,10 +188,10 @@ class CourseAccountMessageTest(TestCase):
         )
 
     @mock.patch(
-        "waldur_site_agent.event_processing.handlers.agent_identity_management.marketplace_site_agent_identities_register_service"
+        "waldur_site_agent.event_processing.offering_context.agent_identity_management.marketplace_site_agent_identities_register_service"
     )
     @mock.patch(
-        "waldur_site_agent.event_processing.handlers.agent_identity_management.marketplace_site_agent_identities_list"
+        "waldur_site_agent.event_processing.offering_context.agent_identity_management.marketplace_site_agent_identities_list"
     )
     @mock.patch(
         "waldur_site_agent.event_processing.handlers.common_processors.OfferingMembershipProcessor"
@@ -8,6 +8,7 @@ username generation and recover stuck users.
 
 from __future__ import annotations
 
+import threading
 import uuid
 from datetime import datetime, timezone
 from unittest import mock
@@ -54,6 +55,7 @@ def _make_processor_with_cache(
     processor = object.__new__(OfferingMembershipProcessor)
     processor.offering = OFFERING
     processor._offering_users_cache = users
+    processor._cache_lock = threading.RLock()
     return processor
 
 
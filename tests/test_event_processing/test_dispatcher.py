@@ -0,0 +1,173 @@
+"""Tests for the worker pool dispatching STOMP messages."""
+
+import json
+import threading
+import unittest
+import zlib
+from unittest import mock
+
+from stomp.constants import HDR_DESTINATION
+
+from waldur_site_agent.event_processing.dispatcher import MessageDispatcher, get_message_key
+from waldur_site_agent.event_processing.listener import WaldurListener
+
+
+def _frame(message, destination="/queue/subscription_x_user_role"):
+    return mock.Mock(body=json.dumps(message), headers={HDR_DESTINATION: destination})
+
+
+class TestGetMessageKey(unittest.TestCase):
+    def test_project_scopes_user_role_messages(self):
+        frame = _frame({"user_uuid": "u1", "project_uuid": "p1", "resource_uuid": "r1"})
+        assert get_message_key(frame) == "p1"
+
+    def test_resource_and_order_keys(self):
+        assert get_message_key(_frame({"resource_uuid": "r1"})) == "r1"
+        assert get_message_key(_frame({"order_uuid": "o1", "order_state": "executing"})) == "o1"
+
+    def test_destination_is_the_fallback(self):
+        frame = _frame({"offering_uuid": "x"}, destination="/queue/sync")
+        assert get_message_key(frame) == "/queue/sync"
+
+
+class TestMessageDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.dispatcher = MessageDispatcher(workers=4, queue_size=100)
+
+    def tearDown(self):
+        self.dispatcher.shutdown(timeout=5)
+
+    def test_tasks_of_a_key_run_in_order(self):
+        processed = []
+        for index in range(50):
+            self.dispatcher.dispatch("resource-1", lambda index=index: processed.append(index))
+        self.dispatcher.shutdown(timeout=5)
+
+        assert processed == list(range(50))
+        assert self.dispatcher.stats()["completed"] == 50
+
+    def test_independent_keys_run_in_parallel(self):
+        blocker = threading.Event()
+        done = threading.Event()
+        keys = [f"key-{index}" for index in range(100)]
+        blocked_key = next(key for key in keys if self._worker(key) == 0)
+        free_key = next(key for key in keys if self._worker(key) != 0)
+
+        self.dispatcher.dispatch(blocked_key, blocker.wait)
+        self.dispatcher.dispatch(free_key, done.set)
+
+        assert done.wait(timeout=5)
+        blocker.set()
+
+    def test_failed_task_does_not_stop_the_worker(self):
+        done = threading.Event()
+
+        def fail():
+            raise RuntimeError("boom")
+
+        self.dispatcher.dispatch("key", fail)
+        self.dispatcher.dispatch("key", done.set)
+
+        assert done.wait(timeout=5)
+        self.dispatcher.shutdown(timeout=5)
+        assert self.dispatcher.stats()["failed"] == 1
+
+    def test_full_queue_applies_backpressure(self):
+        dispatcher = MessageDispatcher(workers=1, queue_size=1)
+        started = threading.Event()
+        blocker = threading.Event()
+
+        def block():
+            started.set()
+            blocker.wait()
+
+        dispatcher.dispatch("key", block)
+        assert started.wait(timeout=5)
+        dispatcher.dispatch("key", lambda: None)
+        assert dispatcher.queue_depths() == [1]
+
+        submitter = threading.Thread(target=dispatcher.dispatch, args=("key", lambda: None))
+        submitter.start()
+        submitter.join(timeout=0.2)
+        assert submitter.is_alive()
+
+        blocker.set()
+        submitter.join(timeout=5)
+        dispatcher.shutdown(timeout=5)
+        stats = dispatcher.stats()
+        assert stats["backpressure_waits"] == 1
+        assert stats["completed"] == 3
+        assert stats["queued"] == 0
+
+    def test_try_dispatch_gives_up_on_a_full_queue(self):
+        dispatcher = MessageDispatcher(workers=1, queue_size=1, enqueue_timeout=0.05)
+        blocker = threading.Event()
+        dispatcher.dispatch("key", blocker.wait)
+        dispatcher.dispatch("key", lambda: None)
+        rejected = mock.Mock()
+
+        assert not dispatcher.try_dispatch("key", rejected)
+
+        blocker.set()
+        dispatcher.shutdown(timeout=5)
+        rejected.assert_not_called()
+        stats = dispatcher.stats()
+        assert stats["rejected"] == 1
+        assert stats["dispatched"] == stats["completed"] == 2
+
+    def _worker(self, key):
+        return zlib.crc32(key.encode()) % 4
+
+
+class TestListenerDispatch(unittest.TestCase):
+    def test_message_is_handed_to_the_dispatcher(self):
+        callback = mock.Mock()
+        dispatcher = mock.Mock()
+        offering = mock.Mock()
+        listener = WaldurListener(
+            mock.Mock(),
+            "queue",
+            "user",
+            "password",
+            callback,
+            offering,
+            "agent",
+            dispatcher=dispatcher,
+        )
+        frame = _frame({"project_uuid": "p1"})
+
+        listener.on_message(frame)
+
+        callback.assert_not_called()
+        key, task = dispatcher.dispatch.call_args.args
+        assert key == "p1"
+        task()
+        callback.assert_called_once_with(frame, offering, "agent", True)
+
+    def test_acknowledged_message_is_returned_when_the_workers_are_busy(self):
+        conn = mock.Mock()
+        dispatcher = mock.Mock()
+        dispatcher.try_dispatch.return_value = False
+        listener = WaldurListener(
+            conn,
+            "queue",
+            "user",
+            "password",
+            mock.Mock(),
+            mock.Mock(),
+            "agent",
+            dispatcher=dispatcher,
+            retry_queue=mock.Mock(),
+        )
+        frame = _frame({"project_uuid": "p1"})
+        frame.headers["ack"] = "ack-1"
+
+        listener.on_message(frame)
+
+        dispatcher.dispatch.assert_not_called()
+        assert dispatcher.try_dispatch.call_args.args[0] == "p1"
+        conn.nack.assert_called_once_with("ack-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
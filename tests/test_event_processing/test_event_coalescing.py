@@ -0,0 +1,176 @@
+"""Tests for coalescing bursts of USER_ROLE and RESOURCE events."""
+
+import json
+import threading
+import unittest
+import uuid
+from unittest import mock
+
+from waldur_site_agent.common import structures
+from waldur_site_agent.event_processing import handlers
+from waldur_site_agent.event_processing.coalescer import EventCoalescer
+
+HANDLERS_MODULE = "waldur_site_agent.event_processing.handlers"
+PROJECT_UUID = uuid.uuid4().hex
+
+
+def _role_change(user_uuid, granted, role_name="PROJECT.MEMBER"):
+    return {
+        "user_uuid": user_uuid,
+        "user_username": f"user-{user_uuid}",
+        "project_uuid": PROJECT_UUID,
+        "project_name": "Project",
+        "role_name": role_name,
+        "granted": granted,
+    }
+
+
+def _make_offering(window):
+    return structures.Offering(
+        name="Test offering",
+        waldur_api_url="https://waldur.example.com/api/",
+        waldur_api_token="static-token",
+        waldur_offering_uuid=uuid.uuid4().hex,
+        backend_type="test",
+        stomp_coalescing_window_seconds=window,
+    )
+
+
+def _inline_dispatcher():
+    dispatcher = mock.Mock()
+    dispatcher.dispatch.side_effect = lambda key, task: task()
+    return dispatcher
+
+
+def _attached_coalescer(dispatcher=None):
+    coalescer = EventCoalescer()
+    coalescer.attach(dispatcher or _inline_dispatcher())
+    return coalescer
+
+
+class TestEventCoalescer(unittest.TestCase):
+    def test_messages_of_a_window_are_handled_together(self):
+        coalescer = _attached_coalescer()
+        handled = []
+        done = threading.Event()
+
+        def handle_batch(batch):
+            handled.append(batch)
+            done.set()
+
+        coalescer.submit("key", {"n": 1}, 0.05, handle_batch)
+        coalescer.submit("key", {"n": 2}, 0.05, handle_batch)
+
+        assert done.wait(timeout=5)
+        assert handled == [[{"n": 1}, {"n": 2}]]
+        assert coalescer.pending() == 0
+
+    def test_flush_all_closes_open_windows(self):
+        coalescer = _attached_coalescer()
+        first, second = mock.Mock(), mock.Mock()
+        coalescer.submit("a", {"n": 1}, 3600, first)
+        coalescer.submit("b", {"n": 2}, 3600, second)
+
+        coalescer.flush_all()
+
+        first.assert_called_once_with([{"n": 1}])
+        second.assert_called_once_with([{"n": 2}])
+        assert coalescer.pending() == 0
+
+    def test_batches_are_dispatched_under_the_message_key(self):
+        dispatcher = _inline_dispatcher()
+        coalescer = _attached_coalescer(dispatcher)
+        handle_batch = mock.Mock()
+        coalescer.submit("key", {"project_uuid": "p1", "resource_uuid": "r1"}, 3600, handle_batch)
+
+        coalescer.flush_all()
+
+        assert dispatcher.dispatch.call_args.args[0] == "p1"
+        handle_batch.assert_called_once()
+
+    def test_submit_is_refused_without_a_dispatcher(self):
+        coalescer = EventCoalescer()
+        handle_batch = mock.Mock()
+
+        assert not coalescer.submit("key", {"n": 1}, 3600, handle_batch)
+        assert coalescer.pending() == 0
+        handle_batch.assert_not_called()
+
+
+class TestCoalesceUserRoleMessages(unittest.TestCase):
+    def test_last_role_change_of_a_user_wins(self):
+        user_uuid = uuid.uuid4().hex
+        messages = [
+            _role_change(user_uuid, True),
+            _role_change(user_uuid, False),
+            _role_change(user_uuid, True, role_name="PROJECT.MANAGER"),
+        ]
+
+        assert handlers._coalesce_user_role_messages(messages) == messages[1:]
+
+    def test_changes_of_several_users_become_a_project_sync(self):
+        messages = [_role_change(uuid.uuid4().hex, True) for _ in range(200)]
+
+        (sync,) = handlers._coalesce_user_role_messages(messages)
+
+        assert sync["user_uuid"] is None
+        assert sync["resource_uuid"] is None
+        assert sync["project_uuid"] == PROJECT_UUID
+
+    def test_resource_syncs_are_deduplicated(self):
+        resource_sync = {**_role_change(None, None), "resource_uuid": "r1"}
+
+        assert handlers._coalesce_user_role_messages([resource_sync, resource_sync]) == [
+            resource_sync
+        ]
+
+
+@mock.patch(f"{HANDLERS_MODULE}.OFFERING_CONTEXTS")
+class TestCoalescingHandlers(unittest.TestCase):
+    def setUp(self):
+        self.coalescer = _attached_coalescer()
+        patcher = mock.patch(f"{HANDLERS_MODULE}.EVENT_COALESCER", self.coalescer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _processor(self, mock_contexts):
+        return mock_contexts.processor.return_value.__enter__.return_value
+
+    def test_bulk_role_update_runs_one_project_sync(self, mock_contexts):
+        offering = _make_offering(window=3600)
+        for _ in range(10):
+            frame = mock.Mock(body=json.dumps(_role_change(uuid.uuid4().hex, True)), headers={})
+            handlers.on_user_role_message_stomp(frame, offering, "test-agent")
+
+        processor = self._processor(mock_contexts)
+        processor.process_user_role_changed.assert_not_called()
+        self.coalescer.flush_all()
+
+        processor.process_project_user_sync.assert_called_once_with(PROJECT_UUID)
+        processor.process_user_role_changed.assert_not_called()
+
+    def test_repeated_resource_events_are_processed_once(self, mock_contexts):
+        offering = _make_offering(window=3600)
+        frame = mock.Mock(body=json.dumps({"resource_uuid": "r1"}), headers={})
+        for _ in range(5):
+            handlers.on_resource_message_stomp(frame, offering, "test-agent")
+
+        self.coalescer.flush_all()
+
+        self._processor(mock_contexts).process_resource_by_uuid.assert_called_once_with("r1")
+
+    def test_events_are_handled_on_arrival_without_window(self, mock_contexts):
+        offering = _make_offering(window=0)
+        user_uuid = uuid.uuid4().hex
+        frame = mock.Mock(body=json.dumps(_role_change(user_uuid, True)), headers={})
+
+        handlers.on_user_role_message_stomp(frame, offering, "test-agent")
+
+        assert self.coalescer.pending() == 0
+        self._processor(mock_contexts).process_user_role_changed.assert_called_once_with(
+            user_uuid, PROJECT_UUID, True, role_name="PROJECT.MEMBER"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -244,3 +244,59 @@ class TestWaldurListenerOnDisconnected(unittest.TestCase):
         """Listener should have a threading lock for reconnection."""
         listener = self._make_listener()
         self.assertIsInstance(listener._reconnect_lock, type(threading.Lock()))
+
+
+class TestWaldurListenerRouting(unittest.TestCase):
+    """Tests for multiplexing several queues over one listener."""
+
+    def setUp(self):
+        self.conn = mock.Mock()
+        self.order_handler = mock.Mock()
+        self.resource_handler = mock.Mock()
+        self.offering = mock.Mock()
+        self.listener = WaldurListener(
+            conn=self.conn,
+            queue="queue_order",
+            username="user",
+            password="pass",
+            on_message_callback=self.order_handler,
+            offering=self.offering,
+            user_agent="test-agent",
+        )
+        self.listener.add_route("queue_resource", self.resource_handler)
+
+    def test_subscribes_to_all_routed_queues_on_connect(self):
+        """Each (re)connect should subscribe to every routed queue."""
+        self.listener.on_connected(mock.Mock())
+
+        subscribed = [call.kwargs["id"] for call in self.conn.subscribe.call_args_list]
+        self.assertEqual(subscribed, ["queue_order", "queue_resource"])
+
+    def test_message_is_routed_by_subscription(self):
+        """Messages should reach the handler of the queue they arrived on."""
+        frame = mock.Mock(body="{}", headers={"subscription": "queue_resource"})
+
+        self.listener.on_message(frame)
+
+        self.resource_handler.assert_called_once_with(frame, self.offering, "test-agent", True)
+        self.order_handler.assert_not_called()
+
+    def test_message_of_unknown_queue_is_dropped(self):
+        """Messages of a queue without a route should not reach any handler."""
+        frame = mock.Mock(body="{}", headers={"subscription": "queue_unknown"})
+
+        self.listener.on_message(frame)
+
+        self.order_handler.assert_not_called()
+        self.resource_handler.assert_not_called()
+
+    def test_replacing_the_primary_callback_updates_its_route(self):
+        """Assigning on_message_callback should replace the handler of the primary queue."""
+        handler = mock.Mock()
+        self.listener.on_message_callback = handler
+        frame = mock.Mock(body="{}", headers={"subscription": "queue_order"})
+
+        self.listener.on_message(frame)
+
+        handler.assert_called_once()
+        self.order_handler.assert_not_called()
@@ -0,0 +1,231 @@
+"""Tests for the per-offering context reused by the STOMP handlers."""
+
+import json
+import unittest
+import uuid
+from unittest import mock
+
+import pytest
+from waldur_api_client.models import ObservableObjectTypeEnum
+
+from waldur_site_agent.common import structures
+from waldur_site_agent.event_processing import handlers, offering_context
+
+CONTEXT_MODULE = "waldur_site_agent.event_processing.offering_context"
+
+
+def _make_offering(**overrides):
+    values = {
+        "name": "Test offering",
+        "waldur_api_url": "https://waldur.example.com/api/",
+        "waldur_api_token": "static-token",
+        "waldur_offering_uuid": uuid.uuid4().hex,
+        "backend_type": "test",
+    }
+    values.update(overrides)
+    return structures.Offering(**values)
+
+
+@mock.patch(f"{CONTEXT_MODULE}.register_event_process_service")
+@mock.patch(f"{CONTEXT_MODULE}.common_utils.get_backend_for_offering")
+@mock.patch(f"{CONTEXT_MODULE}.common_utils.get_client_for_offering")
+class TestOfferingContextCache(unittest.TestCase):
+    def setUp(self):
+        self.offering = _make_offering()
+        self.processor_class = mock.Mock(side_effect=lambda *_, **__: mock.Mock())
+        self.backend = (mock.Mock(), "1.0")
+
+    def _use(self, cache, observable_object=ObservableObjectTypeEnum.ORDER):
+        with cache.processor(
+            self.offering,
+            "test-agent",
+            observable_object,
+            self.processor_class,
+            "order_processing_backend",
+        ) as processor:
+            return processor
+
+    def test_processor_is_reused_across_messages(
+        self, mock_get_client, mock_get_backend, mock_register
+    ):
+        mock_get_backend.return_value = self.backend
+        cache = offering_context.OfferingContextCache(ttl=3600)
+
+        first = self._use(cache)
+        second = self._use(cache)
+
+        assert first is second
+        mock_get_client.assert_called_once_with(self.offering, "test-agent")
+        mock_register.assert_called_once()
+        mock_get_backend.assert_called_once_with(self.offering, "order_processing_backend")
+        self.processor_class.assert_called_once()
+        first.register.assert_called_once_with(mock_register.return_value)
+        first.reset_cycle_caches.assert_called_once()
+
+    def test_offering_details_are_shared_between_processors(
+        self, mock_get_client, mock_get_backend, mock_register
+    ):
+        mock_get_backend.return_value = self.backend
+        cache = offering_context.OfferingContextCache(ttl=3600)
+
+        order_processor = self._use(cache)
+        self._use(cache, ObservableObjectTypeEnum.USER_ROLE)
+
+        mock_get_client.assert_called_once()
+        assert mock_register.call_count == 2
+        kwargs = self.processor_class.call_args_list[1].kwargs
+        assert kwargs["waldur_offering"] is order_processor.waldur_offering
+        assert kwargs["service_provider"] is order_processor.service_provider
+        assert kwargs["current_user"] is order_processor.current_user
+
+    def test_concurrent_messages_get_distinct_processors(
+        self, mock_get_client, mock_get_backend, mock_register
+    ):
+        mock_get_backend.return_value = self.backend
+        cache = offering_context.OfferingContextCache(ttl=3600)
+        observable_object = ObservableObjectTypeEnum.ORDER
+
+        with cache.processor(
+            self.offering, "test-agent", observable_object, self.processor_class
+        ) as first, cache.processor(
+            self.offering, "test-agent", observable_object, self.processor_class
+        ) as second:
+            assert first is not second
+
+        mock_get_backend.assert_not_called()
+        mock_register.assert_called_once()
+
+    def test_context_is_dropped_on_error(self, mock_get_client, mock_get_backend, mock_register):
+        mock_get_backend.return_value = self.backend
+        cache = offering_context.OfferingContextCache(ttl=3600)
+        first = self._use(cache)
+
+        with pytest.raises(RuntimeError), cache.processor(
+            self.offering, "test-agent", ObservableObjectTypeEnum.ORDER, self.processor_class
+        ):
+            raise RuntimeError
+
+        assert self._use(cache) is not first
+        assert mock_get_client.call_count == 2
+        assert mock_register.call_count == 2
+
+    def test_context_expires(self, mock_get_client, mock_get_backend, mock_register):
+        mock_get_backend.return_value = self.backend
+        cache = offering_context.OfferingContextCache(ttl=0)
+
+        assert self._use(cache) is not self._use(cache)
+        assert mock_get_client.call_count == 2
+
+    def test_token_change_rebuilds_context(
+        self, mock_get_client, mock_get_backend, mock_register
+    ):
+        mock_get_backend.return_value = self.backend
+        cache = offering_context.OfferingContextCache(ttl=3600)
+        first = self._use(cache)
+
+        self.offering.waldur_api_token = "rotated-token"
+
+        assert self._use(cache) is not first
+        assert mock_get_client.call_count == 2
+
+    def test_replaced_context_is_closed(self, mock_get_client, mock_get_backend, mock_register):
+        mock_get_backend.return_value = self.backend
+        clients = [mock.Mock(), mock.Mock()]
+        mock_get_client.side_effect = clients
+        cache = offering_context.OfferingContextCache(ttl=3600)
+        first = self._use(cache)
+
+        self.offering.waldur_api_token = "rotated-token"
+        second = self._use(cache)
+
+        first.close.assert_called_once()
+        clients[0].get_httpx_client.return_value.close.assert_called_once()
+        second.close.assert_not_called()
+        clients[1].get_httpx_client.return_value.close.assert_not_called()
+
+    def test_context_is_closed_after_its_last_lent_processor(
+        self, mock_get_client, mock_get_backend, mock_register
+    ):
+        mock_get_backend.return_value = self.backend
+        cache = offering_context.OfferingContextCache(ttl=3600)
+
+        with cache.processor(
+            self.offering, "test-agent", ObservableObjectTypeEnum.ORDER, self.processor_class
+        ) as lent:
+            cache.invalidate(self.offering)
+            lent.close.assert_not_called()
+            mock_get_client.return_value.get_httpx_client.return_value.close.assert_not_called()
+
+        lent.close.assert_called_once()
+        mock_get_client.return_value.get_httpx_client.return_value.close.assert_called_once()
+
+    def test_failed_processor_is_closed(self, mock_get_client, mock_get_backend, mock_register):
+        mock_get_backend.return_value = self.backend
+        cache = offering_context.OfferingContextCache(ttl=3600)
+
+        with pytest.raises(RuntimeError), cache.processor(
+            self.offering, "test-agent", ObservableObjectTypeEnum.ORDER, self.processor_class
+        ) as failed:
+            raise RuntimeError
+
+        failed.close.assert_called_once()
+        mock_get_client.return_value.get_httpx_client.return_value.close.assert_called_once()
+
+    def test_processor_is_closed_after_use_without_reuse(
+        self, mock_get_client, mock_get_backend, mock_register
+    ):
+        mock_get_backend.return_value = self.backend
+        cache = offering_context.OfferingContextCache(ttl=0)
+
+        processor = self._use(cache)
+
+        processor.close.assert_called_once()
+        mock_get_client.return_value.get_httpx_client.return_value.close.assert_called_once()
+
+
+@mock.patch(f"{CONTEXT_MODULE}.register_event_process_service")
+@mock.patch(f"{CONTEXT_MODULE}.common_utils.get_backend_for_offering")
+@mock.patch(f"{CONTEXT_MODULE}.common_utils.get_client_for_offering")
+@mock.patch("waldur_site_agent.event_processing.handlers.common_processors.OfferingOrderProcessor")
+class TestOrderHandlerContextReuse(unittest.TestCase):
+    def setUp(self):
+        self.offering = _make_offering()
+        offering_context.OFFERING_CONTEXTS.invalidate(self.offering)
+
+    def tearDown(self):
+        offering_context.OFFERING_CONTEXTS.invalidate(self.offering)
+
+    def _frame(self):
+        return mock.Mock(
+            body=json.dumps({"order_uuid": uuid.uuid4().hex, "order_state": "executing"})
+        )
+
+    def test_consecutive_orders_reuse_the_processor(
+        self, mock_processor_class, mock_get_client, mock_get_backend, mock_register
+    ):
+        mock_get_backend.return_value = (mock.Mock(), "1.0")
+
+        handlers.on_order_message_stomp(self._frame(), self.offering, "test-agent")
+        handlers.on_order_message_stomp(self._frame(), self.offering, "test-agent")
+
+        mock_processor_class.assert_called_once()
+        mock_get_client.assert_called_once()
+        mock_register.assert_called_once()
+        assert mock_processor_class.return_value.process_order_with_retries.call_count == 2
+
+    def test_failed_order_drops_the_context(
+        self, mock_processor_class, mock_get_client, mock_get_backend, mock_register
+    ):
+        mock_get_backend.return_value = (mock.Mock(), "1.0")
+        mock_processor = mock_processor_class.return_value
+        mock_processor.process_order_with_retries.side_effect = [RuntimeError("boom"), None]
+
+        handlers.on_order_message_stomp(self._frame(), self.offering, "test-agent")
+        handlers.on_order_message_stomp(self._frame(), self.offering, "test-agent")
+
+        assert mock_processor_class.call_count == 2
+        assert mock_get_client.call_count == 2
+
+
+if __name__ == "__main__":
+    unittest.main()
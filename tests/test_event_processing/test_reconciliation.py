@@ -2,6 +2,7 @@
 
 import datetime
 import inspect
+import threading
 import unittest
 import uuid
 from unittest import mock
@@ -13,6 +14,11 @@ from waldur_api_client.types import UNSET
 
 from waldur_site_agent.common import structures as common_structures
 from waldur_site_agent.event_processing import utils
+from waldur_site_agent.event_processing.reconciliation_tracker import (
+    RECONCILIATION_TRACKER,
+    WATERMARK_OVERLAP,
+    ReconciliationTracker,
+)
 
 
 def _make_offering(**overrides) -> common_structures.Offering:
@@ -183,6 +189,15 @@ class TestRunPeriodicUsernameReconciliation(unittest.TestCase):
 class TestRunPeriodicOrderReconciliation(unittest.TestCase):
     """Tests for run_periodic_order_reconciliation function."""
 
+    def setUp(self):
+        # Each test starts with a full scan, whatever the previous tests left behind
+        patcher = mock.patch(
+            "waldur_site_agent.event_processing.utils.RECONCILIATION_TRACKER",
+            ReconciliationTracker(RECONCILIATION_TRACKER.full_scan_interval),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_skips_offering_without_order_processing_backend(self):
         """Offerings without order_processing_backend are skipped entirely."""
         offering = _make_offering(
@@ -327,6 +342,15 @@ class TestRunPeriodicOrderReconciliation(unittest.TestCase):
 class TestRunPeriodicOfferingUserReconciliation(unittest.TestCase):
     """Tests for run_periodic_offering_user_reconciliation function."""
 
+    def setUp(self):
+        # Each test starts with a full scan, whatever the previous tests left behind
+        patcher = mock.patch(
+            "waldur_site_agent.event_processing.utils.RECONCILIATION_TRACKER",
+            ReconciliationTracker(RECONCILIATION_TRACKER.full_scan_interval),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_skips_offering_without_membership_sync_backend(self):
         """Offerings without membership_sync_backend are skipped."""
         offering = _make_offering(stomp_enabled=True)
@@ -406,6 +430,212 @@ class TestRunPeriodicOfferingUserReconciliation(unittest.TestCase):
             )
 
 
+class TestIncrementalReconciliation(unittest.TestCase):
+    """Tests for watermark-driven reconciliation passes between full scans."""
+
+    def setUp(self):
+        self.tracker = ReconciliationTracker(full_scan_interval=3600)
+        patcher = mock.patch(
+            "waldur_site_agent.event_processing.utils.RECONCILIATION_TRACKER", self.tracker
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_first_pass_is_a_full_scan(self):
+        """Without a watermark the pass covers every object."""
+        reconciliation_pass = self.tracker.begin("offering", "order")
+
+        self.assertIsNone(reconciliation_pass.modified_after)
+
+    def test_full_scan_is_repeated_after_the_interval(self):
+        """A full scan is due again once the full scan interval passed."""
+        covered_until = datetime.datetime.now(tz=datetime.timezone.utc)
+        self.tracker.complete(
+            "offering", "order", self.tracker.begin("offering", "order"), covered_until
+        )
+
+        incremental = self.tracker.begin("offering", "order")
+        self.assertEqual(incremental.modified_after, covered_until - WATERMARK_OVERLAP)
+
+        with mock.patch(
+            "waldur_site_agent.event_processing.reconciliation_tracker.time.monotonic",
+            return_value=10**9,
+        ):
+            self.assertIsNone(self.tracker.begin("offering", "order").modified_after)
+
+    def test_full_scans_run_every_six_hours_by_default(self):
+        """Passes are incremental by default, with a full scan every 360 minutes."""
+        self.assertEqual(RECONCILIATION_TRACKER.full_scan_interval, 360 * 60)
+
+    def test_disabled_tracker_always_scans_fully(self):
+        """With no full scan interval every pass is a full scan."""
+        tracker = ReconciliationTracker(full_scan_interval=0)
+        covered_until = datetime.datetime.now(tz=datetime.timezone.utc)
+        tracker.complete("offering", "order", tracker.begin("offering", "order"), covered_until)
+
+        self.assertIsNone(tracker.begin("offering", "order").modified_after)
+
+    @mock.patch(
+        "waldur_site_agent.event_processing.utils.common_processors.OfferingOrderProcessor"
+    )
+    @mock.patch("waldur_site_agent.event_processing.utils.marketplace_orders_list")
+    @mock.patch("waldur_site_agent.event_processing.utils.get_client_for_offering")
+    def test_order_pass_queries_changes_since_previous_pass(
+        self, mock_get_client, mock_orders_list, mock_processor_cls
+    ):
+        """After a full scan, every order that became stuck since the watermark is processed."""
+        offering = _make_offering(order_processing_backend="slurm")
+        handled_order = mock.Mock(uuid=uuid.uuid4())
+        stuck_order = mock.Mock(uuid=uuid.uuid4())
+        mock_orders_list.sync_all.return_value = []
+        utils.run_periodic_order_reconciliation([offering], "agent")
+        self.assertIs(mock_orders_list.sync_all.call_args.kwargs["modified"], UNSET)
+
+        mock_orders_list.sync_all.return_value = [handled_order, stuck_order]
+        utils.run_periodic_order_reconciliation([offering], "agent")
+
+        call_kwargs = mock_orders_list.sync_all.call_args.kwargs
+        self.assertLess(call_kwargs["modified"], call_kwargs["modified_before"])
+        process_order = mock_processor_cls.return_value.process_order_with_retries
+        self.assertEqual(
+            [call.args[0] for call in process_order.call_args_list],
+            [handled_order, stuck_order],
+        )
+
+    @mock.patch(
+        "waldur_site_agent.event_processing.utils.common_processors.OfferingOrderProcessor"
+    )
+    @mock.patch("waldur_site_agent.event_processing.utils.marketplace_orders_list")
+    @mock.patch("waldur_site_agent.event_processing.utils.get_client_for_offering")
+    def test_failed_order_holds_the_watermark(
+        self, mock_get_client, mock_orders_list, mock_processor_cls
+    ):
+        """The watermark is not moved past an order the pass failed to process."""
+        offering = _make_offering(order_processing_backend="slurm")
+        failed_modified = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        failed_order = mock.Mock(uuid=uuid.uuid4(), modified=failed_modified)
+        processed_order = mock.Mock(uuid=uuid.uuid4())
+        mock_orders_list.sync_all.return_value = [failed_order, processed_order]
+        mock_processor_cls.return_value.process_order_with_retries.side_effect = [False, True]
+
+        utils.run_periodic_order_reconciliation([offering], "agent")
+
+        self.assertEqual(
+            self.tracker.begin(offering.uuid, "order").modified_after,
+            failed_modified - WATERMARK_OVERLAP,
+        )
+
+    @mock.patch(
+        "waldur_site_agent.event_processing.utils.common_processors.OfferingOrderProcessor"
+    )
+    @mock.patch("waldur_site_agent.event_processing.utils.marketplace_orders_list")
+    @mock.patch("waldur_site_agent.event_processing.utils.get_client_for_offering")
+    def test_failed_listing_keeps_the_watermark(
+        self, mock_get_client, mock_orders_list, mock_processor_cls
+    ):
+        """A pass that did not finish leaves the watermark where it was."""
+        offering = _make_offering(order_processing_backend="slurm")
+        mock_orders_list.sync_all.side_effect = RuntimeError("Waldur unavailable")
+
+        utils.run_periodic_order_reconciliation([offering], "agent")
+
+        self.assertIsNone(self.tracker.begin(offering.uuid, "order").modified_after)
+
+    @mock.patch("waldur_site_agent.event_processing.utils.common_utils.update_offering_users")
+    @mock.patch("waldur_site_agent.event_processing.utils.marketplace_offering_users_list")
+    @mock.patch("waldur_site_agent.event_processing.utils.get_client_for_offering")
+    def test_offering_user_pass_queries_changes_since_previous_pass(
+        self, mock_get_client, mock_users_list, mock_update
+    ):
+        """After a full scan, only offering users modified since the previous pass are fetched."""
+        offering = _make_offering(membership_sync_backend="slurm")
+        mock_users_list.sync_all.return_value = []
+        before = datetime.datetime.now(tz=datetime.timezone.utc)
+
+        utils.run_periodic_offering_user_reconciliation([offering], "agent")
+        utils.run_periodic_offering_user_reconciliation([offering], "agent")
+
+        first, second = mock_users_list.sync_all.call_args_list
+        self.assertIs(first.kwargs["modified"], UNSET)
+        self.assertGreaterEqual(second.kwargs["modified"], before - WATERMARK_OVERLAP)
+
+    @mock.patch("waldur_site_agent.event_processing.utils.common_utils.update_offering_users")
+    @mock.patch("waldur_site_agent.event_processing.utils.marketplace_offering_users_list")
+    @mock.patch("waldur_site_agent.event_processing.utils.get_client_for_offering")
+    def test_user_without_username_holds_the_watermark(
+        self, mock_get_client, mock_users_list, mock_update
+    ):
+        """Users still without a username after the pass are fetched again by the next one."""
+        offering = _make_offering(membership_sync_backend="slurm")
+        stuck_modified = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        stuck_user = mock.Mock(username="", modified=stuck_modified)
+        resolved_user = mock.Mock(username="alice")
+        mock_users_list.sync_all.return_value = [stuck_user, resolved_user]
+
+        utils.run_periodic_offering_user_reconciliation([offering], "agent")
+
+        self.assertEqual(
+            self.tracker.begin(offering.uuid, "offering_user").modified_after,
+            stuck_modified - WATERMARK_OVERLAP,
+        )
+
+
+class TestRunInitialOfferingProcessing(unittest.TestCase):
+    """Tests for run_initial_offering_processing function."""
+
+    @mock.patch("waldur_site_agent.event_processing.utils.process_offering")
+    def test_offerings_are_processed_concurrently(self, mock_process_offering):
+        """With several workers, a slow offering does not hold back the others."""
+        offerings = [
+            _make_offering(name=f"offering-{index}", stomp_enabled=True) for index in range(3)
+        ]
+        barrier = threading.Barrier(3, timeout=5)
+        mock_process_offering.side_effect = lambda *args, **kwargs: barrier.wait()
+
+        utils.run_initial_offering_processing(offerings, "agent", max_workers=3)
+
+        self.assertEqual(mock_process_offering.call_count, 3)
+
+    @mock.patch("waldur_site_agent.event_processing.utils.process_offering")
+    def test_failing_offering_does_not_stop_the_others(self, mock_process_offering):
+        """Errors are logged per offering, STOMP-disabled offerings are skipped."""
+        failing = _make_offering(name="failing", stomp_enabled=True)
+        working = _make_offering(name="working", stomp_enabled=True)
+        disabled = _make_offering(name="disabled")
+        mock_process_offering.side_effect = [RuntimeError("backend down"), None]
+
+        utils.run_initial_offering_processing([failing, working, disabled], "agent")
+
+        processed = [call.args[0] for call in mock_process_offering.call_args_list]
+        self.assertEqual(processed, [failing, working])
+
+    @mock.patch("waldur_site_agent.event_processing.utils.agent_identity_management")
+    @mock.patch("waldur_site_agent.event_processing.utils.get_client_for_offering")
+    @mock.patch("waldur_site_agent.event_processing.utils.common_processors")
+    def test_orders_and_membership_can_be_processed_separately(
+        self, mock_processors, mock_get_client, mock_identity_management
+    ):
+        """The order pass runs alone before subscribing, the membership sync afterwards."""
+        offering = _make_offering(
+            stomp_enabled=True,
+            order_processing_backend="slurm",
+            membership_sync_backend="slurm",
+        )
+        order_processor = mock_processors.OfferingOrderProcessor.return_value
+        membership_processor = mock_processors.OfferingMembershipProcessor.return_value
+
+        utils.process_offering(offering, "agent", process_membership=False)
+
+        order_processor.process_offering.assert_called_once_with()
+        membership_processor.process_offering.assert_not_called()
+
+        order_processor.reset_mock()
+        utils.process_offering(offering, "agent", process_orders=False)
+
+        order_processor.process_offering.assert_not_called()
+        membership_processor.process_offering.assert_called_once_with()
+
+
 class TestMainLoopTimers(unittest.TestCase):
     """Tests for the event processing main loop timer logic."""
 
@@ -422,6 +652,10 @@ class TestMainLoopTimers(unittest.TestCase):
         config.waldur_offerings = [mock.Mock()]
         config.waldur_user_agent = "test-agent"
         config.expose_backend_error_details = True
+        config.event_dispatch = common_structures.EventDispatchConfig()
+        config.event_retry = common_structures.EventRetryConfig()
+        config.offering_workers = common_structures.OfferingWorkersConfig()
+        config.background_initial_processing = False
 
         # time.time() must exceed both HEALTH_CHECK_INTERVAL (1800) and
         # RECONCILIATION_INTERVAL (3600) since last_* starts at 0.0
@@ -452,6 +686,10 @@ class TestMainLoopTimers(unittest.TestCase):
         config.waldur_offerings = [mock.Mock()]
         config.waldur_user_agent = "test-agent"
         config.expose_backend_error_details = True
+        config.event_dispatch = common_structures.EventDispatchConfig()
+        config.event_retry = common_structures.EventRetryConfig()
+        config.offering_workers = common_structures.OfferingWorkersConfig()
+        config.background_initial_processing = False
 
         first_tick = 5000.0  # Exceeds both intervals, triggers on first tick
         second_tick = first_tick + 60  # 1 minute later — well within 30-min interval
@@ -480,6 +718,10 @@ class TestMainLoopTimers(unittest.TestCase):
         config.waldur_offerings = [mock.Mock()]
         config.waldur_user_agent = "test-agent"
         config.expose_backend_error_details = True
+        config.event_dispatch = common_structures.EventDispatchConfig()
+        config.event_retry = common_structures.EventRetryConfig()
+        config.offering_workers = common_structures.OfferingWorkersConfig()
+        config.background_initial_processing = False
 
         # Make start_stomp_consumers raise to exit early
         mock_utils.run_initial_offering_processing.return_value = None
@@ -492,6 +734,50 @@ class TestMainLoopTimers(unittest.TestCase):
             config.waldur_offerings,
             config.waldur_user_agent,
             expose_backend_error_details=True,
+            max_workers=1,
+        )
+
+    @mock.patch("waldur_site_agent.event_processing.main.threading")
+    @mock.patch("waldur_site_agent.event_processing.main.time")
+    @mock.patch("waldur_site_agent.event_processing.main.utils")
+    @mock.patch("waldur_site_agent.event_processing.main.common_utils")
+    def test_background_initial_processing_starts_after_subscribing(
+        self, mock_common_utils, mock_utils, mock_time, mock_threading
+    ):
+        """With background initial processing, only the orders are processed before subscribing."""
+        from waldur_site_agent.event_processing import main
+
+        config = mock.Mock(spec=common_structures.WaldurAgentConfiguration)
+        config.waldur_offerings = [mock.Mock()]
+        config.waldur_user_agent = "test-agent"
+        config.expose_backend_error_details = True
+        config.event_dispatch = common_structures.EventDispatchConfig()
+        config.event_retry = common_structures.EventRetryConfig()
+        config.offering_workers = common_structures.OfferingWorkersConfig(event_process=4)
+        config.background_initial_processing = True
+        mock_utils.signal_handling.side_effect = RuntimeError("stop")
+
+        with self.assertRaises(SystemExit):
+            main.start(config)
+
+        mock_utils.run_initial_offering_processing.assert_called_once_with(
+            config.waldur_offerings,
+            config.waldur_user_agent,
+            expose_backend_error_details=True,
+            max_workers=4,
+            process_membership=False,
+        )
+        mock_utils.start_stomp_consumers.assert_called_once()
+        target = mock_threading.Thread.call_args.kwargs["target"]
+        mock_threading.Thread.return_value.start.assert_called_once()
+        mock_utils.run_initial_offering_processing.reset_mock()
+        target()
+        mock_utils.run_initial_offering_processing.assert_called_once_with(
+            config.waldur_offerings,
+            config.waldur_user_agent,
+            expose_backend_error_details=True,
+            max_workers=4,
+            process_orders=False,
         )
 
     @mock.patch("waldur_site_agent.event_processing.main.time")
@@ -507,6 +793,10 @@ class TestMainLoopTimers(unittest.TestCase):
         config.waldur_offerings = [mock.Mock()]
         config.waldur_user_agent = "test-agent"
         config.expose_backend_error_details = True
+        config.event_dispatch = common_structures.EventDispatchConfig()
+        config.event_retry = common_structures.EventRetryConfig()
+        config.offering_workers = common_structures.OfferingWorkersConfig()
+        config.background_initial_processing = False
 
         stomp_map = {"key": "value"}
         mock_utils.start_stomp_consumers.return_value = stomp_map
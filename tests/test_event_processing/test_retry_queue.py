@@ -0,0 +1,195 @@
+"""Tests for acknowledged STOMP consumption with the on-disk retry queue."""
+
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from waldur_site_agent.event_processing.dispatcher import MessageDispatcher
+from waldur_site_agent.event_processing.listener import WaldurListener
+from waldur_site_agent.event_processing.retry_queue import (
+    EventRetryQueue,
+    mark_failed,
+    take_delivery_error,
+)
+
+QUEUE = "subscription_x_offering_y_resource"
+
+
+class RetryQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.retry_queue = self._make_queue()
+
+    def tearDown(self):
+        self.retry_queue.stop()
+
+    def _make_queue(self, **kwargs):
+        options = {"max_size": 100, "max_attempts": 3, "initial_delay": 0, "max_delay": 0}
+        options.update(kwargs)
+        return EventRetryQueue(str(Path(self.tmp_dir.name) / "retry.sqlite3"), **options)
+
+
+class TestEventRetryQueue(RetryQueueTestCase):
+    def test_successful_retry_removes_the_message(self):
+        handle = mock.Mock()
+        self.retry_queue.register_route(QUEUE, handle)
+        self.retry_queue.push(QUEUE, '{"resource_uuid": "r1"}', RuntimeError("boom"))
+
+        assert self.retry_queue.retry_due() == 1
+
+        handle.assert_called_once_with('{"resource_uuid": "r1"}')
+        assert len(self.retry_queue) == 0
+
+    def test_reported_failure_reschedules_until_dropped(self):
+        self.retry_queue.register_route(QUEUE, lambda body: mark_failed(RuntimeError("again")))
+        self.retry_queue.push(QUEUE, "{}", RuntimeError("boom"))
+
+        self.retry_queue.retry_due()
+        self.retry_queue.retry_due()
+        assert [entry.attempts for entry in self.retry_queue.due()] == [2]
+
+        self.retry_queue.retry_due()
+        assert len(self.retry_queue) == 0
+
+    def test_messages_wait_for_their_backoff(self):
+        retry_queue = self._make_queue(initial_delay=60, max_delay=600)
+        retry_queue.push(QUEUE, "{}", RuntimeError("boom"))
+
+        assert retry_queue.due() == []
+        assert len(retry_queue) == 1
+        assert retry_queue._delay(5) == 600
+        retry_queue.stop()
+
+    def test_full_queue_drops_the_oldest_message(self):
+        retry_queue = self._make_queue(max_size=2)
+        for index in range(3):
+            retry_queue.push(QUEUE, f'{{"n": {index}}}', RuntimeError("boom"))
+
+        assert [entry.body for entry in retry_queue.due()] == ['{"n": 1}', '{"n": 2}']
+        retry_queue.stop()
+
+    def test_messages_survive_a_restart(self):
+        self.retry_queue.push(QUEUE, "{}", RuntimeError("boom"))
+        self.retry_queue.stop()
+
+        self.retry_queue = self._make_queue()
+        assert len(self.retry_queue) == 1
+
+    def test_message_without_route_is_rescheduled(self):
+        self.retry_queue.push(QUEUE, "{}", RuntimeError("boom"))
+
+        assert self.retry_queue.retry_due() == 0
+        assert [entry.attempts for entry in self.retry_queue.due()] == [1]
+
+
+class TestAcknowledgedListener(RetryQueueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.conn = mock.Mock()
+        self.callback = mock.Mock()
+        self.offering = mock.Mock()
+        self.listener = WaldurListener(
+            self.conn,
+            QUEUE,
+            "user",
+            "password",
+            self.callback,
+            self.offering,
+            "agent",
+            retry_queue=self.retry_queue,
+        )
+        self.frame = mock.Mock(body="{}", headers={"subscription": QUEUE, "ack": "ack-1"})
+
+    def tearDown(self):
+        take_delivery_error()
+        super().tearDown()
+
+    def test_subscribes_with_client_individual_acks(self):
+        self.listener.on_connected(mock.Mock())
+
+        assert self.conn.subscribe.call_args.kwargs["ack"] == "client-individual"
+
+    def test_handled_message_is_acknowledged(self):
+        self.listener.on_message(self.frame)
+
+        self.conn.ack.assert_called_once_with("ack-1")
+        assert len(self.retry_queue) == 0
+
+    def test_failed_message_is_stored_before_the_ack(self):
+        self.callback.side_effect = lambda *args: mark_failed(RuntimeError("backend down"))
+
+        self.listener.on_message(self.frame)
+
+        self.conn.ack.assert_called_once_with("ack-1")
+        assert len(self.retry_queue) == 1
+
+    def test_message_is_returned_when_it_cannot_be_stored(self):
+        self.callback.side_effect = RuntimeError("backend down")
+        self.retry_queue.push = mock.Mock(side_effect=OSError("disk full"))
+
+        self.listener.on_message(self.frame)
+
+        self.conn.nack.assert_called_once_with("ack-1")
+        self.conn.ack.assert_not_called()
+
+    def test_stored_message_is_retried_through_the_listener(self):
+        self.callback.side_effect = [RuntimeError("backend down"), None]
+        self.listener.on_connected(mock.Mock())
+        self.listener.on_message(self.frame)
+
+        assert self.retry_queue.retry_due() == 1
+
+        frame = self.callback.call_args.args[0]
+        assert frame.body == "{}"
+        assert frame.headers["destination"] == f"/amq/queue/{QUEUE}"
+        assert len(self.retry_queue) == 0
+
+
+class TestDispatchedRetries(RetryQueueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dispatcher = MessageDispatcher(workers=2, queue_size=10)
+        self.addCleanup(self.dispatcher.shutdown, 5)
+        self.callback = mock.Mock()
+        self.listener = WaldurListener(
+            mock.Mock(),
+            QUEUE,
+            "user",
+            "password",
+            self.callback,
+            mock.Mock(),
+            "agent",
+            dispatcher=self.dispatcher,
+            retry_queue=self.retry_queue,
+        )
+        self.listener.on_connected(mock.Mock())
+        self.body = json.dumps({"resource_uuid": "resource-1"})
+
+    def test_retry_runs_on_the_worker_of_the_message_key(self):
+        threads = []
+        self.callback.side_effect = lambda *args: threads.append(threading.current_thread())
+        self.retry_queue.push(QUEUE, self.body, RuntimeError("backend down"))
+
+        with mock.patch.object(
+            self.dispatcher, "dispatch", wraps=self.dispatcher.dispatch
+        ) as mock_dispatch:
+            assert self.retry_queue.retry_due() == 1
+
+        assert mock_dispatch.call_args.args[0] == "resource-1"
+        assert threads[0].name.startswith("waldur-event-worker-")
+
+    def test_failure_recorded_on_the_worker_reschedules_the_retry(self):
+        self.callback.side_effect = lambda *args: mark_failed(RuntimeError("again"))
+        self.retry_queue.push(QUEUE, self.body, RuntimeError("backend down"))
+
+        assert self.retry_queue.retry_due() == 0
+        assert len(self.retry_queue) == 1
+        assert take_delivery_error() is None
+
+
+if __name__ == "__main__":
+    unittest.main()
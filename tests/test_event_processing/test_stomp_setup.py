@@ -377,6 +377,107 @@ class TestSetupSingleSubscription(unittest.TestCase):
         self.assertIsNone(result)
 
 
+class TestSetupSharedSubscription(unittest.TestCase):
+    """Tests for _setup_shared_stomp_subscription function."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.offering = common_structures.Offering(
+            name="test-offering",
+            waldur_offering_uuid="test-offering-uuid",
+            waldur_api_url="https://waldur.example.com/api/",
+            waldur_api_token="test_token",
+            backend_type="slurm",
+            order_processing_backend="slurm",
+            stomp_shared_connection=True,
+        )
+        self.mock_identity = mock.Mock(spec=AgentIdentity)
+        self.mock_event_subscription = mock.Mock(spec=EventSubscription)
+        self.mock_event_subscription.uuid = uuid.uuid4()
+        self.mock_identity_manager = mock.Mock()
+        self.mock_identity_manager.register_event_subscription.return_value = (
+            self.mock_event_subscription
+        )
+        self.object_types = [
+            ObservableObjectTypeEnum.ORDER,
+            ObservableObjectTypeEnum.USER_ROLE,
+            ObservableObjectTypeEnum.RESOURCE,
+        ]
+
+    @mock.patch("waldur_site_agent.event_processing.utils.EventSubscriptionManager")
+    def test_all_object_types_share_one_connection(self, mock_esm_class):
+        """Test one subscription and connection carry the queues of all object types."""
+        mock_connection = mock.Mock()
+        mock_esm = mock_esm_class.return_value
+        mock_esm.setup_stomp_connection.return_value = mock_connection
+        mock_esm.start_stomp_connection.return_value = True
+
+        result = utils._setup_shared_stomp_subscription(
+            self.offering,
+            self.mock_identity,
+            self.mock_identity_manager,
+            "test-agent",
+            self.object_types,
+        )
+
+        self.assertEqual(result, (mock_connection, self.mock_event_subscription, self.offering))
+        self.mock_identity_manager.register_event_subscription.assert_called_once_with(
+            self.mock_identity, ObservableObjectTypeEnum.ORDER
+        )
+        self.assertEqual(
+            self.mock_identity_manager.create_event_subscription_queue.call_count, 3
+        )
+        mock_esm.setup_stomp_connection.assert_called_once()
+        self.assertEqual(
+            [call.args[2] for call in mock_esm.add_stomp_subscription.call_args_list],
+            [ObservableObjectTypeEnum.USER_ROLE, ObservableObjectTypeEnum.RESOURCE],
+        )
+        mock_esm.start_stomp_connection.assert_called_once()
+
+    @mock.patch("waldur_site_agent.event_processing.utils.EventSubscriptionManager")
+    def test_object_type_without_queue_is_not_routed(self, mock_esm_class):
+        """Test object types whose queue creation failed are skipped."""
+        self.mock_identity_manager.create_event_subscription_queue.side_effect = [
+            mock.Mock(),
+            None,
+            mock.Mock(),
+        ]
+        mock_esm = mock_esm_class.return_value
+        mock_esm.start_stomp_connection.return_value = True
+
+        result = utils._setup_shared_stomp_subscription(
+            self.offering,
+            self.mock_identity,
+            self.mock_identity_manager,
+            "test-agent",
+            self.object_types,
+        )
+
+        self.assertIsNotNone(result)
+        self.assertEqual(
+            [call.args[2] for call in mock_esm.add_stomp_subscription.call_args_list],
+            [ObservableObjectTypeEnum.RESOURCE],
+        )
+
+    @mock.patch("waldur_site_agent.event_processing.utils._setup_single_stomp_subscription")
+    @mock.patch("waldur_site_agent.event_processing.utils._setup_shared_stomp_subscription")
+    @mock.patch("waldur_site_agent.event_processing.utils._register_agent_identity")
+    @mock.patch("waldur_site_agent.event_processing.utils.get_client_for_offering")
+    def test_offering_setup_uses_shared_connection(
+        self, mock_get_client, mock_register_identity, mock_setup_shared, mock_setup_single
+    ):
+        """Test setup_stomp_offering_subscriptions returns the single shared consumer."""
+        mock_register_identity.return_value = (self.mock_identity, self.mock_identity_manager)
+        offering = self.offering.model_copy(update={"order_processing_backend": None})
+        consumer = (mock.Mock(), self.mock_event_subscription, offering)
+        mock_setup_shared.return_value = consumer
+
+        result = utils.setup_stomp_offering_subscriptions(offering, "test-agent")
+
+        self.assertEqual(result, [consumer])
+        mock_setup_single.assert_not_called()
+
+
 class TestSetupStompSubscriptionsIntegration(unittest.TestCase):
     """Integration tests for setup_stomp_offering_subscriptions function."""
 
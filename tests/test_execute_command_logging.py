@@ -1,6 +1,7 @@
-"""Tests for BaseClient.execute_command() error surfacing."""
+"""Tests for BaseClient.execute_command() error surfacing and BaseClient.stream_command()."""
 
 import subprocess
+import sys
 from unittest.mock import patch
 
 import pytest
@@ -54,3 +55,22 @@ class TestExecuteCommandErrorLogging:
 
         mock_logger.exception.assert_not_called()
         assert "some backend error" in str(exc_info.value)
+
+
+class TestStreamCommand:
+    """stream_command yields the output lines and raises with the error output on failure."""
+
+    def test_yields_output_lines(self):
+        command = [sys.executable, "-c", "print('a|1'); print('b|2')"]
+
+        assert list(BaseClient().stream_command(command)) == ["a|1\n", "b|2\n"]
+
+    def test_failure_raises_with_error_output(self):
+        command = [sys.executable, "-c", "import sys; print('partial'); sys.exit('sacct: error')"]
+
+        with pytest.raises(BackendError, match="sacct: error"):
+            list(BaseClient().stream_command(command))
+
+    def test_missing_binary_raises_backend_error(self):
+        with pytest.raises(BackendError, match="Command not found"):
+            list(BaseClient().stream_command(["/nonexistent/sacct"]))
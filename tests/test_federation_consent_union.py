@@ -11,6 +11,7 @@ teams across all resources in the source project.
 
 from __future__ import annotations
 
+import threading
 import uuid
 from unittest import mock
 
@@ -70,6 +71,7 @@ def _make_federation_processor():
     processor.resource_backend.user_resolve_method = "identity_bridge"
     processor.resource_backend.handled_resource_states = [ResourceState.OK]
     processor._team_cache = {}
+    processor._cache_lock = threading.RLock()
     return processor
 
 
@@ -0,0 +1,72 @@
+"""Tests for membership-only resource pulls that skip usage collection."""
+
+import unittest
+from unittest import mock
+
+from waldur_site_agent.backend.backends import BaseBackend
+from waldur_site_agent.backend.structures import ClientResource
+
+
+class TestMembershipOnlyPull(unittest.TestCase):
+    """BaseBackend.pull_resources with include_usage=False."""
+
+    def setUp(self):
+        self.backend = mock.Mock(spec=BaseBackend)
+        self.backend.client = mock.Mock()
+        self.backend.backend_components = {"cpu": {}}
+        self.backend.client.get_resource.return_value = ClientResource(name="alloc-1")
+        self.backend.client.list_resource_users.return_value = ["user-1", "user-2"]
+        self.backend._get_usage_report.return_value = {}
+        # Route the instance hooks back to the real implementations
+        for name in (
+            "pull_resource",
+            "pull_resource_users",
+            "_pull_backend_resource",
+            "_pull_backend_resource_users",
+        ):
+            setattr(
+                self.backend,
+                name,
+                getattr(BaseBackend, name).__get__(self.backend),
+            )
+        self.waldur_resource = mock.Mock()
+        self.waldur_resource.backend_id = "alloc-1"
+
+    def _call(self, include_usage):
+        return BaseBackend.pull_resources(
+            self.backend, [self.waldur_resource], include_usage=include_usage
+        )
+
+    def test_membership_only_pull_skips_usage_report(self):
+        self.backend.supports_membership_only_pull = True
+
+        report = self._call(include_usage=False)
+
+        self.backend._get_usage_report.assert_not_called()
+        _, backend_resource_info = report["alloc-1"]
+        self.assertEqual(backend_resource_info.users, ["user-1", "user-2"])
+        self.assertEqual(backend_resource_info.usage, {})
+
+    def test_full_pull_collects_usage(self):
+        self.backend.supports_membership_only_pull = True
+
+        report = self._call(include_usage=True)
+
+        self.backend._get_usage_report.assert_called_once_with(["alloc-1"])
+        _, backend_resource_info = report["alloc-1"]
+        self.assertEqual(backend_resource_info.users, ["user-1", "user-2"])
+        self.assertEqual(backend_resource_info.usage, {"TOTAL_ACCOUNT_USAGE": {"cpu": 0}})
+
+    def test_backend_without_support_pulls_everything(self):
+        self.backend.supports_membership_only_pull = False
+
+        self._call(include_usage=False)
+
+        self.backend._get_usage_report.assert_called_once_with(["alloc-1"])
+
+    def test_missing_resource_is_absent_from_report(self):
+        self.backend.supports_membership_only_pull = True
+        self.backend.client.get_resource.return_value = None
+
+        self.assertEqual(self._call(include_usage=False), {})
+        self.backend.client.list_resource_users.assert_not_called()
@@ -0,0 +1,142 @@
+"""Tests for the in-process metrics and their Prometheus endpoint."""
+
+import subprocess
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+import pytest
+
+from waldur_site_agent.backend.clients import (
+    BACKEND_COMMAND_FAILURES,
+    BACKEND_COMMAND_SECONDS,
+    BaseClient,
+)
+from waldur_site_agent.backend.exceptions import BackendError
+from waldur_site_agent.common import metrics
+from waldur_site_agent.event_processing.listener import (
+    EVENT_HANDLER_SECONDS,
+    EVENT_MESSAGES,
+    WaldurListener,
+)
+from waldur_site_agent.event_processing.retry_queue import mark_failed
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = metrics.MetricsRegistry()
+
+    def test_counter_renders_labelled_samples(self):
+        counter = self.registry.register(
+            metrics.Counter("test_events_total", "Events", ("kind",))
+        )
+        counter.inc(kind="a")
+        counter.inc(2, kind='quoted "b"')
+
+        output = self.registry.render()
+
+        assert "# TYPE test_events_total counter" in output
+        assert 'test_events_total{kind="a"} 1.0' in output
+        assert 'test_events_total{kind="quoted \\"b\\""} 2.0' in output
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = self.registry.register(
+            metrics.Histogram("test_duration_seconds", "Duration", buckets=(1, 5))
+        )
+        for value in (0.5, 3, 10):
+            histogram.observe(value)
+
+        lines = self.registry.render().splitlines()
+
+        assert 'test_duration_seconds_bucket{le="1.0"} 1' in lines
+        assert 'test_duration_seconds_bucket{le="5.0"} 2' in lines
+        assert 'test_duration_seconds_bucket{le="+Inf"} 3' in lines
+        assert "test_duration_seconds_sum 13.5" in lines
+        assert "test_duration_seconds_count 3" in lines
+
+    def test_timer_observes_failing_calls(self):
+        histogram = metrics.Histogram("test_call_seconds", "Calls", ("name",))
+
+        @histogram.time(name="failing")
+        def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            fail()
+
+        assert histogram.count(name="failing") == 1
+
+    def test_wrong_labels_are_rejected(self):
+        counter = metrics.Counter("test_total", "Test", ("kind",))
+
+        with pytest.raises(ValueError):
+            counter.inc(other="a")
+
+    def test_registering_a_name_twice_returns_the_first_metric(self):
+        first = self.registry.register(metrics.Gauge("test_depth", "Depth"))
+
+        assert self.registry.register(metrics.Gauge("test_depth", "Depth")) is first
+
+    def test_metric_types_must_render_their_samples(self):
+        with pytest.raises(TypeError):
+            metrics.Metric("test_base", "Base")
+
+
+class TestMetricsServer(unittest.TestCase):
+    def setUp(self):
+        self.server = metrics.start_metrics_server("127.0.0.1", 0)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def test_metrics_are_served(self):
+        with urllib.request.urlopen(f"{self.url}/metrics", timeout=5) as response:  # noqa: S310
+            body = response.read().decode()
+
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert "waldur_site_agent_event_messages_total" in body
+
+    def test_other_paths_are_not_found(self):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{self.url}/", timeout=5)  # noqa: S310
+
+        assert error.value.code == 404
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_listener_counts_handler_outcomes(self):
+        def on_test_message(frame, offering, user_agent, expose_backend_error_details):
+            if frame.body == '{"fail": true}':
+                mark_failed(RuntimeError("boom"))
+
+        listener = WaldurListener(
+            mock.Mock(), "queue", "user", "password", on_test_message, mock.Mock(), "agent"
+        )
+        successes = EVENT_MESSAGES.value(handler="on_test_message", outcome="success")
+        failures = EVENT_MESSAGES.value(handler="on_test_message", outcome="failure")
+        handled = EVENT_HANDLER_SECONDS.count(handler="on_test_message")
+
+        listener.on_message(mock.Mock(body="{}", headers={}))
+        listener.on_message(mock.Mock(body='{"fail": true}', headers={}))
+
+        assert EVENT_MESSAGES.value(handler="on_test_message", outcome="success") == successes + 1
+        assert EVENT_MESSAGES.value(handler="on_test_message", outcome="failure") == failures + 1
+        assert EVENT_HANDLER_SECONDS.count(handler="on_test_message") == handled + 2
+
+    @mock.patch("waldur_site_agent.backend.clients.subprocess.check_output")
+    def test_backend_commands_are_timed(self, check_output):
+        check_output.side_effect = ["ok", subprocess.CalledProcessError(1, "sacctmgr")]
+        timed = BACKEND_COMMAND_SECONDS.count(command="sacctmgr")
+        failed = BACKEND_COMMAND_FAILURES.value(command="sacctmgr")
+
+        BaseClient.execute_command(mock.Mock(), ["/usr/bin/sacctmgr", "list"])
+        with pytest.raises(BackendError):
+            BaseClient.execute_command(mock.Mock(), ["/usr/bin/sacctmgr", "list"], silent=True)
+
+        assert BACKEND_COMMAND_SECONDS.count(command="sacctmgr") == timed + 2
+        assert BACKEND_COMMAND_FAILURES.value(command="sacctmgr") == failed + 1
+
+
+if __name__ == "__main__":
+    unittest.main()
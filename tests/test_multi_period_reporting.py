@@ -191,6 +191,7 @@ class TestMultiPeriodProcessorFlow(unittest.TestCase):
         self.mock_backend = mock.MagicMock(spec=BaseBackend)
         self.mock_backend.backend_type = "slurm"
         self.mock_backend.supports_decreasing_usage = False
+        self.mock_backend.supports_bulk_usage_report = False
         self.mock_backend.backend_components = {
             "cpu": {"limit": 10, "measured_unit": "k-Hours", "unit_factor": 60000,
                     "accounting_type": "limit", "label": "CPU"},
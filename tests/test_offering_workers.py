@@ -0,0 +1,118 @@
+"""Tests for concurrent per-offering processing in the polling agents."""
+
+import threading
+import unittest
+from unittest import mock
+
+from waldur_site_agent.common import structures as common_structures
+from waldur_site_agent.polling_processing import offering_pool
+
+
+def _offerings(count):
+    offerings = []
+    for index in range(count):
+        offering = mock.Mock()
+        offering.name = f"offering-{index}"
+        offerings.append(offering)
+    return offerings
+
+
+@mock.patch("waldur_site_agent.polling_processing.offering_pool.touch_heartbeat")
+class TestProcessOfferings(unittest.TestCase):
+    """offering_pool.process_offerings with one and several workers."""
+
+    def test_single_worker_runs_sequentially_in_caller_thread(self, mock_touch):
+        offerings = _offerings(3)
+        seen = []
+
+        offering_pool.process_offerings(
+            offerings, lambda offering: seen.append((offering, threading.get_ident())), 1
+        )
+
+        self.assertEqual([offering for offering, _ in seen], offerings)
+        self.assertEqual({thread for _, thread in seen}, {threading.get_ident()})
+        self.assertEqual(mock_touch.call_count, 3)
+
+    def test_offerings_run_concurrently_up_to_worker_limit(self, mock_touch):
+        offerings = _offerings(4)
+        barrier = threading.Barrier(2, timeout=5)
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def process(offering):
+            with lock:
+                running.append(offering)
+                peak.append(len(running))
+            # Only passes if two offerings are in flight at the same time
+            barrier.wait()
+            with lock:
+                running.remove(offering)
+
+        offering_pool.process_offerings(offerings, process, 2)
+
+        self.assertEqual(max(peak), 2)
+        # Touched when each offering starts and when it finishes
+        self.assertEqual(mock_touch.call_count, 8)
+
+    def test_failure_in_one_offering_does_not_stop_others(self, mock_touch):
+        offerings = _offerings(3)
+        processed = []
+
+        def process(offering):
+            if offering is offerings[0]:
+                raise RuntimeError("boom")
+            processed.append(offering)
+
+        offering_pool.process_offerings(offerings, process, 3)
+
+        self.assertCountEqual(processed, offerings[1:])
+
+
+class TestOfferingWorkersConfig(unittest.TestCase):
+    """Configuration of the per-mode worker counts."""
+
+    def test_defaults_to_sequential_processing(self):
+        configuration = common_structures.WaldurAgentConfiguration()
+        self.assertEqual(configuration.offering_workers.order_process, 1)
+        self.assertEqual(configuration.offering_workers.report, 1)
+        self.assertEqual(configuration.offering_workers.membership_sync, 1)
+
+    def test_root_configuration_passes_workers_through(self):
+        root = common_structures.RootConfiguration(offerings=[], offering_workers={"report": 4})
+        workers = root.to_agent_configuration().offering_workers
+        self.assertEqual(workers.report, 4)
+        self.assertEqual(workers.membership_sync, 1)
+
+    def test_rejects_non_positive_worker_count(self):
+        with self.assertRaises(ValueError):
+            common_structures.OfferingWorkersConfig(report=0)
+
+
+class TestReportAgentUsesPool(unittest.TestCase):
+    """agent_report._process_offerings hands the offerings to the pool."""
+
+    @mock.patch("waldur_site_agent.polling_processing.agent_report._process_offering")
+    @mock.patch("waldur_site_agent.polling_processing.offering_pool.touch_heartbeat")
+    def test_uses_report_worker_count(self, mock_touch, mock_process_offering):
+        from waldur_site_agent.polling_processing.agent_report import _process_offerings
+
+        configuration = mock.Mock()
+        configuration.waldur_offerings = _offerings(3)
+        configuration.offering_workers = common_structures.OfferingWorkersConfig(report=3)
+        registry = mock.Mock()
+
+        with mock.patch.object(
+            offering_pool, "process_offerings", wraps=offering_pool.process_offerings
+        ) as mock_pool:
+            _process_offerings(configuration, registry)
+
+        self.assertEqual(mock_pool.call_args.args[2], 3)
+        self.assertEqual(mock_process_offering.call_count, 3)
+        mock_process_offering.assert_any_call(
+            configuration.waldur_offerings[0], registry=registry
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -219,6 +219,13 @@ class TestMockBackend:
         assert "user2" in info.users
         assert "user1" not in info.users
 
+        # Membership-only pull, as done by membership sync
+        self.backend._created_resources["lifecycle-test-id"].usage = {"TOTAL_ACCOUNT_USAGE": {}}
+        pulled = self.backend.pull_resources([waldur_resource], include_usage=False)
+        _, membership_info = pulled["lifecycle-test-id"]
+        assert membership_info.users == info.users
+        assert membership_info.usage == {}
+
         # Delete resource
         self.backend.delete_resource(waldur_resource)
 
@@ -0,0 +1,93 @@
+"""Tests for fetching paginated Waldur listings."""
+
+import threading
+import unittest
+from unittest import mock
+
+from waldur_site_agent.common import utils
+
+
+def _listing(total, page_size, with_count=True, gate=None):
+    """Fake sync_detailed serving ``total`` integers in pages."""
+    calls = []
+
+    def api_function(*, client, page, page_size, **kwargs):
+        calls.append((page, kwargs))
+        if gate is not None and page > 1:
+            gate.wait()
+        start = (page - 1) * page_size
+        items = list(range(start, min(start + page_size, total)))
+        headers = {"X-Result-Count": str(total)} if with_count else {}
+        return mock.Mock(parsed=items, headers=headers)
+
+    return api_function, calls
+
+
+class TestIterPaginated(unittest.TestCase):
+    def test_pages_are_yielded_in_order(self):
+        api_function, calls = _listing(total=25, page_size=10)
+
+        items = list(utils.iter_paginated(api_function, mock.Mock(), page_size=10, state="OK"))
+
+        assert items == list(range(25))
+        assert sorted(page for page, _ in calls) == [1, 2, 3]
+        assert all(kwargs == {"state": "OK"} for _, kwargs in calls)
+
+    def test_remaining_pages_are_fetched_concurrently(self):
+        # Pages 2 and 3 only return once both are in flight
+        gate = threading.Barrier(2, timeout=5)
+        api_function, _ = _listing(total=25, page_size=10, gate=gate)
+
+        items = utils.get_all_paginated(api_function, mock.Mock(), page_size=10, max_workers=2)
+
+        assert items == list(range(25))
+
+    def test_items_added_during_the_listing_are_fetched(self):
+        total = [25]
+
+        def api_function(*, client, page, page_size):
+            start = (page - 1) * page_size
+            items = list(range(start, min(start + page_size, total[0])))
+            headers = {"X-Result-Count": str(total[0])}
+            # Items are added once the first page was counted
+            total[0] = 45
+            return mock.Mock(parsed=items, headers=headers)
+
+        items = utils.get_all_paginated(api_function, mock.Mock(), page_size=10, max_workers=2)
+
+        assert items == list(range(45))
+
+    def test_full_last_page_is_followed_by_another_request(self):
+        api_function, calls = _listing(total=30, page_size=10)
+
+        items = utils.get_all_paginated(api_function, mock.Mock(), page_size=10, max_workers=2)
+
+        assert items == list(range(30))
+        assert sorted(page for page, _ in calls) == [1, 2, 3, 4]
+
+    def test_without_result_count_pages_are_fetched_sequentially(self):
+        api_function, calls = _listing(total=20, page_size=10, with_count=False)
+
+        items = utils.get_all_paginated(api_function, mock.Mock(), page_size=10)
+
+        assert items == list(range(20))
+        assert [page for page, _ in calls] == [1, 2, 3]
+
+    def test_single_page_listing_makes_one_request(self):
+        api_function, calls = _listing(total=3, page_size=10)
+
+        assert utils.get_all_paginated(api_function, mock.Mock(), page_size=10) == [0, 1, 2]
+        assert len(calls) == 1
+
+    def test_caller_can_stop_before_the_last_page(self):
+        api_function, _ = _listing(total=1000, page_size=10)
+
+        iterator = utils.iter_paginated(api_function, mock.Mock(), page_size=10, max_workers=2)
+        first_items = [next(iterator) for _ in range(15)]
+        iterator.close()
+
+        assert first_items == list(range(15))
+
+
+if __name__ == "__main__":
+    unittest.main()
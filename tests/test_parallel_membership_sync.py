@@ -0,0 +1,136 @@
+"""Tests for the parallel resource fan-out of membership sync."""
+
+import threading
+import unittest
+import uuid
+from unittest import mock
+
+from waldur_site_agent.backend.backends import BaseBackend
+from waldur_site_agent.common.processors import OfferingMembershipProcessor
+
+PROCESSORS_MODULE = "waldur_site_agent.common.processors"
+
+
+def _make_processor(workers, backend_cap=8):
+    processor = OfferingMembershipProcessor.__new__(OfferingMembershipProcessor)
+    processor.offering = mock.Mock()
+    processor.offering.backend_settings = {"membership_sync_workers": workers}
+    processor.offering.username_reconciliation_enabled = False
+    processor.resource_backend = mock.Mock()
+    processor.resource_backend.max_membership_sync_workers = backend_cap
+    processor.waldur_rest_client = mock.Mock()
+    processor.expose_backend_error_details = True
+    processor._cache_lock = threading.RLock()
+    processor._team_cache = {}
+    processor._refresh_local_offering_users = mock.Mock(return_value=[])
+    processor._sync_user_profiles_to_backend = mock.Mock()
+    return processor
+
+
+def _make_report(count):
+    report = {}
+    for index in range(count):
+        waldur_resource = mock.Mock()
+        waldur_resource.uuid = uuid.uuid4()
+        waldur_resource.backend_id = f"alloc-{index}"
+        report[waldur_resource.backend_id] = (waldur_resource, mock.Mock())
+    return report
+
+
+@mock.patch(f"{PROCESSORS_MODULE}.touch_heartbeat")
+class TestParallelMembershipSync(unittest.TestCase):
+    def test_workers_are_capped_by_backend(self, _):
+        assert _make_processor(8)._membership_sync_workers() == 8
+        assert _make_processor(8, backend_cap=1)._membership_sync_workers() == 1
+        assert _make_processor(8, backend_cap=4)._membership_sync_workers() == 4
+        assert _make_processor(2, backend_cap=4)._membership_sync_workers() == 2
+        assert _make_processor(0)._membership_sync_workers() == 1
+
+    def test_single_worker_syncs_in_order(self, _):
+        processor = _make_processor(1)
+        processor._process_resource_membership = mock.Mock()
+        report = _make_report(3)
+
+        processor._process_resources(report)
+
+        synced = [c.args[0] for c in processor._process_resource_membership.call_args_list]
+        assert synced == [waldur_resource for waldur_resource, _ in report.values()]
+
+    def test_resources_are_synced_concurrently(self, _):
+        processor = _make_processor(2)
+        barrier = threading.Barrier(2, timeout=5)
+        synced = []
+
+        def sync(waldur_resource, *_):
+            # Only passes if two resources are in flight at the same time
+            barrier.wait()
+            synced.append(waldur_resource)
+
+        processor._process_resource_membership = sync
+        report = _make_report(4)
+
+        processor._process_resources(report)
+
+        assert len(synced) == 4
+
+    def test_backends_are_synced_sequentially_by_default(self, _):
+        processor = _make_processor(4, backend_cap=BaseBackend.max_membership_sync_workers)
+
+        assert processor._membership_sync_workers() == 1
+
+    def test_team_cache_is_shared_by_the_workers(self, _):
+        processor = _make_processor(4)
+        project_uuid = uuid.uuid4()
+        resources = [mock.Mock(project_uuid=project_uuid) for _ in range(8)]
+        team = [mock.Mock()]
+
+        with mock.patch(
+            f"{PROCESSORS_MODULE}.marketplace_provider_resources_team_list"
+        ) as mock_team_list:
+            mock_team_list.sync.return_value = team
+            threads = [
+                threading.Thread(target=processor._get_waldur_resource_team, args=(resource,))
+                for resource in resources
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert processor._team_cache == {project_uuid.hex: team}
+
+    @mock.patch(f"{PROCESSORS_MODULE}.utils.mark_waldur_resources_as_erred")
+    @mock.patch(f"{PROCESSORS_MODULE}.marketplace_provider_resources_refresh_last_sync")
+    def test_failing_resource_is_marked_erred_without_stopping_others(
+        self, mock_refresh, mock_mark_erred, _
+    ):
+        processor = _make_processor(3)
+        report = _make_report(3)
+        failing_resource = next(iter(report.values()))[0]
+        for name in (
+            "_fetch_source_project",
+            "_sync_resource_users",
+            "_sync_resource_service_accounts",
+            "_sync_resource_course_accounts",
+            "_sync_resource_status",
+            "_sync_resource_limits",
+            "_sync_resource_user_limits",
+        ):
+            setattr(processor, name, mock.Mock())
+
+        def sync_status(waldur_resource):
+            if waldur_resource is failing_resource:
+                msg = "backend down"
+                raise RuntimeError(msg)
+
+        processor._sync_resource_status.side_effect = sync_status
+
+        processor._process_resources(report)
+
+        mock_mark_erred.assert_called_once()
+        assert mock_mark_erred.call_args.args[1] == [failing_resource]
+        assert mock_refresh.sync_detailed.call_count == 2
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""Tests for checking the async target orders of a cycle in bulk."""
+
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+from waldur_api_client.models.order_state import OrderState
+
+from waldur_site_agent.backend.exceptions import BackendError
+from waldur_site_agent.common.processors import OfferingOrderProcessor
+
+
+def _order(state=OrderState.EXECUTING, backend_id=""):
+    order = mock.Mock()
+    order.uuid = uuid4()
+    order.state = state
+    order.backend_id = backend_id
+    return order
+
+
+@pytest.fixture()
+def processor():
+    processor = OfferingOrderProcessor.__new__(OfferingOrderProcessor)
+    processor.waldur_rest_client = mock.Mock()
+    processor.offering = mock.Mock()
+    processor.resource_backend = mock.Mock()
+    processor.resource_backend.supports_async_orders = True
+    processor.resource_backend.supports_cycle_preflight = False
+    processor._pending_order_statuses = {}
+    return processor
+
+
+def test_executing_async_orders_are_checked_with_one_call(processor):
+    orders = [
+        _order(backend_id="target-1"),
+        _order(backend_id="target-2"),
+        _order(),
+        _order(state=OrderState.PENDING_PROVIDER, backend_id="external"),
+    ]
+    processor.resource_backend.check_pending_orders.return_value = {"target-1": False}
+
+    with mock.patch(
+        "waldur_site_agent.common.processors.marketplace_orders_list"
+    ) as orders_list, mock.patch.object(processor, "process_order_with_retries"):
+        orders_list.sync_all.return_value = orders
+        processor.process_offering()
+
+    processor.resource_backend.check_pending_orders.assert_called_once_with(
+        ["target-1", "target-2"]
+    )
+    assert processor._pending_order_statuses == {"target-1": False}
+
+
+def test_bulk_status_is_used_once(processor):
+    processor._pending_order_statuses = {"target-1": True}
+    processor.resource_backend.check_pending_order.return_value = False
+    order = _order(backend_id="target-1")
+
+    assert processor._poll_async_target_order(order) is True
+    processor.resource_backend.check_pending_order.assert_not_called()
+
+    # A retry of the order polls the backend again
+    assert processor._poll_async_target_order(order) is False
+    processor.resource_backend.check_pending_order.assert_called_once_with("target-1")
+
+
+def test_orders_left_out_of_the_bulk_check_are_polled_one_by_one(processor):
+    processor._pending_order_statuses = {"target-1": False}
+    processor.resource_backend.check_pending_order.side_effect = BackendError("failed")
+
+    with pytest.raises(BackendError):
+        processor._poll_async_target_order(_order(backend_id="target-2"))
+
+
+def test_failed_bulk_check_falls_back_to_single_checks(processor):
+    processor.resource_backend.check_pending_orders.side_effect = Exception("API error")
+
+    assert processor._check_pending_orders([_order(backend_id="target-1")]) == {}
+
+
+def test_backends_without_async_orders_are_not_checked(processor):
+    processor.resource_backend.supports_async_orders = False
+
+    assert processor._check_pending_orders([_order(backend_id="target-1")]) == {}
+    processor.resource_backend.check_pending_orders.assert_not_called()
+
+
+def test_async_orders_check_processes_only_orders_with_a_backend_id(processor):
+    waiting = _order(backend_id="vm-1")
+    processor.resource_backend.check_pending_orders.return_value = {"vm-1": True}
+
+    with mock.patch(
+        "waldur_site_agent.common.processors.marketplace_orders_list"
+    ) as orders_list, mock.patch.object(processor, "process_order_with_retries") as process:
+        orders_list.sync_all.return_value = [waiting, _order()]
+        processor.process_async_orders()
+
+    assert orders_list.sync_all.call_args.kwargs["state"] == [OrderState.EXECUTING]
+    process.assert_called_once_with(waiting)
+    assert processor._pending_order_statuses == {"vm-1": True}
+
+
+def test_async_orders_check_skips_backends_without_async_orders(processor):
+    processor.resource_backend.supports_async_orders = False
+
+    with mock.patch("waldur_site_agent.common.processors.marketplace_orders_list") as orders_list:
+        processor.process_async_orders()
+
+    orders_list.sync_all.assert_not_called()
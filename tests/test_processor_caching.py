@@ -6,6 +6,7 @@ and that cache invalidation triggers fresh API fetches.
 
 from __future__ import annotations
 
+import threading
 import uuid
 from datetime import datetime, timezone
 from unittest import mock
@@ -115,10 +116,16 @@ def _make_course_account(
     )
 
 
+def _page(items):
+    """A single page of a paginated listing, as returned by sync_detailed."""
+    return mock.Mock(parsed=items, headers={})
+
+
 def _make_processor(cls):
     """Create a processor instance bypassing __init__ and setting minimal attributes."""
     processor = cls.__new__(cls)
     processor._offering_users_cache = None
+    processor._cache_lock = threading.RLock()
     processor.waldur_rest_client = mock.Mock()
     processor.offering = mock.Mock()
     processor.offering.uuid = uuid.uuid4().hex
@@ -152,7 +159,7 @@ class TestOfferingUsersCache:
     def test_second_call_uses_cache(self, mock_api):
         """Second call returns cached result without an additional API call."""
         offering_users = [_make_offering_user("user-01")]
-        mock_api.sync_all.return_value = offering_users
+        mock_api.sync_detailed.return_value = _page(offering_users)
 
         processor = _make_membership_processor()
 
@@ -160,14 +167,14 @@ class TestOfferingUsersCache:
         result2 = processor._get_cached_offering_users()
 
         assert result1 is result2
-        assert mock_api.sync_all.call_count == 1
+        assert mock_api.sync_detailed.call_count == 1
 
     @mock.patch("waldur_site_agent.common.processors.marketplace_offering_users_list")
     def test_invalidation_causes_refetch(self, mock_api):
         """After invalidation the next call makes a fresh API request."""
         first_batch = [_make_offering_user("user-01")]
         second_batch = [_make_offering_user("user-01"), _make_offering_user("user-02")]
-        mock_api.sync_all.side_effect = [first_batch, second_batch]
+        mock_api.sync_detailed.side_effect = [_page(first_batch), _page(second_batch)]
 
         processor = _make_membership_processor()
 
@@ -178,49 +185,49 @@ class TestOfferingUsersCache:
 
         result2 = processor._get_cached_offering_users()
         assert len(result2) == 2
-        assert mock_api.sync_all.call_count == 2
+        assert mock_api.sync_detailed.call_count == 2
 
-    @mock.patch("waldur_site_agent.common.processors.utils")
+    @mock.patch("waldur_site_agent.common.processors.utils.update_offering_users")
     @mock.patch("waldur_site_agent.common.processors.marketplace_offering_users_list")
-    def test_update_offering_users_invalidates_cache(self, mock_api, mock_utils):
+    def test_update_offering_users_invalidates_cache(self, mock_api, mock_update):
         """_update_offering_users invalidates cache when modifications occur."""
         offering_users = [_make_offering_user("user-01")]
-        mock_api.sync_all.return_value = offering_users
-        mock_utils.update_offering_users.return_value = True  # indicates modification
+        mock_api.sync_detailed.return_value = _page(offering_users)
+        mock_update.return_value = True  # indicates modification
 
         processor = _make_membership_processor()
 
         # Populate cache
         processor._get_cached_offering_users()
-        assert mock_api.sync_all.call_count == 1
+        assert mock_api.sync_detailed.call_count == 1
 
         # Trigger update that modifies users
         processor._update_offering_users(offering_users)
 
         # Cache should be invalidated — next call re-fetches
         processor._get_cached_offering_users()
-        assert mock_api.sync_all.call_count == 2
+        assert mock_api.sync_detailed.call_count == 2
 
-    @mock.patch("waldur_site_agent.common.processors.utils")
+    @mock.patch("waldur_site_agent.common.processors.utils.update_offering_users")
     @mock.patch("waldur_site_agent.common.processors.marketplace_offering_users_list")
-    def test_update_offering_users_no_invalidation_when_unchanged(self, mock_api, mock_utils):
+    def test_update_offering_users_no_invalidation_when_unchanged(self, mock_api, mock_update):
         """_update_offering_users does NOT invalidate cache when nothing changed."""
         offering_users = [_make_offering_user("user-01")]
-        mock_api.sync_all.return_value = offering_users
-        mock_utils.update_offering_users.return_value = False  # no modification
+        mock_api.sync_detailed.return_value = _page(offering_users)
+        mock_update.return_value = False  # no modification
 
         processor = _make_membership_processor()
 
         # Populate cache
         processor._get_cached_offering_users()
-        assert mock_api.sync_all.call_count == 1
+        assert mock_api.sync_detailed.call_count == 1
 
         # Trigger update that does NOT modify users
         processor._update_offering_users(offering_users)
 
         # Cache should still be valid — no re-fetch
         processor._get_cached_offering_users()
-        assert mock_api.sync_all.call_count == 1
+        assert mock_api.sync_detailed.call_count == 1
 
 
 # ---------------------------------------------------------------------------
@@ -243,7 +250,7 @@ class TestOfferingUsersCacheFiltering:
             _make_offering_user("user-creating", OfferingUserState.CREATING),
             _make_offering_user("user-deleted", OfferingUserState.DELETED),
         ]
-        mock_api.sync_all.return_value = users
+        mock_api.sync_detailed.return_value = _page(users)
 
         processor = _make_membership_processor()
 
@@ -253,20 +260,20 @@ class TestOfferingUsersCacheFiltering:
         usernames = {u.username for u in result}
         assert usernames == {"user-ok", "user-requested", "user-creating"}
         # Only one API call despite filtering
-        assert mock_api.sync_all.call_count == 1
+        assert mock_api.sync_detailed.call_count == 1
 
     @mock.patch("waldur_site_agent.common.processors.marketplace_offering_users_list")
     def test_repeated_calls_use_same_cache(self, mock_api):
         """Multiple calls to _get_waldur_offering_users share the same underlying cache."""
         users = [_make_offering_user("user-ok", OfferingUserState.OK)]
-        mock_api.sync_all.return_value = users
+        mock_api.sync_detailed.return_value = _page(users)
 
         processor = _make_membership_processor()
 
         processor._get_waldur_offering_users()
         processor._get_waldur_offering_users()
 
-        assert mock_api.sync_all.call_count == 1
+        assert mock_api.sync_detailed.call_count == 1
 
 
 # ---------------------------------------------------------------------------
@@ -314,6 +321,30 @@ class TestTeamCache:
         assert result_a is not result_b
         assert mock_api.sync.call_count == 2
 
+    @mock.patch("waldur_site_agent.common.processors.marketplace_provider_resources_team_list")
+    def test_reset_cycle_caches_causes_refetch(self, mock_api):
+        """A processor reused for the next polling cycle fetches the team again."""
+        resource = _make_waldur_resource()
+        mock_api.sync.return_value = [_make_project_user("member-01")]
+
+        processor = _make_membership_processor()
+        processor._source_project_cache = {}
+
+        processor._get_waldur_resource_team(resource)
+        processor.reset_cycle_caches()
+        processor._get_waldur_resource_team(resource)
+
+        assert mock_api.sync.call_count == 2
+
+    def test_reset_cycle_caches_resets_backend(self):
+        """Backends drop the state they snapshotted for the previous cycle."""
+        processor = _make_membership_processor()
+        processor._source_project_cache = {}
+
+        processor.reset_cycle_caches()
+
+        processor.resource_backend.reset_cycle_caches.assert_called_once()
+
 
 # ---------------------------------------------------------------------------
 # Service accounts cache (OfferingMembershipProcessor)
@@ -76,7 +76,9 @@ def _make_membership_processor():
 
 
 def _make_report_processor():
-    return _make_processor(OfferingReportProcessor)
+    processor = _make_processor(OfferingReportProcessor)
+    processor.usage_ledger = None
+    return processor
 
 
 def _make_waldur_resource(**kwargs):
@@ -91,18 +93,23 @@ def _make_waldur_resource(**kwargs):
     return WaldurResource(**defaults)
 
 
+def _page(items):
+    """A single page of a paginated listing, as returned by sync_detailed."""
+    return mock.Mock(parsed=items, headers={})
+
+
 class TestMembershipProcessorFieldSelection:
     """Verify _get_waldur_resources requests all required fields."""
 
     @mock.patch("waldur_site_agent.common.processors.marketplace_provider_resources_list")
     def test_includes_all_backend_required_fields(self, mock_api):
         """Fields needed by plugin backends are included in the API request."""
-        mock_api.sync_all.return_value = [_make_waldur_resource()]
+        mock_api.sync_detailed.return_value = _page([_make_waldur_resource()])
 
         processor = _make_membership_processor()
         processor._get_waldur_resources()
 
-        call_kwargs = mock_api.sync_all.call_args
+        call_kwargs = mock_api.sync_detailed.call_args
         requested_fields = set(call_kwargs.kwargs.get("field", []))
 
         missing = _BACKEND_REQUIRED_FIELDS - requested_fields
@@ -111,12 +118,12 @@ class TestMembershipProcessorFieldSelection:
     @mock.patch("waldur_site_agent.common.processors.marketplace_provider_resources_list")
     def test_includes_membership_specific_fields(self, mock_api):
         """Membership-specific fields (paused, downscaled, etc.) are included."""
-        mock_api.sync_all.return_value = [_make_waldur_resource()]
+        mock_api.sync_detailed.return_value = _page([_make_waldur_resource()])
 
         processor = _make_membership_processor()
         processor._get_waldur_resources()
 
-        call_kwargs = mock_api.sync_all.call_args
+        call_kwargs = mock_api.sync_detailed.call_args
         requested_fields = set(call_kwargs.kwargs.get("field", []))
 
         missing = _MEMBERSHIP_EXTRA_FIELDS - requested_fields
@@ -125,12 +132,12 @@ class TestMembershipProcessorFieldSelection:
     @mock.patch("waldur_site_agent.common.processors.marketplace_provider_resources_list")
     def test_includes_offering_backend_id(self, mock_api):
         """offering_backend_id is requested (needed by cscs-dwdi for cluster filtering)."""
-        mock_api.sync_all.return_value = []
+        mock_api.sync_detailed.return_value = _page([])
 
         processor = _make_membership_processor()
         processor._get_waldur_resources()
 
-        call_kwargs = mock_api.sync_all.call_args
+        call_kwargs = mock_api.sync_detailed.call_args
         requested_fields = set(call_kwargs.kwargs.get("field", []))
 
         assert ResourceFieldEnum.OFFERING_BACKEND_ID in requested_fields
@@ -138,12 +145,12 @@ class TestMembershipProcessorFieldSelection:
     @mock.patch("waldur_site_agent.common.processors.marketplace_provider_resources_list")
     def test_includes_slug(self, mock_api):
         """slug is requested (needed by k8s-ut-namespace for Keycloak group names)."""
-        mock_api.sync_all.return_value = []
+        mock_api.sync_detailed.return_value = _page([])
 
         processor = _make_membership_processor()
         processor._get_waldur_resources()
 
-        call_kwargs = mock_api.sync_all.call_args
+        call_kwargs = mock_api.sync_detailed.call_args
         requested_fields = set(call_kwargs.kwargs.get("field", []))
 
         assert ResourceFieldEnum.SLUG in requested_fields
@@ -151,12 +158,12 @@ class TestMembershipProcessorFieldSelection:
     @mock.patch("waldur_site_agent.common.processors.marketplace_provider_resources_list")
     def test_includes_project_and_customer_slug(self, mock_api):
         """project_slug and customer_slug are requested (needed by rancher)."""
-        mock_api.sync_all.return_value = []
+        mock_api.sync_detailed.return_value = _page([])
 
         processor = _make_membership_processor()
         processor._get_waldur_resources()
 
-        call_kwargs = mock_api.sync_all.call_args
+        call_kwargs = mock_api.sync_detailed.call_args
         requested_fields = set(call_kwargs.kwargs.get("field", []))
 
         assert ResourceFieldEnum.PROJECT_SLUG in requested_fields
@@ -170,12 +177,12 @@ class TestMembershipProcessorFieldSelection:
         sync_resource_end_date converts to None and pushes to Waldur B —
         silently clearing a real end_date on every sync cycle.
         """
-        mock_api.sync_all.return_value = []
+        mock_api.sync_detailed.return_value = _page([])
 
         processor = _make_membership_processor()
         processor._get_waldur_resources()
 
-        call_kwargs = mock_api.sync_all.call_args
+        call_kwargs = mock_api.sync_detailed.call_args
         requested_fields = set(call_kwargs.kwargs.get("field", []))
 
         assert ResourceFieldEnum.END_DATE in requested_fields, (
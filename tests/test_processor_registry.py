@@ -0,0 +1,135 @@
+"""Tests for reusing per-offering processors across polling cycles."""
+
+import unittest
+import uuid
+from unittest import mock
+
+from waldur_site_agent.common import processors as common_processors
+from waldur_site_agent.common import structures as common_structures
+from waldur_site_agent.polling_processing import agent_report, processor_registry
+
+REGISTRY_MODULE = "waldur_site_agent.polling_processing.processor_registry"
+
+
+def _make_offering(**overrides):
+    values = {
+        "name": "Test offering",
+        "waldur_api_url": "https://waldur.example.com/api/",
+        "waldur_api_token": "static-token",
+        "waldur_offering_uuid": uuid.uuid4().hex,
+        "backend_type": "test",
+    }
+    values.update(overrides)
+    return common_structures.Offering(**values)
+
+
+@mock.patch(f"{REGISTRY_MODULE}.utils.ensure_log_shipper")
+@mock.patch(f"{REGISTRY_MODULE}.agent_identity_management.AgentIdentityManager")
+@mock.patch(f"{REGISTRY_MODULE}.utils.get_client")
+class TestProcessorRegistry(unittest.TestCase):
+    def setUp(self):
+        self.configuration = common_structures.WaldurAgentConfiguration(
+            waldur_site_agent_mode="report"
+        )
+        self.offering = _make_offering()
+        self.create_processor = mock.Mock(side_effect=lambda *_: mock.Mock())
+
+    def _registry(self, refresh_interval=3600):
+        return processor_registry.ProcessorRegistry(
+            self.configuration, self.create_processor, refresh_interval
+        )
+
+    def test_processor_is_reused_across_cycles(self, mock_get_client, mock_manager, _):
+        registry = self._registry()
+
+        first = registry.get_processor(self.offering)
+        second = registry.get_processor(self.offering)
+
+        assert first is second
+        self.create_processor.assert_called_once_with(
+            self.offering, mock_get_client.return_value
+        )
+        mock_get_client.assert_called_once()
+        mock_manager.return_value.register_identity.assert_called_once_with(
+            f"agent-{self.offering.uuid}"
+        )
+        mock_manager.return_value.register_service.assert_called_once()
+        first.register.assert_called_once()
+        first.refresh_offering_metadata.assert_not_called()
+        assert first.reset_cycle_caches.call_count == 2
+
+    def test_processor_is_refreshed_after_interval(self, mock_get_client, mock_manager, _):
+        registry = self._registry(refresh_interval=0)
+
+        processor = registry.get_processor(self.offering)
+        assert registry.get_processor(self.offering) is processor
+
+        processor.refresh_offering_metadata.assert_called_once()
+        assert mock_manager.return_value.register_service.call_count == 2
+        assert processor.register.call_count == 2
+        mock_manager.return_value.register_identity.assert_called_once()
+        self.create_processor.assert_called_once()
+
+    def test_discarded_processor_is_rebuilt(self, mock_get_client, mock_manager, _):
+        registry = self._registry()
+
+        first = registry.get_processor(self.offering)
+        registry.discard(self.offering)
+        second = registry.get_processor(self.offering)
+
+        assert first is not second
+        assert self.create_processor.call_count == 2
+        first.close.assert_called_once_with()
+        second.close.assert_not_called()
+
+    def test_processor_is_rebuilt_when_oidc_token_changes(
+        self, mock_get_client, mock_manager, _
+    ):
+        offering = _make_offering(
+            waldur_api_token="",
+            oidc_token_url="https://idp.example.com/token",
+            oidc_client_id="cid",
+            oidc_client_secret="secret",
+        )
+        registry = self._registry()
+
+        with mock.patch(
+            f"{REGISTRY_MODULE}.utils.fetch_oidc_token", side_effect=["jwt-1", "jwt-1", "jwt-2"]
+        ):
+            first = registry.get_processor(offering)
+            assert registry.get_processor(offering) is first
+            second = registry.get_processor(offering)
+
+        assert first is not second
+        first.close.assert_called_once_with()
+        assert mock_get_client.call_args_list[-1].args[1] == "jwt-2"
+        assert mock_get_client.call_args_list[-1].args[-1] == "Bearer"
+
+
+class TestProcessorClose(unittest.TestCase):
+    def test_close_releases_waldur_and_backend_connections(self):
+        processor = common_processors.OfferingReportProcessor.__new__(
+            common_processors.OfferingReportProcessor
+        )
+        processor.waldur_rest_client = mock.Mock()
+        processor.resource_backend = mock.Mock()
+
+        processor.close()
+
+        processor.waldur_rest_client.get_httpx_client.return_value.close.assert_called_once_with()
+        processor.resource_backend.close.assert_called_once_with()
+
+
+class TestReportAgentWithRegistry(unittest.TestCase):
+    def test_failed_cycle_discards_processor(self):
+        registry = mock.Mock()
+        registry.get_processor.return_value.process_offering.side_effect = RuntimeError("boom")
+        offering = _make_offering()
+
+        agent_report._process_offering(offering, registry)
+
+        registry.discard.assert_called_once_with(offering)
+
+
+if __name__ == "__main__":
+    unittest.main()
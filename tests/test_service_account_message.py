@@ -129,10 +129,10 @@ class ServiceAccountMessageTest(TestCase):
         assert args[1] == {self.service_account.username}
 
     @mock.patch(
-        "waldur_site_agent.event_processing.handlers.agent_identity_management.marketplace_site_agent_identities_register_service"
+        "waldur_site_agent.event_processing.offering_context.agent_identity_management.marketplace_site_agent_identities_register_service"
     )
     @mock.patch(
-        "waldur_site_agent.event_processing.handlers.agent_identity_management.marketplace_site_agent_identities_list"
+        "waldur_site_agent.event_processing.offering_context.agent_identity_management.marketplace_site_agent_identities_list"
     )
     @mock.patch(
         "waldur_site_agent.event_processing.handlers.common_processors.OfferingMembershipProcessor"
@@ -186,10 +186,10 @@ class ServiceAccountMessageTest(TestCase):
         )
 
     @mock.patch(
-        "waldur_site_agent.event_processing.handlers.agent_identity_management.marketplace_site_agent_identities_register_service"
+        "waldur_site_agent.event_processing.offering_context.agent_identity_management.marketplace_site_agent_identities_register_service"
     )
     @mock.patch(
-        "waldur_site_agent.event_processing.handlers.agent_identity_management.marketplace_site_agent_identities_list"
+        "waldur_site_agent.event_processing.offering_context.agent_identity_management.marketplace_site_agent_identities_list"
     )
     @mock.patch(
         "waldur_site_agent.event_processing.handlers.common_processors.OfferingMembershipProcessor"
@@ -170,6 +170,11 @@ class TestSubmitTotalUsageIdempotencyIntegration(unittest.TestCase):
         proc.resource_backend = self.backend
         proc.timezone = ""  # type: ignore[attr-defined]
         proc.waldur_rest_client = self.client  # type: ignore[attr-defined]
+        proc.offering = OFFERING  # type: ignore[attr-defined]
+        proc._component_usages_index = {}
+        proc._user_usage_parents_index = {}
+        proc._stale_component_usages = set()
+        proc.usage_ledger = None
         return proc
 
     @respx.mock
@@ -180,6 +185,7 @@ class TestSubmitTotalUsageIdempotencyIntegration(unittest.TestCase):
             f"{self.BASE_URL}/api/marketplace-component-usages/"
         ).respond(200, json=[{
             "uuid": uuid.uuid4().hex,
+            "resource_uuid": self.resource_uuid,
             "type": "cpu",
             "usage": "100.0000",
         }])
@@ -216,6 +222,7 @@ class TestSubmitTotalUsageIdempotencyIntegration(unittest.TestCase):
             f"{self.BASE_URL}/api/marketplace-component-usages/"
         ).respond(200, json=[{
             "uuid": uuid.uuid4().hex,
+            "resource_uuid": self.resource_uuid,
             "type": "cpu",
             "usage": "100.0000",
         }])
@@ -258,6 +265,7 @@ class TestSubmitTotalUsageIdempotencyIntegration(unittest.TestCase):
             f"{self.BASE_URL}/api/marketplace-component-usages/"
         ).respond(200, json=[{
             "uuid": uuid.uuid4().hex,
+            "resource_uuid": self.resource_uuid,
             "type": "cpu",
             "usage": "100.0000",
         }])
@@ -292,6 +300,7 @@ class TestSubmitTotalUsageIdempotencyIntegration(unittest.TestCase):
             f"{self.BASE_URL}/api/marketplace-component-usages/"
         ).respond(200, json=[{
             "uuid": uuid.uuid4().hex,
+            "resource_uuid": self.resource_uuid,
             "type": "cpu",
             "usage": "100.0000",
         }])
@@ -335,6 +344,7 @@ class TestSubmitTotalUsageIdempotencyIntegration(unittest.TestCase):
             f"{self.BASE_URL}/api/marketplace-component-usages/"
         ).respond(200, json=[{
             "uuid": uuid.uuid4().hex,
+            "resource_uuid": self.resource_uuid,
             "type": "cpu",
             "usage": "100.0000",
         }])
@@ -10,6 +10,7 @@ readable by a regular (non-staff) agent account.
 
 from __future__ import annotations
 
+import threading
 import uuid
 from unittest import mock
 
@@ -31,6 +32,7 @@ def _make_processor(requires_source_project: bool):
     processor.resource_backend.requires_source_project = requires_source_project
     processor.service_provider = mock.Mock(uuid=_SP_UUID)
     processor._source_project_cache = {}
+    processor._cache_lock = threading.RLock()
     return processor
 
 
@@ -6,6 +6,7 @@ membership row.  It fires only when the team list comes back empty; a non-empty
 but stale team (new member missing) breaks on attempt 1.
 """
 
+import threading
 from unittest import mock
 
 import pytest
@@ -25,6 +26,7 @@ def _make_processor(*, team_fetch_attempts: int = 1, team_fetch_delay: float = 3
     processor.resource_backend.team_fetch_attempts = team_fetch_attempts
     processor.resource_backend.team_fetch_delay = team_fetch_delay
     processor._offering_users_cache = []
+    processor._cache_lock = threading.RLock()
     return processor
 
 
@@ -24,6 +24,8 @@ def _make_config(**overrides):
     config.expose_backend_error_details = True
     config.log_shipping = mock.Mock(spec=common_structures.LogShippingConfig)
     config.log_shipping.enabled = False
+    config.usage_ledger = mock.Mock(spec=common_structures.UsageLedgerConfig)
+    config.usage_ledger.enabled = False
     return config
 
 
@@ -90,6 +92,30 @@ class TestEventProcessHealthChecksOnly(unittest.TestCase):
 
         mock_time.sleep.assert_called_once_with(TICK_INTERVAL)
 
+    @mock.patch("waldur_site_agent.event_processing.main.touch_heartbeat")
+    @mock.patch("waldur_site_agent.event_processing.main.time")
+    @mock.patch("waldur_site_agent.event_processing.main.utils")
+    def test_async_orders_checked_between_reconciliations(self, mock_utils, mock_time, mock_touch):
+        """Async orders are checked every ASYNC_ORDER_CHECK_INTERVAL, not on reconciliation ticks."""
+        from waldur_site_agent.event_processing.main import (
+            ASYNC_ORDER_CHECK_INTERVAL,
+            _run_without_username_reconciliation,
+        )
+
+        config = _make_config()
+
+        first = 5000.0
+        mock_time.time.side_effect = [first, first + 60, first + ASYNC_ORDER_CHECK_INTERVAL]
+        mock_time.sleep.side_effect = [None, None, StopIteration("break")]
+
+        with self.assertRaises(StopIteration):
+            _run_without_username_reconciliation(config)
+
+        self.assertEqual(mock_utils.run_periodic_order_reconciliation.call_count, 1)
+        mock_utils.run_periodic_async_order_check.assert_called_once_with(
+            config.waldur_offerings, "test-agent", expose_backend_error_details=True
+        )
+
 
 class TestReportTickLoop(unittest.TestCase):
     """Tests for polling_processing.agent_report tick loop."""
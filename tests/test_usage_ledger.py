@@ -0,0 +1,171 @@
+"""Tests for the local ledger of submitted usage."""
+
+import datetime
+import tempfile
+import unittest
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from waldur_api_client.models import ComponentUsage
+
+from waldur_site_agent.common.processors import OfferingReportProcessor
+from waldur_site_agent.common.usage_ledger import TOTAL_USAGE_SCOPE, UsageLedger
+
+PROCESSORS_MODULE = "waldur_site_agent.common.processors"
+JUNE = datetime.date(2024, 6, 1)
+MAY = datetime.date(2024, 5, 1)
+
+
+class UsageLedgerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp_dir.name) / "state" / "usage-ledger.sqlite3")
+        self.ledger = UsageLedger(self.path, refresh_ttl=3600)
+        self.resource_uuid = uuid.uuid4().hex
+
+    def tearDown(self):
+        self.ledger.close()
+        self.tmp_dir.cleanup()
+
+
+class TestUsageLedger(UsageLedgerTestCase):
+    def test_recorded_usage_matches(self):
+        usage = {TOTAL_USAGE_SCOPE: {"cpu": 10.0, "mem": 20.0}}
+        assert not self.ledger.matches(self.resource_uuid, JUNE, usage)
+
+        self.ledger.record(self.resource_uuid, JUNE, usage)
+
+        assert self.ledger.matches(self.resource_uuid, JUNE, usage)
+        assert not self.ledger.matches(self.resource_uuid, MAY, usage)
+        assert not self.ledger.matches(
+            self.resource_uuid, JUNE, {TOTAL_USAGE_SCOPE: {"cpu": 11.0, "mem": 20.0}}
+        )
+        assert not self.ledger.matches(
+            self.resource_uuid, JUNE, {TOTAL_USAGE_SCOPE: {"cpu": 10.0}}
+        )
+
+    def test_scopes_are_compared_independently(self):
+        self.ledger.record(self.resource_uuid, JUNE, {TOTAL_USAGE_SCOPE: {"cpu": 10.0}})
+        self.ledger.record(self.resource_uuid, JUNE, {"alice": {"cpu": 4.0}, "bob": {"cpu": 6.0}})
+
+        assert self.ledger.matches(self.resource_uuid, JUNE, {TOTAL_USAGE_SCOPE: {"cpu": 10.0}})
+        assert self.ledger.matches(self.resource_uuid, JUNE, {"alice": {"cpu": 4.0}})
+        assert not self.ledger.matches(self.resource_uuid, JUNE, {"carol": {"cpu": 1.0}})
+
+    def test_expired_entries_do_not_match(self):
+        usage = {TOTAL_USAGE_SCOPE: {"cpu": 10.0}}
+        self.ledger.record(self.resource_uuid, JUNE, usage)
+        self.ledger.refresh_ttl = 0
+
+        assert not self.ledger.matches(self.resource_uuid, JUNE, usage)
+
+    def test_entries_survive_reopening(self):
+        usage = {TOTAL_USAGE_SCOPE: {"cpu": 10.0}}
+        self.ledger.record(self.resource_uuid, JUNE, usage)
+        self.ledger.close()
+
+        self.ledger = UsageLedger(self.path, refresh_ttl=3600)
+
+        assert self.ledger.matches(self.resource_uuid, JUNE, usage)
+
+    def test_prune_drops_old_periods(self):
+        usage = {TOTAL_USAGE_SCOPE: {"cpu": 10.0}}
+        self.ledger.record(self.resource_uuid, MAY, usage)
+        self.ledger.record(self.resource_uuid, JUNE, usage)
+
+        self.ledger.prune(JUNE)
+
+        assert not self.ledger.matches(self.resource_uuid, MAY, usage)
+        assert self.ledger.matches(self.resource_uuid, JUNE, usage)
+
+
+@mock.patch(f"{PROCESSORS_MODULE}.marketplace_component_usages_set_usage")
+@mock.patch(f"{PROCESSORS_MODULE}.marketplace_component_user_usages_list")
+@mock.patch(f"{PROCESSORS_MODULE}.marketplace_component_usages_list")
+class TestReportProcessorWithLedger(UsageLedgerTestCase):
+    def _make_processor(self):
+        processor = OfferingReportProcessor.__new__(OfferingReportProcessor)
+        processor.offering = mock.Mock(uuid=uuid.uuid4().hex)
+        processor.waldur_rest_client = mock.Mock()
+        processor.timezone = ""
+        processor.resource_backend = mock.Mock(supports_decreasing_usage=True)
+        processor._component_usages_index = {}
+        processor._user_usage_parents_index = {}
+        processor._stale_component_usages = set()
+        processor.usage_ledger = self.ledger
+        return processor
+
+    def _submit(self, processor, amount):
+        processor._submit_total_usage_for_resource(
+            SimpleNamespace(uuid=uuid.UUID(self.resource_uuid), backend_id="alloc-01"),
+            {"cpu": amount},
+            [SimpleNamespace(type_="cpu")],
+            report_date=datetime.datetime(2024, 6, 15, tzinfo=datetime.timezone.utc),
+            billing_period_start=JUNE,
+        )
+
+    def test_unchanged_usage_skips_waldur(self, mock_list, mock_user_list, mock_set_usage):
+        mock_list.sync_detailed.return_value = mock.Mock(parsed=[], headers={})
+
+        self._submit(self._make_processor(), 10.0)
+        self._submit(self._make_processor(), 10.0)
+
+        mock_set_usage.sync_detailed.assert_called_once()
+        mock_list.sync_detailed.assert_called_once()
+
+    def test_changed_usage_is_submitted(self, mock_list, mock_user_list, mock_set_usage):
+        mock_list.sync_detailed.return_value = mock.Mock(parsed=[], headers={})
+
+        self._submit(self._make_processor(), 10.0)
+        self._submit(self._make_processor(), 12.0)
+
+        assert mock_set_usage.sync_detailed.call_count == 2
+
+    def test_usage_found_in_waldur_is_recorded(self, mock_list, mock_user_list, mock_set_usage):
+        existing = ComponentUsage(
+            uuid=uuid.uuid4(), resource_uuid=uuid.UUID(self.resource_uuid), type_="cpu", usage="10"
+        )
+        mock_list.sync_detailed.return_value = mock.Mock(parsed=[existing], headers={})
+
+        self._submit(self._make_processor(), 10.0)
+
+        mock_set_usage.sync_detailed.assert_not_called()
+        assert self.ledger.matches(self.resource_uuid, JUNE, {TOTAL_USAGE_SCOPE: {"cpu": 10.0}})
+
+
+@mock.patch(f"{PROCESSORS_MODULE}.marketplace_component_usages_set_user_usages")
+class TestSubmittedUserUsages(UsageLedgerTestCase):
+    def _make_processor(self):
+        processor = OfferingReportProcessor.__new__(OfferingReportProcessor)
+        processor.waldur_rest_client = mock.Mock()
+        processor.timezone = ""
+        processor._get_cached_offering_users = mock.Mock(return_value=[])
+        return processor
+
+    def test_only_components_with_usage_records_are_returned(self, mock_set_user_usages):
+        cpu_usage = ComponentUsage(
+            uuid=uuid.uuid4(), resource_uuid=uuid.UUID(self.resource_uuid), type_="cpu", usage="10"
+        )
+
+        submitted = self._make_processor()._submit_bulk_user_usages_for_resource(
+            {"alice": {"cpu": 4.0, "gpu": 1.0}, "bob": {"gpu": 2.0}},
+            [cpu_usage],
+            report_date=datetime.datetime(2024, 6, 15, tzinfo=datetime.timezone.utc),
+        )
+
+        mock_set_user_usages.sync_detailed.assert_called_once()
+        assert submitted == {"alice": {"cpu": 4.0}}
+
+    def test_nothing_is_returned_without_usage_records(self, mock_set_user_usages):
+        submitted = self._make_processor()._submit_bulk_user_usages_for_resource(
+            {"alice": {"cpu": 4.0}}, []
+        )
+
+        mock_set_user_usages.sync_detailed.assert_not_called()
+        assert submitted == {}
+
+
+if __name__ == "__main__":
+    unittest.main()
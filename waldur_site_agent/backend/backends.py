@@ -100,6 +100,26 @@ class BaseBackend(ABC):
     # when a sibling offering's team is synced.
     shared_project_membership: bool = False
 
+    # Capability flag: Set to True for backends whose ``_get_usage_report`` answers
+    # for many resources in a single backend query (e.g. one ``sacct`` run for a
+    # list of SLURM accounts). When enabled, the report processor collects usage
+    # for a whole chunk of resources via ``pull_resources_usage`` instead of
+    # pulling every resource separately.
+    supports_bulk_usage_report: bool = False
+
+    # Capability flag: Set to True for backends relying on the generic
+    # ``_pull_backend_resource`` whose users can be listed without the usage
+    # report. Membership sync then pulls resources via ``pull_resources(...,
+    # include_usage=False)``, which skips ``_get_usage_report`` entirely.
+    supports_membership_only_pull: bool = False
+
+    # Upper bound on the number of resources membership sync processes
+    # concurrently when the ``membership_sync_workers`` backend setting opts in
+    # to parallel sync. Backends are assumed not to be thread-safe, so the
+    # default keeps the sync sequential; raise it in backends whose clients
+    # can be shared between threads.
+    max_membership_sync_workers: int = 1
+
     # How many times to attempt fetching the team for a resource before giving
     # up.  The retry loop only fires when the team list comes back empty, so it
     # covers the race where Waldur hasn't yet committed a new membership row.
@@ -165,6 +185,19 @@ class BaseBackend(ABC):
         logger.warning(msg)
         raise BackendNotReadyError(msg)
 
+    def reset_cycle_caches(self) -> None:
+        """Drop the backend data cached for the previous processing cycle.
+
+        Called by the processors before each polling cycle or event. Backends
+        that snapshot backend state for a cycle (e.g. object listings used for
+        lookups by name) override this to list it again on the next cycle.
+        """
+        return
+
+    def close(self) -> None:
+        """Release the connections held by the backend once it is no longer used."""
+        self.client.close()
+
     @abstractmethod
     def diagnostics(self) -> bool:
         """Log diagnostic information about the backend and return status.
@@ -364,6 +397,25 @@ class BaseBackend(ABC):
         del order_backend_id
         return True  # Default: no async orders, always "complete"
 
+    def check_pending_orders(self, order_backend_ids: list[str]) -> dict[str, bool]:
+        """Check many async orders on a remote system at once.
+
+        Called once per order processing cycle with the backend_ids of all
+        EXECUTING source orders, so that backends able to read the state of
+        many orders from one listing do not issue a request per order.
+
+        Args:
+            order_backend_ids: The source orders' backend_ids
+
+        Returns:
+            Mapping of order backend_id to True if the order completed
+            successfully and False if it is still pending. Orders left out
+            (failed, unknown or not checkable in bulk) are checked with
+            check_pending_order() when they are processed.
+        """
+        del order_backend_ids
+        return {}  # Default: every order is checked with check_pending_order()
+
     def evaluate_pending_order(
         self,
         order: OrderDetails,
@@ -514,20 +566,76 @@ class BaseBackend(ABC):
         """
 
     def pull_resources(
-        self, waldur_resources: list[WaldurResource]
+        self, waldur_resources: list[WaldurResource], include_usage: bool = True
     ) -> dict[str, tuple[WaldurResource, structures.BackendResourceInfo]]:
-        """Pull data of resources available in the backend."""
+        """Pull data of resources available in the backend.
+
+        With ``include_usage=False`` backends declaring ``supports_membership_only_pull``
+        return only the resource users and skip usage collection, which membership
+        sync never reads. Other backends ignore the argument and pull everything.
+        """
+        membership_only = not include_usage and self.supports_membership_only_pull
         report = {}
         for waldur_resource in waldur_resources:
             backend_id = waldur_resource.backend_id
             try:
-                backend_resource_info = self.pull_resource(waldur_resource)
+                if membership_only:
+                    backend_resource_info = self.pull_resource_users(waldur_resource)
+                else:
+                    backend_resource_info = self.pull_resource(waldur_resource)
                 if backend_resource_info is not None:
                     report[backend_id] = (waldur_resource, backend_resource_info)
             except Exception as e:
                 logger.exception("Error while pulling resource [%s]: %s", backend_id, e)
         return report
 
+    def pull_resources_usage(
+        self, waldur_resources: list[WaldurResource]
+    ) -> dict[str, structures.BackendResourceInfo]:
+        """Pull usage of several resources, keyed by resource backend ID.
+
+        Backends declaring ``supports_bulk_usage_report`` answer the whole list
+        with one existence listing and one ``_get_usage_report`` call. Other
+        backends fall back to ``pull_resource`` for each resource. Resources
+        missing in the backend are absent from the result.
+        """
+        if not self.supports_bulk_usage_report:
+            report: dict[str, structures.BackendResourceInfo] = {}
+            for waldur_resource in waldur_resources:
+                backend_id = waldur_resource.backend_id
+                if not isinstance(backend_id, str) or not backend_id:
+                    continue
+                backend_resource_info = self.pull_resource(waldur_resource)
+                if backend_resource_info is not None:
+                    report[backend_id] = backend_resource_info
+            return report
+
+        backend_ids = [
+            waldur_resource.backend_id
+            for waldur_resource in waldur_resources
+            if isinstance(waldur_resource.backend_id, str) and waldur_resource.backend_id
+        ]
+        existing_ids = {resource.name for resource in self.client.list_resources()}
+        missing_ids = [backend_id for backend_id in backend_ids if backend_id not in existing_ids]
+        if missing_ids:
+            logger.warning(
+                "There are no resources with IDs %s in the backend", ", ".join(missing_ids)
+            )
+        present_ids = [backend_id for backend_id in backend_ids if backend_id in existing_ids]
+        if not present_ids:
+            return {}
+
+        logger.info("Pulling usage for %s resources in one query", len(present_ids))
+        usage_report = self._get_usage_report(present_ids)
+        report = {}
+        for backend_id in present_ids:
+            usage = usage_report.get(backend_id)
+            if usage is None:
+                empty_usage = dict.fromkeys(self.backend_components, 0)
+                usage = {"TOTAL_ACCOUNT_USAGE": empty_usage}
+            report[backend_id] = structures.BackendResourceInfo(backend_id=backend_id, usage=usage)
+        return report
+
     def get_membership_sync_report(
         self,
         waldur_resource: WaldurResource,  # noqa: ARG002
@@ -564,6 +672,22 @@ class BaseBackend(ABC):
         else:
             return backend_resource_info
 
+    def pull_resource_users(
+        self, waldur_resource: WaldurResource
+    ) -> Optional[structures.BackendResourceInfo]:
+        """Pull resource users from backend, without the usage report."""
+        try:
+            backend_id = waldur_resource.backend_id
+            if not backend_id:
+                logger.warning("Backend ID is missing for resource %s", waldur_resource.name)
+                return None
+            backend_resource_info = self._pull_backend_resource_users(backend_id)
+        except Exception as e:
+            logger.exception("Error while pulling resource users [%s]: %s", backend_id, e)
+            return None
+        else:
+            return backend_resource_info
+
     def recreate_missing_resource(self, waldur_resource: WaldurResource) -> bool:
         """Recreate the backend resource if it is missing, keeping its backend ID.
 
@@ -598,15 +722,10 @@ class BaseBackend(ABC):
         self, resource_backend_id: str
     ) -> Optional[structures.BackendResourceInfo]:
         """Pull resource data from the backend."""
-        logger.info("Pulling resource %s", resource_backend_id)
-        resource_backend_info = self.client.get_resource(resource_backend_id)
-
-        if resource_backend_info is None:
-            logger.warning("There is no resource with ID %s in the backend", resource_backend_id)
+        backend_resource_info = self._pull_backend_resource_users(resource_backend_id)
+        if backend_resource_info is None:
             return None
 
-        users = self.client.list_resource_users(resource_backend_id)
-
         report = self._get_usage_report([resource_backend_id])
         usage = report.get(resource_backend_id)
 
@@ -614,10 +733,22 @@ class BaseBackend(ABC):
             empty_usage = dict.fromkeys(self.backend_components, 0)
             usage = {"TOTAL_ACCOUNT_USAGE": empty_usage}
 
-        return structures.BackendResourceInfo(
-            users=users,
-            usage=usage,
-        )
+        backend_resource_info.usage = usage
+        return backend_resource_info
+
+    def _pull_backend_resource_users(
+        self, resource_backend_id: str
+    ) -> Optional[structures.BackendResourceInfo]:
+        """Pull resource existence and users from the backend, without usage."""
+        logger.info("Pulling resource %s", resource_backend_id)
+        resource_backend_info = self.client.get_resource(resource_backend_id)
+
+        if resource_backend_info is None:
+            logger.warning("There is no resource with ID %s in the backend", resource_backend_id)
+            return None
+
+        users = self.client.list_resource_users(resource_backend_id)
+        return structures.BackendResourceInfo(users=users)
 
     def has_prepaid_components(self) -> bool:
         """Return True if any backend component is marked as prepaid.
@@ -1231,9 +1362,10 @@ class UnknownBackend(BaseBackend):
         """Placeholder."""
 
     def pull_resources(
-        self, _: list[WaldurResource]
+        self, _: list[WaldurResource], include_usage: bool = True
     ) -> dict[str, tuple[WaldurResource, structures.BackendResourceInfo]]:
         """Placeholder."""
+        del include_usage
         return {}
 
     def delete_resource(
@@ -2,6 +2,10 @@
 
 import abc
 import subprocess
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
 from typing import Optional
 
 from waldur_site_agent.backend import logger
@@ -9,6 +13,18 @@ from waldur_site_agent.backend.exceptions import (
     BackendError,
 )
 from waldur_site_agent.backend.structures import Association, ClientResource
+from waldur_site_agent.common import metrics
+
+BACKEND_COMMAND_SECONDS = metrics.histogram(
+    "waldur_site_agent_backend_command_duration_seconds",
+    "Time spent running a backend command by executable",
+    ("command",),
+)
+BACKEND_COMMAND_FAILURES = metrics.counter(
+    "waldur_site_agent_backend_command_failures_total",
+    "Backend commands that failed by executable",
+    ("command",),
+)
 
 
 class BaseClient:
@@ -16,10 +32,13 @@ class BaseClient:
 
     def execute_command(self, command: list[str], silent: bool = False) -> str:
         """Execute command on backend."""
+        executable = Path(command[0]).name if command else ""
         try:
             logger.debug("Executing command: %s", " ".join(command))
-            return subprocess.check_output(command, stderr=subprocess.STDOUT, encoding="utf-8")
+            with BACKEND_COMMAND_SECONDS.time(command=executable):
+                return subprocess.check_output(command, stderr=subprocess.STDOUT, encoding="utf-8")
         except subprocess.CalledProcessError as e:
+            BACKEND_COMMAND_FAILURES.inc(command=executable)
             stdout = e.output or ""
             lines = stdout.splitlines()
             stdout = "\n".join(lines)
@@ -30,6 +49,7 @@ class BaseClient:
                 logger.exception('Failed to execute command "%s": %s', command, stdout)
             raise BackendError(stdout) from e
         except FileNotFoundError as e:
+            BACKEND_COMMAND_FAILURES.inc(command=executable)
             # The binary itself is missing (e.g. SLURM CLI tools absent on a
             # host running the agent in REST execution_mode). Surface it as a
             # BackendError so callers (binary validation, usage reporting) get
@@ -38,6 +58,35 @@ class BaseClient:
                 logger.exception('Command not found: "%s".', command)
             raise BackendError(f"Command not found: {e}") from e
 
+    def stream_command(self, command: list[str]) -> Iterator[str]:
+        """Execute command on backend, yielding its output lines as they are produced.
+
+        Unlike ``execute_command``, the output is never held in memory as a
+        whole. The error output is kept aside and raised as ``BackendError``
+        once the output is consumed if the command fails.
+        """
+        executable = Path(command[0]).name if command else ""
+        logger.debug("Streaming command: %s", " ".join(command))
+        started_at = time.monotonic()
+        with tempfile.TemporaryFile(mode="w+", encoding="utf-8") as stderr:
+            try:
+                process = subprocess.Popen(
+                    command, stdout=subprocess.PIPE, stderr=stderr, encoding="utf-8"
+                )
+            except FileNotFoundError as e:
+                BACKEND_COMMAND_FAILURES.inc(command=executable)
+                logger.exception('Command not found: "%s".', command)
+                raise BackendError(f"Command not found: {e}") from e
+            with process:
+                yield from process.stdout or ()
+            BACKEND_COMMAND_SECONDS.observe(time.monotonic() - started_at, command=executable)
+            if process.returncode != 0:
+                BACKEND_COMMAND_FAILURES.inc(command=executable)
+                stderr.seek(0)
+                error_output = stderr.read().strip()
+                logger.error('Failed to execute command "%s": %s', command, error_output)
+                raise BackendError(error_output)
+
     @abc.abstractmethod
     def list_resources(self) -> list[ClientResource]:
         """List all resources (accounts/allocations) on the backend.
@@ -229,6 +278,14 @@ class BaseClient:
         command = ["/sbin/mkhomedir_helper", username, umask]
         return self.execute_command(command)
 
+    def close(self) -> None:
+        """Release the connections held by the client.
+
+        Called when the processor owning the backend is dropped. Clients keeping
+        HTTP connection pools override this to close them.
+        """
+        return
+
 
 class UnknownClient(BaseClient):
     """Unknown cli-client for a backend communication."""
@@ -33,6 +33,26 @@ WALDUR_SITE_AGENT_MEMBERSHIP_SYNC_PERIOD_MINUTES = int(
 WALDUR_SITE_AGENT_RECONCILIATION_PERIOD_MINUTES = int(
     os.environ.get("WALDUR_SITE_AGENT_RECONCILIATION_PERIOD_MINUTES", "60")
 )
+# Interval (in minutes) between the checks of executing async orders in event mode
+WALDUR_SITE_AGENT_ASYNC_ORDER_CHECK_PERIOD_MINUTES = int(
+    os.environ.get("WALDUR_SITE_AGENT_ASYNC_ORDER_CHECK_PERIOD_MINUTES", "5")
+)
+# Interval (in minutes) between full scans of the periodic reconciliation in event mode;
+# the passes in between only query objects modified since the previous pass.
+# 0 scans the whole offering in every pass
+WALDUR_SITE_AGENT_FULL_RECONCILIATION_PERIOD_MINUTES = int(
+    os.environ.get("WALDUR_SITE_AGENT_FULL_RECONCILIATION_PERIOD_MINUTES", "360")
+)
+# Interval (in minutes) after which polling agents re-fetch the offering metadata
+# and renew the service registration of their long-lived processors
+WALDUR_SITE_AGENT_PROCESSOR_REFRESH_MINUTES = int(
+    os.environ.get("WALDUR_SITE_AGENT_PROCESSOR_REFRESH_MINUTES", "30")
+)
+# Lifetime (in minutes) of the per-offering client, registrations and processors
+# reused by the event processing handlers; 0 builds them for every message
+WALDUR_SITE_AGENT_EVENT_CONTEXT_TTL_MINUTES = int(
+    os.environ.get("WALDUR_SITE_AGENT_EVENT_CONTEXT_TTL_MINUTES", "30")
+)
 waldur_verify_ssl = os.getenv("WALDUR_VERIFY_SSL", "true").lower() in ("true", "yes")
 
 WALDUR_SITE_AGENT_VERSION = version("waldur-site-agent")
@@ -0,0 +1,293 @@
+"""In-process metrics of the agent, exposed in the Prometheus text format.
+
+Instrumented modules declare their metrics at import time with ``counter``,
+``gauge`` and ``histogram`` and update them from any thread. When enabled in
+the configuration, ``start_metrics_server`` serves all of them on a local
+``/metrics`` endpoint; without it, updating a metric costs a lock and a
+dictionary update.
+"""
+
+from __future__ import annotations
+
+import abc
+import math
+import threading
+import time
+from collections.abc import Sequence
+from contextlib import ContextDecorator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from typing import Optional
+
+from waldur_site_agent.backend import logger
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+class Metric(abc.ABC):
+    """Base class of the metrics, a family of samples keyed by label values."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        """Constructor."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            message = f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            raise ValueError(message)
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        """Return the lines of the metric in the Prometheus text format."""
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self._render_samples(),
+        ]
+
+    @abc.abstractmethod
+    def _render_samples(self) -> list[str]:
+        """Return the sample lines of the metric."""
+
+
+class Counter(Metric):
+    """Monotonically increasing value."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        """Constructor."""
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increase the counter of the given labels."""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current value of the given labels."""
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0.0)
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Decrease the gauge of the given labels."""
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge of the given labels."""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class _Timer(ContextDecorator):
+    """Observes the duration of a block or function call in a histogram."""
+
+    def __init__(self, histogram: Histogram, labels: dict[str, str]) -> None:
+        self._histogram = histogram
+        self._labels = labels
+        self._local = threading.local()
+
+    def __enter__(self) -> None:
+        self._local.started_at = time.monotonic()
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self._histogram.observe(time.monotonic() - self._local.started_at, **self._labels)
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Constructor."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+        # Label values -> (count per bucket, sum of the observed values)
+        self._values: dict[LabelValues, tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record an observed value for the given labels."""
+        key = self._label_values(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def time(self, **labels: str) -> _Timer:
+        """Return a context manager and decorator observing the duration in seconds."""
+        return _Timer(self, labels)
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observations of the given labels."""
+        with self._lock:
+            counts, _ = self._values.get(self._label_values(labels), ([0], 0.0))
+        return sum(counts)
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total)) for key, (counts, total) in self._values.items()
+            )
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels((*self.labelnames, "le"), (*key, _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of the metrics of the agent."""
+
+    def __init__(self) -> None:
+        """Constructor."""
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """Add the metric, returning the already registered one of the same name."""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = [line for metric in metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Declare a counter in the agent registry."""
+    metric = REGISTRY.register(Counter(name, documentation, labelnames))
+    assert isinstance(metric, Counter)  # noqa: S101
+    return metric
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    """Declare a gauge in the agent registry."""
+    metric = REGISTRY.register(Gauge(name, documentation, labelnames))
+    assert isinstance(metric, Gauge)  # noqa: S101
+    return metric
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """Declare a histogram in the agent registry."""
+    metric = REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+    assert isinstance(metric, Histogram)  # noqa: S101
+    return metric
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        logger.debug("Metrics request: " + format, *args)
+
+
+def start_metrics_server(host: str, port: int) -> ThreadingHTTPServer:
+    """Serve the agent metrics on ``http://host:port/metrics`` from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    thread = threading.Thread(
+        target=server.serve_forever, name="waldur-metrics-server", daemon=True
+    )
+    thread.start()
+    logger.info("Serving metrics on http://%s:%s/metrics", host, server.server_port)
+    return server
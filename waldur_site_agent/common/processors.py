@@ -16,13 +16,17 @@ while sharing common patterns for error handling, retry logic, and API communica
 from __future__ import annotations
 
 import abc
+import contextvars
 import datetime
+import functools
 import math
+import threading
 import time as _time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
 from http import HTTPStatus
 from time import sleep
-from typing import Any, ClassVar, Optional, Union
+from typing import Any, Callable, ClassVar, Optional, TypeVar, Union
 from zoneinfo import ZoneInfo
 
 import httpx
@@ -174,9 +178,10 @@ from waldur_site_agent.backend.backends import (
 )
 from waldur_site_agent.backend.exceptions import BackendError
 from waldur_site_agent.backend.structures import BackendResourceInfo
-from waldur_site_agent.common import agent_identity_management, structures, utils
+from waldur_site_agent.common import agent_identity_management, metrics, structures, utils
 from waldur_site_agent.common.healthz import touch_heartbeat
 from waldur_site_agent.common.structures import AccountType
+from waldur_site_agent.common.usage_ledger import TOTAL_USAGE_SCOPE, UsageLedger
 
 # Module-level cache for offering user attribute configs.
 # Keyed by offering UUID, stores (fields_list, exposed_names, timestamp).
@@ -188,6 +193,29 @@ _ATTRIBUTE_CONFIG_TTL = 300  # seconds
 # Touch the liveness heartbeat after every N items in long per-offering loops.
 _HEARTBEAT_BATCH_SIZE = 10
 
+# Default number of resources whose usage is collected with one backend query
+# (backends declaring supports_bulk_usage_report only).
+_DEFAULT_USAGE_REPORT_BATCH_SIZE = 500
+
+PROCESSOR_PHASE_SECONDS = metrics.histogram(
+    "waldur_site_agent_processor_phase_duration_seconds",
+    "Time spent in a processing phase by processor class and phase",
+    ("processor", "phase"),
+)
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+def _timed_phase(method: _F) -> _F:
+    """Observe the duration of the processor method in PROCESSOR_PHASE_SECONDS."""
+
+    @functools.wraps(method)
+    def wrapper(self: OfferingBaseProcessor, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        with PROCESSOR_PHASE_SECONDS.time(processor=type(self).__name__, phase=method.__name__):
+            return method(self, *args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
 
 def _is_transient_waldur_api_error(e: Exception) -> bool:
     """Whether the exception is a transient Waldur API failure worth retrying.
@@ -297,6 +325,8 @@ class OfferingBaseProcessor(abc.ABC):
         # so cache it per offering (keyed by offering uuid) and reuse it across
         # resources within a processing pass instead of re-fetching per resource.
         self._service_accounts_cache: dict[str, list[ProjectServiceAccount]] = {}
+        # Guards the per-cycle caches, which membership sync workers share
+        self._cache_lock = threading.RLock()
         self._course_accounts_cache: dict[str, list[CourseAccount]] = {}
         # Use dependency injection if backend is provided, otherwise create it
         if resource_backend is not None:
@@ -320,18 +350,8 @@ class OfferingBaseProcessor(abc.ABC):
         self._print_current_user()
 
         if waldur_offering is None:
-            waldur_offering = marketplace_provider_offerings_retrieve.sync(
-                client=self.waldur_rest_client,
-                uuid=self.offering.uuid,
-                field=[
-                    ProviderOfferingDetailsFieldEnum.COMPONENTS,
-                    ProviderOfferingDetailsFieldEnum.CUSTOMER_UUID,
-                    ProviderOfferingDetailsFieldEnum.PARTITIONS,
-                    ProviderOfferingDetailsFieldEnum.PLUGIN_OPTIONS,
-                ],
-            )
-        self.waldur_offering = waldur_offering
-        utils.extend_backend_components(self.offering, self.waldur_offering.components)
+            waldur_offering = self._fetch_waldur_offering()
+        self._apply_waldur_offering(waldur_offering)
 
         if service_provider is None:
             service_providers = marketplace_service_providers_list.sync(
@@ -343,6 +363,28 @@ class OfferingBaseProcessor(abc.ABC):
 
         self.service_provider = service_provider
         self.resource_backend.service_provider_uuid = self.service_provider.uuid.hex
+
+        # Per-cycle cache for offering users (avoids redundant API calls)
+        self._offering_users_cache: list[OfferingUser] | None = None
+
+    def _fetch_waldur_offering(self) -> ProviderOfferingDetails:
+        """Fetch the offering details the processor depends on from Waldur."""
+        return marketplace_provider_offerings_retrieve.sync(
+            client=self.waldur_rest_client,
+            uuid=self.offering.uuid,
+            field=[
+                ProviderOfferingDetailsFieldEnum.COMPONENTS,
+                ProviderOfferingDetailsFieldEnum.CUSTOMER_UUID,
+                ProviderOfferingDetailsFieldEnum.PARTITIONS,
+                ProviderOfferingDetailsFieldEnum.PLUGIN_OPTIONS,
+            ],
+        )
+
+    def _apply_waldur_offering(self, waldur_offering: ProviderOfferingDetails) -> None:
+        """Propagate offering components, partitions and options to the backend."""
+        self.waldur_offering = waldur_offering
+        utils.extend_backend_components(self.offering, self.waldur_offering.components)
+
         self.resource_backend.offering_partitions = sorted(
             p.partition_name for p in (self.waldur_offering.partitions or []) if p.partition_name
         )
@@ -355,8 +397,27 @@ class OfferingBaseProcessor(abc.ABC):
             enforce_qos = props.get("enforce_qos") if isinstance(props, dict) else None
             self.resource_backend.offering_enforce_qos = bool(enforce_qos)
 
-        # Per-cycle cache for offering users (avoids redundant API calls)
-        self._offering_users_cache: list[OfferingUser] | None = None
+    def refresh_offering_metadata(self) -> None:
+        """Re-fetch the offering details and components of a long-lived processor.
+
+        Polling agents keep processors across cycles, so offering changes made
+        in Waldur (new components, partitions, plugin options) are picked up
+        here instead of on construction.
+        """
+        self._apply_waldur_offering(self._fetch_waldur_offering())
+
+    def reset_cycle_caches(self) -> None:
+        """Drop the per-cycle caches before the processor handles a new cycle."""
+        with self._cache_lock:
+            self._offering_users_cache = None
+            self._service_accounts_cache.clear()
+            self._course_accounts_cache.clear()
+        self.resource_backend.reset_cycle_caches()
+
+    def close(self) -> None:
+        """Close the connection pools of the Waldur client and the backend."""
+        self.waldur_rest_client.get_httpx_client().close()
+        self.resource_backend.close()
 
     def _print_current_user(self) -> None:
         """Log information about the current authenticated Waldur user."""
@@ -507,14 +568,16 @@ class OfferingBaseProcessor(abc.ABC):
         dynamically from the offering's OfferingUserAttributeConfig (with
         a module-level TTL cache to avoid per-event API calls).
         """
-        if self._offering_users_cache is None:
-            self._offering_users_cache = marketplace_offering_users_list.sync_all(
-                client=self.waldur_rest_client,
-                offering_uuid=[self.offering.uuid],
-                is_restricted=False,
-                field=self._build_offering_user_fields(),
-            )
-        return self._offering_users_cache
+        with self._cache_lock:
+            if self._offering_users_cache is None:
+                self._offering_users_cache = utils.get_all_paginated(
+                    marketplace_offering_users_list.sync_detailed,
+                    self.waldur_rest_client,
+                    offering_uuid=[self.offering.uuid],
+                    is_restricted=False,
+                    field=self._build_offering_user_fields(),
+                )
+            return self._offering_users_cache
 
     def _invalidate_offering_users_cache(self) -> None:
         """Invalidate the offering users cache.
@@ -522,7 +585,8 @@ class OfferingBaseProcessor(abc.ABC):
         Call this after modifying offering users (e.g., creating new ones)
         to ensure fresh data on the next access.
         """
-        self._offering_users_cache = None
+        with self._cache_lock:
+            self._offering_users_cache = None
 
     def _check_backend_id_uniqueness(self, backend_id: str) -> bool:
         """Check if backend_id is unique across offering history.
@@ -681,25 +745,27 @@ class OfferingBaseProcessor(abc.ABC):
         identity, unlike the service-provider-scoped endpoint). One fetch covers
         all projects, so it is cached and reused across resources.
         """
-        if self.offering.uuid not in self._service_accounts_cache:
-            self._service_accounts_cache[self.offering.uuid] = (
-                marketplace_provider_offerings_list_project_service_accounts_list.sync_all(
-                    self.offering.uuid,
-                    client=self.waldur_rest_client,
+        with self._cache_lock:
+            if self.offering.uuid not in self._service_accounts_cache:
+                self._service_accounts_cache[self.offering.uuid] = (
+                    marketplace_provider_offerings_list_project_service_accounts_list.sync_all(
+                        self.offering.uuid,
+                        client=self.waldur_rest_client,
+                    )
                 )
-            )
-        return self._service_accounts_cache[self.offering.uuid]
+            return self._service_accounts_cache[self.offering.uuid]
 
     def _offering_course_accounts(self) -> list[CourseAccount]:
         """Every project's course accounts under the offering, cached per offering."""
-        if self.offering.uuid not in self._course_accounts_cache:
-            self._course_accounts_cache[self.offering.uuid] = (
-                marketplace_provider_offerings_list_course_accounts_list.sync_all(
-                    self.offering.uuid,
-                    client=self.waldur_rest_client,
+        with self._cache_lock:
+            if self.offering.uuid not in self._course_accounts_cache:
+                self._course_accounts_cache[self.offering.uuid] = (
+                    marketplace_provider_offerings_list_course_accounts_list.sync_all(
+                        self.offering.uuid,
+                        client=self.waldur_rest_client,
+                    )
                 )
-            )
-        return self._course_accounts_cache[self.offering.uuid]
+            return self._course_accounts_cache[self.offering.uuid]
 
     def _sync_resource_service_accounts(self, waldur_resource: WaldurResource) -> None:
         """Sync project service accounts between Waldur and the backend resource.
@@ -809,6 +875,38 @@ class OfferingOrderProcessor(OfferingBaseProcessor):
 
     BACKEND_TYPE_KEY = "order_processing_backend"
 
+    def __init__(
+        self,
+        offering: structures.Offering,
+        waldur_rest_client: utils.AuthenticatedClient,
+        timezone: str = "",
+        resource_backend: Optional[BaseBackend] = None,
+        resource_backend_version: Optional[str] = None,
+        waldur_offering: Optional[ProviderOfferingDetails] = None,
+        service_provider: Optional[ServiceProvider] = None,
+        current_user: Optional[UserMe] = None,
+        expose_backend_error_details: bool = True,
+    ) -> None:
+        """Initialize the order processor with the per-cycle async order statuses."""
+        super().__init__(
+            offering,
+            waldur_rest_client,
+            timezone,
+            resource_backend=resource_backend,
+            resource_backend_version=resource_backend_version,
+            waldur_offering=waldur_offering,
+            service_provider=service_provider,
+            current_user=current_user,
+            expose_backend_error_details=expose_backend_error_details,
+        )
+        # Target order backend_id -> completed, checked in bulk once per cycle
+        self._pending_order_statuses: dict[str, bool] = {}
+
+    def reset_cycle_caches(self) -> None:
+        """Drop the per-cycle caches, including the async order statuses."""
+        super().reset_cycle_caches()
+        self._pending_order_statuses.clear()
+
     def log_order_processing_error(self, order: OrderDetails, e: Exception) -> None:
         """Log detailed error information for order processing failures.
 
@@ -851,6 +949,7 @@ class OfferingOrderProcessor(OfferingBaseProcessor):
             logger.warning("Failed to fetch service provider SSH keys: %s", e)
             return {}
 
+    @_timed_phase
     def process_offering(self) -> None:
         """Process all pending and executing orders for this offering.
 
@@ -886,6 +985,7 @@ class OfferingOrderProcessor(OfferingBaseProcessor):
         if not orders:
             logger.info("There are no pending or executing orders")
             return
+        self._pending_order_statuses = self._check_pending_orders(orders)
         for index, order in enumerate(orders):
             if index % _HEARTBEAT_BATCH_SIZE == 0:
                 touch_heartbeat()
@@ -894,6 +994,36 @@ class OfferingOrderProcessor(OfferingBaseProcessor):
             except Exception as e:
                 self.log_order_processing_error(order, e)
 
+    def process_async_orders(self) -> None:
+        """Complete the executing orders waiting for an async backend operation.
+
+        Used in event mode, where no order event arrives when the backend
+        operation of an order finishes. Only EXECUTING orders with a
+        backend_id are processed, and only for backends with async orders.
+        """
+        if not self.resource_backend.supports_async_orders:
+            return
+
+        orders = [
+            order
+            for order in marketplace_orders_list.sync_all(
+                client=self.waldur_rest_client,
+                offering_uuid=self.offering.uuid,
+                state=[OrderState.EXECUTING],
+            )
+            if self._get_order_backend_id(order)
+        ]
+        if not orders:
+            return
+        logger.info("Checking %d executing async orders", len(orders))
+        self._pending_order_statuses = self._check_pending_orders(orders)
+        for order in orders:
+            touch_heartbeat()
+            try:
+                self.process_order_with_retries(order)
+            except Exception as e:
+                self.log_order_processing_error(order, e)
+
     def get_order_info(self, order_uuid: str) -> Optional[OrderDetails]:
         """Retrieve current order information from Waldur API.
 
@@ -911,13 +1041,16 @@ class OfferingOrderProcessor(OfferingBaseProcessor):
 
     def process_order_with_retries(
         self, order_info: OrderDetails, retry_count: int = 10, delay: int = 5
-    ) -> None:
+    ) -> bool:
         """Process an order with automatic retry on failures.
 
         Args:
             order_info: The order to process (used directly on first attempt)
             retry_count: Maximum number of retry attempts (default: 10)
             delay: Delay in seconds between retry attempts (default: 5)
+
+        Returns:
+            False if the order could not be processed after all attempts
         """
         for attempt_number in range(retry_count):
             try:
@@ -930,22 +1063,23 @@ class OfferingOrderProcessor(OfferingBaseProcessor):
                     order_fetched: Optional[OrderDetails] = self.get_order_info(order_info.uuid.hex)
                     if order_fetched is None:
                         logger.error("Failed to get order %s info", order_info.uuid)
-                        return
+                        return False
                     order = order_fetched
                 self.process_order(order)
-                break
+                return True
             except (UnexpectedStatus, httpx.TransportError) as e:
                 self.log_order_processing_error(order, e)
                 logger.info("Retrying order %s processing in %s seconds", order_info.uuid, delay)
                 sleep(delay)
 
-        if attempt_number == retry_count - 1:
-            logger.error(
-                "Failed to process order %s after %s retries, skipping to the next one",
-                order_info.uuid,
-                retry_count,
-            )
+        logger.error(
+            "Failed to process order %s after %s retries, skipping to the next one",
+            order_info.uuid,
+            retry_count,
+        )
+        return False
 
+    @_timed_phase
     def process_order(self, order: OrderDetails) -> None:
         """Process a single order through its complete lifecycle.
 
@@ -1433,9 +1567,39 @@ class OfferingOrderProcessor(OfferingBaseProcessor):
     def _get_order_backend_id(self, order: OrderDetails) -> str:
         return order.backend_id or ""
 
+    def _check_pending_orders(self, orders: list[OrderDetails]) -> dict[str, bool]:
+        """Check all executing async orders of the cycle with one backend call.
+
+        Orders the backend could not check in bulk are left out of the result
+        and polled one by one by _poll_async_target_order.
+        """
+        if not self.resource_backend.supports_async_orders:
+            return {}
+
+        order_backend_ids = [
+            order_backend_id
+            for order in orders
+            if order.state == OrderState.EXECUTING
+            and (order_backend_id := self._get_order_backend_id(order))
+        ]
+        if not order_backend_ids:
+            return {}
+
+        try:
+            return self.resource_backend.check_pending_orders(order_backend_ids)
+        except Exception as e:
+            logger.warning(
+                "Failed to check %d pending target orders in bulk, checking them one by one: %s",
+                len(order_backend_ids),
+                e,
+            )
+            return {}
+
     def _poll_async_target_order(self, order: OrderDetails) -> Optional[bool]:
         """Poll target order on an async backend when order.backend_id is set.
 
+        Uses the status checked in bulk for the cycle when there is one.
+
         Returns:
             True when the target order completed successfully.
             False when the target order is still in progress.
@@ -1448,7 +1612,12 @@ class OfferingOrderProcessor(OfferingBaseProcessor):
         if not order_backend_id:
             return None
 
-        if self.resource_backend.check_pending_order(order_backend_id):
+        # Popped so that retries of the order poll the backend again
+        completed = self._pending_order_statuses.pop(order_backend_id, None)
+        if completed is None:
+            completed = self.resource_backend.check_pending_order(order_backend_id)
+
+        if completed:
             logger.info("Target order %s completed successfully", order_backend_id)
             return True
 
@@ -1793,6 +1962,9 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
         timezone: str = "",
         resource_backend: Optional[BaseBackend] = None,
         resource_backend_version: Optional[str] = None,
+        waldur_offering: Optional[ProviderOfferingDetails] = None,
+        service_provider: Optional[ServiceProvider] = None,
+        current_user: Optional[UserMe] = None,
         expose_backend_error_details: bool = True,
     ) -> None:
         """Initialize the membership processor with per-cycle caches."""
@@ -1802,6 +1974,9 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
             timezone,
             resource_backend=resource_backend,
             resource_backend_version=resource_backend_version,
+            waldur_offering=waldur_offering,
+            service_provider=service_provider,
+            current_user=current_user,
             expose_backend_error_details=expose_backend_error_details,
         )
         # Per-cycle caches to avoid redundant API calls per project
@@ -1809,6 +1984,13 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
         self._team_cache: dict[str, list[ProjectUser]] = {}
         self._source_project_cache: dict[str, Optional[Project]] = {}
 
+    def reset_cycle_caches(self) -> None:
+        """Drop the per-cycle caches, including the team and source project ones."""
+        super().reset_cycle_caches()
+        with self._cache_lock:
+            self._team_cache.clear()
+            self._source_project_cache.clear()
+
     def _get_waldur_resources(self, project_uuid: Optional[str] = None) -> list[WaldurResource]:
         """Fetch Waldur resources for this offering, optionally filtered by project.
 
@@ -1852,24 +2034,29 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
 
         if project_uuid is not None:
             filters["project_uuid"] = project_uuid
-        waldur_resources = marketplace_provider_resources_list.sync_all(
-            client=self.waldur_rest_client,
-            **filters,
-        )
 
-        waldur_resources_filtered = [
-            waldur_resource for waldur_resource in waldur_resources if waldur_resource.backend_id
-        ]
+        # Filter page by page, so resources without backend_id are never accumulated
+        waldur_resources_count = 0
+        waldur_resources_filtered: list[WaldurResource] = []
+        for waldur_resource in utils.iter_paginated(
+            marketplace_provider_resources_list.sync_detailed,
+            self.waldur_rest_client,
+            **filters,
+        ):
+            waldur_resources_count += 1
+            if waldur_resource.backend_id:
+                waldur_resources_filtered.append(waldur_resource)
 
         logger.info(
             "Fetched %s resources (%s with backend_id set) under %s offering",
-            len(waldur_resources),
+            waldur_resources_count,
             len(waldur_resources_filtered),
             self.offering.name,
         )
 
         return waldur_resources_filtered
 
+    @_timed_phase
     def process_resource_by_uuid(self, resource_uuid: str) -> None:
         """Process a specific resource's status and membership data.
 
@@ -1901,11 +2088,14 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
             waldur_resource.name,
             waldur_resource.backend_id,
         )
-        resource_report = self.resource_backend.pull_resources([waldur_resource])
+        resource_report = self.resource_backend.pull_resources(
+            [waldur_resource], include_usage=False
+        )
         if not resource_report:
             return
         self._process_resources(resource_report)
 
+    @_timed_phase
     def process_offering(self, recreate_missing_resources: bool = False) -> None:
         """Process all resources in this offering for membership synchronization.
 
@@ -1935,7 +2125,9 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
             # could overwrite the erred state with that stale view. This is an
             # accepted edge case: the next forced sync re-attempts recreation.
             self._recreate_missing_resources(waldur_resources_info)
-        resource_report = self.resource_backend.pull_resources(waldur_resources_info)
+        resource_report = self.resource_backend.pull_resources(
+            waldur_resources_info, include_usage=False
+        )
 
         self._process_resources(resource_report)
 
@@ -1953,9 +2145,12 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
             return None
         project_uuid = waldur_resource.project_uuid
         cache_key = project_uuid.hex
-        if cache_key in self._source_project_cache:
-            logger.info("Using cached source project for project %s", cache_key)
-            return self._source_project_cache[cache_key]
+        # The fetch runs outside the lock so that workers syncing resources of
+        # other projects do not wait for it
+        with self._cache_lock:
+            if cache_key in self._source_project_cache:
+                logger.info("Using cached source project for project %s", cache_key)
+                return self._source_project_cache[cache_key]
         try:
             projects = marketplace_service_providers_projects_list.sync(
                 self.service_provider.uuid,
@@ -1988,7 +2183,8 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
                 e,
             )
             project = None
-        self._source_project_cache[cache_key] = project
+        with self._cache_lock:
+            self._source_project_cache[cache_key] = project
         return project
 
     def _recreate_missing_resources(self, waldur_resources: list[WaldurResource]) -> None:
@@ -2038,7 +2234,9 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
             self.offering.uuid,
         )
         waldur_resources = self._get_waldur_resources()
-        resource_report = self.resource_backend.pull_resources(waldur_resources)
+        resource_report = self.resource_backend.pull_resources(
+            waldur_resources, include_usage=False
+        )
         for waldur_resource, _ in resource_report.values():
             try:
                 source_project = self._fetch_source_project(waldur_resource)
@@ -2117,7 +2315,7 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
             user_cuid = None
 
         resources: list[WaldurResource] = self._get_waldur_resources(project_uuid=project_uuid)
-        resource_report = self.resource_backend.pull_resources(resources)
+        resource_report = self.resource_backend.pull_resources(resources, include_usage=False)
 
         for waldur_resource, _ in resource_report.values():
             try:
@@ -2235,7 +2433,7 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
         """
         logger.info("Processing sync of all users for project %s", project_uuid)
         resources = self._get_waldur_resources(project_uuid=project_uuid)
-        resource_report = self.resource_backend.pull_resources(resources)
+        resource_report = self.resource_backend.pull_resources(resources, include_usage=False)
         # Fetch offering users
         offering_users = self._refresh_local_offering_users()
         self._sync_user_profiles_to_backend(offering_users)
@@ -2297,9 +2495,10 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
         self, resource: WaldurResource, has_consent: Union[bool, Unset] = UNSET
     ) -> list[ProjectUser]:
         cache_key = resource.project_uuid.hex
-        if cache_key in self._team_cache:
-            logger.info("Using cached team for project %s", cache_key)
-            return self._team_cache[cache_key]
+        with self._cache_lock:
+            if cache_key in self._team_cache:
+                logger.info("Using cached team for project %s", cache_key)
+                return self._team_cache[cache_key]
         logger.info("Fetching Waldur resource team")
         if has_consent is True and self.resource_backend.shared_project_membership:
             # Backends where many resources collapse onto one shared backend project
@@ -2312,7 +2511,8 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
             team = marketplace_provider_resources_team_list.sync(
                 client=self.waldur_rest_client, uuid=resource.uuid.hex, has_consent=has_consent
             )
-        self._team_cache[cache_key] = team
+        with self._cache_lock:
+            self._team_cache[cache_key] = team
         return team
 
     def _fetch_consented_team(self, resource_uuid: str) -> list[ProjectUser]:
@@ -2729,7 +2929,7 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
                 self.offering.name,
             )
             return
-        resource_report = self.resource_backend.pull_resources(resources)
+        resource_report = self.resource_backend.pull_resources(resources, include_usage=False)
         offering_users = self._refresh_local_offering_users()
         self._sync_user_profiles_to_backend(offering_users)
         for waldur_resource, backend_resource_info in resource_report.values():
@@ -2845,6 +3045,7 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
                     exc,
                 )
 
+    @_timed_phase
     def _process_resources(
         self,
         resource_report: dict[str, tuple[WaldurResource, BackendResourceInfo]],
@@ -2863,67 +3064,106 @@ class OfferingMembershipProcessor(OfferingBaseProcessor):
         ):
             offering_users = self._get_waldur_offering_users()
 
-        for index, (waldur_resource, backend_resource_info) in enumerate(resource_report.values()):
-            if index % _HEARTBEAT_BATCH_SIZE == 0:
-                touch_heartbeat()
-            try:
-                source_project = self._fetch_source_project(waldur_resource)
-                self.resource_backend.sync_resource_project(waldur_resource, source_project)
-                self.resource_backend.sync_project_end_date(
-                    waldur_resource, self.waldur_rest_client, source_project
-                )
-                resource_usernames = self._sync_resource_users(
+        resources = list(resource_report.values())
+        max_workers = self._membership_sync_workers()
+        if max_workers <= 1 or len(resources) <= 1:
+            for index, (waldur_resource, backend_resource_info) in enumerate(resources):
+                if index % _HEARTBEAT_BATCH_SIZE == 0:
+                    touch_heartbeat()
+                self._process_resource_membership(
                     waldur_resource, backend_resource_info, offering_users
                 )
-                self._sync_resource_service_accounts(waldur_resource)
-                self._sync_resource_course_accounts(waldur_resource)
-                self._sync_resource_status(waldur_resource)
-                self.resource_backend.sync_resource_end_date(
-                    waldur_resource, self.waldur_rest_client
-                )
-                self.resource_backend.sync_resource_effective_id(
-                    waldur_resource, self.waldur_rest_client
+            return
+
+        logger.info("Syncing %s resources with %s concurrent workers", len(resources), max_workers)
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(resources)), thread_name_prefix="membership"
+        ) as executor:
+            # Each task runs in a copy of the caller's context, so log entries
+            # keep the offering bound by the polling loop
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._process_resource_membership,
+                    waldur_resource,
+                    backend_resource_info,
+                    offering_users,
                 )
-                self._sync_resource_limits(waldur_resource)
-                self._sync_resource_user_limits(waldur_resource, resource_usernames)
+                for waldur_resource, backend_resource_info in resources
+            ]
+            for index, future in enumerate(as_completed(futures)):
+                if index % _HEARTBEAT_BATCH_SIZE == 0:
+                    touch_heartbeat()
+                future.result()
+
+    def _membership_sync_workers(self) -> int:
+        """Number of resources synced concurrently, capped by the backend."""
+        workers = max(1, int(self.offering.backend_settings.get("membership_sync_workers", 1)))
+        return min(workers, max(1, self.resource_backend.max_membership_sync_workers))
 
+    def _process_resource_membership(
+        self,
+        waldur_resource: WaldurResource,
+        backend_resource_info: BackendResourceInfo,
+        offering_users: list[OfferingUser],
+    ) -> None:
+        """Sync a single resource, marking it as erred in Waldur on failure."""
+        try:
+            source_project = self._fetch_source_project(waldur_resource)
+            self.resource_backend.sync_resource_project(waldur_resource, source_project)
+            self.resource_backend.sync_project_end_date(
+                waldur_resource, self.waldur_rest_client, source_project
+            )
+            resource_usernames = self._sync_resource_users(
+                waldur_resource, backend_resource_info, offering_users
+            )
+            self._sync_resource_service_accounts(waldur_resource)
+            self._sync_resource_course_accounts(waldur_resource)
+            self._sync_resource_status(waldur_resource)
+            self.resource_backend.sync_resource_end_date(waldur_resource, self.waldur_rest_client)
+            self.resource_backend.sync_resource_effective_id(
+                waldur_resource, self.waldur_rest_client
+            )
+            self._sync_resource_limits(waldur_resource)
+            self._sync_resource_user_limits(waldur_resource, resource_usernames)
+
+            logger.info(
+                "Refreshing resource %s (%s) last sync",
+                waldur_resource.name,
+                waldur_resource.backend_id,
+            )
+
+            marketplace_provider_resources_refresh_last_sync.sync_detailed(
+                uuid=waldur_resource.uuid.hex,
+                client=self.waldur_rest_client,
+            )
+            if waldur_resource.state == ResourceState.ERRED:
                 logger.info(
-                    "Refreshing resource %s (%s) last sync",
+                    "Setting resource %s (%s) state to OK",
                     waldur_resource.name,
                     waldur_resource.backend_id,
                 )
-
-                marketplace_provider_resources_refresh_last_sync.sync_detailed(
+                marketplace_provider_resources_set_as_ok.sync_detailed(
                     uuid=waldur_resource.uuid.hex,
                     client=self.waldur_rest_client,
                 )
-                if waldur_resource.state == ResourceState.ERRED:
-                    logger.info(
-                        "Setting resource %s (%s) state to OK",
-                        waldur_resource.name,
-                        waldur_resource.backend_id,
-                    )
-                    marketplace_provider_resources_set_as_ok.sync_detailed(
-                        uuid=waldur_resource.uuid.hex,
-                        client=self.waldur_rest_client,
-                    )
-            except Exception as e:
-                logger.exception(
-                    "Error while processing allocation %s: %s",
-                    waldur_resource.backend_id,
-                    e,
-                )
-                error_message, error_traceback = utils.format_waldur_error_details(
-                    e, self.expose_backend_error_details
-                )
-                utils.mark_waldur_resources_as_erred(
-                    self.waldur_rest_client,
-                    [waldur_resource],
-                    error_details={
-                        "error_message": error_message,
-                        "error_traceback": error_traceback,
-                    },
-                )
+        except Exception as e:
+            logger.exception(
+                "Error while processing allocation %s: %s",
+                waldur_resource.backend_id,
+                e,
+            )
+            error_message, error_traceback = utils.format_waldur_error_details(
+                e, self.expose_backend_error_details
+            )
+            utils.mark_waldur_resources_as_erred(
+                self.waldur_rest_client,
+                [waldur_resource],
+                error_details={
+                    "error_message": error_message,
+                    "error_traceback": error_traceback,
+                },
+            )
 
     def process_account_creation(self, account_username: str, account_type: AccountType) -> None:
         """Process service or course account creation."""
@@ -3011,6 +3251,7 @@ class OfferingReportProcessor(OfferingBaseProcessor):
         resource_backend_version: Optional[str] = None,
         reporting_periods: int = 1,
         expose_backend_error_details: bool = True,
+        usage_ledger: Optional[UsageLedger] = None,
     ) -> None:
         """Initialize the report processor.
 
@@ -3024,6 +3265,8 @@ class OfferingReportProcessor(OfferingBaseProcessor):
                 (1 = current month only, 2 = current + previous).
             expose_backend_error_details: Whether to forward raw exception
                 details to Waldur when marking objects as ERRED.
+            usage_ledger: Local ledger of submitted usage; when set, unchanged
+                usage is skipped without contacting Waldur.
         """
         super().__init__(
             offering,
@@ -3034,6 +3277,23 @@ class OfferingReportProcessor(OfferingBaseProcessor):
             expose_backend_error_details=expose_backend_error_details,
         )
         self.reporting_periods = reporting_periods
+        self.usage_ledger = usage_ledger
+        # Per-cycle indexes of the offering's usage records, keyed by billing period
+        self._component_usages_index: dict[datetime.date, dict[str, list[ComponentUsage]]] = {}
+        self._user_usage_parents_index: dict[datetime.date, set[str]] = {}
+        # (billing period, resource UUID) pairs whose records changed in this cycle
+        self._stale_component_usages: set[tuple[datetime.date, str]] = set()
+        # Past-period usage collected for a whole batch of resources in this cycle,
+        # keyed by (year, month), then resource backend ID
+        self._past_period_reports: dict[tuple[int, int], dict[str, dict]] = {}
+
+    def reset_cycle_caches(self) -> None:
+        """Drop the per-cycle caches, including the usage record indexes."""
+        super().reset_cycle_caches()
+        self._component_usages_index.clear()
+        self._user_usage_parents_index.clear()
+        self._stale_component_usages.clear()
+        self._past_period_reports.clear()
 
     @staticmethod
     def _compute_reporting_periods(
@@ -3076,6 +3336,7 @@ class OfferingReportProcessor(OfferingBaseProcessor):
                 return None
         return None
 
+    @_timed_phase
     def process_offering(self) -> None:
         """Process all resources in this offering for usage reporting.
 
@@ -3088,6 +3349,12 @@ class OfferingReportProcessor(OfferingBaseProcessor):
             self.offering.name,
             self.offering.uuid,
         )
+        if self.usage_ledger is not None:
+            current_time = backend_utils.get_current_time_in_timezone(self.timezone)
+            oldest_year, oldest_month, _ = self._compute_reporting_periods(
+                current_time, self.reporting_periods
+            )[0]
+            self.usage_ledger.prune(datetime.date(oldest_year, oldest_month, 1))
         waldur_offering = marketplace_provider_offerings_retrieve.sync(
             client=self.waldur_rest_client,
             uuid=self.offering.uuid,
@@ -3124,6 +3391,10 @@ class OfferingReportProcessor(OfferingBaseProcessor):
             "Fetched %s resources under %s offering", len(waldur_resources), self.offering.name
         )
 
+        if self.resource_backend.supports_bulk_usage_report:
+            self._process_resources_in_batches(waldur_resources, waldur_offering)
+            return
+
         for index, waldur_resource in enumerate(waldur_resources):
             if index % _HEARTBEAT_BATCH_SIZE == 0:
                 touch_heartbeat()
@@ -3136,12 +3407,128 @@ class OfferingReportProcessor(OfferingBaseProcessor):
                     e,
                 )
 
+    @_timed_phase
+    def _process_resources_in_batches(
+        self,
+        waldur_resources: list[WaldurResource],
+        waldur_offering: ProviderOfferingDetails,
+    ) -> None:
+        """Collect usage per chunk of resources with one backend query, then submit it.
+
+        The chunk size comes from the ``usage_report_batch_size`` backend setting.
+        A chunk whose bulk query fails falls back to pulling its resources one by one,
+        so a single bad batch does not cost the whole cycle.
+        """
+        batch_size = max(
+            1,
+            int(
+                self.offering.backend_settings.get(
+                    "usage_report_batch_size", _DEFAULT_USAGE_REPORT_BATCH_SIZE
+                )
+            ),
+        )
+        index = 0
+        for batch_start in range(0, len(waldur_resources), batch_size):
+            batch = waldur_resources[batch_start : batch_start + batch_size]
+            touch_heartbeat()
+            # Recorded before the pull for the month-boundary check in _process_resource
+            pre_pull_time = backend_utils.get_current_time_in_timezone(self.timezone)
+            batch_report: Optional[dict[str, BackendResourceInfo]]
+            try:
+                batch_report = self.resource_backend.pull_resources_usage(batch)
+            except Exception as e:
+                logger.exception(
+                    "Unable to pull usage for %s resources in one query, "
+                    "falling back to per-resource pulls: %s",
+                    len(batch),
+                    e,
+                )
+                batch_report = None
+
+            self._collect_past_period_usage(batch, pre_pull_time)
+
+            for waldur_resource in batch:
+                if index % _HEARTBEAT_BATCH_SIZE == 0:
+                    touch_heartbeat()
+                index += 1
+                try:
+                    if batch_report is None:
+                        self._process_resource_with_retries(waldur_resource, waldur_offering)
+                        continue
+                    backend_id = waldur_resource.backend_id
+                    backend_resource_info = (
+                        batch_report.get(backend_id) if isinstance(backend_id, str) else None
+                    )
+                    if backend_resource_info is None:
+                        logger.warning(
+                            "The resource %s is missing in backend", waldur_resource.backend_id
+                        )
+                        continue
+                    self._process_resource_with_retries(
+                        waldur_resource,
+                        waldur_offering,
+                        backend_resource_info=backend_resource_info,
+                        pre_pull_time=pre_pull_time,
+                    )
+                except Exception as e:
+                    logger.exception(
+                        "Error while processing allocation %s: %s",
+                        waldur_resource.backend_id,
+                        e,
+                    )
+
+    def _collect_past_period_usage(
+        self, waldur_resources: list[WaldurResource], current_time: datetime.datetime
+    ) -> None:
+        """Collect the past periods' usage of the resources with one backend query per period.
+
+        The reports are kept until the resources are processed. A period whose
+        query fails is left to the per-resource queries of _process_resource_period.
+        """
+        backend_ids = [
+            waldur_resource.backend_id
+            for waldur_resource in waldur_resources
+            if waldur_resource.backend_id
+        ]
+        if not backend_ids:
+            return
+        for year, month, is_current in self._compute_reporting_periods(
+            current_time, self.reporting_periods
+        ):
+            if is_current:
+                continue
+            logger.info(
+                "Fetching historical usage for %s resources, period %04d-%02d",
+                len(backend_ids),
+                year,
+                month,
+            )
+            try:
+                period_report = self.resource_backend.get_usage_report_for_period(
+                    backend_ids, year, month
+                )
+            except Exception as e:
+                logger.warning(
+                    "Unable to fetch historical usage for period %04d-%02d in one query, "
+                    "falling back to per-resource queries: %s",
+                    year,
+                    month,
+                    e,
+                )
+                continue
+            self._past_period_reports.setdefault((year, month), {}).update(
+                {backend_id: period_report.get(backend_id, {}) for backend_id in backend_ids}
+            )
+
     def _process_resource_with_retries(
         self,
         waldur_resource: WaldurResource,
         waldur_offering: ProviderOfferingDetails,
         retry_count: int = 10,
         delay: int = 5,
+        *,
+        backend_resource_info: Optional[BackendResourceInfo] = None,
+        pre_pull_time: Optional[datetime.datetime] = None,
     ) -> None:
         for attempt_number in range(retry_count):
             try:
@@ -3152,7 +3539,12 @@ class OfferingReportProcessor(OfferingBaseProcessor):
                     waldur_resource.name,
                     waldur_resource.backend_id,
                 )
-                self._process_resource(waldur_resource, waldur_offering)
+                self._process_resource(
+                    waldur_resource,
+                    waldur_offering,
+                    backend_resource_info=backend_resource_info,
+                    pre_pull_time=pre_pull_time,
+                )
                 break
             except Exception as e:
                 logger.warning(
@@ -3217,6 +3609,79 @@ class OfferingReportProcessor(OfferingBaseProcessor):
 
         return False
 
+    def _get_component_usages(
+        self, resource_uuid: str, billing_period: datetime.date
+    ) -> list[ComponentUsage]:
+        """Return the ComponentUsage records of the resource in the billing period.
+
+        The records of the whole offering are listed once per billing period and
+        cycle, then indexed by resource UUID. A resource whose usage was submitted
+        in this cycle is re-read on its own, since set_usage replaced its records.
+        """
+        stale_key = (billing_period, resource_uuid)
+        if stale_key in self._stale_component_usages:
+            self._stale_component_usages.discard(stale_key)
+            usages = marketplace_component_usages_list.sync_all(
+                client=self.waldur_rest_client,
+                resource_uuid=resource_uuid,
+                billing_period=billing_period,
+                field=[
+                    ComponentUsageFieldEnum.UUID,
+                    ComponentUsageFieldEnum.TYPE,
+                    ComponentUsageFieldEnum.USAGE,
+                ],
+            )
+            self._component_usages_index.setdefault(billing_period, {})[resource_uuid] = usages
+            return usages
+
+        index = self._component_usages_index.get(billing_period)
+        if index is None:
+            index = {}
+            for usage in utils.iter_paginated(
+                marketplace_component_usages_list.sync_detailed,
+                self.waldur_rest_client,
+                offering_uuid=self.offering.uuid,
+                billing_period=billing_period,
+                field=[
+                    ComponentUsageFieldEnum.UUID,
+                    ComponentUsageFieldEnum.TYPE,
+                    ComponentUsageFieldEnum.USAGE,
+                    ComponentUsageFieldEnum.RESOURCE_UUID,
+                ],
+            ):
+                if isinstance(usage.resource_uuid, type(UNSET)):
+                    continue
+                index.setdefault(usage.resource_uuid.hex, []).append(usage)
+            logger.info(
+                "Fetched usage records of %s resources for billing period %s",
+                len(index),
+                billing_period,
+            )
+            self._component_usages_index[billing_period] = index
+        return index.get(resource_uuid, [])
+
+    def _get_user_usage_parent_uuids(self, billing_period: datetime.date) -> set[str]:
+        """Return UUIDs of the offering's ComponentUsages having per-user breakdowns."""
+        parent_uuids = self._user_usage_parents_index.get(billing_period)
+        if parent_uuids is not None:
+            return parent_uuids
+
+        parent_uuids = set()
+        for user_usage in utils.iter_paginated(
+            marketplace_component_user_usages_list.sync_detailed,
+            self.waldur_rest_client,
+            offering_uuid=self.offering.uuid,
+            component_usage_billing_period=billing_period,
+            field=[ComponentUserUsageFieldEnum.COMPONENT_USAGE],
+        ):
+            if not isinstance(user_usage.component_usage, type(UNSET)) and (
+                user_usage.component_usage
+            ):
+                # component_usage is a URL like ".../marketplace-component-usages/{uuid}/"
+                parent_uuids.add(user_usage.component_usage.rstrip("/").split("/")[-1])
+        self._user_usage_parents_index[billing_period] = parent_uuids
+        return parent_uuids
+
     def _submit_total_usage_for_resource(
         self,
         waldur_resource: WaldurResource,
@@ -3261,20 +3726,27 @@ class OfferingReportProcessor(OfferingBaseProcessor):
         if billing_period_start is None:
             billing_period_start = backend_utils.month_start(report_date).date()
 
-        # Always fetch existing ComponentUsage records for this billing period.
+        ledger_usage = {
+            TOTAL_USAGE_SCOPE: {
+                c: amount for c, amount in total_usage.items() if c in component_types
+            }
+        }
+        if self.usage_ledger is not None and self.usage_ledger.matches(
+            resource_uuid, billing_period_start, ledger_usage
+        ):
+            logger.info(
+                "Usage for resource %s in billing period %s matches the usage ledger; "
+                "skipping set_usage submission.",
+                waldur_resource.backend_id,
+                billing_period_start,
+            )
+            return
+
+        # Look up existing ComponentUsage records for this billing period.
         # Used for two purposes:
         #   1) idempotency check below (skip set_usage when nothing changed)
         #   2) anomaly detection on non-decreasing-usage backends
-        existing_usages = marketplace_component_usages_list.sync_all(
-            client=self.waldur_rest_client,
-            resource_uuid=resource_uuid,
-            billing_period=billing_period_start,
-            field=[
-                ComponentUsageFieldEnum.UUID,
-                ComponentUsageFieldEnum.TYPE,
-                ComponentUsageFieldEnum.USAGE,
-            ],
-        )
+        existing_usages = self._get_component_usages(resource_uuid, billing_period_start)
 
         # Idempotency: skip set_usage when the reported usage matches every
         # existing record. Avoids fanning out the marketplace post_save
@@ -3289,6 +3761,8 @@ class OfferingReportProcessor(OfferingBaseProcessor):
                 waldur_resource.backend_id,
                 billing_period_start,
             )
+            if self.usage_ledger is not None:
+                self.usage_ledger.record(resource_uuid, billing_period_start, ledger_usage)
             return
 
         current_usage_by_type: dict[str, float] = {}
@@ -3321,18 +3795,7 @@ class OfferingReportProcessor(OfferingBaseProcessor):
         if not self.resource_backend.supports_decreasing_usage:
             # Filter out component usages that have per-user breakdowns;
             # only aggregate records should participate in anomaly detection.
-            user_usages = marketplace_component_user_usages_list.sync_all(
-                client=self.waldur_rest_client,
-                resource_uuid=resource_uuid,
-                component_usage_billing_period=billing_period_start,
-                field=[ComponentUserUsageFieldEnum.COMPONENT_USAGE],
-            )
-            user_usage_parent_uuids = set()
-            for uu in user_usages:
-                if not isinstance(uu.component_usage, type(UNSET)) and uu.component_usage:
-                    # component_usage is a URL like ".../marketplace-component-usages/{uuid}/"
-                    parent_uuid = uu.component_usage.rstrip("/").split("/")[-1]
-                    user_usage_parent_uuids.add(parent_uuid)
+            user_usage_parent_uuids = self._get_user_usage_parent_uuids(billing_period_start)
 
             aggregate_usages = (
                 [u for u in existing_usages if str(u.uuid) not in user_usage_parent_uuids]
@@ -3361,6 +3824,9 @@ class OfferingReportProcessor(OfferingBaseProcessor):
         marketplace_component_usages_set_usage.sync_detailed(
             client=self.waldur_rest_client, body=request_body
         )
+        self._stale_component_usages.add((billing_period_start, resource_uuid))
+        if self.usage_ledger is not None:
+            self.usage_ledger.record(resource_uuid, billing_period_start, ledger_usage)
 
     @staticmethod
     def _usage_matches_existing(
@@ -3415,17 +3881,22 @@ class OfferingReportProcessor(OfferingBaseProcessor):
         usages: dict[str, dict[str, float]],
         waldur_component_usages: list[ComponentUsage] | None,
         report_date: Optional[datetime.datetime] = None,
-    ) -> None:
+    ) -> dict[str, dict[str, float]]:
         """Reports per-user usage for all users in bulk, one API call per component.
 
         Args:
             usages: Mapping of username -> {component_type -> usage amount}.
             waldur_component_usages: List of component usage records from Waldur.
             report_date: Datetime to use as the report date. Defaults to current time.
+
+        Returns:
+            The submitted usages, username -> {component_type -> usage amount}.
+            Components without a component usage record in Waldur are not submitted.
         """
+        submitted: dict[str, dict[str, float]] = {}
         if not waldur_component_usages:
             logger.warning("No component usages found, skipping per-user usage reporting")
-            return
+            return submitted
 
         if report_date is None:
             report_date = backend_utils.get_current_time_in_timezone(self.timezone)
@@ -3438,6 +3909,8 @@ class OfferingReportProcessor(OfferingBaseProcessor):
 
         for component_usage in waldur_component_usages:
             component_type = component_usage.type_
+            if not isinstance(component_type, str):
+                continue
             items: list[ComponentUserUsageCreateRequest] = []
             for username, user_usage in usages.items():
                 usage = user_usage.get(component_type)
@@ -3466,24 +3939,36 @@ class OfferingReportProcessor(OfferingBaseProcessor):
                 client=self.waldur_rest_client,
                 body=ComponentUserUsageBulkCreateRequest(usages=items),
             )
+            for username, user_usage in usages.items():
+                if user_usage.get(component_type) is not None:
+                    submitted.setdefault(username, {})[component_type] = user_usage[component_type]
+        return submitted
 
     def _process_resource(
         self,
         waldur_resource: WaldurResource,
         waldur_offering: ProviderOfferingDetails,
+        backend_resource_info: Optional[BackendResourceInfo] = None,
+        pre_pull_time: Optional[datetime.datetime] = None,
     ) -> None:
-        """Processes usage report for the resource across configured billing periods."""
+        """Processes usage report for the resource across configured billing periods.
+
+        ``backend_resource_info`` and ``pre_pull_time`` are passed when the usage
+        was already collected by a batched query; otherwise the resource is pulled here.
+        """
         resource_backend_id = waldur_resource.backend_id
-        logger.info("Pulling resource %s (%s)", waldur_resource.name, resource_backend_id)
 
-        # Record the month BEFORE pulling resource data so we can detect
-        # a month-boundary crossing (e.g. pull at 23:59 Mar 31, process at 00:00 Apr 1).
-        pre_pull_time = backend_utils.get_current_time_in_timezone(self.timezone)
+        if backend_resource_info is None or pre_pull_time is None:
+            logger.info("Pulling resource %s (%s)", waldur_resource.name, resource_backend_id)
 
-        backend_resource_info = self.resource_backend.pull_resource(waldur_resource)
-        if backend_resource_info is None:
-            logger.warning("The resource %s is missing in backend", resource_backend_id)
-            return
+            # Record the month BEFORE pulling resource data so we can detect a
+            # month-boundary crossing (e.g. pull at 23:59 Mar 31, process at 00:00 Apr 1).
+            pre_pull_time = backend_utils.get_current_time_in_timezone(self.timezone)
+
+            backend_resource_info = self.resource_backend.pull_resource(waldur_resource)
+            if backend_resource_info is None:
+                logger.warning("The resource %s is missing in backend", resource_backend_id)
+                return
 
         # Invalidate cache of Waldur resource
         logger.info(
@@ -3604,19 +4089,24 @@ class OfferingReportProcessor(OfferingBaseProcessor):
             # Use current-month data already fetched by pull_resource
             usages = dict(backend_resource_info.usage)
         else:
-            logger.info(
-                "Fetching historical usage for %s, period %04d-%02d",
-                resource_backend_id,
-                year,
-                month,
-            )
-            period_report = self.resource_backend.get_usage_report_for_period(
-                [resource_backend_id],
-                year,
-                month,
-                waldur_resource=waldur_resource_info,
-            )
-            usages = period_report.get(resource_backend_id, {})
+            past_period_report = self._past_period_reports.get((year, month), {})
+            if resource_backend_id in past_period_report:
+                # Collected for the whole batch by _collect_past_period_usage
+                usages = dict(past_period_report.pop(resource_backend_id))
+            else:
+                logger.info(
+                    "Fetching historical usage for %s, period %04d-%02d",
+                    resource_backend_id,
+                    year,
+                    month,
+                )
+                period_report = self.resource_backend.get_usage_report_for_period(
+                    [resource_backend_id],
+                    year,
+                    month,
+                    waldur_resource=waldur_resource_info,
+                )
+                usages = period_report.get(resource_backend_id, {})
             if not usages:
                 logger.info(
                     "No historical data for %s in %04d-%02d, skipping",
@@ -3648,20 +4138,36 @@ class OfferingReportProcessor(OfferingBaseProcessor):
         if not usages:
             return
 
-        waldur_component_usages = marketplace_component_usages_list.sync_all(
-            client=self.waldur_rest_client,
-            resource_uuid=waldur_resource_info.uuid.hex,
-            billing_period=billing_period_start,
-            field=[
-                ComponentUsageFieldEnum.UUID,
-                ComponentUsageFieldEnum.TYPE,
-                ComponentUsageFieldEnum.USAGE,
-            ],
+        resource_uuid = waldur_resource_info.uuid.hex
+        offering_components = (
+            waldur_offering.components if not isinstance(waldur_offering.components, Unset) else []
         )
+        component_types = {
+            component.type_
+            for component in offering_components
+            if isinstance(component.type_, str) and component.type_
+        }
+        ledger_usages = {
+            username: {c: amount for c, amount in user_usage.items() if c in component_types}
+            for username, user_usage in usages.items()
+        }
+        if self.usage_ledger is not None and self.usage_ledger.matches(
+            resource_uuid, billing_period_start, ledger_usages
+        ):
+            logger.info(
+                "Per-user usages for period %04d-%02d match the usage ledger, skipping",
+                year,
+                month,
+            )
+            return
+
+        waldur_component_usages = self._get_component_usages(resource_uuid, billing_period_start)
         logger.info("Setting per-user usages for period %04d-%02d", year, month)
-        self._submit_bulk_user_usages_for_resource(
+        submitted_usages = self._submit_bulk_user_usages_for_resource(
             usages, waldur_component_usages, report_date=report_date
         )
+        if self.usage_ledger is not None and submitted_usages:
+            self.usage_ledger.record(resource_uuid, billing_period_start, submitted_usages)
 
 
 class OfferingImportableResourcesProcessor(OfferingBaseProcessor):
@@ -3669,6 +4175,7 @@ class OfferingImportableResourcesProcessor(OfferingBaseProcessor):
 
     BACKEND_TYPE_KEY = "order_processing_backend"
 
+    @_timed_phase
     def process_offering(self) -> None:
         """This function is blank because the processor operates over backend resource request."""
 
@@ -59,6 +59,99 @@ class LogShippingConfig(BaseModel):
     )
 
 
+class OfferingWorkersConfig(BaseModel):
+    """Number of offerings processed concurrently by each agent mode.
+
+    Each offering runs in its own worker with its own Waldur client and backend.
+    The default of one worker keeps offerings processed one after another.
+    """
+
+    order_process: int = Field(
+        default=1, ge=1, description="Concurrent offerings in order processing mode"
+    )
+    report: int = Field(default=1, ge=1, description="Concurrent offerings in report mode")
+    membership_sync: int = Field(
+        default=1, ge=1, description="Concurrent offerings in membership sync mode"
+    )
+    event_process: int = Field(
+        default=1,
+        ge=1,
+        description="Concurrent offerings in the initial processing of event processing mode",
+    )
+
+
+class EventDispatchConfig(BaseModel):
+    """Worker pool handling the STOMP messages in event processing mode.
+
+    Messages about the same project, resource or order are handled in
+    arrival order by one worker; unrelated ones run in parallel. With no
+    workers, every subscription handles its messages on its receiver thread.
+    """
+
+    workers: int = Field(
+        default=0, ge=0, description="Worker threads handling STOMP messages, 0 disables the pool"
+    )
+    queue_size: int = Field(
+        default=100,
+        ge=1,
+        description="Messages queued per worker before reading from the broker pauses",
+    )
+    enqueue_timeout_seconds: float = Field(
+        default=10.0,
+        ge=0,
+        description=(
+            "With event_retry, seconds a message waits for a full worker queue "
+            "before it is returned to the broker"
+        ),
+    )
+
+
+class EventRetryConfig(BaseModel):
+    """Client-acknowledged STOMP consumption with an on-disk retry queue.
+
+    When enabled, messages are acknowledged only after their handler finished;
+    messages whose handling failed are stored locally and retried with
+    exponential backoff until they succeed or run out of attempts.
+    """
+
+    enabled: bool = Field(default=False, description="Enable acknowledged consumption")
+    max_size: int = Field(
+        default=10000, ge=1, description="Messages kept for retry before the oldest are dropped"
+    )
+    max_attempts: int = Field(
+        default=8, ge=1, description="Failed retries after which a message is dropped"
+    )
+    initial_delay_seconds: int = Field(
+        default=30, ge=1, description="Delay before the first retry, doubled after each failure"
+    )
+    max_delay_seconds: int = Field(default=3600, ge=1, description="Upper bound of the delay")
+
+
+class MetricsConfig(BaseModel):
+    """Local HTTP endpoint serving the agent metrics in the Prometheus text format."""
+
+    enabled: bool = Field(default=False, description="Serve the metrics on /metrics")
+    host: str = Field(default="127.0.0.1", description="Address the metrics endpoint listens on")
+    port: int = Field(
+        default=9108, ge=0, le=65535, description="Port the metrics endpoint listens on"
+    )
+
+
+class UsageLedgerConfig(BaseModel):
+    """Configuration of the on-disk ledger of submitted usage in report mode.
+
+    When enabled, the report processor skips usage equal to what it submitted
+    before without contacting Waldur, until the entry is older than the TTL.
+    """
+
+    enabled: bool = Field(default=False, description="Enable the usage ledger")
+    refresh_ttl_minutes: int = Field(
+        default=360,
+        ge=0,
+        description="Minutes after which unchanged usage is verified against Waldur again",
+    )
+
+
 class BackendComponent(BaseModel):
     """Configuration for a single backend component (e.g., CPU, memory, storage).
 
@@ -203,6 +296,17 @@ class Offering(BaseModel):
     stomp_ws_host: Optional[str] = Field(default=None, description="STOMP WebSocket host")
     stomp_ws_port: Optional[int] = Field(default=None, description="STOMP WebSocket port")
     stomp_ws_path: Optional[str] = Field(default=None, description="STOMP WebSocket path")
+    stomp_shared_connection: bool = Field(
+        default=False,
+        description="Carry the subscriptions of all observable object types of the offering "
+        "over a single STOMP connection instead of one connection per type",
+    )
+    stomp_coalescing_window_seconds: float = Field(
+        default=0,
+        ge=0,
+        description="Seconds USER_ROLE and RESOURCE events are collected per project or "
+        "resource before being handled together; 0 handles every event on arrival",
+    )
 
     # Backend selection for different operations
     order_processing_backend: Optional[str] = Field(
@@ -380,6 +484,35 @@ class WaldurAgentConfiguration(BaseModel):
         default_factory=LogShippingConfig,
         description="Configuration for shipping agent logs to Waldur",
     )
+    offering_workers: OfferingWorkersConfig = Field(
+        default_factory=OfferingWorkersConfig,
+        description="Number of offerings processed concurrently per agent mode",
+    )
+    background_initial_processing: bool = Field(
+        default=False,
+        description="Subscribe to STOMP events right after processing the pending orders and "
+        "run the initial membership sync of event processing mode in the background",
+    )
+    event_dispatch: EventDispatchConfig = Field(
+        default_factory=EventDispatchConfig,
+        description="Worker pool handling STOMP messages in event processing mode",
+    )
+    event_retry: EventRetryConfig = Field(
+        default_factory=EventRetryConfig,
+        description="Acknowledged STOMP consumption with a local retry queue",
+    )
+    metrics: MetricsConfig = Field(
+        default_factory=MetricsConfig,
+        description="Local HTTP endpoint serving the agent metrics",
+    )
+    state_dir: str = Field(
+        default="/var/lib/waldur-site-agent",
+        description="Directory for the agent's persistent local state",
+    )
+    usage_ledger: UsageLedgerConfig = Field(
+        default_factory=UsageLedgerConfig,
+        description="Configuration of the local ledger of submitted usage",
+    )
 
     # Runtime fields (set programmatically, not validated)
     waldur_site_agent_mode: str = ""
@@ -488,6 +621,35 @@ class RootConfiguration(BaseModel):
         default_factory=LogShippingConfig,
         description="Configuration for shipping agent logs to Waldur",
     )
+    offering_workers: OfferingWorkersConfig = Field(
+        default_factory=OfferingWorkersConfig,
+        description="Number of offerings processed concurrently per agent mode",
+    )
+    background_initial_processing: bool = Field(
+        default=False,
+        description="Subscribe to STOMP events right after processing the pending orders and "
+        "run the initial membership sync of event processing mode in the background",
+    )
+    event_dispatch: EventDispatchConfig = Field(
+        default_factory=EventDispatchConfig,
+        description="Worker pool handling STOMP messages in event processing mode",
+    )
+    event_retry: EventRetryConfig = Field(
+        default_factory=EventRetryConfig,
+        description="Acknowledged STOMP consumption with a local retry queue",
+    )
+    metrics: MetricsConfig = Field(
+        default_factory=MetricsConfig,
+        description="Local HTTP endpoint serving the agent metrics",
+    )
+    state_dir: str = Field(
+        default="/var/lib/waldur-site-agent",
+        description="Directory for the agent's persistent local state",
+    )
+    usage_ledger: UsageLedgerConfig = Field(
+        default_factory=UsageLedgerConfig,
+        description="Configuration of the local ledger of submitted usage",
+    )
 
     @field_validator("sentry_dsn")
     @classmethod
@@ -569,6 +731,13 @@ class RootConfiguration(BaseModel):
             reporting_periods=self.reporting_periods,
             expose_backend_error_details=self.expose_backend_error_details,
             log_shipping=self.log_shipping,
+            offering_workers=self.offering_workers,
+            background_initial_processing=self.background_initial_processing,
+            event_dispatch=self.event_dispatch,
+            event_retry=self.event_retry,
+            metrics=self.metrics,
+            state_dir=self.state_dir,
+            usage_ledger=self.usage_ledger,
         )
 
     @field_validator("timezone")
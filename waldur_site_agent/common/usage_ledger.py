@@ -0,0 +1,134 @@
+"""On-disk ledger of the usage the agent last submitted to Waldur.
+
+The report processor records every total and per-user usage it submits (or
+finds already stored in Waldur) per resource, billing period and component.
+On later cycles a report equal to its ledger entry is skipped without asking
+Waldur, as long as the entry is younger than the refresh TTL. Older entries
+fall through to the regular Waldur-side idempotency check, which renews them.
+"""
+
+from __future__ import annotations
+
+import datetime
+import math
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+
+LEDGER_FILE_NAME = "usage-ledger.sqlite3"
+
+# Scope of the total resource usage, the other scopes are usernames
+TOTAL_USAGE_SCOPE = ""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submitted_usage (
+    resource_uuid TEXT NOT NULL,
+    billing_period TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    component TEXT NOT NULL,
+    amount REAL NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (resource_uuid, billing_period, scope, component)
+)
+"""
+
+
+class UsageLedger:
+    """SQLite-backed record of submitted usage, shared by the offerings of an agent."""
+
+    def __init__(self, path: str, refresh_ttl: float) -> None:
+        """Constructor.
+
+        Args:
+            path: Location of the SQLite database, created if missing
+            refresh_ttl: Seconds after which an entry is verified against Waldur again
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.refresh_ttl = refresh_ttl
+        # Offerings are processed by concurrent workers
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(_SCHEMA)
+
+    def matches(
+        self,
+        resource_uuid: str,
+        billing_period: datetime.date,
+        usages: Mapping[str, Mapping[str, float]],
+    ) -> bool:
+        """Return True when every scope's usage equals its fresh ledger entry.
+
+        Args:
+            resource_uuid: UUID of the Waldur resource
+            billing_period: First day of the billing period
+            usages: Mapping of scope (TOTAL_USAGE_SCOPE or username) to
+                component type to usage amount
+        """
+        if not usages:
+            return False
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT scope, component, amount, recorded_at FROM submitted_usage "
+                "WHERE resource_uuid = ? AND billing_period = ?",
+                (resource_uuid, billing_period.isoformat()),
+            ).fetchall()
+
+        expires_before = time.time() - self.refresh_ttl
+        recorded: dict[str, dict[str, float]] = {}
+        for scope, component, amount, recorded_at in rows:
+            if scope not in usages:
+                continue
+            if recorded_at < expires_before:
+                return False
+            recorded.setdefault(scope, {})[component] = amount
+
+        for scope, usage in usages.items():
+            scope_recorded = recorded.get(scope)
+            if scope_recorded is None or set(scope_recorded) != set(usage):
+                return False
+            if not all(
+                math.isclose(float(amount), scope_recorded[component], rel_tol=1e-9, abs_tol=1e-6)
+                for component, amount in usage.items()
+            ):
+                return False
+        return True
+
+    def record(
+        self,
+        resource_uuid: str,
+        billing_period: datetime.date,
+        usages: Mapping[str, Mapping[str, float]],
+    ) -> None:
+        """Replace the ledger entries of the given scopes with the submitted usage."""
+        period = billing_period.isoformat()
+        now = time.time()
+        with self._lock, self._connection:
+            for scope, usage in usages.items():
+                self._connection.execute(
+                    "DELETE FROM submitted_usage "
+                    "WHERE resource_uuid = ? AND billing_period = ? AND scope = ?",
+                    (resource_uuid, period, scope),
+                )
+                self._connection.executemany(
+                    "INSERT INTO submitted_usage VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (resource_uuid, period, scope, component, float(amount), now)
+                        for component, amount in usage.items()
+                    ],
+                )
+
+    def prune(self, oldest_period: datetime.date) -> None:
+        """Drop the entries of billing periods before ``oldest_period``."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM submitted_usage WHERE billing_period < ?",
+                (oldest_period.isoformat(),),
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
@@ -14,10 +14,14 @@ automatically detected and loaded via Python entry points.
 """
 
 import argparse
+import math
 import sys
 import threading
 import time
 import traceback
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Union, cast
 from uuid import UUID
@@ -325,6 +329,32 @@ def fetch_oidc_token(
     return token
 
 
+def get_offering_api_token(
+    offering: structures.Offering,
+    proxy: Optional[str] = None,
+) -> tuple[str, str]:
+    """Resolve the Waldur API token of an offering.
+
+    Args:
+        offering: Offering configuration containing the auth settings
+        proxy: Optional proxy URL used to reach the OIDC provider
+
+    Returns:
+        Tuple of the token and its Authorization header prefix: the static
+        waldur_api_token with ``Token``, otherwise a cached OIDC JWT with ``Bearer``
+    """
+    if offering.waldur_api_token:
+        return offering.waldur_api_token, "Token"
+    token = fetch_oidc_token(
+        offering.oidc_token_url,  # type: ignore[arg-type]
+        offering.oidc_client_id,  # type: ignore[arg-type]
+        offering.oidc_client_secret,  # type: ignore[arg-type]
+        offering.verify_ssl,
+        proxy,
+    )
+    return token, "Bearer"
+
+
 def get_client_for_offering(
     offering: structures.Offering,
     agent_header: Optional[str] = None,
@@ -344,18 +374,7 @@ def get_client_for_offering(
     Returns:
         Configured AuthenticatedClient instance ready for API calls
     """
-    if offering.waldur_api_token:
-        token = offering.waldur_api_token
-        token_prefix = "Token"  # noqa: S105
-    else:
-        token = fetch_oidc_token(
-            offering.oidc_token_url,  # type: ignore[arg-type]
-            offering.oidc_client_id,  # type: ignore[arg-type]
-            offering.oidc_client_secret,  # type: ignore[arg-type]
-            offering.verify_ssl,
-            proxy,
-        )
-        token_prefix = "Bearer"  # noqa: S105
+    token, token_prefix = get_offering_api_token(offering, proxy)
     return get_client(
         offering.waldur_api_url, token, agent_header, offering.verify_ssl, proxy, token_prefix
     )
@@ -1656,6 +1675,9 @@ def setup_log_shippers(
     )
 
 
+_LOG_SHIPPER_LOCK = threading.Lock()
+
+
 def ensure_log_shipper(
     offering: structures.Offering,
     agent_identity_uuid: str,
@@ -1676,23 +1698,25 @@ def ensure_log_shipper(
         return
 
     manager = get_log_shipping_manager()
-    if agent_identity_uuid in manager.shippers:
-        return  # shipper already running for this agent
-
-    buffer = get_log_buffer_manager().get_buffer()
-    if buffer is None:
-        logger.warning("Log buffer not available for agent %s, skipping", agent_identity_uuid)
-        return
-
-    shipper = LogShipper(
-        buffer=buffer,
-        api_url=offering.api_url,
-        api_token=offering.api_token,
-        agent_identity_uuid=agent_identity_uuid,
-        ship_interval=ls_cfg.ship_interval_seconds,
-    )
-    shipper.start()
-    manager.add_shipper(agent_identity_uuid, shipper)
+    # Offerings processed by concurrent workers must not start a shipper twice
+    with _LOG_SHIPPER_LOCK:
+        if agent_identity_uuid in manager.shippers:
+            return  # shipper already running for this agent
+
+        buffer = get_log_buffer_manager().get_buffer()
+        if buffer is None:
+            logger.warning("Log buffer not available for agent %s, skipping", agent_identity_uuid)
+            return
+
+        shipper = LogShipper(
+            buffer=buffer,
+            api_url=offering.api_url,
+            api_token=offering.api_token,
+            agent_identity_uuid=agent_identity_uuid,
+            ship_interval=ls_cfg.ship_interval_seconds,
+        )
+        shipper.start()
+        manager.add_shipper(agent_identity_uuid, shipper)
     logger.info(
         "Log shipper started for agent %s (interval=%ds)",
         agent_identity_uuid,
@@ -1709,39 +1733,118 @@ def teardown_log_shippers() -> None:
         logger.info("Log shippers stopped: %d shipper(s) shut down", count)
 
 
-def get_all_paginated(api_function, client, **kwargs) -> list:  # noqa: ANN001, ANN003
-    """Get all items from a paginated API endpoint.
+# Default page size of paginated Waldur listings (the maximum Waldur allows)
+DEFAULT_PAGE_SIZE = 100
+# Default number of pages fetched concurrently once the total count is known
+DEFAULT_PAGE_WORKERS = 4
+
+
+def _paginated_items(response) -> list:  # noqa: ANN001
+    return response.parsed if hasattr(response, "parsed") and response.parsed else []
+
+
+def _paginated_result_count(response) -> Optional[int]:  # noqa: ANN001
+    """Return the total item count Waldur reports in the X-Result-Count header."""
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("X-Result-Count") or headers.get("x-result-count")
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_paginated(
+    api_function,  # noqa: ANN001
+    client,  # noqa: ANN001
+    page_size: int = DEFAULT_PAGE_SIZE,
+    max_workers: int = DEFAULT_PAGE_WORKERS,
+    **kwargs,  # noqa: ANN003
+) -> Iterator:
+    """Iterate over the items of a paginated API endpoint, page by page.
+
+    The first page is fetched alone. If Waldur reports the total count in the
+    X-Result-Count header, the remaining pages are fetched concurrently, with
+    at most ``max_workers`` pages in flight, and yielded in page order as they
+    arrive. The count of every page extends the listing, so items added while
+    it is fetched are not dropped, and it ends at the first page shorter than
+    ``page_size``. Without the header the pages are fetched one after another.
+    Only the pages in flight are held in memory, so callers can process (and
+    drop) items before the last page arrives.
 
     Args:
         api_function: The API function to call
             (e.g., marketplace_provider_resources_list.sync_detailed)
         client: The authenticated client
+        page_size: Number of items requested per page
+        max_workers: Maximum number of pages fetched concurrently
         **kwargs: Additional parameters to pass to the API function
 
-    Returns:
-        List of all items from all pages
+    Yields:
+        Items from all pages, in the order of the listing
     """
-    all_items: list = []
-    page = 1
-    page_size = 100  # Default page size
 
-    while True:
+    def fetch(page: int) -> tuple[list, Optional[int]]:
         response = api_function(client=client, page=page, page_size=page_size, **kwargs)
+        return _paginated_items(response), _paginated_result_count(response)
 
-        items = response.parsed if hasattr(response, "parsed") and response.parsed else []
-
-        if not items:
-            break
+    items, result_count = fetch(1)
+    yield from items
+    if len(items) < page_size:
+        return
 
-        all_items.extend(items)
+    page = 2
+    if result_count is not None and max_workers > 1:
+        last_page = math.ceil(result_count / page_size)
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="waldur-pages")
+        try:
+            in_flight: deque[Future] = deque()
+            while page <= last_page or in_flight:
+                while page <= last_page and len(in_flight) < max_workers:
+                    in_flight.append(executor.submit(fetch, page))
+                    page += 1
+                items, result_count = in_flight.popleft().result()
+                yield from items
+                if len(items) < page_size:
+                    return
+                if result_count is not None:
+                    last_page = max(last_page, math.ceil(result_count / page_size))
+                if page > last_page and not in_flight:
+                    # A full last page may be followed by items added since it was counted
+                    last_page = page
+        finally:
+            # A caller that stops iterating early must not wait for pages it dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+        return
 
-        # If we got fewer items than page_size, we're at the last page
+    while True:
+        items, _ = fetch(page)
+        yield from items
         if len(items) < page_size:
-            break
-
+            return
         page += 1
 
-    return all_items
+
+def get_all_paginated(
+    api_function,  # noqa: ANN001
+    client,  # noqa: ANN001
+    page_size: int = DEFAULT_PAGE_SIZE,
+    max_workers: int = DEFAULT_PAGE_WORKERS,
+    **kwargs,  # noqa: ANN003
+) -> list:
+    """Get all items from a paginated API endpoint.
+
+    Args:
+        api_function: The API function to call
+            (e.g., marketplace_provider_resources_list.sync_detailed)
+        client: The authenticated client
+        page_size: Number of items requested per page
+        max_workers: Maximum number of pages fetched concurrently
+        **kwargs: Additional parameters to pass to the API function
+
+    Returns:
+        List of all items from all pages
+    """
+    return list(iter_paginated(api_function, client, page_size, max_workers, **kwargs))
 
 
 def provision_resource_api_keys(
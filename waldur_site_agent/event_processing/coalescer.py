@@ -0,0 +1,116 @@
+"""Coalescing of bursts of STOMP messages about the same object."""
+
+from __future__ import annotations
+
+import functools
+import threading
+from collections.abc import Hashable, Mapping
+from typing import Any, Callable, Optional, TypeVar
+
+from waldur_site_agent.backend import logger
+from waldur_site_agent.event_processing.dispatcher import MessageDispatcher, message_key
+
+MessageT = TypeVar("MessageT", bound=Mapping[str, Any])
+BatchHandler = Callable[[list[Any]], None]
+
+
+class EventCoalescer:
+    """Collects messages per key for a window and handles each batch once.
+
+    The first message of a key opens a window of the given length; the
+    messages arriving within it are passed to the batch handler together
+    when it closes. Later messages do not extend the window, so a steady
+    stream of events is delayed by at most one window.
+
+    A closed window is handed to the event dispatcher under the ordering key
+    of its messages, so the batch runs on the worker handling all other
+    messages about the same object. Without a dispatcher the coalescer is
+    disabled and ``submit`` refuses the messages.
+    """
+
+    def __init__(self) -> None:
+        """Constructor."""
+        self._batches: dict[Hashable, tuple[list[Any], BatchHandler]] = {}
+        self._timers: dict[Hashable, threading.Timer] = {}
+        self._lock = threading.Lock()
+        self._dispatcher: Optional[MessageDispatcher] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether messages are accepted into windows."""
+        return self._dispatcher is not None
+
+    def attach(self, dispatcher: Optional[MessageDispatcher]) -> None:
+        """Run the closed windows on the dispatcher, None disables coalescing."""
+        self._dispatcher = dispatcher
+
+    def submit(
+        self,
+        key: Hashable,
+        message: MessageT,
+        window: float,
+        handle_batch: Callable[[list[MessageT]], None],
+    ) -> bool:
+        """Add the message to the batch of the key, opening a window if none is open.
+
+        Returns False when coalescing is disabled; the caller then handles
+        the message itself.
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            if key in self._batches:
+                self._batches[key][0].append(message)
+                return True
+            self._batches[key] = ([message], handle_batch)
+            timer = threading.Timer(window, self._flush, args=(key,))
+            timer.daemon = True
+            self._timers[key] = timer
+            timer.start()
+        return True
+
+    def pending(self) -> int:
+        """Return the number of messages waiting in open windows."""
+        with self._lock:
+            return sum(len(batch) for batch, _ in self._batches.values())
+
+    def flush_all(self) -> None:
+        """Close all open windows now and dispatch their batches."""
+        with self._lock:
+            batches = list(self._batches.values())
+            timers = list(self._timers.values())
+            self._batches.clear()
+            self._timers.clear()
+        for timer in timers:
+            timer.cancel()
+        for batch, handle_batch in batches:
+            self._dispatch(batch, handle_batch)
+
+    def _flush(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._batches.pop(key, None)
+            self._timers.pop(key, None)
+        if entry is not None:
+            self._dispatch(*entry)
+
+    def _dispatch(self, batch: list[Any], handle_batch: BatchHandler) -> None:
+        dispatcher = self._dispatcher
+        task = functools.partial(self._handle, batch, handle_batch)
+        if dispatcher is None:
+            # Detached while the window was open, only happens at shutdown
+            task()
+            return
+        try:
+            dispatcher.dispatch(message_key(batch[0]), task)
+        except Exception:
+            logger.exception("Failed to dispatch a batch of %d coalesced events", len(batch))
+
+    def _handle(self, batch: list[Any], handle_batch: BatchHandler) -> None:
+        try:
+            handle_batch(batch)
+        except Exception:
+            logger.exception("Failed to handle a batch of %d coalesced events", len(batch))
+
+
+# Shared by the handlers of all STOMP subscriptions of the agent
+EVENT_COALESCER = EventCoalescer()
@@ -0,0 +1,174 @@
+"""Bounded worker pool running the STOMP message handlers off the receiver threads.
+
+Messages are partitioned between the workers by a key taken from the message
+body (project, resource, order UUID), so messages sharing a key are handled
+one after another in arrival order while unrelated ones run in parallel.
+Every worker has a bounded queue: when it is full, the receiver thread
+handing over the message waits, which stops reading from the broker until
+the worker catches up. With acknowledged consumption the wait is bounded and
+a message that still finds the queue full is returned to the broker.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import threading
+import zlib
+from collections.abc import Mapping
+from typing import Any, Callable, Optional
+
+import stomp.utils
+from stomp.constants import HDR_DESTINATION
+
+from waldur_site_agent.backend import logger
+from waldur_site_agent.common import metrics
+
+# Message fields identifying the object a message is about, most specific
+# ordering scope first: role and account changes of a project must not
+# overtake each other, even when they name a resource
+MESSAGE_KEY_FIELDS = (
+    "project_uuid",
+    "resource_uuid",
+    "order_uuid",
+    "user_uuid",
+    "backend_resource_request_uuid",
+)
+
+
+def message_key(message: Mapping[str, Any], default: str = "") -> str:
+    """Return the ordering key of a decoded message body, the default if it names no object."""
+    for field in MESSAGE_KEY_FIELDS:
+        value = message.get(field)
+        if value:
+            return str(value)
+    return default
+
+
+def get_message_key(frame: stomp.utils.Frame) -> str:
+    """Return the ordering key of the message, the destination queue if it names no object."""
+    destination = str(frame.headers.get(HDR_DESTINATION, ""))
+    try:
+        message = json.loads(frame.body)
+    except ValueError:
+        message = None
+    if isinstance(message, dict):
+        return message_key(message, destination)
+    return destination
+
+
+EVENT_QUEUE_DEPTH = metrics.gauge(
+    "waldur_site_agent_event_queue_depth",
+    "STOMP messages waiting for an event worker",
+)
+
+
+class MessageDispatcher:
+    """Runs tasks on a fixed set of worker threads, in order per key."""
+
+    def __init__(self, workers: int, queue_size: int, enqueue_timeout: float = 10.0) -> None:
+        """Constructor.
+
+        Args:
+            workers: Number of worker threads
+            queue_size: Tasks a worker holds before the submitting thread waits
+            enqueue_timeout: Seconds try_dispatch waits for a full worker queue
+        """
+        self.enqueue_timeout = enqueue_timeout
+        self._queues: list[queue.Queue[Optional[Callable[[], None]]]] = [
+            queue.Queue(maxsize=queue_size) for _ in range(workers)
+        ]
+        self._lock = threading.Lock()
+        self._dispatched = 0
+        self._completed = 0
+        self._failed = 0
+        self._backpressure_waits = 0
+        self._rejected = 0
+        self._threads = [
+            threading.Thread(
+                target=self._work,
+                args=(worker_queue,),
+                name=f"waldur-event-worker-{index}",
+                daemon=True,
+            )
+            for index, worker_queue in enumerate(self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def dispatch(self, key: str, task: Callable[[], None]) -> None:
+        """Queue the task on the worker owning the key, waiting while that worker is full."""
+        self._put(key, task, timeout=None)
+
+    def try_dispatch(self, key: str, task: Callable[[], None]) -> bool:
+        """Queue the task like dispatch, but wait at most enqueue_timeout for a full worker.
+
+        Returns:
+            False if the worker stayed full and the task was not queued
+        """
+        queued = self._put(key, task, timeout=self.enqueue_timeout)
+        if not queued:
+            with self._lock:
+                self._rejected += 1
+        return queued
+
+    def _put(self, key: str, task: Callable[[], None], timeout: Optional[float]) -> bool:
+        worker_queue = self._queues[zlib.crc32(key.encode()) % len(self._queues)]
+        EVENT_QUEUE_DEPTH.inc()
+        try:
+            worker_queue.put_nowait(task)
+        except queue.Full:
+            with self._lock:
+                self._backpressure_waits += 1
+            logger.warning(
+                "Event worker queue is full (%d tasks), waiting before reading more messages",
+                worker_queue.maxsize,
+            )
+            try:
+                worker_queue.put(task, timeout=timeout)
+            except queue.Full:
+                EVENT_QUEUE_DEPTH.dec()
+                return False
+        with self._lock:
+            self._dispatched += 1
+        return True
+
+    def queue_depths(self) -> list[int]:
+        """Return the number of tasks waiting per worker."""
+        return [worker_queue.qsize() for worker_queue in self._queues]
+
+    def stats(self) -> dict[str, int]:
+        """Return the task counters and the current total queue depth."""
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "queued": sum(self.queue_depths()),
+                "dispatched": self._dispatched,
+                "completed": self._completed,
+                "failed": self._failed,
+                "backpressure_waits": self._backpressure_waits,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Let the workers finish the queued tasks and stop them."""
+        for worker_queue in self._queues:
+            worker_queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self, worker_queue: queue.Queue[Optional[Callable[[], None]]]) -> None:
+        while True:
+            task = worker_queue.get()
+            if task is None:
+                return
+            EVENT_QUEUE_DEPTH.dec()
+            try:
+                task()
+            except Exception:
+                logger.exception("Unhandled error in event worker")
+                with self._lock:
+                    self._failed += 1
+            else:
+                with self._lock:
+                    self._completed += 1
@@ -18,7 +18,9 @@ from waldur_site_agent.backend import logger
 from waldur_site_agent.common import utils
 from waldur_site_agent.common.structures import Offering
 from waldur_site_agent.event_processing import handlers
+from waldur_site_agent.event_processing.dispatcher import MessageDispatcher
 from waldur_site_agent.event_processing.listener import WaldurListener, connect_to_stomp_server
+from waldur_site_agent.event_processing.retry_queue import EventRetryQueue
 
 WALDUR_LISTENER_NAME = "waldur-listener"
 OBJECT_TYPE_TO_HANDLER_STOMP: dict[ObservableObjectTypeEnum, Callable] = {
@@ -54,6 +56,8 @@ class EventSubscriptionManager:
         observable_object_type: str = "",
         global_proxy: str = "",
         expose_backend_error_details: bool = True,
+        dispatcher: Optional[MessageDispatcher] = None,
+        retry_queue: Optional[EventRetryQueue] = None,
     ) -> None:
         """Constructor."""
         self.waldur_rest_client = utils.get_client_for_offering(offering, user_agent, global_proxy)
@@ -63,6 +67,8 @@ class EventSubscriptionManager:
         self.on_message_callback = on_message_callback
         self.observable_object_type = observable_object_type
         self.expose_backend_error_details = expose_backend_error_details
+        self.dispatcher = dispatcher
+        self.retry_queue = retry_queue
 
     def _read_pid_file(self) -> dict:
         content = {}
@@ -127,16 +133,10 @@ class EventSubscriptionManager:
         )
         # Mapped to a vhost in RabbitMQ bound to a Waldur User object
         vhost_name = event_subscription.user_uuid.hex
-        event_subscription_uuid = event_subscription.uuid.hex
         # Mapped to a username in RabbitMQ bound to the Waldur EventSubscription object
-        username = event_subscription_uuid
-        # Normalize offering UUID to hex (no dashes) to match the queue name format
-        # used by Waldur Mastermind's EventSubscriptionQueue.queue_name property.
-        offering_uuid_hex = self.offering.uuid.replace("-", "")
-        queue_name = (
-            f"subscription_{event_subscription_uuid}_"
-            f"offering_{offering_uuid_hex}_{self.observable_object_type}"
-        )
+        username = event_subscription.uuid.hex
+        object_type = ObservableObjectTypeEnum(self.observable_object_type)
+        queue_name = self._get_queue_name(event_subscription, object_type)
 
         stomp_host = custom_stomp_ws_host or urllib3.util.parse_url(self.offering.api_url).host
         stomp_port = custom_stomp_ws_port or (
@@ -162,7 +162,7 @@ class EventSubscriptionManager:
         if self.offering.websocket_use_tls:
             connection.set_ssl(for_hosts=[(stomp_host, stomp_port)])
 
-        callback_function = OBJECT_TYPE_TO_HANDLER_STOMP[self.observable_object_type]
+        callback_function = OBJECT_TYPE_TO_HANDLER_STOMP[object_type]
         connection.set_listener(
             WALDUR_LISTENER_NAME,
             WaldurListener(
@@ -174,6 +174,8 @@ class EventSubscriptionManager:
                 self.offering,
                 self.user_agent,
                 expose_backend_error_details=self.expose_backend_error_details,
+                dispatcher=self.dispatcher,
+                retry_queue=self.retry_queue,
             ),
         )
 
@@ -190,6 +192,32 @@ class EventSubscriptionManager:
         connection.transport.override_threading(create_stomp_thread)
         return connection
 
+    def _get_queue_name(
+        self, event_subscription: EventSubscription, object_type: ObservableObjectTypeEnum
+    ) -> str:
+        # Normalize offering UUID to hex (no dashes) to match the queue name format
+        # used by Waldur Mastermind's EventSubscriptionQueue.queue_name property.
+        offering_uuid_hex = self.offering.uuid.replace("-", "")
+        return (
+            f"subscription_{event_subscription.uuid.hex}_offering_{offering_uuid_hex}_{object_type}"
+        )
+
+    def add_stomp_subscription(
+        self,
+        connection: stomp.WSStompConnection,
+        event_subscription: EventSubscription,
+        object_type: ObservableObjectTypeEnum,
+    ) -> None:
+        """Consume the queue of one more object type over an already set up connection.
+
+        Must be called before the connection is started; the listener subscribes
+        to all its queues on every (re)connect.
+        """
+        queue_name = self._get_queue_name(event_subscription, object_type)
+        logger.info("Routing %s messages over the shared connection (%s)", object_type, queue_name)
+        listener: WaldurListener = connection.get_listener(WALDUR_LISTENER_NAME)
+        listener.add_route(queue_name, OBJECT_TYPE_TO_HANDLER_STOMP[object_type])
+
     def start_stomp_connection(
         self,
         event_subscription: EventSubscription,
@@ -1,5 +1,6 @@
 """Handlers for different events and protocols."""
 
+import functools
 import json
 from typing import Optional
 from uuid import UUID
@@ -24,16 +25,21 @@ from waldur_api_client.models import (
     ResourceFieldEnum,
     ResourceState,
 )
-from waldur_api_client.models.agent_service import AgentService
 from waldur_api_client.models.slurm_command_result_request import (
     SlurmCommandResultRequest,
 )
 from waldur_api_client.types import UNSET
 
 from waldur_site_agent.backend import logger
-from waldur_site_agent.common import agent_identity_management, structures
 from waldur_site_agent.common import processors as common_processors
+from waldur_site_agent.common import structures
 from waldur_site_agent.common import utils as common_utils
+from waldur_site_agent.event_processing.coalescer import EVENT_COALESCER
+from waldur_site_agent.event_processing.offering_context import (
+    OFFERING_CONTEXTS,
+    register_event_process_service,
+)
+from waldur_site_agent.event_processing.retry_queue import mark_failed
 from waldur_site_agent.event_processing.structures import (
     AccountMessage,
     ApiKeyRotationMessage,
@@ -47,34 +53,6 @@ from waldur_site_agent.event_processing.structures import (
 )
 
 
-def register_event_process_service(
-    offering: structures.Offering,
-    waldur_rest_client: AuthenticatedClient,
-    observable_object: ObservableObjectTypeEnum,
-) -> AgentService:
-    """A shortcut for initialization of the event_process service.
-
-    Args:
-        offering (structures.Offering): Waldur offering
-        waldur_rest_client (AuthenticatedClient): Waldur API client
-        observable_object (ObservableObjectTypeEnum): Type of observable object
-
-    Returns:
-        AgentService: Registered agent service
-    """
-    agent_identity_manager = agent_identity_management.AgentIdentityManager(
-        offering, waldur_rest_client
-    )
-    agent_identity_name = f"agent-{offering.uuid}"
-    agent_identity = agent_identity_manager.get_identity(agent_identity_name)
-    service_name = f"{structures.AgentMode.EVENT_PROCESS.value}-{observable_object}"
-    return agent_identity_manager.register_service(
-        agent_identity,
-        service_name,
-        structures.AgentMode.EVENT_PROCESS.value,
-    )
-
-
 def process_account_message(
     message: AccountMessage,
     offering: structures.Offering,
@@ -89,25 +67,21 @@ def process_account_message(
     project_uuid = message["project_uuid"]
     action = message.get("action", "create")
     try:
-        waldur_rest_client = common_utils.get_client_for_offering(offering, user_agent)
-
-        agent_service = register_event_process_service(
-            offering, waldur_rest_client, observable_object
-        )
-
-        processor = common_processors.OfferingMembershipProcessor(
+        with OFFERING_CONTEXTS.processor(
             offering,
-            waldur_rest_client,
+            user_agent,
+            observable_object,
+            common_processors.OfferingMembershipProcessor,
             expose_backend_error_details=expose_backend_error_details,
-        )
-        processor.register(agent_service)
-        if action == "create":
-            processor.process_account_creation(account_username, account_type)
-        elif action == "delete":
-            processor.process_account_removal(account_username, project_uuid)
-        else:
-            logger.error("Unknown action %s for course account %s", action, account_username)
+        ) as processor:
+            if action == "create":
+                processor.process_account_creation(account_username, account_type)
+            elif action == "delete":
+                processor.process_account_removal(account_username, project_uuid)
+            else:
+                logger.error("Unknown action %s for course account %s", action, account_username)
     except Exception as e:
+        mark_failed(e)
         logger.error(
             "Failed to process %s of course account %s (%s): %s",
             action,
@@ -153,39 +127,29 @@ def on_order_message_stomp(
         return
 
     try:
-        waldur_rest_client = common_utils.get_client_for_offering(offering, user_agent)
-        agent_service = register_event_process_service(
-            offering, waldur_rest_client, ObservableObjectTypeEnum.ORDER
-        )
-
-        # Create backend instance for dependency injection
-        resource_backend, resource_backend_version = common_utils.get_backend_for_offering(
-            offering, "order_processing_backend"
-        )
-
-        processor = common_processors.OfferingOrderProcessor(
+        with OFFERING_CONTEXTS.processor(
             offering,
-            waldur_rest_client,
-            resource_backend=resource_backend,
-            resource_backend_version=resource_backend_version,
-            expose_backend_error_details=expose_backend_error_details,
-        )
-        processor.register(agent_service)
-
-        order = processor.get_order_info(order_uuid)
-        if order is None:
-            logger.error("Failed to get order info for %s", order_uuid)
-            return
-        logger.info(
-            "Fetched order %s: type=%s, state=%s, resource=%s",
-            order_uuid,
-            order.type_,
-            order.state,
-            order.resource_name,
-        )
-        processor.process_order_with_retries(order)
-        logger.info("Finished processing order %s", order_uuid)
+            user_agent,
+            ObservableObjectTypeEnum.ORDER,
+            common_processors.OfferingOrderProcessor,
+            "order_processing_backend",
+            expose_backend_error_details,
+        ) as processor:
+            order = processor.get_order_info(order_uuid)
+            if order is None:
+                logger.error("Failed to get order info for %s", order_uuid)
+                return
+            logger.info(
+                "Fetched order %s: type=%s, state=%s, resource=%s",
+                order_uuid,
+                order.type_,
+                order.state,
+                order.resource_name,
+            )
+            processor.process_order_with_retries(order)
+            logger.info("Finished processing order %s", order_uuid)
     except Exception as e:
+        mark_failed(e)
         logger.exception("Failed to process order %s: %s", order_uuid, e)
 
 
@@ -198,63 +162,130 @@ def on_user_role_message_stomp(
     """Membership sync handler for STOMP message event."""
     message: UserRoleMessage = json.loads(frame.body)
     logger.info("Received message: %s on topic %s", message, frame.headers.get("destination"))
+    handle_batch = functools.partial(
+        _process_user_role_messages,
+        offering=offering,
+        user_agent=user_agent,
+        expose_backend_error_details=expose_backend_error_details,
+    )
+    if offering.stomp_coalescing_window_seconds > 0 and EVENT_COALESCER.submit(
+        (offering.uuid, ObservableObjectTypeEnum.USER_ROLE, message["project_uuid"]),
+        message,
+        offering.stomp_coalescing_window_seconds,
+        handle_batch,
+    ):
+        return
+    handle_batch([message])
+
+
+def _coalesce_user_role_messages(messages: list[UserRoleMessage]) -> list[UserRoleMessage]:
+    """Reduce the user role events of a project to the work they require.
+
+    Only the last change of a user's role counts. Changes of several users,
+    or a project sync request among them, collapse into one sync of all
+    project users, which also covers every resource-scoped sync request.
+    """
+    last = messages[-1]
+    project_sync = UserRoleMessage(
+        user_uuid=None,
+        user_username=None,
+        project_uuid=last["project_uuid"],
+        project_name=last["project_name"],
+        role_name="",
+        granted=None,
+        resource_uuid=None,
+    )
+    role_changes: dict[tuple[str, str], UserRoleMessage] = {}
+    resource_syncs: dict[str, UserRoleMessage] = {}
+    for message in messages:
+        user_uuid = message.get("user_uuid")
+        resource_uuid = message.get("resource_uuid")
+        if user_uuid:
+            key = (user_uuid, message.get("role_name", ""))
+            role_changes.pop(key, None)
+            role_changes[key] = message
+        elif resource_uuid:
+            resource_syncs[resource_uuid] = message
+        else:
+            return [project_sync]
+
+    if len({user_uuid for user_uuid, _ in role_changes}) > 1:
+        logger.info(
+            "Coalesced %d user role events of project %s into a sync of all project users",
+            len(messages),
+            last["project_name"],
+        )
+        return [project_sync]
+    return [*resource_syncs.values(), *role_changes.values()]
+
+
+def _process_user_role_messages(
+    messages: list[UserRoleMessage],
+    offering: structures.Offering,
+    user_agent: str,
+    expose_backend_error_details: bool = True,
+) -> None:
+    """Process user role events of a project received together."""
+    for message in _coalesce_user_role_messages(messages):
+        _process_user_role_message(message, offering, user_agent, expose_backend_error_details)
+
+
+def _process_user_role_message(
+    message: UserRoleMessage,
+    offering: structures.Offering,
+    user_agent: str,
+    expose_backend_error_details: bool = True,
+) -> None:
+    """Process a USER_ROLE event message."""
     user_uuid = message.get("user_uuid")
+    user_username = message.get("user_username")
+    role_granted = message.get("granted")
     project_name = message["project_name"]
     project_uuid = message["project_uuid"]
 
     try:
-        waldur_rest_client = common_utils.get_client_for_offering(offering, user_agent)
-        agent_service = register_event_process_service(
-            offering, waldur_rest_client, ObservableObjectTypeEnum.USER_ROLE
-        )
-
-        # Create backend instance for dependency injection
-        resource_backend, resource_backend_version = common_utils.get_backend_for_offering(
-            offering, "membership_sync_backend"
-        )
-
-        processor = common_processors.OfferingMembershipProcessor(
+        with OFFERING_CONTEXTS.processor(
             offering,
-            waldur_rest_client,
-            resource_backend=resource_backend,
-            resource_backend_version=resource_backend_version,
-            expose_backend_error_details=expose_backend_error_details,
-        )
-        processor.register(agent_service)
-        if user_uuid:
-            user_username = message["user_username"]
-            role_granted = message["granted"]
-            if role_granted is None:
-                logger.error("Missing required field 'granted' for user role change")
-                return
-            logger.info(
-                "Processing %s (%s) user role changed event in project %s, granted: %s",
-                user_username,
-                user_uuid,
-                project_name,
-                role_granted,
-            )
-            role_name = message.get("role_name", "")
-            processor.process_user_role_changed(
-                user_uuid, project_uuid, role_granted, role_name=role_name
-            )
-        else:
-            resource_uuid = message.get("resource_uuid")
-            if resource_uuid:
-                # Resource-scoped resync trigger: same USER_ROLE channel,
-                # narrowed to one resource by the added payload field.
+            user_agent,
+            ObservableObjectTypeEnum.USER_ROLE,
+            common_processors.OfferingMembershipProcessor,
+            "membership_sync_backend",
+            expose_backend_error_details,
+        ) as processor:
+            if user_uuid:
+                if role_granted is None:
+                    logger.error("Missing required field 'granted' for user role change")
+                    return
                 logger.info(
-                    "Processing user sync event for resource %s in project %s",
-                    resource_uuid,
+                    "Processing %s (%s) user role changed event in project %s, granted: %s",
+                    user_username,
+                    user_uuid,
                     project_name,
+                    role_granted,
                 )
-                processor.process_resource_user_sync(resource_uuid)
-            else:
-                logger.info(
-                    "Processing full project all users sync event for project %s", project_name
+                role_name = message.get("role_name", "")
+                processor.process_user_role_changed(
+                    user_uuid, project_uuid, role_granted, role_name=role_name
                 )
-                processor.process_project_user_sync(project_uuid)
+            else:
+                resource_uuid = message.get("resource_uuid")
+                if resource_uuid:
+                    # Resource-scoped resync trigger: same USER_ROLE channel,
+                    # narrowed to one resource by the added payload field.
+                    logger.info(
+                        "Processing user sync event for resource %s in project %s",
+                        resource_uuid,
+                        project_name,
+                    )
+                    processor.process_resource_user_sync(resource_uuid)
+                else:
+                    logger.info(
+                        "Processing full project all users sync event for project %s",
+                        project_name,
+                    )
+                    processor.process_project_user_sync(project_uuid)
     except Exception as e:
+        mark_failed(e)
         if user_uuid:
             logger.error(
                 "Failed to process user %s (%s) role change in project %s (%s) (granted: %s): %s",
@@ -281,23 +312,44 @@ def on_resource_message_stomp(
 ) -> None:
     """Resource update handler for STOMP message event."""
     message: ResourceMessage = json.loads(frame.body)
-    resource_uuid = message["resource_uuid"]
+    handle_batch = functools.partial(
+        _process_resource_messages,
+        offering=offering,
+        user_agent=user_agent,
+        expose_backend_error_details=expose_backend_error_details,
+    )
+    if offering.stomp_coalescing_window_seconds > 0 and EVENT_COALESCER.submit(
+        (offering.uuid, ObservableObjectTypeEnum.RESOURCE, message["resource_uuid"]),
+        message,
+        offering.stomp_coalescing_window_seconds,
+        handle_batch,
+    ):
+        return
+    handle_batch([message])
 
-    try:
-        waldur_rest_client = common_utils.get_client_for_offering(offering, user_agent)
 
-        agent_service = register_event_process_service(
-            offering, waldur_rest_client, ObservableObjectTypeEnum.RESOURCE
-        )
-        processor = common_processors.OfferingMembershipProcessor(
+def _process_resource_messages(
+    messages: list[ResourceMessage],
+    offering: structures.Offering,
+    user_agent: str,
+    expose_backend_error_details: bool = True,
+) -> None:
+    """Process update events of a resource; one pass covers all of them."""
+    resource_uuid = messages[-1]["resource_uuid"]
+    if len(messages) > 1:
+        logger.info("Coalesced %d events of resource %s", len(messages), resource_uuid)
+
+    try:
+        with OFFERING_CONTEXTS.processor(
             offering,
-            waldur_rest_client,
+            user_agent,
+            ObservableObjectTypeEnum.RESOURCE,
+            common_processors.OfferingMembershipProcessor,
             expose_backend_error_details=expose_backend_error_details,
-        )
-        processor.register(agent_service)
-
-        processor.process_resource_by_uuid(resource_uuid)
+        ) as processor:
+            processor.process_resource_by_uuid(resource_uuid)
     except Exception as e:
+        mark_failed(e)
         logger.error("Failed to process resource %s: %s", resource_uuid, e)
 
 
@@ -321,11 +373,15 @@ def on_offering_resources_sync_message_stomp(
         offering.name,
         message.get("requested_by_user_uuid"),
     )
+    # A forced sync follows changes of the offering in Waldur (e.g. components),
+    # the handlers of later messages must not keep using the old offering details
+    OFFERING_CONTEXTS.invalidate(offering)
     try:
         waldur_rest_client = common_utils.get_client(
             offering.api_url, offering.api_token, user_agent, offering.verify_ssl
         )
     except Exception as e:
+        mark_failed(e)
         logger.exception(
             "Failed to create Waldur client for offering resources sync of %s: %s",
             offering.name,
@@ -362,6 +418,7 @@ def on_offering_resources_sync_message_stomp(
             membership_processor.register(agent_service)
             membership_processor.process_offering(recreate_missing_resources=True)
         except Exception as e:
+            mark_failed(e)
             logger.exception(
                 "Failed to run membership sync for offering resources sync of %s: %s",
                 offering.name,
@@ -389,6 +446,7 @@ def on_offering_resources_sync_message_stomp(
             )
             order_processor.process_offering()
         except Exception as e:
+            mark_failed(e)
             logger.exception(
                 "Failed to re-process orders for offering resources sync of %s: %s",
                 offering.name,
@@ -408,28 +466,17 @@ def on_importable_resources_message_stomp(
     message: BackendResourceRequestMessage = json.loads(frame.body)
     request_uuid = message["backend_resource_request_uuid"]
     try:
-        waldur_rest_client = common_utils.get_client_for_offering(offering, user_agent)
-
-        agent_service = register_event_process_service(
-            offering, waldur_rest_client, ObservableObjectTypeEnum.IMPORTABLE_RESOURCES
-        )
-
-        # Create backend instance for dependency injection
-        resource_backend, resource_backend_version = common_utils.get_backend_for_offering(
-            offering, "order_processing_backend"
-        )
-
-        processor = common_processors.OfferingImportableResourcesProcessor(
+        with OFFERING_CONTEXTS.processor(
             offering,
-            waldur_rest_client,
-            resource_backend=resource_backend,
-            resource_backend_version=resource_backend_version,
-            expose_backend_error_details=expose_backend_error_details,
-        )
-        processor.register(agent_service)
-
-        processor.process_request(request_uuid)
+            user_agent,
+            ObservableObjectTypeEnum.IMPORTABLE_RESOURCES,
+            common_processors.OfferingImportableResourcesProcessor,
+            "order_processing_backend",
+            expose_backend_error_details,
+        ) as processor:
+            processor.process_request(request_uuid)
     except Exception as e:
+        mark_failed(e)
         logger.error("Failed to process importable resource list request %s: %s", request_uuid, e)
 
 
@@ -577,6 +624,7 @@ def on_resource_periodic_limits_update_stomp(
     except json.JSONDecodeError as e:
         logger.error("Failed to parse periodic limits STOMP message: %s", e)
     except Exception as e:
+        mark_failed(e)
         logger.error("Error processing periodic limits update: %s", e)
 
 
@@ -631,6 +679,7 @@ def on_resource_api_key_rotation_stomp(
     except json.JSONDecodeError as e:
         logger.error("Failed to parse API key STOMP message: %s", e)
     except Exception as e:
+        mark_failed(e)
         logger.error("Error handling API key event: %s", e)
 
 
@@ -698,7 +747,8 @@ def _process_offering_user_message(
             )
         else:
             logger.warning("Unknown offering user action: %s", action)
-    except Exception:
+    except Exception as e:
+        mark_failed(e)
         logger.exception(
             "Failed to process offering user event %s for %s (%s)",
             action,
@@ -44,17 +44,22 @@ Key stomp.py corner cases (validated against RabbitMQ + rabbitmq_web_stomp):
    frames are detected immediately by the receiver thread.
 """
 
+import functools
 import json
 import random
 import threading
 import time
-from typing import Callable
+from concurrent.futures import Future
+from typing import Callable, Optional
 
 import stomp.utils
+from stomp.constants import HDR_ACK, HDR_DESTINATION, HDR_SUBSCRIPTION
 from stomp.exception import ConnectFailedException, StompException
 
 from waldur_site_agent.backend import logger
-from waldur_site_agent.common import structures
+from waldur_site_agent.common import metrics, structures
+from waldur_site_agent.event_processing.dispatcher import MessageDispatcher, get_message_key
+from waldur_site_agent.event_processing.retry_queue import EventRetryQueue, take_delivery_error
 
 BACKOFF_INITIAL = 1.0
 BACKOFF_FACTOR = 2.0
@@ -63,6 +68,30 @@ BACKOFF_JITTER = 0.25
 WARN_THRESHOLD = 3
 RECONNECT_MAX_RETRIES = 10
 
+STOMP_CONNECTION_ATTEMPTS = metrics.counter(
+    "waldur_site_agent_stomp_connection_attempts_total",
+    "Attempts to connect to the STOMP server by outcome",
+    ("outcome",),
+)
+STOMP_DISCONNECTS = metrics.counter(
+    "waldur_site_agent_stomp_disconnects_total",
+    "Disconnections from the STOMP server detected by the listeners",
+)
+STOMP_RECONNECT_SECONDS = metrics.histogram(
+    "waldur_site_agent_stomp_reconnect_duration_seconds",
+    "Time spent reconnecting to the STOMP server after a disconnection",
+)
+EVENT_MESSAGES = metrics.counter(
+    "waldur_site_agent_event_messages_total",
+    "STOMP messages handled by handler and outcome",
+    ("handler", "outcome"),
+)
+EVENT_HANDLER_SECONDS = metrics.histogram(
+    "waldur_site_agent_event_handler_duration_seconds",
+    "Time spent handling a STOMP message by handler",
+    ("handler",),
+)
+
 
 def _calculate_backoff(attempt: int) -> float:
     """Calculate exponential backoff delay with jitter.
@@ -78,6 +107,12 @@ def _calculate_backoff(attempt: int) -> float:
     return delay + jitter
 
 
+def _handler_name(callback: Callable) -> str:
+    while isinstance(callback, functools.partial):
+        callback = callback.func
+    return getattr(callback, "__name__", type(callback).__name__)
+
+
 def connect_to_stomp_server(
     connection: stomp.StompConnection12,
     username: str,
@@ -124,7 +159,9 @@ def connect_to_stomp_server(
                     "accept-version": "1.2",
                 },
             )
+            STOMP_CONNECTION_ATTEMPTS.inc(outcome="success")
         except (StompException, OSError) as e:
+            STOMP_CONNECTION_ATTEMPTS.inc(outcome="failure")
             backoff = _calculate_backoff(attempt)
             log_fn = logger.warning if attempt < WARN_THRESHOLD else logger.error
             log_fn(
@@ -153,53 +190,162 @@ class WaldurListener(stomp.ConnectionListener):
         offering: structures.Offering,
         user_agent: str,
         expose_backend_error_details: bool = True,
+        dispatcher: Optional[MessageDispatcher] = None,
+        retry_queue: Optional[EventRetryQueue] = None,
     ) -> None:
-        """Constructor method."""
+        """Constructor method.
+
+        Without a dispatcher, messages are handled on the stomp.py receiver thread.
+        Further queues can be consumed over the same connection with ``add_route``.
+        With a retry queue, messages are acknowledged after their handler finished
+        and the failed ones are stored in the queue for retry.
+        """
         self.queue = queue
+        # Queue name (used as the subscription id) -> message handler
+        self.routes: dict[str, Callable] = {queue: on_message_callback}
         self.username = username
         self.password = password
         self.conn = conn
-        self.on_message_callback = on_message_callback
         self.offering = offering
         self.user_agent = user_agent
         self.expose_backend_error_details = expose_backend_error_details
+        self.dispatcher = dispatcher
+        self.retry_queue = retry_queue
+        self.ack_mode = "auto" if retry_queue is None else "client-individual"
         self._reconnect_lock = threading.Lock()
 
+    @property
+    def on_message_callback(self) -> Callable:
+        """Handler of the messages of the primary queue."""
+        return self.routes[self.queue]
+
+    @on_message_callback.setter
+    def on_message_callback(self, callback: Callable) -> None:
+        self.routes[self.queue] = callback
+
+    def add_route(self, queue: str, on_message_callback: Callable) -> None:
+        """Subscribe to one more queue on the connection, handled by the given callback."""
+        self.routes[queue] = on_message_callback
+
     def on_error(self, frame: stomp.utils.Frame) -> None:
         """Error handler method."""
         logger.error("Received an error %s", frame.body)
 
     def on_message(self, frame: stomp.utils.Frame) -> None:
         """Message handler method."""
-        logger.info("Received a message %s on queue %s", json.loads(frame.body), self.queue)
-        try:
-            self.on_message_callback(
-                frame, self.offering, self.user_agent, self.expose_backend_error_details
+        queue = frame.headers.get(HDR_SUBSCRIPTION, self.queue)
+        logger.info("Received a message %s on queue %s", json.loads(frame.body), queue)
+        callback = self.routes.get(queue)
+        if callback is None:
+            logger.error("No handler registered for queue %s, dropping the message", queue)
+            return
+        if self.dispatcher is None:
+            self._handle_message(frame, queue, callback)
+            return
+        key = get_message_key(frame)
+        task = functools.partial(self._handle_message, frame, queue, callback)
+        if self.retry_queue is None:
+            # An auto-acknowledged message cannot be returned, so the receiver waits
+            self.dispatcher.dispatch(key, task)
+        elif not self.dispatcher.try_dispatch(key, task):
+            logger.warning(
+                "Event workers are busy, returning the message of queue %s to the broker", queue
             )
+            self._settle(frame, queue, self.conn.nack)
+
+    def _handle_message(self, frame: stomp.utils.Frame, queue: str, callback: Callable) -> None:
+        handler = _handler_name(callback)
+        take_delivery_error()
+        try:
+            with EVENT_HANDLER_SECONDS.time(handler=handler):
+                callback(frame, self.offering, self.user_agent, self.expose_backend_error_details)
+            error = take_delivery_error()
         except Exception as e:
-            logger.exception(
-                "Error processing message %s on queue %s: %s", frame.body, self.queue, e
-            )
+            logger.exception("Error processing message %s on queue %s: %s", frame.body, queue, e)
+            error = e
+        EVENT_MESSAGES.inc(handler=handler, outcome="success" if error is None else "failure")
+        if self.retry_queue is None:
+            return
 
-    def on_connected(self, _: stomp.utils.Frame) -> None:
-        """Connection handler method."""
-        # Use /amq/queue/ prefix to subscribe to pre-existing queue without attempting
-        # declaration. The /queue/ prefix would redeclare and cause PRECONDITION_FAILED
-        # errors when queue parameters (x-message-ttl, x-overflow, etc.) don't match.
-        destination = f"/amq/queue/{self.queue}"
-        logger.debug("Subscribing to %s", destination)
-        self.conn.subscribe(
-            destination=destination,
-            id=self.queue,
-            ack="auto",
-        )
+        if error is not None:
+            try:
+                self.retry_queue.push(queue, frame.body, error)
+            except Exception:
+                logger.exception(
+                    "Failed to store message of queue %s for retry, returning it to the broker",
+                    queue,
+                )
+                self._settle(frame, queue, self.conn.nack)
+                return
+        self._settle(frame, queue, self.conn.ack)
+
+    def _settle(self, frame: stomp.utils.Frame, queue: str, settle: Callable) -> None:
+        # A message received before a reconnect can no longer be settled;
+        # the broker redelivers it on the new connection
+        try:
+            settle(frame.headers[HDR_ACK])
+        except Exception as e:
+            logger.warning("Failed to acknowledge message on queue %s: %s", queue, e)
 
-        logger.debug(
-            "Successfully subscribed to queue: %s "
-            "(subscription_id: %s, ack_mode: auto)",
-            destination,
-            self.queue,
+    def _retry_message(self, queue: str, body: str) -> None:
+        """Handle a message from the retry queue, raising when it fails again.
+
+        With a dispatcher the message is handled by the worker owning its key, as
+        on the first attempt, so it never runs alongside newer events of its object.
+        """
+        frame = stomp.utils.Frame(
+            "MESSAGE",
+            {HDR_SUBSCRIPTION: queue, HDR_DESTINATION: f"/amq/queue/{queue}"},
+            body,
         )
+        callback = self.routes[queue]
+        if self.dispatcher is None:
+            callback(frame, self.offering, self.user_agent, self.expose_backend_error_details)
+            return
+
+        outcome: Future[None] = Future()
+
+        def handle() -> None:
+            # The failures a handler records are local to the worker thread
+            take_delivery_error()
+            try:
+                callback(frame, self.offering, self.user_agent, self.expose_backend_error_details)
+                error = take_delivery_error()
+            except Exception as e:
+                error = e
+            if error is None:
+                outcome.set_result(None)
+            else:
+                outcome.set_exception(error)
+
+        self.dispatcher.dispatch(get_message_key(frame), handle)
+        outcome.result()
+
+    def on_connected(self, _: stomp.utils.Frame) -> None:
+        """Connection handler method, (re)subscribes to all routed queues."""
+        for queue in self.routes:
+            # Use /amq/queue/ prefix to subscribe to pre-existing queue without attempting
+            # declaration. The /queue/ prefix would redeclare and cause PRECONDITION_FAILED
+            # errors when queue parameters (x-message-ttl, x-overflow, etc.) don't match.
+            destination = f"/amq/queue/{queue}"
+            logger.debug("Subscribing to %s", destination)
+            self.conn.subscribe(
+                destination=destination,
+                id=queue,
+                ack=self.ack_mode,
+            )
+            if self.retry_queue is not None:
+                self.retry_queue.register_route(
+                    queue, functools.partial(self._retry_message, queue)
+                )
+
+            logger.debug(
+                "Successfully subscribed to queue: %s "
+                "(subscription_id: %s, ack_mode: %s)",
+                destination,
+                queue,
+                self.ack_mode,
+            )
         logger.debug(
             "Connection info - host: %s, vhost: %s, ws_path: %s, connected: %s",
             self.conn.transport.current_host_and_port,
@@ -220,6 +366,7 @@ class WaldurListener(stomp.ConnectionListener):
         held for the duration of the retry loop (bounded by RECONNECT_MAX_RETRIES
         with exponential backoff), after which it is released regardless of outcome.
         """
+        STOMP_DISCONNECTS.inc()
         if not self._reconnect_lock.acquire(blocking=False):
             logger.debug(
                 "Reconnection already in progress for queue %s, skipping", self.queue
@@ -228,9 +375,10 @@ class WaldurListener(stomp.ConnectionListener):
 
         try:
             logger.warning("Disconnected from queue %s, attempting reconnection", self.queue)
-            connect_to_stomp_server(
-                self.conn, self.username, self.password, max_retries=RECONNECT_MAX_RETRIES
-            )
+            with STOMP_RECONNECT_SECONDS.time():
+                connect_to_stomp_server(
+                    self.conn, self.username, self.password, max_retries=RECONNECT_MAX_RETRIES
+                )
         except Exception as e:
             logger.error(
                 "Reconnection failed for queue %s: %s: %s",
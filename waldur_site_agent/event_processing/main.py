@@ -1,10 +1,15 @@
 """Entrypoint for event processing loop."""
 
+import functools
 import sys
+import threading
 import time
+from pathlib import Path
+from typing import Optional
 
 from waldur_site_agent.backend import logger
 from waldur_site_agent.common import (
+    WALDUR_SITE_AGENT_ASYNC_ORDER_CHECK_PERIOD_MINUTES,
     WALDUR_SITE_AGENT_RECONCILIATION_PERIOD_MINUTES,
 )
 from waldur_site_agent.common import (
@@ -13,27 +18,103 @@ from waldur_site_agent.common import (
 from waldur_site_agent.common import utils as common_utils
 from waldur_site_agent.common.healthz import touch_heartbeat
 from waldur_site_agent.event_processing import utils
+from waldur_site_agent.event_processing.coalescer import EVENT_COALESCER
+from waldur_site_agent.event_processing.dispatcher import MessageDispatcher
+from waldur_site_agent.event_processing.retry_queue import RETRY_QUEUE_FILE_NAME, EventRetryQueue
 
 HEALTH_CHECK_INTERVAL = 30 * 60  # 30 minutes
 RECONCILIATION_INTERVAL = WALDUR_SITE_AGENT_RECONCILIATION_PERIOD_MINUTES * 60
+ASYNC_ORDER_CHECK_INTERVAL = WALDUR_SITE_AGENT_ASYNC_ORDER_CHECK_PERIOD_MINUTES * 60
 TICK_INTERVAL = 60  # Wake up every minute to check timers
+DISPATCHER_SHUTDOWN_TIMEOUT = 30  # Seconds each event worker gets to finish its queue
+RETRY_SHUTDOWN_TIMEOUT = 30  # Seconds the retry worker gets to finish its current batch
+
+
+def _open_retry_queue(
+    configuration: common_structures.WaldurAgentConfiguration,
+) -> Optional[EventRetryQueue]:
+    """Open the on-disk retry queue of failed event messages if enabled."""
+    if not configuration.event_retry.enabled:
+        return None
+    path = Path(configuration.state_dir) / RETRY_QUEUE_FILE_NAME
+    logger.info("Using acknowledged STOMP consumption with the retry queue at %s", path)
+    retry_queue = EventRetryQueue(
+        str(path),
+        max_size=configuration.event_retry.max_size,
+        max_attempts=configuration.event_retry.max_attempts,
+        initial_delay=configuration.event_retry.initial_delay_seconds,
+        max_delay=configuration.event_retry.max_delay_seconds,
+    )
+    retry_queue.start()
+    return retry_queue
+
+
+def _attach_event_coalescer(
+    configuration: common_structures.WaldurAgentConfiguration,
+    dispatcher: Optional[MessageDispatcher],
+    retry_queue: Optional[EventRetryQueue],
+) -> None:
+    """Enable event coalescing if the configuration allows handling windows safely.
+
+    The closed windows run on the dispatcher to keep the per-object ordering,
+    and with acknowledged consumption a message must not be acknowledged while
+    it still waits in a window, so coalescing needs a dispatcher and no retry queue.
+    """
+    if dispatcher is not None and retry_queue is None:
+        EVENT_COALESCER.attach(dispatcher)
+        return
+    EVENT_COALESCER.attach(None)
+    if any(o.stomp_coalescing_window_seconds for o in configuration.waldur_offerings):
+        logger.warning(
+            "stomp_coalescing_window_seconds requires event_dispatch workers and is not "
+            "supported with event_retry, handling every event on arrival"
+        )
 
 
 def start(configuration: common_structures.WaldurAgentConfiguration) -> None:
     """Starts the main loop for event-based offering processing."""
     common_utils.setup_log_shippers(configuration)
+    dispatcher = None
+    retry_queue = None
     try:
-        utils.run_initial_offering_processing(
+        run_initial_processing = functools.partial(
+            utils.run_initial_offering_processing,
             configuration.waldur_offerings,
             configuration.waldur_user_agent,
             expose_backend_error_details=configuration.expose_backend_error_details,
+            max_workers=configuration.offering_workers.event_process,
         )
+        if configuration.background_initial_processing:
+            # Pending orders are still processed before subscribing, so that order
+            # events redelivered on subscription never race the initial pass over them
+            run_initial_processing(process_membership=False)
+        else:
+            run_initial_processing()
+
+        if configuration.event_dispatch.workers > 0:
+            dispatcher = MessageDispatcher(
+                configuration.event_dispatch.workers,
+                configuration.event_dispatch.queue_size,
+                configuration.event_dispatch.enqueue_timeout_seconds,
+            )
+        retry_queue = _open_retry_queue(configuration)
+        _attach_event_coalescer(configuration, dispatcher, retry_queue)
 
         stomp_consumers_map = utils.start_stomp_consumers(
             configuration.waldur_offerings,
             configuration.waldur_user_agent,
             expose_backend_error_details=configuration.expose_backend_error_details,
+            dispatcher=dispatcher,
+            retry_queue=retry_queue,
         )
+        if configuration.background_initial_processing:
+            # The membership of the offerings is synced while their events are already
+            # being handled
+            threading.Thread(
+                target=functools.partial(run_initial_processing, process_orders=False),
+                name="waldur-initial-processing",
+                daemon=True,
+            ).start()
 
         reconciliation_enabled = any(
             o.username_reconciliation_enabled for o in configuration.waldur_offerings
@@ -41,24 +122,33 @@ def start(configuration: common_structures.WaldurAgentConfiguration) -> None:
 
         with utils.signal_handling(stomp_consumers_map):
             if reconciliation_enabled:
-                _run_with_reconciliation(configuration)
+                _run_with_reconciliation(configuration, dispatcher, retry_queue)
             else:
-                _run_without_username_reconciliation(configuration)
+                _run_without_username_reconciliation(configuration, dispatcher, retry_queue)
     except Exception as e:
         logger.exception("Error in main process: %s", e)
         if "stomp_consumers_map" in locals():
             utils.stop_stomp_consumers(stomp_consumers_map)
         sys.exit(1)
     finally:
+        # Events still waiting in a coalescing window were already taken off the queue
+        EVENT_COALESCER.flush_all()
+        if dispatcher is not None:
+            dispatcher.shutdown(timeout=DISPATCHER_SHUTDOWN_TIMEOUT)
+        if retry_queue is not None:
+            retry_queue.stop(timeout=RETRY_SHUTDOWN_TIMEOUT)
         common_utils.teardown_log_shippers()
 
 
 def _run_without_username_reconciliation(
     configuration: common_structures.WaldurAgentConfiguration,
+    dispatcher: Optional[MessageDispatcher] = None,
+    retry_queue: Optional[EventRetryQueue] = None,
 ) -> None:
-    """Tick-based main loop: health checks, order and offering user reconciliation."""
+    """Tick-based main loop: health checks, async orders, order and offering user reconciliation."""
     last_health_check = 0.0
     last_reconciliation = 0.0
+    last_async_order_check = 0.0
 
     while True:
         touch_heartbeat()
@@ -68,6 +158,10 @@ def _run_without_username_reconciliation(
             utils.send_agent_health_checks(
                 configuration.waldur_offerings, configuration.waldur_user_agent
             )
+            if dispatcher is not None:
+                logger.info("Event dispatcher stats: %s", dispatcher.stats())
+            if retry_queue is not None:
+                logger.info("Event messages waiting for retry: %d", len(retry_queue))
             last_health_check = now
 
         if now - last_reconciliation >= RECONCILIATION_INTERVAL:
@@ -86,14 +180,28 @@ def _run_without_username_reconciliation(
                 configuration.waldur_offerings, configuration.waldur_user_agent
             )
             last_reconciliation = now
+            last_async_order_check = now
+
+        if now - last_async_order_check >= ASYNC_ORDER_CHECK_INTERVAL:
+            utils.run_periodic_async_order_check(
+                configuration.waldur_offerings,
+                configuration.waldur_user_agent,
+                expose_backend_error_details=configuration.expose_backend_error_details,
+            )
+            last_async_order_check = now
 
         time.sleep(TICK_INTERVAL)
 
 
-def _run_with_reconciliation(configuration: common_structures.WaldurAgentConfiguration) -> None:
-    """Tick-based main loop: health checks + periodic username and order reconciliation."""
+def _run_with_reconciliation(
+    configuration: common_structures.WaldurAgentConfiguration,
+    dispatcher: Optional[MessageDispatcher] = None,
+    retry_queue: Optional[EventRetryQueue] = None,
+) -> None:
+    """Tick-based main loop: health checks, async orders + username and order reconciliation."""
     last_health_check = 0.0
     last_reconciliation = 0.0
+    last_async_order_check = 0.0
 
     while True:
         touch_heartbeat()
@@ -103,6 +211,10 @@ def _run_with_reconciliation(configuration: common_structures.WaldurAgentConfigu
             utils.send_agent_health_checks(
                 configuration.waldur_offerings, configuration.waldur_user_agent
             )
+            if dispatcher is not None:
+                logger.info("Event dispatcher stats: %s", dispatcher.stats())
+            if retry_queue is not None:
+                logger.info("Event messages waiting for retry: %d", len(retry_queue))
             last_health_check = now
 
         if now - last_reconciliation >= RECONCILIATION_INTERVAL:
@@ -124,5 +236,14 @@ def _run_with_reconciliation(configuration: common_structures.WaldurAgentConfigu
                 configuration.waldur_offerings, configuration.waldur_user_agent
             )
             last_reconciliation = now
+            last_async_order_check = now
+
+        if now - last_async_order_check >= ASYNC_ORDER_CHECK_INTERVAL:
+            utils.run_periodic_async_order_check(
+                configuration.waldur_offerings,
+                configuration.waldur_user_agent,
+                expose_backend_error_details=configuration.expose_backend_error_details,
+            )
+            last_async_order_check = now
 
         time.sleep(TICK_INTERVAL)
@@ -0,0 +1,323 @@
+"""Per-offering state reused by the STOMP event handlers across messages."""
+
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Optional, TypeVar, cast
+
+from waldur_api_client import AuthenticatedClient
+from waldur_api_client.models import ObservableObjectTypeEnum
+from waldur_api_client.models.agent_service import AgentService
+from waldur_api_client.models.provider_offering_details import ProviderOfferingDetails
+from waldur_api_client.models.service_provider import ServiceProvider
+from waldur_api_client.models.user_me import UserMe
+
+from waldur_site_agent.backend import logger
+from waldur_site_agent.backend.backends import BaseBackend
+from waldur_site_agent.common import (
+    WALDUR_SITE_AGENT_EVENT_CONTEXT_TTL_MINUTES,
+    agent_identity_management,
+    structures,
+)
+from waldur_site_agent.common import processors as common_processors
+from waldur_site_agent.common import utils as common_utils
+
+CONTEXT_TTL = WALDUR_SITE_AGENT_EVENT_CONTEXT_TTL_MINUTES * 60
+
+ProcessorT = TypeVar("ProcessorT", bound=common_processors.OfferingBaseProcessor)
+
+
+def register_event_process_service(
+    offering: structures.Offering,
+    waldur_rest_client: AuthenticatedClient,
+    observable_object: ObservableObjectTypeEnum,
+) -> AgentService:
+    """A shortcut for initialization of the event_process service.
+
+    Args:
+        offering (structures.Offering): Waldur offering
+        waldur_rest_client (AuthenticatedClient): Waldur API client
+        observable_object (ObservableObjectTypeEnum): Type of observable object
+
+    Returns:
+        AgentService: Registered agent service
+    """
+    agent_identity_manager = agent_identity_management.AgentIdentityManager(
+        offering, waldur_rest_client
+    )
+    agent_identity_name = f"agent-{offering.uuid}"
+    agent_identity = agent_identity_manager.get_identity(agent_identity_name)
+    service_name = f"{structures.AgentMode.EVENT_PROCESS.value}-{observable_object}"
+    return agent_identity_manager.register_service(
+        agent_identity,
+        service_name,
+        structures.AgentMode.EVENT_PROCESS.value,
+    )
+
+
+@dataclass
+class OfferingContext:
+    """Waldur client and offering state shared by the handlers of an offering.
+
+    Processors are kept per observable object type and handed out to one
+    message at a time, so concurrent handlers never share a processor.
+    """
+
+    waldur_rest_client: AuthenticatedClient
+    api_token: str
+    created_at: float
+    waldur_offering: Optional[ProviderOfferingDetails] = None
+    service_provider: Optional[ServiceProvider] = None
+    current_user: Optional[UserMe] = None
+    agent_services: dict[str, AgentService] = field(default_factory=dict)
+    idle_processors: dict[str, list[common_processors.OfferingBaseProcessor]] = field(
+        default_factory=dict
+    )
+    # Processors currently lent to handlers
+    leases: int = 0
+    # Dropped from the cache, closed once no processor is lent anymore
+    retired: bool = False
+
+
+def _close_context(context: OfferingContext) -> None:
+    """Close the connection pools of a context that is no longer used."""
+    for processors in context.idle_processors.values():
+        for processor in processors:
+            try:
+                processor.close()
+            except Exception:
+                logger.exception(
+                    "Failed to close the processor of the offering %s", processor.offering.name
+                )
+    context.idle_processors.clear()
+    try:
+        context.waldur_rest_client.get_httpx_client().close()
+    except Exception:
+        logger.exception("Failed to close the Waldur client of a dropped context")
+
+
+class OfferingContextCache:
+    """TTL-bound, thread-safe cache of per-offering contexts.
+
+    The first message of an offering creates the Waldur client, registers the
+    event process service and builds the processor; the setup round-trips
+    (offering details, service provider, current user) are then skipped for
+    later messages. A context is rebuilt once it is older than ``ttl``
+    seconds or the API token of the offering changed, and dropped when a
+    handler fails, so a broken client is never reused. Waldur sends no event
+    when the offering changes, so changed offering details (e.g. components)
+    are picked up when the context expires or on a forced resources sync.
+
+    A dropped context is closed, with its Waldur client and the processors
+    and backends it built, once none of its processors is lent to a handler.
+    """
+
+    def __init__(self, ttl: float = CONTEXT_TTL) -> None:
+        """Constructor.
+
+        Args:
+            ttl: Seconds a context is reused for, 0 disables the reuse
+        """
+        self.ttl = ttl
+        self._contexts: dict[str, OfferingContext] = {}
+        # Every STOMP subscription runs its handler in its own thread
+        self._lock = threading.Lock()
+
+    def _lease_context(self, offering: structures.Offering, user_agent: str) -> OfferingContext:
+        """Return the context of the offering with one more processor lent from it."""
+        # OIDC tokens expire, a client holding a stale one must be replaced
+        api_token, _ = common_utils.get_offering_api_token(offering)
+        with self._lock:
+            context = self._contexts.get(offering.uuid)
+            if (
+                context is not None
+                and context.api_token == api_token
+                and time.monotonic() - context.created_at < self.ttl
+            ):
+                context.leases += 1
+                return context
+
+        new_context = OfferingContext(
+            waldur_rest_client=common_utils.get_client_for_offering(offering, user_agent),
+            api_token=api_token,
+            created_at=time.monotonic(),
+            leases=1,
+            retired=self.ttl <= 0,
+        )
+        replaced = None
+        with self._lock:
+            if self.ttl > 0:
+                replaced = self._contexts.get(offering.uuid)
+                self._contexts[offering.uuid] = new_context
+                if replaced is not None and not self._retire(replaced):
+                    replaced = None
+        if replaced is not None:
+            _close_context(replaced)
+        return new_context
+
+    def _release_context(self, context: OfferingContext) -> None:
+        """Return a lent processor slot, closing the context if it was the last one."""
+        with self._lock:
+            context.leases -= 1
+            close = context.retired and context.leases == 0
+        if close:
+            _close_context(context)
+
+    @staticmethod
+    def _retire(context: OfferingContext) -> bool:
+        """Mark a context dropped; return True if it must be closed now.
+
+        Must be called with the lock held.
+        """
+        if context.retired:
+            return False
+        context.retired = True
+        return context.leases == 0
+
+    def get_agent_service(
+        self,
+        offering: structures.Offering,
+        context: OfferingContext,
+        observable_object: ObservableObjectTypeEnum,
+    ) -> AgentService:
+        """Return the event process service of the observable object, registering it once."""
+        with self._lock:
+            agent_service = context.agent_services.get(observable_object)
+        if agent_service is None:
+            agent_service = register_event_process_service(
+                offering, context.waldur_rest_client, observable_object
+            )
+            with self._lock:
+                context.agent_services[observable_object] = agent_service
+        return agent_service
+
+    @contextlib.contextmanager
+    def processor(
+        self,
+        offering: structures.Offering,
+        user_agent: str,
+        observable_object: ObservableObjectTypeEnum,
+        processor_class: type[ProcessorT],
+        backend_type_key: Optional[str] = None,
+        expose_backend_error_details: bool = True,
+    ) -> Iterator[ProcessorT]:
+        """Lend a registered processor of the offering to the caller.
+
+        Args:
+            offering: Offering the message belongs to
+            user_agent: User agent of the Waldur client
+            observable_object: Object type of the handled message
+            processor_class: Processor class to build if none is idle
+            backend_type_key: Offering attribute selecting the backend of a new
+                processor; the processor picks its default backend if omitted
+            expose_backend_error_details: Whether to forward raw exception
+                details to Waldur
+
+        Yields:
+            The processor, returned to the cache if the caller does not fail
+        """
+        context = self._lease_context(offering, user_agent)
+        with self._lock:
+            idle = context.idle_processors.get(observable_object)
+            # The processors of an object type are all built from its processor class
+            processor = cast("ProcessorT", idle.pop()) if idle else None
+
+        try:
+            if processor is None:
+                processor = self._create_processor(
+                    offering,
+                    context,
+                    observable_object,
+                    processor_class,
+                    backend_type_key,
+                    expose_backend_error_details,
+                )
+            else:
+                processor.reset_cycle_caches()
+            yield processor
+        except Exception:
+            self.invalidate(offering, context)
+            if processor is not None:
+                # Closed with the dropped context once no other processor of it is lent
+                with self._lock:
+                    context.idle_processors.setdefault(observable_object, []).append(processor)
+            self._release_context(context)
+            raise
+
+        # Processors of a dropped context, or of a context that is not reused, are
+        # closed with it
+        with self._lock:
+            context.idle_processors.setdefault(observable_object, []).append(processor)
+        self._release_context(context)
+
+    def invalidate(
+        self, offering: structures.Offering, context: Optional[OfferingContext] = None
+    ) -> None:
+        """Drop the context of the offering, so the next message rebuilds it.
+
+        Args:
+            offering: Offering whose context is dropped
+            context: Drop the context only if it is still the current one
+        """
+        with self._lock:
+            current = self._contexts.get(offering.uuid)
+            if current is not None and (context is None or current is context):
+                logger.info("Dropping the cached event processing context of %s", offering.name)
+                del self._contexts[offering.uuid]
+            # The context of a failed handler may have been replaced already
+            dropped = context if context is not None else current
+            close = dropped is not None and self._retire(dropped)
+        if close and dropped is not None:
+            _close_context(dropped)
+
+    def clear(self) -> None:
+        """Drop the contexts of all offerings."""
+        with self._lock:
+            contexts = [context for context in self._contexts.values() if self._retire(context)]
+            self._contexts.clear()
+        for context in contexts:
+            _close_context(context)
+
+    def _create_processor(
+        self,
+        offering: structures.Offering,
+        context: OfferingContext,
+        observable_object: ObservableObjectTypeEnum,
+        processor_class: type[ProcessorT],
+        backend_type_key: Optional[str],
+        expose_backend_error_details: bool,
+    ) -> ProcessorT:
+        agent_service = self.get_agent_service(offering, context, observable_object)
+
+        resource_backend: Optional[BaseBackend] = None
+        resource_backend_version: Optional[str] = None
+        if backend_type_key is not None:
+            resource_backend, resource_backend_version = common_utils.get_backend_for_offering(
+                offering, backend_type_key
+            )
+
+        processor = processor_class(
+            offering,
+            context.waldur_rest_client,
+            resource_backend=resource_backend,
+            resource_backend_version=resource_backend_version,
+            waldur_offering=context.waldur_offering,
+            service_provider=context.service_provider,
+            current_user=context.current_user,
+            expose_backend_error_details=expose_backend_error_details,
+        )
+        processor.register(agent_service)
+
+        with self._lock:
+            context.waldur_offering = processor.waldur_offering
+            context.service_provider = processor.service_provider
+            context.current_user = processor.current_user
+        return processor
+
+
+# Shared by the handlers of all STOMP subscriptions of the agent
+OFFERING_CONTEXTS = OfferingContextCache()
@@ -0,0 +1,92 @@
+"""Watermarks driving the incremental periodic reconciliation in event mode.
+
+The periodic reconciliation looks for objects that STOMP events left
+unfinished. Between full scans, a pass only queries the objects modified since
+the watermark of the same offering and object type. A pass moves the watermark
+only once it finished, and never past an object it failed to get unstuck, so
+such objects are queried again by the next pass. Every full reconciliation
+period, and whenever no watermark is known yet, the pass scans the whole
+offering again.
+"""
+
+from __future__ import annotations
+
+import datetime
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from waldur_site_agent.common import WALDUR_SITE_AGENT_FULL_RECONCILIATION_PERIOD_MINUTES
+
+# Queried before the watermark to tolerate clock skew between the agent and Waldur
+WATERMARK_OVERLAP = datetime.timedelta(minutes=5)
+
+
+class ReconciliationPass(NamedTuple):
+    """Scope of one reconciliation pass of an offering and object type.
+
+    Attributes:
+        modified_after: Lower bound of the modification time of the queried
+            objects, None for a full scan
+    """
+
+    modified_after: Optional[datetime.datetime]
+
+
+class ReconciliationTracker:
+    """Per offering and object type watermarks of the reconciliation passes."""
+
+    def __init__(self, full_scan_interval: float) -> None:
+        """Constructor.
+
+        Args:
+            full_scan_interval: Seconds between full scans, 0 makes every pass a full scan
+        """
+        self.full_scan_interval = full_scan_interval
+        self._watermarks: dict[tuple[str, str], datetime.datetime] = {}
+        self._last_full_scans: dict[tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, offering_uuid: str, object_type: str) -> ReconciliationPass:
+        """Return the scope of the next pass, a full scan when one is due."""
+        key = (offering_uuid, object_type)
+        with self._lock:
+            watermark = self._watermarks.get(key)
+            last_full_scan = self._last_full_scans.get(key)
+        if (
+            self.full_scan_interval <= 0
+            or watermark is None
+            or last_full_scan is None
+            or time.monotonic() - last_full_scan >= self.full_scan_interval
+        ):
+            return ReconciliationPass(None)
+        return ReconciliationPass(watermark - WATERMARK_OVERLAP)
+
+    def complete(
+        self,
+        offering_uuid: str,
+        object_type: str,
+        reconciliation_pass: ReconciliationPass,
+        covered_until: datetime.datetime,
+    ) -> None:
+        """Move the watermark once the pass finished.
+
+        Args:
+            offering_uuid: UUID of the offering
+            object_type: Type of the reconciled objects
+            reconciliation_pass: The finished pass
+            covered_until: Modification time up to which the pass handled the
+                objects, at most the modification time of the oldest object
+                that is still stuck
+        """
+        key = (offering_uuid, object_type)
+        with self._lock:
+            self._watermarks[key] = covered_until
+            if reconciliation_pass.modified_after is None:
+                self._last_full_scans[key] = time.monotonic()
+
+
+# Shared by the periodic reconciliation passes of the agent
+RECONCILIATION_TRACKER = ReconciliationTracker(
+    WALDUR_SITE_AGENT_FULL_RECONCILIATION_PERIOD_MINUTES * 60
+)
@@ -0,0 +1,205 @@
+"""On-disk queue of STOMP messages whose handling failed, retried with backoff.
+
+With acknowledged consumption, the listener acknowledges a message only after
+its handler finished. A message whose handler failed is stored here before it
+is acknowledged, so it survives both the failure and an agent restart. A
+background thread hands the due messages back to the handler of their queue,
+doubling the delay after every failure, and drops a message after the
+configured number of attempts.
+
+Handlers catch their own errors to keep the receiver threads alive, so they
+report a failure with ``mark_failed`` instead of raising.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional, Union
+
+from waldur_site_agent.backend import logger
+
+RETRY_QUEUE_FILE_NAME = "event-retry-queue.sqlite3"
+RETRY_POLL_INTERVAL = 5  # Seconds between checks for due messages
+RETRY_BATCH_SIZE = 100  # Messages retried per check
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS failed_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT NOT NULL
+)
+"""
+
+_delivery = threading.local()
+
+
+def mark_failed(error: Exception) -> None:
+    """Record that the handler running on this thread failed to handle its message."""
+    _delivery.error = error
+
+
+def take_delivery_error() -> Optional[Exception]:
+    """Return and clear the failure recorded on this thread."""
+    error = getattr(_delivery, "error", None)
+    _delivery.error = None
+    return error
+
+
+class RetryEntry(NamedTuple):
+    """A stored message waiting for its next attempt, ``attempts`` counts the retries."""
+
+    id: int
+    queue: str
+    body: str
+    attempts: int
+
+
+class EventRetryQueue:
+    """SQLite-backed retry queue shared by the STOMP listeners of an agent."""
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int,
+        max_attempts: int,
+        initial_delay: float,
+        max_delay: float,
+    ) -> None:
+        """Constructor.
+
+        Args:
+            path: Location of the SQLite database, created if missing
+            max_size: Messages kept before the oldest are dropped
+            max_attempts: Failed retries after which a message is dropped
+            initial_delay: Seconds before the first retry
+            max_delay: Upper bound of the delay between retries
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        # Queue name -> function handling a stored message body, raising on failure
+        self._routes: dict[str, Callable[[str], None]] = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(_SCHEMA)
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register_route(self, queue: str, handle: Callable[[str], None]) -> None:
+        """Set the function retrying the messages of the queue."""
+        with self._lock:
+            self._routes[queue] = handle
+
+    def push(self, queue: str, body: Union[str, bytes], error: Exception) -> None:
+        """Store a message whose first attempt failed."""
+        if isinstance(body, bytes):
+            body = body.decode()
+        with self._lock, self._connection:
+            (size,) = self._connection.execute("SELECT COUNT(*) FROM failed_messages").fetchone()
+            if size >= self.max_size:
+                logger.warning("Event retry queue is full (%d messages), dropping the oldest", size)
+                self._connection.execute(
+                    "DELETE FROM failed_messages WHERE id IN "
+                    "(SELECT id FROM failed_messages ORDER BY id LIMIT ?)",
+                    (size - self.max_size + 1,),
+                )
+            self._connection.execute(
+                "INSERT INTO failed_messages (queue, body, attempts, next_attempt_at, last_error) "
+                "VALUES (?, ?, 0, ?, ?)",
+                (queue, body, time.time() + self._delay(0), str(error)),
+            )
+        logger.info("Stored a failed message of queue %s for retry", queue)
+
+    def due(self, limit: int = RETRY_BATCH_SIZE) -> list[RetryEntry]:
+        """Return the messages whose next attempt is due, oldest first."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, queue, body, attempts FROM failed_messages "
+                "WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+        return [RetryEntry(*row) for row in rows]
+
+    def retry_due(self) -> int:
+        """Retry the due messages and return the number handled successfully."""
+        succeeded = 0
+        for entry in self.due():
+            with self._lock:
+                handle = self._routes.get(entry.queue)
+            if handle is None:
+                self._reschedule(entry, f"no handler registered for queue {entry.queue}")
+                continue
+            take_delivery_error()
+            try:
+                handle(entry.body)
+                error = take_delivery_error()
+            except Exception as e:
+                error = e
+            if error is None:
+                self._remove(entry)
+                succeeded += 1
+            else:
+                self._reschedule(entry, error)
+        return succeeded
+
+    def __len__(self) -> int:
+        """Return the number of stored messages."""
+        with self._lock:
+            (size,) = self._connection.execute("SELECT COUNT(*) FROM failed_messages").fetchone()
+        return size
+
+    def start(self) -> None:
+        """Start retrying the due messages in a background thread."""
+        self._thread = threading.Thread(target=self._run, name="waldur-event-retry", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background thread and close the database."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._lock:
+            self._connection.close()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(RETRY_POLL_INTERVAL):
+            try:
+                succeeded = self.retry_due()
+                if succeeded:
+                    logger.info("Retried %d failed event messages successfully", succeeded)
+            except Exception:
+                logger.exception("Failed to retry the stored event messages")
+
+    def _delay(self, attempts: int) -> float:
+        return min(self.initial_delay * 2**attempts, self.max_delay)
+
+    def _remove(self, entry: RetryEntry) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM failed_messages WHERE id = ?", (entry.id,))
+
+    def _reschedule(self, entry: RetryEntry, error: Union[Exception, str]) -> None:
+        attempts = entry.attempts + 1
+        if attempts >= self.max_attempts:
+            logger.error(
+                "Dropping message of queue %s after %d failed retries, last error: %s",
+                entry.queue,
+                attempts,
+                error,
+            )
+            self._remove(entry)
+            return
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE failed_messages SET attempts = ?, next_attempt_at = ?, last_error = ? "
+                "WHERE id = ?",
+                (attempts, time.time() + self._delay(attempts), str(error), entry.id),
+            )
@@ -3,10 +3,11 @@
 from __future__ import annotations
 
 import datetime
+import functools
 import signal
 import sys
 import types
-from collections.abc import Generator
+from collections.abc import Generator, Sequence
 from contextlib import contextmanager
 
 from waldur_api_client import AuthenticatedClient
@@ -16,9 +17,12 @@ from waldur_api_client.api.marketplace_resource_api_keys import (
     marketplace_resource_api_keys_list,
 )
 from waldur_api_client.models.observable_object_type_enum import ObservableObjectTypeEnum
+from waldur_api_client.models.offering_user import OfferingUser
 from waldur_api_client.models.offering_user_state import OfferingUserState
+from waldur_api_client.models.order_details import OrderDetails
 from waldur_api_client.models.order_state import OrderState
 from waldur_api_client.models.resource_api_key_state import ResourceApiKeyState
+from waldur_api_client.types import UNSET
 
 from waldur_site_agent.backend import logger
 from waldur_site_agent.common import agent_identity_management
@@ -30,11 +34,16 @@ from waldur_site_agent.common.utils import (
     get_backend_for_offering,
     get_client_for_offering,
 )
+from waldur_site_agent.event_processing.dispatcher import MessageDispatcher
 from waldur_site_agent.event_processing.event_subscription_manager import EventSubscriptionManager
+from waldur_site_agent.event_processing.offering_context import OFFERING_CONTEXTS
+from waldur_site_agent.event_processing.reconciliation_tracker import RECONCILIATION_TRACKER
+from waldur_site_agent.event_processing.retry_queue import EventRetryQueue
 from waldur_site_agent.event_processing.structures import (
     StompConsumer,
     StompConsumersMap,
 )
+from waldur_site_agent.polling_processing import offering_pool
 
 
 def _determine_observable_object_types(
@@ -143,6 +152,8 @@ def _setup_single_stomp_subscription(
     object_type: ObservableObjectTypeEnum,
     global_proxy: str = "",
     expose_backend_error_details: bool = True,
+    dispatcher: MessageDispatcher | None = None,
+    retry_queue: EventRetryQueue | None = None,
 ) -> StompConsumer | None:
     """Setup a single STOMP subscription for the given object type.
 
@@ -154,6 +165,10 @@ def _setup_single_stomp_subscription(
         object_type: Type of observable object to subscribe to
         global_proxy: Optional proxy configuration
         expose_backend_error_details: Whether to forward raw exception details to Waldur
+        dispatcher: Worker pool the messages are handed to, None handles them
+            on the receiver thread
+        retry_queue: Queue storing the messages whose handling failed, None
+            consumes without acknowledgements
 
     Returns:
         Tuple of (connection, event_subscription, offering) if successful, None if failed
@@ -182,6 +197,8 @@ def _setup_single_stomp_subscription(
             object_type,
             global_proxy,
             expose_backend_error_details=expose_backend_error_details,
+            dispatcher=dispatcher,
+            retry_queue=retry_queue,
         )
         connection = event_subscription_manager.setup_stomp_connection(
             event_subscription,
@@ -212,11 +229,102 @@ def _setup_single_stomp_subscription(
         return None
 
 
+def _setup_shared_stomp_subscription(
+    offering: common_structures.Offering,
+    agent_identity: agent_identity_management.AgentIdentity,
+    agent_identity_manager: agent_identity_management.AgentIdentityManager,
+    waldur_user_agent: str,
+    object_types: list[ObservableObjectTypeEnum],
+    global_proxy: str = "",
+    expose_backend_error_details: bool = True,
+    dispatcher: MessageDispatcher | None = None,
+    retry_queue: EventRetryQueue | None = None,
+) -> StompConsumer | None:
+    """Setup one STOMP connection consuming the queues of all given object types.
+
+    A single event subscription is registered and a queue is created in it for
+    every object type; the listener of the connection routes the messages to
+    the handler of the queue they arrive on.
+
+    Returns:
+        Tuple of (connection, event_subscription, offering) if successful, None if failed
+    """
+    if not object_types:
+        return None
+    try:
+        event_subscription = agent_identity_manager.register_event_subscription(
+            agent_identity, object_types[0]
+        )
+        routed_object_types = []
+        for object_type in object_types:
+            event_subscription_queue = agent_identity_manager.create_event_subscription_queue(
+                event_subscription, object_type
+            )
+            if event_subscription_queue is None:
+                logger.error(
+                    "Failed to create event subscription queue for the offering %s, object type %s",
+                    offering.name,
+                    object_type,
+                )
+                continue
+            routed_object_types.append(object_type)
+        if not routed_object_types:
+            return None
+
+        event_subscription_manager = EventSubscriptionManager(
+            offering,
+            None,
+            None,
+            waldur_user_agent,
+            routed_object_types[0],
+            global_proxy,
+            expose_backend_error_details=expose_backend_error_details,
+            dispatcher=dispatcher,
+            retry_queue=retry_queue,
+        )
+        connection = event_subscription_manager.setup_stomp_connection(
+            event_subscription,
+            offering.stomp_ws_host,
+            offering.stomp_ws_port,
+            offering.stomp_ws_path,
+        )
+        for object_type in routed_object_types[1:]:
+            event_subscription_manager.add_stomp_subscription(
+                connection, event_subscription, object_type
+            )
+        connected = event_subscription_manager.start_stomp_connection(
+            event_subscription, connection
+        )
+        if not connected:
+            logger.error(
+                "Failed to start the shared STOMP connection for the offering %s (%s)",
+                offering.name,
+                offering.uuid,
+            )
+            return None
+
+        logger.info(
+            "Consuming %d object types over one STOMP connection for the offering %s",
+            len(routed_object_types),
+            offering.name,
+        )
+        return (connection, event_subscription, offering)
+    except Exception as e:
+        logger.exception(
+            "Unable to set up the shared STOMP connection for offering %s: %s",
+            offering.name,
+            e,
+        )
+        return None
+
+
 def setup_stomp_offering_subscriptions(
     waldur_offering: common_structures.Offering,
     waldur_user_agent: str,
     global_proxy: str = "",
     expose_backend_error_details: bool = True,
+    dispatcher: MessageDispatcher | None = None,
+    retry_queue: EventRetryQueue | None = None,
 ) -> list[StompConsumer]:
     """Set up STOMP subscriptions for the specified offering."""
     stomp_connections: list[StompConsumer] = []
@@ -233,19 +341,36 @@ def setup_stomp_offering_subscriptions(
 
     agent_identity, agent_identity_manager = result
 
-    # Setup subscription for each object type
-    for object_type in object_types:
-        consumer = _setup_single_stomp_subscription(
+    if waldur_offering.stomp_shared_connection:
+        consumer = _setup_shared_stomp_subscription(
             waldur_offering,
             agent_identity,
             agent_identity_manager,
             waldur_user_agent,
-            object_type,
+            object_types,
             global_proxy,
             expose_backend_error_details=expose_backend_error_details,
+            dispatcher=dispatcher,
+            retry_queue=retry_queue,
         )
         if consumer is not None:
             stomp_connections.append(consumer)
+    else:
+        # Setup subscription for each object type
+        for object_type in object_types:
+            consumer = _setup_single_stomp_subscription(
+                waldur_offering,
+                agent_identity,
+                agent_identity_manager,
+                waldur_user_agent,
+                object_type,
+                global_proxy,
+                expose_backend_error_details=expose_backend_error_details,
+                dispatcher=dispatcher,
+                retry_queue=retry_queue,
+            )
+            if consumer is not None:
+                stomp_connections.append(consumer)
 
     # Set up target event subscriptions for backends that support them
     # (e.g., Waldur federation backend subscribes to ORDER events on Waldur B).
@@ -271,6 +396,8 @@ def start_stomp_consumers(
     waldur_user_agent: str,
     global_proxy: str = "",
     expose_backend_error_details: bool = True,
+    dispatcher: MessageDispatcher | None = None,
+    retry_queue: EventRetryQueue | None = None,
 ) -> StompConsumersMap:
     """Start multiple STOMP consumers."""
     stomp_consumers_map: StompConsumersMap = {}
@@ -285,6 +412,8 @@ def start_stomp_consumers(
             waldur_user_agent,
             global_proxy,
             expose_backend_error_details=expose_backend_error_details,
+            dispatcher=dispatcher,
+            retry_queue=retry_queue,
         )
         if stomp_connections:
             stomp_consumers_map[(waldur_offering.name, waldur_offering.uuid)] = stomp_connections
@@ -354,29 +483,66 @@ def signal_handling(
             signal.signal(sig, handler)
 
 
+def _run_initial_offering_process(
+    offering: common_structures.Offering,
+    user_agent: str = "",
+    expose_backend_error_details: bool = True,
+    process_orders: bool = True,
+    process_membership: bool = True,
+) -> None:
+    try:
+        process_offering(
+            offering,
+            user_agent,
+            expose_backend_error_details=expose_backend_error_details,
+            process_orders=process_orders,
+            process_membership=process_membership,
+        )
+    except Exception as e:
+        logger.exception("Error occurred during initial offering process: %s", e)
+
+
 def run_initial_offering_processing(
     waldur_offerings: list[common_structures.Offering],
     user_agent: str = "",
     expose_backend_error_details: bool = True,
+    max_workers: int = 1,
+    process_orders: bool = True,
+    process_membership: bool = True,
 ) -> None:
-    """Runs processing of offerings with event-based processing enabled."""
-    logger.info("Processing offerings with STOMP feature enabled")
-    for offering in waldur_offerings:
-        try:
-            if offering.stomp_enabled:
-                process_offering(
-                    offering, user_agent, expose_backend_error_details=expose_backend_error_details
-                )
-        except Exception as e:
-            logger.exception("Error occurred during initial offering process: %s", e)
+    """Runs processing of offerings with event-based processing enabled.
+
+    Up to ``max_workers`` offerings are processed concurrently. The order and
+    membership parts can be run separately, see ``process_offering``.
+    """
+    stomp_offerings = [offering for offering in waldur_offerings if offering.stomp_enabled]
+    logger.info("Processing %d offerings with STOMP feature enabled", len(stomp_offerings))
+    offering_pool.process_offerings(
+        stomp_offerings,
+        functools.partial(
+            _run_initial_offering_process,
+            user_agent=user_agent,
+            expose_backend_error_details=expose_backend_error_details,
+            process_orders=process_orders,
+            process_membership=process_membership,
+        ),
+        max_workers,
+    )
+    logger.info("Finished the initial processing of the offerings")
 
 
 def process_offering(
     offering: common_structures.Offering,
     user_agent: str = "",
     expose_backend_error_details: bool = True,
+    process_orders: bool = True,
+    process_membership: bool = True,
 ) -> None:
-    """Processes the specified offering."""
+    """Processes the specified offering.
+
+    ``process_orders`` and ``process_membership`` select the order and the
+    membership part of the pass.
+    """
     logger.info("Processing offering %s (%s)", offering.name, offering.uuid)
 
     waldur_rest_client = get_client_for_offering(offering, user_agent)
@@ -390,7 +556,7 @@ def process_offering(
         common_structures.AgentMode.EVENT_PROCESS.value,
     )
 
-    if offering.order_processing_backend:
+    if process_orders and offering.order_processing_backend:
         order_processor = common_processors.OfferingOrderProcessor(
             offering,
             waldur_rest_client,
@@ -399,10 +565,13 @@ def process_offering(
         order_processor.register(agent_service)
         logger.info("Running offering order process")
         order_processor.process_offering()
-    else:
+    elif process_orders:
         logger.info("Order processing is disabled for this offering, skipping it")
 
-    if offering.membership_sync_backend and offering.stomp_membership_sync_enabled is not False:
+    membership_enabled = (
+        offering.membership_sync_backend and offering.stomp_membership_sync_enabled is not False
+    )
+    if process_membership and membership_enabled:
         membership_processor = common_processors.OfferingMembershipProcessor(
             offering,
             waldur_rest_client,
@@ -411,7 +580,7 @@ def process_offering(
         membership_processor.register(agent_service)
         logger.info("Running offering membership process")
         membership_processor.process_offering()
-    else:
+    elif process_membership:
         logger.info("Membership sync is disabled for this offering, skipping it")
 
 
@@ -443,6 +612,16 @@ def run_periodic_username_reconciliation(
             logger.exception("Reconciliation failed for offering %s", offering.name)
 
 
+def _oldest_modified(
+    stuck_objects: Sequence[OfferingUser | OrderDetails], covered_until: datetime.datetime
+) -> datetime.datetime:
+    """Return the watermark of a pass that left the given objects stuck."""
+    modified = [
+        obj.modified for obj in stuck_objects if isinstance(obj.modified, datetime.datetime)
+    ]
+    return min([*modified, covered_until])
+
+
 def run_periodic_offering_user_reconciliation(
     waldur_offerings: list[common_structures.Offering], user_agent: str = ""
 ) -> None:
@@ -454,13 +633,20 @@ def run_periodic_offering_user_reconciliation(
     CREATING, ERROR_CREATING, or PENDING_* with no periodic retry.
 
     This function fetches offering users in those stuck states and runs
-    update_offering_users() to retry username generation.
+    update_offering_users() to retry username generation. Between full scans
+    (see RECONCILIATION_TRACKER) only users modified since the watermark are
+    fetched. The watermark is moved after the pass, but not past the oldest
+    user that still has no username, so such users are retried by every pass.
     """
     for offering in waldur_offerings:
         touch_heartbeat()
         if not offering.membership_sync_backend:
             continue
         try:
+            reconciliation_pass = RECONCILIATION_TRACKER.begin(
+                offering.uuid, ObservableObjectTypeEnum.OFFERING_USER
+            )
+            started_at = datetime.datetime.now(tz=datetime.timezone.utc)
             waldur_rest_client = get_client_for_offering(offering, user_agent)
 
             stuck_users = marketplace_offering_users_list.sync_all(
@@ -474,23 +660,31 @@ def run_periodic_offering_user_reconciliation(
                     OfferingUserState.PENDING_ADDITIONAL_VALIDATION,
                 ],
                 is_restricted=False,
+                modified=reconciliation_pass.modified_after or UNSET,
             )
 
-            if not stuck_users:
-                continue
-
-            logger.info(
-                "Offering user reconciliation: found %d stuck user(s) for %s",
-                len(stuck_users),
-                offering.name,
-            )
-
-            updated = common_utils.update_offering_users(offering, waldur_rest_client, stuck_users)
-            if updated:
+            if stuck_users:
                 logger.info(
-                    "Offering user reconciliation: usernames updated for %s",
+                    "Offering user reconciliation: found %d stuck user(s) for %s",
+                    len(stuck_users),
                     offering.name,
                 )
+                updated = common_utils.update_offering_users(
+                    offering, waldur_rest_client, stuck_users
+                )
+                if updated:
+                    logger.info(
+                        "Offering user reconciliation: usernames updated for %s",
+                        offering.name,
+                    )
+
+            # update_offering_users sets the username of every user it got unstuck
+            RECONCILIATION_TRACKER.complete(
+                offering.uuid,
+                ObservableObjectTypeEnum.OFFERING_USER,
+                reconciliation_pass,
+                _oldest_modified([user for user in stuck_users if not user.username], started_at),
+            )
         except Exception:
             logger.exception("Offering user reconciliation failed for %s", offering.name)
 
@@ -507,6 +701,11 @@ def run_periodic_order_reconciliation(
     with orders that are being actively processed by STOMP handlers.
 
     Only runs for offerings that have order_processing_backend configured.
+
+    Between full scans (see RECONCILIATION_TRACKER) only orders that became
+    stuck since the watermark are fetched. The watermark is moved after the
+    pass, but not past the oldest order that failed to be processed, so such
+    orders are retried by the next pass.
     """
     cutoff = datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(
         minutes=stuck_threshold_minutes
@@ -517,6 +716,9 @@ def run_periodic_order_reconciliation(
         if not offering.order_processing_backend:
             continue
         try:
+            reconciliation_pass = RECONCILIATION_TRACKER.begin(
+                offering.uuid, ObservableObjectTypeEnum.ORDER
+            )
             waldur_rest_client = get_client_for_offering(offering, user_agent)
 
             stuck_orders = marketplace_orders_list.sync_all(
@@ -524,29 +726,70 @@ def run_periodic_order_reconciliation(
                 offering_uuid=offering.waldur_offering_uuid,
                 state=[OrderState.PENDING_PROVIDER, OrderState.EXECUTING],
                 modified_before=cutoff,
+                modified=reconciliation_pass.modified_after or UNSET,
             )
 
-            if not stuck_orders:
-                continue
-
-            logger.info(
-                "Order reconciliation: found %d stuck order(s) for %s (modified before %s)",
-                len(stuck_orders),
-                offering.name,
-                cutoff.isoformat(),
+            failed_orders = []
+            if stuck_orders:
+                logger.info(
+                    "Order reconciliation: found %d stuck order(s) for %s (modified before %s)",
+                    len(stuck_orders),
+                    offering.name,
+                    cutoff.isoformat(),
+                )
+                order_processor = common_processors.OfferingOrderProcessor(
+                    offering, waldur_rest_client
+                )
+                for order in stuck_orders:
+                    touch_heartbeat()
+                    try:
+                        if not order_processor.process_order_with_retries(order):
+                            failed_orders.append(order)
+                    except Exception as e:
+                        order_processor.log_order_processing_error(order, e)
+                        failed_orders.append(order)
+
+            RECONCILIATION_TRACKER.complete(
+                offering.uuid,
+                ObservableObjectTypeEnum.ORDER,
+                reconciliation_pass,
+                _oldest_modified(failed_orders, cutoff),
             )
-
-            order_processor = common_processors.OfferingOrderProcessor(offering, waldur_rest_client)
-            for order in stuck_orders:
-                touch_heartbeat()
-                try:
-                    order_processor.process_order_with_retries(order)
-                except Exception as e:
-                    order_processor.log_order_processing_error(order, e)
         except Exception:
             logger.exception("Order reconciliation failed for offering %s", offering.name)
 
 
+def run_periodic_async_order_check(
+    waldur_offerings: list[common_structures.Offering],
+    user_agent: str = "",
+    expose_backend_error_details: bool = True,
+) -> None:
+    """Complete the executing orders of backends with async orders.
+
+    No order event arrives when an async backend operation finishes (e.g. a
+    VM created without waiting reaches RUNNING), so such orders are checked
+    on a short interval instead of waiting for the stuck-order reconciliation.
+
+    Only runs for offerings that have order_processing_backend configured.
+    """
+    for offering in waldur_offerings:
+        touch_heartbeat()
+        if not offering.order_processing_backend:
+            continue
+        try:
+            with OFFERING_CONTEXTS.processor(
+                offering,
+                user_agent,
+                ObservableObjectTypeEnum.ORDER,
+                common_processors.OfferingOrderProcessor,
+                "order_processing_backend",
+                expose_backend_error_details,
+            ) as processor:
+                processor.process_async_orders()
+        except Exception:
+            logger.exception("Async order check failed for offering %s", offering.name)
+
+
 def run_periodic_api_key_reconciliation(
     waldur_offerings: list[common_structures.Offering],
     user_agent: str = "",
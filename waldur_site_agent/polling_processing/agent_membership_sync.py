@@ -1,108 +1,93 @@
 """Agent responsible for membership control."""
 
+import functools
 import time
 
-from waldur_api_client.models import AgentIdentity
-
 from waldur_site_agent.backend import logger
-from waldur_site_agent.common import (
-    WALDUR_SITE_AGENT_MEMBERSHIP_SYNC_PERIOD_MINUTES,
-    agent_identity_management,
-)
+from waldur_site_agent.common import WALDUR_SITE_AGENT_MEMBERSHIP_SYNC_PERIOD_MINUTES
 from waldur_site_agent.common import processors as common_processors
 from waldur_site_agent.common import structures as common_structures
 from waldur_site_agent.common import utils as common_utils
 from waldur_site_agent.common.healthz import touch_heartbeat
+from waldur_site_agent.polling_processing import offering_pool, processor_registry
 
 SYNC_INTERVAL = WALDUR_SITE_AGENT_MEMBERSHIP_SYNC_PERIOD_MINUTES * 60
 TICK_INTERVAL = 60  # Wake up every minute to touch heartbeat
 
 
-def _process_offerings(
+def _create_processor(
+    offering: common_structures.Offering,
+    waldur_rest_client: common_utils.AuthenticatedClient,
     configuration: common_structures.WaldurAgentConfiguration,
-    agent_identities: dict[str, AgentIdentity],
+) -> common_processors.OfferingMembershipProcessor:
+    """Build the membership processor of the offering."""
+    # Create backend instance for dependency injection
+    resource_backend, resource_backend_version = common_utils.get_backend_for_offering(
+        offering, "membership_sync_backend"
+    )
+
+    return common_processors.OfferingMembershipProcessor(
+        offering,
+        waldur_rest_client,
+        resource_backend=resource_backend,
+        resource_backend_version=resource_backend_version,
+        expose_backend_error_details=configuration.expose_backend_error_details,
+    )
+
+
+def _process_offering(
+    offering: common_structures.Offering,
+    registry: processor_registry.ProcessorRegistry,
 ) -> None:
-    """Run a single membership sync cycle for all offerings."""
-    waldur_offerings = configuration.waldur_offerings
-    user_agent = configuration.waldur_user_agent
-
-    logger.info("Number of offerings to process: %s", len(waldur_offerings))
-    for offering in waldur_offerings:
-        # Touch the heartbeat at the start of every offering so liveness stays
-        # fresh (and the heartbeat file is created on the first iteration,
-        touch_heartbeat()
-        try:
-            use_stomp = (
-                offering.stomp_membership_sync_enabled
-                if offering.stomp_membership_sync_enabled is not None
-                else offering.stomp_enabled
-            )
-            if use_stomp:
-                logger.info(
-                    "Skipping HTTP polling for the offering %s, "
-                    "because it uses event-based processing",
-                    offering.name,
-                )
-                continue
-
-            waldur_rest_client = common_utils.get_client_for_offering(
-                offering,
-                user_agent,
-                configuration.global_proxy,
-            )
-
-            agent_identity_manager = agent_identity_management.AgentIdentityManager(
-                offering, waldur_rest_client
-            )
-
-            identity_name = f"agent-{offering.uuid}"
-
-            # Get an identity from the local cache
-            agent_identity = agent_identities.get(offering.uuid)
-            if agent_identity is None:
-                # If no identities found locally, registering one
-                agent_identity = agent_identity_manager.register_identity(identity_name)
-
-            common_utils.ensure_log_shipper(
-                offering, agent_identity.uuid.hex, configuration.log_shipping
+    """Run a single membership sync cycle for the offering."""
+    try:
+        use_stomp = (
+            offering.stomp_membership_sync_enabled
+            if offering.stomp_membership_sync_enabled is not None
+            else offering.stomp_enabled
+        )
+        if use_stomp:
+            logger.info(
+                "Skipping HTTP polling for the offering %s, because it uses event-based processing",
+                offering.name,
             )
+            return
 
-            agent_service = agent_identity_manager.register_service(
-                agent_identity,
-                configuration.waldur_site_agent_mode,
-                configuration.waldur_site_agent_mode,
-            )
+        processor = registry.get_processor(offering)
+        processor.process_offering()
+    except Exception as e:
+        registry.discard(offering)
+        logger.exception("Unable to process the offering due to the error: %s", e)
 
-            # Create backend instance for dependency injection
-            resource_backend, resource_backend_version = common_utils.get_backend_for_offering(
-                offering, "membership_sync_backend"
-            )
 
-            processor = common_processors.OfferingMembershipProcessor(
-                offering,
-                waldur_rest_client,
-                resource_backend=resource_backend,
-                resource_backend_version=resource_backend_version,
-                expose_backend_error_details=configuration.expose_backend_error_details,
-            )
-            processor.register(agent_service)
+def _process_offerings(
+    configuration: common_structures.WaldurAgentConfiguration,
+    registry: processor_registry.ProcessorRegistry,
+) -> None:
+    """Run a single membership sync cycle for all offerings."""
+    waldur_offerings = configuration.waldur_offerings
 
-            processor.process_offering()
-        except Exception as e:
-            logger.exception("Unable to process the offering due to the error: %s", e)
+    logger.info("Number of offerings to process: %s", len(waldur_offerings))
+    offering_pool.process_offerings(
+        waldur_offerings,
+        functools.partial(_process_offering, registry=registry),
+        configuration.offering_workers.membership_sync,
+    )
 
 
 def start(configuration: common_structures.WaldurAgentConfiguration) -> None:
     """Starts the tick-based main loop for offering processing."""
     last_sync = 0.0
-    agent_identities: dict[str, AgentIdentity] = {}
+    registry = processor_registry.ProcessorRegistry(
+        configuration, functools.partial(_create_processor, configuration=configuration)
+    )
     common_utils.setup_log_shippers(configuration)
     try:
         while True:
             now = time.time()
 
             if now - last_sync >= SYNC_INTERVAL:
-                _process_offerings(configuration, agent_identities)
+                _process_offerings(configuration, registry)
                 last_sync = time.time()
 
             touch_heartbeat()
@@ -1,97 +1,108 @@
 """Agent responsible for usage and limits reporting."""
 
+import functools
 import time
-
-from waldur_api_client.models import AgentIdentity
+from pathlib import Path
+from typing import Optional
 
 from waldur_site_agent.backend import logger
-from waldur_site_agent.common import (
-    WALDUR_SITE_AGENT_REPORT_PERIOD_MINUTES,
-    agent_identity_management,
-    utils,
-)
+from waldur_site_agent.common import WALDUR_SITE_AGENT_REPORT_PERIOD_MINUTES, utils
 from waldur_site_agent.common import processors as common_processors
 from waldur_site_agent.common import structures as common_structures
 from waldur_site_agent.common.healthz import touch_heartbeat
+from waldur_site_agent.common.usage_ledger import LEDGER_FILE_NAME, UsageLedger
+from waldur_site_agent.polling_processing import offering_pool, processor_registry
 
 REPORT_INTERVAL = WALDUR_SITE_AGENT_REPORT_PERIOD_MINUTES * 60
 TICK_INTERVAL = 60  # Wake up every minute to touch heartbeat
 
 
+def _create_processor(
+    offering: common_structures.Offering,
+    waldur_rest_client: utils.AuthenticatedClient,
+    configuration: common_structures.WaldurAgentConfiguration,
+    usage_ledger: Optional[UsageLedger] = None,
+) -> common_processors.OfferingReportProcessor:
+    """Build the report processor of the offering."""
+    # Create backend instance for dependency injection
+    resource_backend, resource_backend_version = utils.get_backend_for_offering(
+        offering, "reporting_backend"
+    )
+
+    return common_processors.OfferingReportProcessor(
+        offering,
+        waldur_rest_client,
+        configuration.timezone,
+        resource_backend=resource_backend,
+        resource_backend_version=resource_backend_version,
+        reporting_periods=configuration.reporting_periods,
+        expose_backend_error_details=configuration.expose_backend_error_details,
+        usage_ledger=usage_ledger,
+    )
+
+
+def _process_offering(
+    offering: common_structures.Offering,
+    registry: processor_registry.ProcessorRegistry,
+) -> None:
+    """Run a single report cycle for the offering."""
+    try:
+        processor = registry.get_processor(offering)
+        processor.process_offering()
+    except Exception as e:
+        registry.discard(offering)
+        logger.exception("The application crashed due to the error: %s", e)
+
+
 def _process_offerings(
     configuration: common_structures.WaldurAgentConfiguration,
-    agent_identities: dict[str, AgentIdentity],
+    registry: processor_registry.ProcessorRegistry,
 ) -> None:
     """Run a single report cycle for all offerings."""
     waldur_offerings = configuration.waldur_offerings
-    user_agent = configuration.waldur_user_agent
 
     logger.info("Number of offerings to process: %s", len(waldur_offerings))
-    for offering in waldur_offerings:
-        touch_heartbeat()
-        try:
-            waldur_rest_client = utils.get_client_for_offering(
-                offering,
-                user_agent,
-                configuration.global_proxy,
-            )
-
-            agent_identity_manager = agent_identity_management.AgentIdentityManager(
-                offering, waldur_rest_client
-            )
-
-            identity_name = f"agent-{offering.uuid}"
-
-            # Get an identity from the local cache
-            agent_identity = agent_identities.get(offering.uuid)
-            if agent_identity is None:
-                # If no identities found locally, registering one
-                agent_identity = agent_identity_manager.register_identity(identity_name)
-
-            utils.ensure_log_shipper(offering, agent_identity.uuid.hex, configuration.log_shipping)
-
-            agent_service = agent_identity_manager.register_service(
-                agent_identity,
-                configuration.waldur_site_agent_mode,
-                configuration.waldur_site_agent_mode,
-            )
-
-            # Create backend instance for dependency injection
-            resource_backend, resource_backend_version = utils.get_backend_for_offering(
-                offering, "reporting_backend"
-            )
-
-            processor = common_processors.OfferingReportProcessor(
-                offering,
-                waldur_rest_client,
-                configuration.timezone,
-                resource_backend=resource_backend,
-                resource_backend_version=resource_backend_version,
-                reporting_periods=configuration.reporting_periods,
-                expose_backend_error_details=configuration.expose_backend_error_details,
-            )
-            processor.register(agent_service)
-
-            processor.process_offering()
-        except Exception as e:
-            logger.exception("The application crashed due to the error: %s", e)
+    offering_pool.process_offerings(
+        waldur_offerings,
+        functools.partial(_process_offering, registry=registry),
+        configuration.offering_workers.report,
+    )
+
+
+def _open_usage_ledger(
+    configuration: common_structures.WaldurAgentConfiguration,
+) -> Optional[UsageLedger]:
+    """Open the local usage ledger if it is enabled in the configuration."""
+    if not configuration.usage_ledger.enabled:
+        return None
+    path = Path(configuration.state_dir) / LEDGER_FILE_NAME
+    logger.info("Using the usage ledger at %s", path)
+    return UsageLedger(str(path), configuration.usage_ledger.refresh_ttl_minutes * 60)
 
 
 def start(configuration: common_structures.WaldurAgentConfiguration) -> None:
     """Starts the tick-based main loop for offering processing."""
     logger.info("Synching data to Waldur")
     last_report = 0.0
-    agent_identities: dict[str, AgentIdentity] = {}
+    usage_ledger = _open_usage_ledger(configuration)
+    registry = processor_registry.ProcessorRegistry(
+        configuration,
+        functools.partial(
+            _create_processor, configuration=configuration, usage_ledger=usage_ledger
+        ),
+    )
     utils.setup_log_shippers(configuration)
     try:
         while True:
             now = time.time()
 
             if now - last_report >= REPORT_INTERVAL:
-                _process_offerings(configuration, agent_identities)
+                _process_offerings(configuration, registry)
                 last_report = time.time()
 
             touch_heartbeat()
             time.sleep(TICK_INTERVAL)
     finally:
         utils.teardown_log_shippers()
+        if usage_ledger is not None:
+            usage_ledger.close()
@@ -0,0 +1,61 @@
+"""Bounded worker pool for per-offering processing in the agents."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import structlog
+
+from waldur_site_agent.backend import logger
+from waldur_site_agent.common import structures as common_structures
+from waldur_site_agent.common.healthz import touch_heartbeat
+
+
+def _run_offering(
+    process_offering: Callable[[common_structures.Offering], None],
+    offering: common_structures.Offering,
+) -> None:
+    """Process a single offering inside a pool worker."""
+    touch_heartbeat()
+    # Tag the log entries of the worker, which interleave with other offerings
+    with structlog.contextvars.bound_contextvars(offering=offering.name):
+        process_offering(offering)
+
+
+def process_offerings(
+    offerings: Sequence[common_structures.Offering],
+    process_offering: Callable[[common_structures.Offering], None],
+    max_workers: int = 1,
+) -> None:
+    """Run ``process_offering`` for each offering using at most ``max_workers`` threads.
+
+    With a single worker the offerings are processed sequentially in the calling
+    thread. Otherwise each offering runs in its own pool worker and the call
+    returns once all of them are done. The heartbeat is touched whenever an
+    offering starts or finishes, so a pool stuck on hung offerings still stops
+    the heartbeat the same way a stuck sequential loop does.
+    """
+    if max_workers <= 1 or len(offerings) <= 1:
+        for offering in offerings:
+            touch_heartbeat()
+            process_offering(offering)
+        return
+
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(offerings)), thread_name_prefix="offering"
+    ) as executor:
+        futures = {
+            executor.submit(_run_offering, process_offering, offering): offering
+            for offering in offerings
+        }
+        for future in as_completed(futures):
+            touch_heartbeat()
+            try:
+                future.result()
+            except Exception as e:
+                logger.exception(
+                    "Unable to process the offering %s due to the error: %s",
+                    futures[future].name,
+                    e,
+                )
@@ -0,0 +1,150 @@
+"""Per-offering processors kept alive across polling cycles."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from waldur_api_client import AuthenticatedClient
+from waldur_api_client.models import AgentIdentity
+
+from waldur_site_agent.backend import logger
+from waldur_site_agent.common import (
+    WALDUR_SITE_AGENT_PROCESSOR_REFRESH_MINUTES,
+    agent_identity_management,
+    utils,
+)
+from waldur_site_agent.common import processors as common_processors
+from waldur_site_agent.common import structures as common_structures
+
+PROCESSOR_REFRESH_INTERVAL = WALDUR_SITE_AGENT_PROCESSOR_REFRESH_MINUTES * 60
+
+ProcessorFactory = Callable[
+    [common_structures.Offering, AuthenticatedClient], common_processors.OfferingBaseProcessor
+]
+
+
+@dataclass
+class _RegistryEntry:
+    """Processor of an offering together with its agent registration."""
+
+    processor: common_processors.OfferingBaseProcessor
+    agent_identity_manager: agent_identity_management.AgentIdentityManager
+    agent_identity: AgentIdentity
+    api_token: str
+    refreshed_at: float = 0.0
+
+
+def _close_entry(entry: _RegistryEntry) -> None:
+    """Close the connection pools of a processor that is no longer used."""
+    try:
+        entry.processor.close()
+    except Exception:
+        logger.exception(
+            "Failed to close the processor of the offering %s", entry.processor.offering.name
+        )
+
+
+class ProcessorRegistry:
+    """Long-lived per-offering processors of a polling agent mode.
+
+    The first cycle of an offering creates the Waldur client, registers the
+    agent identity and service and builds the processor. Later cycles reuse
+    all of it, so they skip the setup round-trips (offering details, service
+    provider, current user) and keep the client's connection pool open.
+    Every ``refresh_interval`` seconds the offering metadata and components
+    are re-fetched and the service and processor registrations renewed.
+    """
+
+    def __init__(
+        self,
+        configuration: common_structures.WaldurAgentConfiguration,
+        create_processor: ProcessorFactory,
+        refresh_interval: float = PROCESSOR_REFRESH_INTERVAL,
+    ) -> None:
+        """Constructor.
+
+        Args:
+            configuration: Agent configuration of the polling mode
+            create_processor: Builds the mode's processor for an offering and client
+            refresh_interval: Seconds after which a reused processor is refreshed
+        """
+        self.configuration = configuration
+        self.create_processor = create_processor
+        self.refresh_interval = refresh_interval
+        self._entries: dict[str, _RegistryEntry] = {}
+        # Offerings are processed by concurrent workers
+        self._lock = threading.Lock()
+
+    def get_processor(
+        self, offering: common_structures.Offering
+    ) -> common_processors.OfferingBaseProcessor:
+        """Return the processor of the offering, ready for a new cycle."""
+        with self._lock:
+            entry = self._entries.get(offering.uuid)
+
+        # OIDC tokens expire, a client holding a stale one must be replaced
+        api_token, token_prefix = utils.get_offering_api_token(
+            offering, self.configuration.global_proxy
+        )
+        if entry is not None and entry.api_token != api_token:
+            logger.info("API token of the offering %s changed, recreating processor", offering.name)
+            _close_entry(entry)
+            entry = None
+
+        if entry is None:
+            entry = self._create_entry(offering, api_token, token_prefix)
+        elif time.monotonic() - entry.refreshed_at >= self.refresh_interval:
+            logger.info("Refreshing the processor of the offering %s", offering.name)
+            entry.processor.refresh_offering_metadata()
+            self._register(entry)
+        entry.processor.reset_cycle_caches()
+
+        with self._lock:
+            self._entries[offering.uuid] = entry
+        return entry.processor
+
+    def discard(self, offering: common_structures.Offering) -> None:
+        """Drop the processor of the offering, so the next cycle builds it from scratch."""
+        with self._lock:
+            entry = self._entries.pop(offering.uuid, None)
+        if entry is not None:
+            _close_entry(entry)
+
+    def _create_entry(
+        self, offering: common_structures.Offering, api_token: str, token_prefix: str
+    ) -> _RegistryEntry:
+        waldur_rest_client = utils.get_client(
+            offering.waldur_api_url,
+            api_token,
+            self.configuration.waldur_user_agent,
+            offering.verify_ssl,
+            self.configuration.global_proxy,
+            token_prefix,
+        )
+        agent_identity_manager = agent_identity_management.AgentIdentityManager(
+            offering, waldur_rest_client
+        )
+        agent_identity = agent_identity_manager.register_identity(f"agent-{offering.uuid}")
+
+        utils.ensure_log_shipper(offering, agent_identity.uuid.hex, self.configuration.log_shipping)
+
+        entry = _RegistryEntry(
+            processor=self.create_processor(offering, waldur_rest_client),
+            agent_identity_manager=agent_identity_manager,
+            agent_identity=agent_identity,
+            api_token=api_token,
+        )
+        self._register(entry)
+        return entry
+
+    def _register(self, entry: _RegistryEntry) -> None:
+        agent_service = entry.agent_identity_manager.register_service(
+            entry.agent_identity,
+            self.configuration.waldur_site_agent_mode,
+            self.configuration.waldur_site_agent_mode,
+        )
+        entry.processor.register(agent_service)
+        entry.refreshed_at = time.monotonic()
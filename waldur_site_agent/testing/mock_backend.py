@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import dataclasses
 from typing import Any, Optional
 
 from waldur_api_client.models.resource import Resource as WaldurResource
@@ -105,13 +106,15 @@ class MockBackend(BaseBackend):
         return self._created_resources.get(backend_id)
 
     def pull_resources(
-        self, waldur_resources: list[WaldurResource]
+        self, waldur_resources: list[WaldurResource], include_usage: bool = True
     ) -> dict[str, tuple[WaldurResource, BackendResourceInfo]]:
-        """Pull multiple resources from the mock backend."""
+        """Pull multiple resources from the mock backend, without usage if not requested."""
         result = {}
         for resource in waldur_resources:
             backend_info = self.pull_resource(resource)
             if backend_info is not None:
+                if not include_usage:
+                    backend_info = dataclasses.replace(backend_info, usage={})
                 result[resource.backend_id] = (resource, backend_info)
         return result
 